@@ -0,0 +1,115 @@
+"""
+日志调用开销基准测试
+比较每次日志调用在调用线程中的耗时：
+    - sync: 同步写入（原实现：调用线程中写文件处理器、控制台处理器，并额外打印一行彩色消息）
+    - async_info: Logger.info（放入队列，由后台线程写入）
+    - disabled_debug: 级别关闭时的 Logger.debug("...%s", value)（不做格式化）
+控制台输出重定向到空设备，日志文件写入临时目录；async 另外给出包含后台写完的总耗时。
+
+用法:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --calls 50000 --json logging.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import contextlib
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from colorama import Fore, Style  # noqa: E402
+
+from src.utils.logger import Logger, flush_logs  # noqa: E402
+
+
+def sync_logger(log_dir: str) -> logging.Logger:
+    """按原实现配置的同步日志（文件 + 控制台处理器）"""
+    logger = logging.getLogger('bench_sync')
+    logger.setLevel(logging.DEBUG)
+    logger.handlers.clear()
+    file_handler = logging.FileHandler(os.path.join(log_dir, 'bench_sync.log'), encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
+    return logger
+
+
+def time_calls(func, calls: int) -> float:
+    """执行 calls 次，返回每次调用的平均耗时（微秒）"""
+    started = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def run(calls: int) -> dict:
+    log_dir = tempfile.mkdtemp(prefix='bench_logging_')
+    results = {}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                contextlib.redirect_stderr(devnull):
+            legacy = sync_logger(log_dir)
+
+            def sync_info(i):
+                message = f"已处理: {i}/{calls}"
+                legacy.info(message)
+                print(f"{Fore.BLUE}[INFO] {message}{Style.RESET_ALL}")
+
+            results['sync_us'] = time_calls(sync_info, calls)
+            for handler in legacy.handlers:
+                handler.close()
+            legacy.handlers.clear()
+
+            logger = Logger('bench_async', log_dir)
+            started = time.perf_counter()
+            results['async_info_us'] = time_calls(lambda i: logger.info("已处理: %d/%d", i, calls), calls)
+            flush_logs(timeout=120)
+            results['async_total_us'] = (time.perf_counter() - started) / calls * 1e6
+
+            logger.logger.setLevel(logging.INFO)
+            results['disabled_debug_us'] = time_calls(lambda i: logger.debug("进度: %d/%d", i, calls), calls)
+    finally:
+        flush_logs()
+        shutil.rmtree(log_dir, ignore_errors=True)
+    results['calls'] = calls
+    results['speedup'] = results['sync_us'] / results['async_info_us'] if results['async_info_us'] else 0
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='日志调用开销基准测试')
+    parser.add_argument('--calls', type=int, default=20000, help='每种方式的调用次数')
+    parser.add_argument('--json', dest='json_path', help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    results = run(max(1, args.calls))
+
+    print("=" * 50)
+    print("日志调用开销基准测试")
+    print("=" * 50)
+    print(f"调用次数: {results['calls']}")
+    print(f"同步写入(原实现): {results['sync_us']:.2f} 微秒/次")
+    print(f"Logger.info(调用线程): {results['async_info_us']:.2f} 微秒/次")
+    print(f"Logger.info(含后台写完): {results['async_total_us']:.2f} 微秒/次")
+    print(f"关闭级别的 debug: {results['disabled_debug_us']:.2f} 微秒/次")
+    print(f"调用线程加速: {results['speedup']:.1f}x")
+    print("=" * 50)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,544 @@
+"""
+处理流程基准测试（离线、可重复）
+在本地生成确定性的测试素材，逐步计时截图提取、截图去重、Markdown生成、Prompt生成
+和知乎格式转换（图片上传指向本地模拟服务），结果写入JSON，并与基线对比吞吐量。
+
+测试素材:
+    - 幻灯片式视频：每页一张确定性生成的幻灯片图片，右下角叠加 ffmpeg lavfi testsrc2
+      模拟画面中的运动，音轨为带音节包络的 lavfi 正弦音（代替人声，不依赖TTS）
+    - 字幕：每页若干条、时间均匀分布的SRT
+    - 未安装ffmpeg时跳过截图提取，直接按字幕时间生成截图，其余步骤照常计时
+
+用法:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --json pipeline.json
+    python benchmarks/bench_pipeline.py --baseline pipeline.json --max-regression 0.2 --threshold generate_prompt=0.5
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+# 各步骤的计时顺序（也是结果JSON中的键名）
+STEPS = [
+    'extract_screenshots',
+    'deduplicate_screenshots',
+    'generate_markdown',
+    'generate_prompt',
+    'convert_markdown_to_zhihu',
+]
+
+WORDS = ('the model renders each frame before the encoder splits the scene into tiles and '
+         'we measure latency across the pipeline while the cache keeps hot entries close to '
+         'the worker so throughput stays stable under load').split()
+
+
+# ----------------------------------------------------------------------
+# 测试素材
+# ----------------------------------------------------------------------
+
+def render_slide(path: str, slide_index: int, width: int, height: int, seed: int, frame: int = -1) -> None:
+    """
+    生成一张确定性的幻灯片图片
+
+    Args:
+        path: 输出PNG路径
+        slide_index: 幻灯片序号（决定版式和配色）
+        width/height: 分辨率
+        seed: 随机种子
+        frame: >=0 时在右下角绘制随帧变化的小块（模拟画面运动，用于无ffmpeg时直接生成截图）
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed * 1000 + slide_index)
+    background = tuple(rng.randint(200, 255) for _ in range(3))
+    accent = tuple(rng.randint(0, 120) for _ in range(3))
+    image = Image.new('RGB', (width, height), background)
+    draw = ImageDraw.Draw(image)
+
+    # 标题栏
+    draw.rectangle([0, 0, width, height // 8], fill=accent)
+    # 要点条目
+    top = height // 5
+    for _ in range(rng.randint(3, 6)):
+        bar_width = rng.randint(width // 4, width * 3 // 4)
+        draw.rectangle([width // 10, top, width // 10 + bar_width, top + height // 30], fill=accent)
+        top += height // 10
+    # 配图
+    box = [width * 6 // 10, height // 4, width * 9 // 10, height * 3 // 5]
+    if rng.random() < 0.5:
+        draw.ellipse(box, outline=accent, width=8)
+    else:
+        draw.rectangle(box, outline=accent, width=8)
+
+    if frame >= 0:
+        shade = (frame * 37) % 256
+        draw.rectangle([width - width // 8 - 20, height - height // 8 - 20, width - 20, height - 20],
+                       fill=(shade, 255 - shade, (shade * 3) % 256))
+    image.save(path)
+
+
+def format_srt_time(seconds: float) -> str:
+    """秒 -> SRT时间戳"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def write_srt(path: str, slides: int, slide_seconds: float, subtitles_per_slide: int, seed: int) -> list:
+    """
+    生成字幕文件
+
+    Returns:
+        list: [(字幕序号, 开始秒数, 所属幻灯片)]
+    """
+    rng = random.Random(seed)
+    step = slide_seconds / subtitles_per_slide
+    entries = []
+    with open(path, 'w', encoding='utf-8') as f:
+        index = 1
+        for slide in range(slides):
+            for i in range(subtitles_per_slide):
+                start = slide * slide_seconds + i * step
+                text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + '.'
+                f.write(f"{index}\n{format_srt_time(start)} --> {format_srt_time(start + step - 0.05)}\n{text}\n\n")
+                entries.append((index, start, slide))
+                index += 1
+    return entries
+
+
+def build_video(ffmpeg: list, slide_paths: list, slide_seconds: float, output_path: str, fps: int = 10) -> None:
+    """用幻灯片图片 + lavfi 运动画面和正弦音轨合成测试视频"""
+    total = slide_seconds * len(slide_paths)
+    cmd = list(ffmpeg) + ['-y', '-v', 'error']
+    for path in slide_paths:
+        cmd += ['-loop', '1', '-framerate', str(fps), '-t', str(slide_seconds), '-i', path]
+    cmd += ['-f', 'lavfi', '-i', f'testsrc2=s=160x90:r={fps}:d={total}']
+    cmd += ['-f', 'lavfi', '-i', f'sine=frequency=220:sample_rate=16000:duration={total}']
+
+    count = len(slide_paths)
+    concat_inputs = ''.join(f'[{i}:v]' for i in range(count))
+    filter_complex = (
+        f"{concat_inputs}concat=n={count}:v=1:a=0[slides];"
+        f"[slides][{count}:v]overlay=W-w-20:H-h-20:shortest=1,format=yuv420p[v];"
+        f"[{count + 1}:a]volume='0.2+0.8*abs(sin(2*PI*2.5*t))':eval=frame[a]"
+    )
+    cmd += ['-filter_complex', filter_complex, '-map', '[v]', '-map', '[a]',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-threads', '1', '-c:a', 'aac', '-shortest', output_path]
+    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore', timeout=600)
+    if result.returncode != 0:
+        raise RuntimeError(f"生成测试视频失败:\n{result.stderr}")
+
+
+def build_fixtures(work_dir: str, args: argparse.Namespace, ffmpeg: list) -> dict:
+    """
+    生成项目目录结构和测试素材（与处理器的步骤目录一致）
+
+    Returns:
+        dict: 各素材路径
+    """
+    project = os.path.join(work_dir, 'bench_project')
+    dirs = {name: os.path.join(project, name) for name in
+            ('step1_download', 'step2_transcribe', 'step3_screenshots', 'step4_markdown', 'step5_prompt')}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+
+    slides_dir = os.path.join(work_dir, 'slides')
+    os.makedirs(slides_dir, exist_ok=True)
+    slide_paths = []
+    for slide in range(args.slides):
+        path = os.path.join(slides_dir, f'slide_{slide:03d}.png')
+        render_slide(path, slide, args.width, args.height, args.seed)
+        slide_paths.append(path)
+
+    srt_path = os.path.join(dirs['step2_transcribe'], 'subtitles_en.srt')
+    entries = write_srt(srt_path, args.slides, args.slide_seconds, args.subtitles_per_slide, args.seed)
+
+    video_path = None
+    if ffmpeg:
+        video_path = os.path.join(dirs['step1_download'], 'benchmark.mp4')
+        build_video(ffmpeg, slide_paths, args.slide_seconds, video_path)
+
+    video_info_path = os.path.join(dirs['step1_download'], 'video_info.json')
+    with open(video_info_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'title': 'Synthetic benchmark video',
+            'duration': int(args.slides * args.slide_seconds),
+            'uploader': 'benchmark',
+            'upload_date': '20240101',
+            'description': '',
+            'url': 'https://www.youtube.com/watch?v=benchmark00',
+            'platform': 'youtube'
+        }, f, ensure_ascii=False, indent=2)
+
+    return {
+        'project': project,
+        'dirs': dirs,
+        'entries': entries,
+        'srt': srt_path,
+        'video': video_path,
+        'video_info': video_info_path,
+    }
+
+
+def render_screenshots(fixtures: dict, args: argparse.Namespace) -> list:
+    """无ffmpeg时按字幕直接生成截图（与 extract_screenshots 的文件名和索引格式一致）"""
+    from src.core.steps.step3_screenshots import VideoScreenshot
+
+    screenshots_dir = os.path.join(fixtures['dirs']['step3_screenshots'], 'screenshots')
+    os.makedirs(screenshots_dir, exist_ok=True)
+    screenshot_info = []
+    for index, start, slide in fixtures['entries']:
+        filename = VideoScreenshot._screenshot_filename(index, 0.0)
+        path = os.path.join(screenshots_dir, filename)
+        render_slide(path, slide, args.width, args.height, args.seed, frame=index)
+        screenshot_info.append({
+            'subtitle_index': index,
+            'start_time': start,
+            'text': '',
+            'offset': 0.0,
+            'timestamp': start,
+            'filename': filename,
+            'path': path
+        })
+    return screenshot_info
+
+
+# ----------------------------------------------------------------------
+# 本地模拟的知乎图床
+# ----------------------------------------------------------------------
+
+class FakeZhihuHandler(BaseHTTPRequestHandler):
+    """模拟 api.zhihu.com/images（总是要求上传）和 OSS 上传接口"""
+
+    latency = 0.0
+
+    def _reply(self, status: int, body: dict = None):
+        time.sleep(self.latency)
+        data = json.dumps(body or {}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        self._reply(200, {
+            'upload_file': {'state': 2, 'image_id': payload.get('image_hash', '')},
+            'upload_token': {'access_id': 'bench', 'access_key': 'bench', 'access_token': 'bench'}
+        })
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply(200)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_server(latency_ms: float) -> ThreadingHTTPServer:
+    """在后台线程启动模拟服务"""
+    FakeZhihuHandler.latency = latency_ms / 1000.0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeZhihuHandler)
+    threading.Thread(target=server.serve_forever, name='fake_zhihu', daemon=True).start()
+    return server
+
+
+# ----------------------------------------------------------------------
+# 计时
+# ----------------------------------------------------------------------
+
+def time_runs(func, runs: int, prepare=None) -> list:
+    """
+    执行多次并计时
+
+    Args:
+        func: 被测函数，返回 (是否成功, 处理条目数)
+        runs: 次数
+        prepare: 每次执行前调用（清理上一次的输出，不计入耗时）
+
+    Returns:
+        list: [(耗时秒数, 条目数)]
+    """
+    samples = []
+    for _ in range(runs):
+        if prepare:
+            prepare()
+        started = time.perf_counter()
+        success, items = func()
+        elapsed = time.perf_counter() - started
+        if not success:
+            raise RuntimeError('步骤执行失败')
+        samples.append((elapsed, items))
+    return samples
+
+
+def summarize(samples: list, unit: str) -> dict:
+    """汇总多次执行的耗时和吞吐量（取中位数）"""
+    seconds = [s for s, _ in samples]
+    median = statistics.median(seconds)
+    items = samples[-1][1]
+    return {
+        'seconds': round(median, 4),
+        'all_seconds': [round(s, 4) for s in seconds],
+        'items': items,
+        'unit': unit,
+        'throughput': round(items / median, 3) if median > 0 else 0.0
+    }
+
+
+def run_benchmarks(args: argparse.Namespace, work_dir: str) -> dict:
+    """生成素材并逐步计时"""
+    from src.utils.config import Config
+    from src.utils.logger import Logger
+    from src.utils.capabilities import get_capabilities
+
+    ffmpeg_capability = get_capabilities().tool('ffmpeg')
+    ffmpeg = ffmpeg_capability['command'] if ffmpeg_capability['available'] else None
+
+    config = Config(args.config)
+    config.set('step3_screenshots', 'auto_open_dedup_report', 'false')
+    # 保留重复截图，保证每次计时的输入相同
+    config.set('step3_screenshots', 'delete_duplicate_files', 'false')
+    config.set('step6_zhihu', 'cookie_file', os.path.join(work_dir, 'zhihu_cookies.json'))
+    logger = Logger('benchmark')
+
+    fixtures = build_fixtures(work_dir, args, ffmpeg)
+    step3_dir = fixtures['dirs']['step3_screenshots']
+    screenshots_dir = os.path.join(step3_dir, 'screenshots')
+    results = {}
+
+    from src.core.steps.step3_screenshots import VideoScreenshot
+    screenshot = VideoScreenshot(config, logger)
+
+    # 截图提取
+    if ffmpeg:
+        holder = {}
+
+        def extract():
+            result = screenshot.extract_screenshots(fixtures['video'], fixtures['srt'], step3_dir)
+            holder['result'] = result
+            return result['success'], result.get('extraction_stats', {}).get('screenshots_extracted', 0)
+
+        def reset_step3():
+            shutil.rmtree(step3_dir, ignore_errors=True)
+            os.makedirs(step3_dir)
+
+        # 只计时截图本身，去重单独计时
+        screenshot.enable_deduplication = False
+        results['extract_screenshots'] = summarize(time_runs(extract, args.runs, reset_step3), 'screenshots')
+        with open(holder['result']['index_file'], 'r', encoding='utf-8') as f:
+            screenshot_info = json.load(f)
+    else:
+        results['extract_screenshots'] = {'skipped': '未安装ffmpeg'}
+        screenshot_info = render_screenshots(fixtures, args)
+
+    # 截图去重
+    from src.core.steps.step3_screenshots import IMAGEHASH_AVAILABLE
+    if IMAGEHASH_AVAILABLE:
+        holder = {}
+
+        def dedup():
+            info = copy.deepcopy(screenshot_info)
+            stats = screenshot._deduplicate_screenshots(screenshots_dir, info)
+            holder['info'] = info
+            return True, stats.get('total_screenshots', len(info))
+
+        results['deduplicate_screenshots'] = summarize(time_runs(dedup, args.runs), 'screenshots')
+        screenshot_info = holder['info']
+    else:
+        results['deduplicate_screenshots'] = {'skipped': '未安装imagehash'}
+    with open(os.path.join(step3_dir, 'screenshot_index.json'), 'w', encoding='utf-8') as f:
+        json.dump(screenshot_info, f, ensure_ascii=False, indent=2)
+
+    # Markdown生成
+    from src.core.steps.step4_generate_markdown import MarkdownGenerator
+    generator = MarkdownGenerator(config, logger)
+    generator.set_language('en')
+    markdown_path = os.path.join(fixtures['dirs']['step4_markdown'], 'article.md')
+    subtitle_count = len(fixtures['entries'])
+
+    def markdown():
+        result = generator.generate_markdown(fixtures['srt'], screenshots_dir, fixtures['video_info'], markdown_path)
+        return result['success'], subtitle_count
+
+    results['generate_markdown'] = summarize(time_runs(markdown, args.runs), 'subtitles')
+
+    # Prompt生成
+    from src.core.steps.step5_generate_prompt import PromptGenerator
+    prompt_generator = PromptGenerator(config, logger)
+
+    def prompt():
+        result = prompt_generator.generate_prompt(markdown_path, fixtures['video_info'],
+                                                  fixtures['dirs']['step5_prompt'])
+        return result['success'], subtitle_count
+
+    results['generate_prompt'] = summarize(time_runs(prompt, args.runs), 'subtitles')
+
+    # 知乎格式转换（图片上传到本地模拟服务）
+    server = start_fake_server(args.fake_latency_ms)
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        config.set('step6_zhihu', 'image_api_url', f"{base_url}/images")
+        config.set('step6_zhihu', 'image_upload_url', base_url)
+        from src.core.steps.step6_publish_zhihu import ZhihuPublisher
+        publisher = ZhihuPublisher(config, logger)
+
+        def convert():
+            result = publisher.convert_markdown_to_zhihu(markdown_path, fixtures['project'])
+            return result['success'], result.get('images_uploaded', 0)
+
+        results['convert_markdown_to_zhihu'] = summarize(time_runs(convert, args.runs), 'images')
+    finally:
+        server.shutdown()
+
+    fixture_summary = {
+        'slides': args.slides,
+        'slide_seconds': args.slide_seconds,
+        'subtitles': subtitle_count,
+        'screenshots': len(screenshot_info),
+        'resolution': f"{args.width}x{args.height}",
+        'seed': args.seed,
+        'video': bool(fixtures['video'])
+    }
+    return {'fixture': fixture_summary, 'steps': results}
+
+
+# ----------------------------------------------------------------------
+# 基线对比
+# ----------------------------------------------------------------------
+
+def parse_thresholds(values: list, default: float) -> dict:
+    """解析 --threshold 步骤名=比例"""
+    thresholds = {step: default for step in STEPS}
+    for value in values or []:
+        name, _, ratio = value.partition('=')
+        if name not in STEPS or not ratio:
+            raise ValueError(f"无效的阈值: {value}（格式 步骤名=比例，步骤名: {', '.join(STEPS)}）")
+        thresholds[name] = float(ratio)
+    return thresholds
+
+
+def compare_with_baseline(steps: dict, baseline: dict, thresholds: dict) -> dict:
+    """
+    与基线对比吞吐量
+
+    Returns:
+        dict: {步骤名: {'baseline', 'current', 'change', 'threshold', 'passed'}}
+    """
+    comparison = {}
+    for step in STEPS:
+        current = steps.get(step, {})
+        previous = baseline.get('steps', {}).get(step, {})
+        if 'throughput' not in current or not previous.get('throughput'):
+            continue
+        change = current['throughput'] / previous['throughput'] - 1
+        comparison[step] = {
+            'baseline': previous['throughput'],
+            'current': current['throughput'],
+            'change': round(change, 4),
+            'threshold': thresholds[step],
+            'passed': change >= -thresholds[step]
+        }
+    return comparison
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='处理流程基准测试（离线生成测试素材）')
+    parser.add_argument('--config', default='config/config.ini', help='配置文件路径')
+    parser.add_argument('--runs', type=int, default=3, help='每个步骤的测量次数（取中位数）')
+    parser.add_argument('--slides', type=int, default=12, help='幻灯片页数')
+    parser.add_argument('--slide-seconds', type=float, default=10.0, help='每页时长（秒）')
+    parser.add_argument('--subtitles-per-slide', type=int, default=4, help='每页字幕条数')
+    parser.add_argument('--width', type=int, default=1280, help='视频宽度')
+    parser.add_argument('--height', type=int, default=720, help='视频高度')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--fake-latency-ms', type=float, default=0, help='模拟图床每个请求的延迟（毫秒）')
+    parser.add_argument('--work-dir', help='素材和输出目录（默认使用临时目录，结束后删除）')
+    parser.add_argument('--json', dest='json_path', help='将结果写入JSON文件')
+    parser.add_argument('--baseline', help='基线结果JSON，吞吐量下降超过阈值时失败')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='允许的吞吐量下降比例（默认 0.2）')
+    parser.add_argument('--threshold', action='append', metavar='STEP=RATIO', help='单个步骤的下降阈值，可重复')
+    args = parser.parse_args()
+
+    try:
+        thresholds = parse_thresholds(args.threshold, args.max_regression)
+    except ValueError as e:
+        print(f"[错误] {e}")
+        return 2
+
+    os.chdir(PROJECT_ROOT)
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        measured = run_benchmarks(args, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': args.runs,
+        **measured
+    }
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('fixture') != summary['fixture']:
+            print("[警告] 基线的测试素材参数不同，对比结果仅供参考")
+        summary['comparison'] = compare_with_baseline(summary['steps'], baseline, thresholds)
+        for step, item in summary['comparison'].items():
+            if not item['passed']:
+                failures.append(f"{step} 吞吐量下降 {-item['change']:.1%}，超过阈值 {item['threshold']:.0%}")
+    summary['passed'] = not failures
+
+    print("=" * 60)
+    print("处理流程基准测试")
+    print("=" * 60)
+    fixture = summary['fixture']
+    print(f"素材: {fixture['slides']} 页幻灯片，{fixture['subtitles']} 条字幕，{fixture['screenshots']} 张截图")
+    for step in STEPS:
+        result = summary['steps'][step]
+        if 'skipped' in result:
+            print(f"{step:28s} 跳过（{result['skipped']}）")
+            continue
+        line = f"{step:28s} {result['seconds']:8.3f} 秒  {result['throughput']:10.1f} {result['unit']}/秒"
+        compared = summary.get('comparison', {}).get(step)
+        if compared:
+            line += f"  ({compared['change']:+.1%})"
+        print(line)
+    for failure in failures:
+        print(f"[失败] {failure}")
+    print("=" * 60)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    return 0 if summary['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+启动耗时基准测试
+在全新的子进程中导入 Web 应用并创建 app，测量耗时、内存，并检查重量级依赖是否被提前加载
+
+用法:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --max-seconds 3 --json startup.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 启动路径上不应出现的模块（应在首次执行对应步骤时才导入）
+HEAVY_MODULES = ['whisper', 'torch', 'yt_dlp', 'pysrt', 'PIL', 'imagehash', 'numpy', 'qrcode']
+
+PROBE_SCRIPT = r'''
+import json, sys, time
+started = time.perf_counter()
+from src.web.app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+try:
+    import resource
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if sys.platform == 'darwin':
+        rss_mb /= 1024
+except ImportError:
+    rss_mb = 0
+heavy = [m for m in HEAVY if m in sys.modules]
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': created - imported,
+    'total_seconds': created - started,
+    'max_rss_mb': rss_mb,
+    'heavy_modules': heavy
+}))
+'''
+
+
+def run_once() -> dict:
+    """在子进程中执行一次启动测量"""
+    script = f"HEAVY = {HEAVY_MODULES!r}\n" + PROBE_SCRIPT
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        errors='ignore',
+        timeout=300
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"启动失败:\n{result.stderr}")
+    # 只取最后一行（前面可能有日志输出）
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Web应用启动耗时基准测试')
+    parser.add_argument('--runs', type=int, default=3, help='测量次数（取中位数）')
+    parser.add_argument('--max-seconds', type=float, default=3.0, help='启动总耗时上限（秒），超过则失败')
+    parser.add_argument('--max-rss-mb', type=float, default=0, help='内存峰值上限（MB），0 表示不检查')
+    parser.add_argument('--json', dest='json_path', help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(max(1, args.runs))]
+    summary = {
+        'runs': len(runs),
+        'total_seconds_median': statistics.median(r['total_seconds'] for r in runs),
+        'import_seconds_median': statistics.median(r['import_seconds'] for r in runs),
+        'max_rss_mb': max(r['max_rss_mb'] for r in runs),
+        'heavy_modules': sorted({m for r in runs for m in r['heavy_modules']}),
+    }
+
+    failures = []
+    if summary['heavy_modules']:
+        failures.append(f"启动时加载了重量级模块: {', '.join(summary['heavy_modules'])}")
+    if summary['total_seconds_median'] > args.max_seconds:
+        failures.append(f"启动耗时 {summary['total_seconds_median']:.2f}秒 超过上限 {args.max_seconds}秒")
+    if args.max_rss_mb and summary['max_rss_mb'] > args.max_rss_mb:
+        failures.append(f"内存峰值 {summary['max_rss_mb']:.0f}MB 超过上限 {args.max_rss_mb}MB")
+    summary['passed'] = not failures
+
+    print("=" * 50)
+    print("启动耗时基准测试")
+    print("=" * 50)
+    print(f"导入耗时(中位数): {summary['import_seconds_median']:.3f} 秒")
+    print(f"启动总耗时(中位数): {summary['total_seconds_median']:.3f} 秒")
+    print(f"内存峰值: {summary['max_rss_mb']:.1f} MB")
+    print(f"重量级模块: {', '.join(summary['heavy_modules']) or '无'}")
+    for failure in failures:
+        print(f"[失败] {failure}")
+    print("=" * 50)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    return 0 if summary['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
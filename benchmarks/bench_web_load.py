@@ -0,0 +1,279 @@
+"""
+Web服务并发基准测试
+分别以 dev（线程模式开发服务器）和 production（协程服务器）启动 run_web.py，
+连接若干 SocketIO 客户端（模拟打开的处理页面）并持续推送进度事件，同时并发请求项目列表等接口，
+对比客户端连接数、事件送达延迟和请求延迟。
+
+两种模式使用同一份临时配置：开启任务队列、不启动工作进程，由测试脚本直接向队列写入进度事件
+（模拟工作进程），Web进程的转发线程把事件推送到项目房间。
+
+用法:
+    python benchmarks/bench_web_load.py
+    python benchmarks/bench_web_load.py --clients 100 --requests 1000 --concurrency 50
+    python benchmarks/bench_web_load.py --modes production --json web_load.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+BENCH_PROJECT = 'bench_web_load'
+
+# 压测请求的接口（轮流请求）
+ENDPOINTS = ['/api/projects', '/api/jobs', '/']
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentiles(values: list) -> dict:
+    """毫秒级延迟统计"""
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+    return {
+        'p50': round(statistics.median(ordered) * 1000, 1),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        'max': round(ordered[-1] * 1000, 1)
+    }
+
+
+def prepare_workspace(work_dir: str, mode: str, port: int, project_count: int) -> str:
+    """生成临时配置和项目目录，返回任务队列数据库路径"""
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(PROJECT_ROOT, 'config', 'config.ini'), encoding='utf-8')
+    queue_path = os.path.join(work_dir, 'task_queue.db')
+    overrides = {
+        'basic': {'output_dir': os.path.join(work_dir, 'projects'), 'temp_dir': os.path.join(work_dir, 'temp'),
+                  'cache_dir': os.path.join(work_dir, 'cache')},
+        'jobs': {'state_file': os.path.join(work_dir, 'jobs.json')},
+        'tracing': {'enabled': 'false'},
+        'distributed': {'enabled': 'true', 'queue_path': queue_path},
+        'step2_transcribe': {'warmup_on_start': 'false'},
+        'web': {'host': '127.0.0.1', 'port': str(port), 'debug': 'false', 'server': mode,
+                'local_workers': '0', 'message_queue': '', 'relay_events': 'true', 'progress_interval': '0'},
+    }
+    for section, values in overrides.items():
+        if not parser.has_section(section):
+            parser.add_section(section)
+        for key, value in values.items():
+            parser.set(section, key, value)
+    os.makedirs(os.path.join(work_dir, 'config'), exist_ok=True)
+    with open(os.path.join(work_dir, 'config', 'config.ini'), 'w', encoding='utf-8') as f:
+        parser.write(f)
+
+    # 项目列表接口会读取每个项目的总结文件
+    for index in range(project_count):
+        project_path = os.path.join(work_dir, 'projects', f'project_{index:04d}')
+        os.makedirs(project_path, exist_ok=True)
+        with open(os.path.join(project_path, 'project_summary.json'), 'w', encoding='utf-8') as f:
+            json.dump({'project_name': f'project_{index:04d}', 'status': 'completed', 'current_step': 5,
+                       'youtube_url': f'https://www.youtube.com/watch?v={index:011d}'}, f, ensure_ascii=False)
+    return queue_path
+
+
+def start_server(work_dir: str, mode: str, port: int, timeout: float = 60) -> subprocess.Popen:
+    """启动 run_web.py 并等待接口可用"""
+    import requests
+
+    log_file = open(os.path.join(work_dir, f'server_{mode}.log'), 'w', encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, 'run_web.py'), '--server', mode, '--workers', '0'],
+        cwd=work_dir, stdout=log_file, stderr=subprocess.STDOUT
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} 服务启动失败，日志: {log_file.name}")
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/api/jobs', timeout=2).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.3)
+    process.kill()
+    raise RuntimeError(f"{mode} 服务启动超时，日志: {log_file.name}")
+
+
+class DashboardClient:
+    """模拟一个打开的处理页面：加入项目房间，记录进度事件的送达延迟"""
+
+    def __init__(self, url: str):
+        import socketio
+
+        self.url = url
+        self.sio = socketio.Client(reconnection=False)
+        self.latencies = []
+        self.joined = threading.Event()
+        self.sio.on('joined_project', lambda data: self.joined.set())
+        self.sio.on('progress_update', self._on_progress)
+
+    def _on_progress(self, data: dict):
+        message = data.get('message', '')
+        if message.startswith('bench '):
+            self.latencies.append(time.time() - float(message.split(' ', 1)[1]))
+
+    def connect(self, timeout: float) -> bool:
+        try:
+            self.sio.connect(self.url, wait_timeout=timeout)
+            self.sio.emit('join_project', {'project_name': BENCH_PROJECT})
+            return self.joined.wait(timeout)
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    """以指定模式启动服务并压测"""
+    import requests
+    from src.utils.logger import Logger
+    from src.core.task_queue import SQLiteTaskQueue
+
+    work_dir = tempfile.mkdtemp(prefix=f'bench_web_{mode}_')
+    port = free_port()
+    queue_path = prepare_workspace(work_dir, mode, port, args.projects)
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_server(work_dir, mode, port)
+    clients = []
+    try:
+        # 1. 连接客户端
+        started = time.time()
+        clients = [DashboardClient(base_url) for _ in range(args.clients)]
+        with ThreadPoolExecutor(max_workers=min(32, max(1, args.clients))) as pool:
+            connected = list(pool.map(lambda c: c.connect(args.timeout), clients))
+        connect_seconds = time.time() - started
+        live_clients = [c for c, ok in zip(clients, connected) if ok]
+
+        # 2. 推送进度事件的同时并发请求接口
+        task_queue = SQLiteTaskQueue(queue_path, Logger('bench_web_load', os.path.join(work_dir, 'logs')))
+        stop_events = threading.Event()
+        events_sent = [0]
+
+        def publish_events():
+            while not stop_events.is_set():
+                task_queue.publish_event(BENCH_PROJECT, 'progress_update',
+                                         {'step': 1, 'progress': 50, 'message': f'bench {time.time()}'})
+                events_sent[0] += 1
+                stop_events.wait(1.0 / args.event_rate)
+
+        publisher = threading.Thread(target=publish_events, daemon=True)
+        publisher.start()
+
+        def timed_request(index: int):
+            started_at = time.time()
+            try:
+                response = requests.get(base_url + ENDPOINTS[index % len(ENDPOINTS)], timeout=args.timeout)
+                return time.time() - started_at, response.status_code == 200
+            except requests.RequestException:
+                return time.time() - started_at, False
+
+        load_started = time.time()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            responses = list(pool.map(timed_request, range(args.requests)))
+        load_seconds = time.time() - load_started
+
+        stop_events.set()
+        publisher.join()
+        time.sleep(args.drain)
+
+        latencies = [seconds for c in live_clients for seconds in c.latencies]
+        expected = events_sent[0] * len(live_clients)
+        request_latencies = [seconds for seconds, ok in responses if ok]
+        return {
+            'mode': mode,
+            'clients': args.clients,
+            'clients_connected': len(live_clients),
+            'connect_seconds': round(connect_seconds, 2),
+            'events_sent': events_sent[0],
+            'delivery_ratio': round(len(latencies) / expected, 3) if expected else 0.0,
+            'event_latency_ms': percentiles(latencies),
+            'requests': args.requests,
+            'request_errors': sum(1 for _, ok in responses if not ok),
+            'requests_per_second': round(args.requests / load_seconds, 1) if load_seconds > 0 else 0.0,
+            'request_latency_ms': percentiles(request_latencies)
+        }
+    finally:
+        for client in clients:
+            client.close()
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_results(results: list) -> None:
+    rows = [
+        ('客户端连接', lambda r: f"{r['clients_connected']}/{r['clients']}"),
+        ('连接耗时(秒)', lambda r: r['connect_seconds']),
+        ('事件送达率', lambda r: r['delivery_ratio']),
+        ('事件延迟p50(ms)', lambda r: r['event_latency_ms']['p50']),
+        ('事件延迟p95(ms)', lambda r: r['event_latency_ms']['p95']),
+        ('请求失败数', lambda r: r['request_errors']),
+        ('请求吞吐(次/秒)', lambda r: r['requests_per_second']),
+        ('请求延迟p50(ms)', lambda r: r['request_latency_ms']['p50']),
+        ('请求延迟p95(ms)', lambda r: r['request_latency_ms']['p95']),
+        ('请求延迟max(ms)', lambda r: r['request_latency_ms']['max']),
+    ]
+    print("=" * 60)
+    print("Web服务并发基准测试")
+    print("=" * 60)
+    print(f"{'':<18}" + ''.join(f"{r['mode']:>18}" for r in results))
+    for label, value in rows:
+        print(f"{label:<18}" + ''.join(f"{str(value(r)):>18}" for r in results))
+    print("=" * 60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Web服务并发基准测试（dev / production 对比）')
+    parser.add_argument('--modes', default='dev,production', help='逗号分隔的运行模式')
+    parser.add_argument('--clients', type=int, default=50, help='SocketIO客户端数（模拟打开的处理页面）')
+    parser.add_argument('--requests', type=int, default=600, help='HTTP请求总数')
+    parser.add_argument('--concurrency', type=int, default=30, help='并发请求数')
+    parser.add_argument('--projects', type=int, default=300, help='项目目录数（影响项目列表接口的耗时）')
+    parser.add_argument('--event-rate', type=float, default=20, help='每秒推送的进度事件数')
+    parser.add_argument('--timeout', type=float, default=30, help='连接/请求超时（秒）')
+    parser.add_argument('--drain', type=float, default=3, help='停止推送后等待事件送达的时间（秒）')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（含服务日志）')
+    parser.add_argument('--json', dest='json_path', help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    results = []
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        try:
+            results.append(run_mode(mode, args))
+        except RuntimeError as e:
+            print(f"[失败] {str(e)}")
+            return 1
+
+    print_results(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
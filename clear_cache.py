@@ -18,6 +18,8 @@ def main():
     parser.add_argument('--type', choices=['video', 'subtitle_en', 'all'], 
                        default='all', help='缓存类型')
     parser.add_argument('--stats', action='store_true', help='显示缓存统计')
+    parser.add_argument('--gc', action='store_true', help='清理Blob存储中的失效引用')
+    parser.add_argument('--evict', action='store_true', help='按配置的容量预算淘汰缓存（不清空全部）')
     
     args = parser.parse_args()
     
@@ -26,7 +28,28 @@ def main():
     logger = Logger("cache_manager")
     cache_manager = CacheManager(config, logger)
     
-    if args.stats:
+    if args.gc:
+        # 清理失效引用
+        stats = cache_manager.gc_blobs()
+        print("=" * 50)
+        print("Blob引用清理")
+        print("=" * 50)
+        print(f"Blob数量: {stats['blobs']}")
+        print(f"清理失效引用: {stats['dead_refs']}")
+        print(f"孤立Blob: {stats['orphan_blobs']}")
+        print("=" * 50)
+    
+    elif args.evict:
+        # 按预算淘汰
+        evicted = cache_manager.evict()
+        print("=" * 50)
+        print(f"按容量预算淘汰缓存（策略: {cache_manager.eviction_policy}）")
+        print("=" * 50)
+        for kind, count in evicted.items():
+            print(f"{kind}: 淘汰 {count} 项")
+        print("=" * 50)
+    
+    elif args.stats:
         # 显示缓存统计
         stats = cache_manager.get_cache_stats()
         
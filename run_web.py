@@ -1,27 +1,55 @@
 #!/usr/bin/env python3
 """
 YouTube转文章工具 - Web UI启动脚本
+
+用法:
+    python run_web.py                              # 开发服务器（线程模式）
+    python run_web.py --server production          # 生产模式：协程服务器 + 本机工作进程
+    python run_web.py --server production --workers 0   # 生产模式，工作进程另行部署（run_worker.py）
 """
 import os
 import sys
-from src.web.app import create_app
+import argparse
+
+# 生产模式需要在导入Web应用和日志模块之前给标准库打补丁，这里只导入标准库和配置模块
 from src.utils.config import Config
-from src.utils.logger import Logger
+from src.web.server import SERVER_MODES, patch_for_async
 
 def main():
     """启动Web应用"""
+    parser = argparse.ArgumentParser(description='启动Web界面')
+    parser.add_argument('--server', choices=SERVER_MODES, help='运行模式（默认读取 [web] server）')
+    parser.add_argument('--workers', type=int, help='生产模式在本机启动的工作进程数（默认读取 [web] local_workers）')
+    args = parser.parse_args()
+    
+    config = Config()
+    server_mode = args.server or config.get('web', 'server', 'dev').strip().lower()
+    if server_mode not in SERVER_MODES:
+        print(f"[错误] 未知的运行模式: {server_mode}（可选: {', '.join(SERVER_MODES)}）")
+        return False
+    if server_mode == 'production':
+        try:
+            patch_for_async(config.get('web', 'async_mode', 'gevent'))
+        except RuntimeError as e:
+            print(f"[错误] {str(e)}")
+            return False
+    
+    from src.utils.logger import Logger, flush_logs
+    from src.web.app import create_app, get_socketio
+    from src.web.server import start_local_workers, stop_local_workers
+    
     # 初始化日志
     logger = Logger("web_startup")
+    workers = []
     
     try:
         # 加载配置
-        config = Config()
         if not config.validate_config():
             logger.error("配置文件验证失败，请检查 config/config.ini")
             return False
         
         # 创建Flask应用
-        app = create_app()
+        app = create_app(server_mode)
         
         # 获取配置
         host = config.get('web', 'host', '0.0.0.0')
@@ -33,27 +61,41 @@ def main():
         print("=" * 60)
         logger.info("正在启动Web服务...")
         logger.info(f"Web界面地址: http://localhost:{port}")
+        logger.info(f"运行模式: {server_mode}")
         logger.info(f"配置文件: config/config.ini")
         logger.info(f"输出目录: {config.get('basic', 'output_dir')}")
         logger.info(f"临时目录: {config.get('basic', 'temp_dir')}")
+        flush_logs()  # 日志由后台线程输出，打印分隔线前先输出完
         print("=" * 60)
         print()
         logger.info("提示：")
         logger.info("- 在浏览器中打开上述地址开始使用")
         logger.info("- 按 Ctrl+C 停止服务")
         logger.info("- 所有项目文件将保存在 projects/ 目录中")
+        flush_logs()
         print()
         
-        # 启动Flask应用
-        logger.success("Web服务启动成功！")
-        app.run(host=host, port=port, debug=debug)
-        
+        if server_mode == 'production':
+            # 处理步骤在工作进程中执行，Web进程只处理请求和推送进度
+            worker_count = args.workers if args.workers is not None else config.get_int('web', 'local_workers', 1)
+            workers = start_local_workers(worker_count, os.path.join('config', 'config.ini'), logger)
+            if not workers:
+                logger.warning("未启动本机工作进程，请在其他终端或主机运行 python run_worker.py")
+            logger.success("Web服务启动成功！")
+            get_socketio().run(app, host=host, port=port, log_output=debug)
+        else:
+            # 启动Flask应用
+            logger.success("Web服务启动成功！")
+            app.run(host=host, port=port, debug=debug)
+    
     except KeyboardInterrupt:
         logger.info("用户中断，正在关闭服务...")
         return True
     except Exception as e:
         logger.error(f"启动失败: {str(e)}", exc_info=True)
         return False
+    finally:
+        stop_local_workers(workers)
 
 if __name__ == "__main__":
     success = main()
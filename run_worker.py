@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+YouTube转文章工具 - 分布式工作进程启动脚本
+
+需要在 config/config.ini 中设置 [distributed] enabled = true，
+并让所有主机共享 projects/、cache/ 目录和任务队列数据库。
+
+用法:
+    python run_worker.py                              # 自动探测本机能力
+    python run_worker.py --capabilities network       # 只领取下载任务
+    python run_worker.py --capabilities whisper       # 只领取转录任务（以及步骤4、5）
+"""
+import sys
+import argparse
+
+from src.utils.logger import Logger
+from src.core.worker import StepWorker, WORKER_CAPABILITIES
+
+
+def main():
+    """启动工作进程"""
+    parser = argparse.ArgumentParser(description='分布式工作进程：从共享队列领取步骤任务并执行')
+    parser.add_argument('--config', default='config/config.ini', help='配置文件路径')
+    parser.add_argument('--worker-id', help='工作进程ID（默认 主机名_进程号）')
+    parser.add_argument('--capabilities',
+                        help=f"逗号分隔的能力列表（{', '.join(WORKER_CAPABILITIES)}），默认读取配置或自动探测")
+    parser.add_argument('--max-tasks', type=int, default=0, help='执行指定数量的任务后退出，0 表示不限制')
+    parser.add_argument('--exit-when-idle', action='store_true', help='队列中没有可领取的任务时退出')
+    args = parser.parse_args()
+
+    logger = Logger("worker_startup")
+
+    capabilities = None
+    if args.capabilities is not None:
+        capabilities = [c.strip() for c in args.capabilities.split(',') if c.strip()]
+        unknown = [c for c in capabilities if c not in WORKER_CAPABILITIES]
+        if unknown:
+            logger.error(f"未知的能力: {', '.join(unknown)}（可选: {', '.join(WORKER_CAPABILITIES)}）")
+            return False
+
+    try:
+        worker = StepWorker(args.config, worker_id=args.worker_id, capabilities=capabilities)
+        worker.run(max_tasks=args.max_tasks, exit_when_idle=args.exit_when_idle)
+        return True
+    except KeyboardInterrupt:
+        logger.info("用户中断，工作进程退出")
+        return True
+    except Exception as e:
+        logger.error(f"工作进程启动失败: {str(e)}", exc_info=True)
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
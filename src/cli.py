@@ -0,0 +1,336 @@
+"""
+YouTube转文章工具 - 命令行批处理
+
+不启动Web服务，直接在本进程中并行处理一批视频URL或本地视频文件，
+结束后输出JSON运行报告（每个任务的步骤耗时、缓存命中和失败原因）。
+未指定 --report 时报告输出到标准输出，运行期间的控制台日志输出到标准错误，
+因此可以直接重定向或管道给其他程序解析。
+
+用法:
+    python -m src.cli batch urls.txt
+    python -m src.cli batch urls.txt --jobs 4 --whisper-slots 1 --timeout 3600 --report report.json
+
+输入文件每行一个视频URL或本地视频路径，空行和 # 开头的行会被忽略。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.config import Config
+from src.utils.logger import Logger, flush_logs
+from src.utils.url_identifier import URLIdentifier
+from src.core.job_manager import FINISHED_STATES, JOB_COMPLETED
+
+
+def read_inputs(input_file: str) -> List[str]:
+    """
+    读取批处理输入文件
+
+    Args:
+        input_file: 每行一个URL或本地路径的文本文件
+
+    Returns:
+        List[str]: 去重后的输入列表（保持原顺序）
+    """
+    inputs = []
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and line not in inputs:
+                inputs.append(line)
+    return inputs
+
+
+def build_items(inputs: List[str], expander=None, logger: Optional[Logger] = None) -> List[Dict]:
+    """
+    把输入转换为批量条目（与 BatchExpander.expand 返回的条目格式一致）
+
+    Args:
+        inputs: URL或本地路径列表
+        expander: 传入 BatchExpander 时展开播放列表/频道/多P视频
+        logger: 日志记录器
+
+    Returns:
+        List[Dict]: [{'index', 'url', 'title', 'source'}]
+    """
+    items = []
+    for source in inputs:
+        local_path = URLIdentifier.local_video_path(source)
+        if local_path:
+            entries = [{'url': local_path, 'title': os.path.splitext(os.path.basename(local_path))[0]}]
+        elif expander is not None:
+            expanded = expander.expand(source)
+            if not expanded['success']:
+                if logger:
+                    logger.warning(f"[批处理] 展开失败，按单个视频处理: {source} ({expanded.get('error', '')})")
+                entries = [{'url': source, 'title': ''}]
+            else:
+                entries = [{'url': item['url'], 'title': item.get('title') or item.get('video_id', '')}
+                           for item in expanded['items']]
+        else:
+            video_id = URLIdentifier.extract_youtube_video_id(source) or URLIdentifier.extract_bilibili_bvid(source)
+            entries = [{'url': source, 'title': video_id or ''}]
+
+        for entry in entries:
+            entry['index'] = len(items) + 1
+            entry['source'] = source
+            items.append(entry)
+    return items
+
+
+def apply_overrides(config: Config, args: argparse.Namespace, run_id: str, job_count: int) -> None:
+    """把命令行参数写入配置（只影响本次运行）"""
+    # 命令行运行使用独立的任务状态文件，避免与Web服务的队列互相恢复
+    temp_dir = config.get('basic', 'temp_dir', './temp')
+    config.set('jobs', 'state_file', os.path.join(temp_dir, f"cli_{run_id}.jobs.json"))
+    config.set('jobs', 'history_limit', max(job_count, config.get_int('jobs', 'history_limit', 200)))
+    config.set('distributed', 'enabled', 'false')
+    if args.whisper_model:
+        config.set('step2_transcribe', 'model', args.whisper_model)
+
+    overrides = {
+        'max_running_jobs': args.jobs,
+        'network_slots': args.network_slots,
+        'whisper_slots': args.whisper_slots,
+        'ffmpeg_slots': args.ffmpeg_slots,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            config.set('jobs', key, max(1, value))
+
+
+def elapsed_seconds(started_time: Optional[str], finished_time: Optional[str] = None) -> Optional[float]:
+    """根据任务的ISO时间计算耗时（未结束时计算到当前）"""
+    if not started_time:
+        return None
+    end = datetime.fromisoformat(finished_time) if finished_time else datetime.now()
+    return round((end - datetime.fromisoformat(started_time)).total_seconds(), 3)
+
+
+def wait_for_jobs(processor, job_ids: List[str], timeout: float, logger: Logger,
+                  poll_interval: float = 1.0) -> Dict[str, str]:
+    """
+    等待任务结束
+
+    Args:
+        processor: 处理器
+        job_ids: 任务ID列表
+        timeout: 单个任务的超时时间（秒，从开始运行计时），超时的任务会被取消，0 表示不限制
+        logger: 日志记录器
+        poll_interval: 轮询间隔
+
+    Returns:
+        Dict[str, str]: 超时的任务 {job_id: 'timeout'}
+    """
+    timed_out = {}
+    pending = list(job_ids)
+    while pending:
+        for job_id in list(pending):
+            job = processor.job_manager.get_job(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                pending.remove(job_id)
+            elif timeout and job_id not in timed_out and (elapsed_seconds(job.started_time) or 0) > timeout:
+                # 超时的任务被取消：结束正在运行的子进程，继续等待步骤退出并释放槽位
+                logger.warning(f"[批处理] 任务超时，正在取消: {job.project_name} (步骤{job.current_step})")
+                processor.cancel_job(job_id, reason='timeout')
+                timed_out[job_id] = 'timeout'
+        if pending:
+            time.sleep(poll_interval)
+    return timed_out
+
+
+def build_report(run_id: str, started: float, settings: Dict, items: List[Dict],
+                 processor, submitted: Dict[int, Dict], timed_out: Dict[str, str]) -> Dict:
+    """生成运行报告"""
+    jobs = []
+    for item in items:
+        entry = {
+            'input': item['source'],
+            'url': item['url'],
+            'project_name': None,
+            'job_id': None,
+            'status': 'failed',
+            'seconds': None,
+            'steps': {},
+            'message': ''
+        }
+        result = submitted.get(item['index'])
+        if result is None or not result.get('success'):
+            entry['message'] = (result or {}).get('message', '提交失败')
+            jobs.append(entry)
+            continue
+
+        job = processor.job_manager.get_job(result['job_id'])
+        entry['project_name'] = result['project_name']
+        entry['job_id'] = result['job_id']
+        if job is not None:
+            entry['status'] = timed_out.get(job.job_id, job.status)
+            entry['steps'] = job.steps
+            entry['message'] = job.message
+            entry['seconds'] = elapsed_seconds(job.started_time, job.finished_time)
+        jobs.append(entry)
+
+    summary = {'total': len(jobs)}
+    for entry in jobs:
+        summary[entry['status']] = summary.get(entry['status'], 0) + 1
+    summary['cache_hits'] = sum(1 for entry in jobs for step in entry['steps'].values() if step.get('cache_hit'))
+
+    finished = time.time()
+    return {
+        'run_id': run_id,
+        'started_time': datetime.fromtimestamp(started).isoformat(),
+        'finished_time': datetime.fromtimestamp(finished).isoformat(),
+        'total_seconds': round(finished - started, 3),
+        'settings': settings,
+        'summary': summary,
+        'jobs': jobs
+    }
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    执行 batch 子命令（运行期间标准输出转到标准错误，控制台日志和各步骤的输出不会混入JSON报告）
+
+    Returns:
+        int: 退出码（全部成功为0）
+    """
+    report_stream = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            return process_batch(args, report_stream)
+        finally:
+            # 控制台日志由后台线程输出，写完后再恢复标准输出
+            flush_logs()
+
+
+def process_batch(args: argparse.Namespace, report_stream) -> int:
+    """
+    处理一批输入并输出运行报告
+
+    Args:
+        args: batch 子命令参数
+        report_stream: 未指定 --report 时写入JSON报告的流
+
+    Returns:
+        int: 退出码（全部成功为0）
+    """
+    logger = Logger("cli")
+    started = time.time()
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    inputs = read_inputs(args.input_file)
+    if not inputs:
+        logger.error(f"[批处理] 输入文件中没有URL: {args.input_file}")
+        return 2
+
+    config = Config(args.config)
+    expander = None
+    if args.expand:
+        from src.core.batch_expander import BatchExpander
+        expander = BatchExpander(config, logger)
+    items = build_items(inputs, expander, logger)
+    apply_overrides(config, args, run_id, len(items))
+
+    # 延迟导入：处理器会加载各步骤依赖
+    from src.core.processor import YouTubeToArticleProcessor
+    processor = YouTubeToArticleProcessor(config=config)
+
+    process_config = {'transcribe_language': args.language}
+    if args.whisper_model:
+        process_config['whisper_model'] = args.whisper_model
+
+    # 所有任务共享同一个任务管理器（资源槽位）和进程内的Whisper模型缓存
+    if args.warmup:
+        processor.start_model_warmup()
+
+    logger.info(f"[批处理] 共 {len(items)} 个视频，最多同时运行 {processor.job_manager.max_running} 个任务")
+    submitted = {}
+    for item in items:
+        project_name = f"{args.project_prefix}_{item['index']:03d}"
+        if item['title']:
+            project_name += f"_{item['title']}"
+        submitted[item['index']] = processor.start_async_process(item['url'], project_name, process_config)
+
+    job_ids = [result['job_id'] for result in submitted.values() if result.get('success')]
+    timed_out = {}
+    try:
+        timed_out = wait_for_jobs(processor, job_ids, args.timeout, logger)
+    except KeyboardInterrupt:
+        logger.warning("[批处理] 用户中断，取消未完成的任务并输出当前进度报告")
+        timed_out = {job_id: 'interrupted' for job_id in job_ids
+                     if processor.job_manager.get_job(job_id).status not in FINISHED_STATES}
+        for job_id in timed_out:
+            processor.cancel_job(job_id, reason='interrupted')
+
+    slots = processor.job_manager.list_jobs()['slots']
+    settings = {
+        'config': args.config,
+        'language': args.language,
+        'whisper_model': args.whisper_model,
+        'timeout': args.timeout,
+        'jobs': processor.job_manager.max_running,
+        'slots': {name: usage['limit'] for name, usage in slots.items()}
+    }
+    report = build_report(run_id, started, settings, items, processor, submitted, timed_out)
+
+    report_text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        report_dir = os.path.dirname(os.path.abspath(args.report))
+        os.makedirs(report_dir, exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report_text)
+        logger.file_created(args.report)
+    else:
+        report_stream.write(report_text + '\n')
+        report_stream.flush()
+
+    summary = report['summary']
+    logger.info(f"[批处理] 完成: {summary.get(JOB_COMPLETED, 0)}/{summary['total']} 成功，"
+                f"耗时 {report['total_seconds']:.1f} 秒")
+    return 0 if summary.get(JOB_COMPLETED, 0) == summary['total'] else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='YouTube转文章工具 - 命令行批处理')
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch = subparsers.add_parser('batch', help='批量处理URL或本地视频文件')
+    batch.add_argument('input_file', help='输入文件，每行一个视频URL或本地视频路径')
+    batch.add_argument('--config', default='config/config.ini', help='配置文件路径')
+    batch.add_argument('--language', default='en', help='语音识别语言（默认 en）')
+    batch.add_argument('--whisper-model', help='Whisper模型（默认使用配置文件）')
+    batch.add_argument('--jobs', type=int, help='最多同时运行的任务数（默认 jobs.max_running_jobs）')
+    batch.add_argument('--network-slots', type=int, help='同时下载数（默认 jobs.network_slots）')
+    batch.add_argument('--whisper-slots', type=int, help='同时转录数（默认 jobs.whisper_slots）')
+    batch.add_argument('--ffmpeg-slots', type=int, help='同时截图数（默认 jobs.ffmpeg_slots）')
+    batch.add_argument('--timeout', type=float, default=0, help='单个任务超时时间（秒），0 表示不限制')
+    batch.add_argument('--report', help='JSON报告输出路径（默认输出到标准输出，日志输出到标准错误）')
+    batch.add_argument('--project-prefix', default='cli',
+                       help='项目名前缀')
+    batch.add_argument('--expand', action='store_true', help='展开播放列表/频道/多P视频')
+    batch.add_argument('--warmup', action='store_true', help='启动时预加载Whisper模型')
+    batch.set_defaults(handler=run_batch)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'handler', None):
+        parser.print_help()
+        return 2
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
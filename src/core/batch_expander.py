@@ -0,0 +1,183 @@
+"""
+批量导入 - URL展开
+将YouTube播放列表、YouTube频道、B站多P视频展开为单个视频条目
+"""
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.utils.config import Config
+from src.utils.logger import Logger
+from src.utils.cache_manager import CacheManager
+from src.utils.url_identifier import URLIdentifier
+from src.utils.capabilities import get_capabilities
+
+
+class BatchExpander:
+    """批量URL展开器"""
+
+    def __init__(self, config: Config, logger: Logger, cache_manager: Optional[CacheManager] = None):
+        self.config = config
+        self.logger = logger
+        self.cache_manager = cache_manager or CacheManager(config, logger)
+        self.max_items = config.get_int('step1_download', 'batch_max_items', 200)
+
+    def expand(self, url: str) -> Dict:
+        """
+        展开批量URL
+
+        Args:
+            url: 播放列表/频道/多P视频/单个视频URL
+
+        Returns:
+            Dict: {
+                'success': bool,
+                'source_type': 'youtube_playlist' | 'youtube_channel' | 'bilibili_multipart' | 'single',
+                'title': str,
+                'items': [{'index', 'url', 'video_id', 'title', 'duration', 'cached'}],
+                'message': str
+            }
+        """
+        try:
+            platform = URLIdentifier.identify_platform(url)
+            if platform == 'youtube' and URLIdentifier.is_youtube_collection(url):
+                result = self._expand_youtube(url)
+            elif platform == 'youtube':
+                video_id = URLIdentifier.extract_youtube_video_id(url)
+                if not video_id:
+                    raise ValueError(f"无法从URL提取视频ID: {url}")
+                result = {
+                    'source_type': 'single',
+                    'title': '',
+                    'items': [{'url': f"https://www.youtube.com/watch?v={video_id}",
+                               'video_id': video_id, 'title': '', 'duration': 0}]
+                }
+            elif platform == 'bilibili':
+                result = self._expand_bilibili(url)
+            else:
+                raise ValueError(f"不支持的视频平台: {url}")
+
+            items = result['items'][:self.max_items]
+            if len(result['items']) > self.max_items:
+                self.logger.warning(f"[批量] 条目数超过上限，仅保留前 {self.max_items} 个")
+
+            for index, item in enumerate(items, start=1):
+                item['index'] = index
+                item['cached'] = self.cache_manager.has_cached_video(item['url'])
+
+            cached_count = sum(1 for item in items if item['cached'])
+            self.logger.info(f"[批量] 展开完成: {len(items)} 个视频，其中 {cached_count} 个已缓存")
+
+            return {
+                'success': True,
+                'source_type': result['source_type'],
+                'title': result['title'],
+                'items': items,
+                'message': f'共 {len(items)} 个视频（{cached_count} 个已缓存）'
+            }
+
+        except Exception as e:
+            self.logger.error(f"[批量] 展开失败: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': f'展开失败: {str(e)}'
+            }
+
+    @staticmethod
+    def _normalize_channel_url(url: str) -> str:
+        """频道首页默认展开“视频”标签页，避免得到标签页列表"""
+        parsed = urlparse(url)
+        if re.match(r'^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)/?$', parsed.path):
+            return f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}/videos"
+        return url
+
+    def _expand_youtube(self, url: str) -> Dict:
+        """展开YouTube播放列表/频道（extract_flat，只请求列表页）"""
+        if not get_capabilities().has_module('yt_dlp'):
+            raise RuntimeError("yt-dlp Python API 不可用，请先安装: pip install yt-dlp")
+
+        is_playlist = urlparse(url).path.startswith('/playlist')
+        list_url = url if is_playlist else self._normalize_channel_url(url)
+        cache_id = re.sub(r'^https?://(www\.)?', '', list_url)
+
+        info = self.cache_manager.get_cached_metadata('youtube_list', cache_id)
+        if not info:
+            ydl_opts = {
+                'quiet': True,
+                'no_warnings': True,
+                'no_color': True,
+                'extract_flat': 'in_playlist',
+                'playlistend': self.max_items,
+            }
+            import yt_dlp
+            self.logger.info(f"[批量] 正在展开: {list_url}")
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.sanitize_info(ydl.extract_info(list_url, download=False))
+            self.cache_manager.cache_metadata('youtube_list', cache_id, info)
+
+        items = []
+        self._collect_youtube_entries(info.get('entries') or [], items)
+        return {
+            'source_type': 'youtube_playlist' if is_playlist else 'youtube_channel',
+            'title': info.get('title') or '',
+            'items': items
+        }
+
+    def _collect_youtube_entries(self, entries: List[Dict], items: List[Dict], depth: int = 0) -> None:
+        """收集视频条目（频道标签页等嵌套列表最多展开一层）"""
+        seen = {item['video_id'] for item in items}
+        for entry in entries:
+            if not entry or len(items) >= self.max_items:
+                break
+            if entry.get('entries') is not None:
+                if depth < 1:
+                    self._collect_youtube_entries(entry['entries'], items, depth + 1)
+                continue
+
+            video_id = entry.get('id')
+            if not video_id or entry.get('ie_key', 'Youtube') != 'Youtube' or video_id in seen:
+                continue
+            seen.add(video_id)
+            items.append({
+                'url': f"https://www.youtube.com/watch?v={video_id}",
+                'video_id': video_id,
+                'title': entry.get('title') or '',
+                'duration': int(entry.get('duration') or 0)
+            })
+
+    def _expand_bilibili(self, url: str) -> Dict:
+        """展开B站多P视频（view接口的pages字段）"""
+        from src.core.steps.step1_bilibili_download import BilibiliDownloader
+
+        bvid = URLIdentifier.extract_bilibili_bvid(url)
+        if not bvid:
+            raise ValueError(f"无法从URL提取BVID: {url}")
+
+        downloader = BilibiliDownloader(self.config, self.logger)
+        video_info = downloader.get_video_metadata(f"https://www.bilibili.com/video/{bvid}")
+        if not video_info:
+            raise RuntimeError(f"无法获取视频信息: {bvid}")
+
+        pages = video_info.get('pages') or [{'page': 1, 'part': '', 'duration': video_info.get('duration', 0)}]
+        items = []
+        for page in pages:
+            page_no = page['page']
+            page_url = f"https://www.bilibili.com/video/{bvid}" + (f"?p={page_no}" if page_no > 1 else '')
+            items.append({
+                'url': page_url,
+                'video_id': bvid if page_no == 1 else f"{bvid}_p{page_no}",
+                'title': page.get('part') or video_info['title'],
+                'duration': page.get('duration', 0)
+            })
+
+        return {
+            'source_type': 'bilibili_multipart' if len(items) > 1 else 'single',
+            'title': video_info['title'],
+            'items': items
+        }
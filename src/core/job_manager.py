@@ -0,0 +1,533 @@
+"""
+任务管理器 - 多项目任务队列
+每个提交的视频是一个独立的任务（Job），拥有自己的状态对象；
+任务按提交顺序排队，最多同时运行 max_running_jobs 个，
+下载/转录/截图分别受网络、Whisper、ffmpeg 资源槽位限制。
+"""
+import os
+import sys
+import json
+import uuid
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.utils.config import Config
+from src.utils.logger import Logger
+from src.utils.cancellation import CancellationToken, JobCancelled
+from src.utils.memory_budget import MemoryBudget
+
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+# 资源槽位名称
+RESOURCE_NETWORK = 'network'
+RESOURCE_WHISPER = 'whisper'
+RESOURCE_FFMPEG = 'ffmpeg'
+
+
+class Job:
+    """单个处理任务的状态"""
+
+    def __init__(self, job_id: str, url: str, project_name: str, project_path: str,
+                 process_config: Optional[Dict] = None, batch_id: Optional[str] = None, start_step: int = 1):
+        self.job_id = job_id
+        self.url = url
+        self.project_name = project_name
+        self.project_path = project_path
+        self.process_config = process_config or {}
+        self.batch_id = batch_id
+        # 起始步骤（重试时大于1，之前的步骤在输入未变化时沿用已有结果）
+        self.start_step = start_step
+        self.status = JOB_QUEUED
+        self.current_step = 1
+        self.message = ''
+        self.attempts = 0
+        self.created_time = datetime.now().isoformat()
+        self.started_time = None
+        self.finished_time = None
+        # 各步骤的执行结果 {'1': {'status', 'seconds', 'cache_hit'}}
+        self.steps: Dict[str, Dict] = {}
+        # 各阶段的内存准入决定 {'transcribe': {'option', 'estimate_mb', 'degraded', ...}}
+        self.memory: Dict[str, Dict] = {}
+        # 正在等待/占用的资源（仅内存中，用于状态展示）
+        self.waiting_for = None
+        # 取消令牌（仅内存中，每次开始执行时重建）
+        self.cancel_token = CancellationToken()
+
+    def to_dict(self) -> Dict:
+        """转换为可持久化/可序列化的字典"""
+        return {
+            'job_id': self.job_id,
+            'url': self.url,
+            'project_name': self.project_name,
+            'project_path': self.project_path,
+            'process_config': self.process_config,
+            'batch_id': self.batch_id,
+            'start_step': self.start_step,
+            'status': self.status,
+            'current_step': self.current_step,
+            'message': self.message,
+            'steps': self.steps,
+            'memory': self.memory,
+            'attempts': self.attempts,
+            'created_time': self.created_time,
+            'started_time': self.started_time,
+            'finished_time': self.finished_time,
+            'waiting_for': self.waiting_for
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        """从持久化字典恢复"""
+        job = cls(data['job_id'], data['url'], data['project_name'], data['project_path'],
+                  data.get('process_config'), data.get('batch_id'), data.get('start_step', 1))
+        job.status = data.get('status', JOB_QUEUED)
+        job.current_step = data.get('current_step', 1)
+        job.message = data.get('message', '')
+        job.steps = data.get('steps', {})
+        job.memory = data.get('memory', {})
+        job.attempts = data.get('attempts', 0)
+        job.created_time = data.get('created_time', job.created_time)
+        job.started_time = data.get('started_time')
+        job.finished_time = data.get('finished_time')
+        return job
+
+
+class ResourceSlots:
+    """
+    按资源类型划分的并发槽位（线程安全）
+
+    network: 视频下载；whisper: 语音转录（CPU/GPU密集）；ffmpeg: 截图提取
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = {name: max(1, int(limit)) for name, limit in limits.items()}
+        self._semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in self.limits.items()}
+        self._in_use = {name: 0 for name in self.limits}
+        self._waiting = {name: 0 for name in self.limits}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, name: str, token: Optional[CancellationToken] = None):
+        """
+        占用一个资源槽位（槽位已满时阻塞等待）
+
+        Args:
+            name: 资源名称（未配置的资源不限制）
+            token: 取消令牌，等待期间被取消时抛出 JobCancelled
+        """
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            yield
+            return
+
+        with self._lock:
+            self._waiting[name] += 1
+        try:
+            if token is None:
+                semaphore.acquire()
+            else:
+                while not semaphore.acquire(timeout=0.5):
+                    token.raise_if_cancelled()
+                if token.cancelled:
+                    semaphore.release()
+                    token.raise_if_cancelled()
+        finally:
+            with self._lock:
+                self._waiting[name] -= 1
+        with self._lock:
+            self._in_use[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+            semaphore.release()
+
+    def available(self, name: str) -> bool:
+        """是否有空闲槽位（仅用于提示，不保证随后 acquire 不阻塞）"""
+        with self._lock:
+            return name not in self.limits or self._in_use[name] < self.limits[name]
+
+    def usage(self) -> Dict[str, Dict]:
+        """各资源的占用情况"""
+        with self._lock:
+            return {name: {'limit': self.limits[name],
+                           'in_use': self._in_use[name],
+                           'waiting': self._waiting[name]}
+                    for name in self.limits}
+
+
+class JobManager:
+    """
+    任务管理器
+
+    runner(job) 在工作线程中执行单个任务的完整流水线，返回是否成功。
+    队列状态写入 jobs.state_file，服务重启后未完成的任务会重新排队。
+    """
+
+    def __init__(self, config: Config, logger: Logger, runner: Callable[[Job], bool]):
+        self.config = config
+        self.logger = logger
+        self.runner = runner
+
+        self.max_running = max(1, config.get_int('jobs', 'max_running_jobs', 4))
+        self.history_limit = max(0, config.get_int('jobs', 'history_limit', 200))
+        self.state_file = config.get('jobs', 'state_file',
+                                     os.path.join(config.get('basic', 'output_dir', './projects'), '.jobs.json'))
+        self.slots = ResourceSlots({
+            RESOURCE_NETWORK: config.get_int('jobs', 'network_slots',
+                                             config.get_int('step1_download', 'parallel_downloads', 2)),
+            RESOURCE_WHISPER: config.get_int('jobs', 'whisper_slots', 1),
+            RESOURCE_FFMPEG: config.get_int('jobs', 'ffmpeg_slots', 2),
+        })
+        self.memory = MemoryBudget.from_config(config)
+
+        self._jobs: Dict[str, Job] = {}
+        self._queue: List[str] = []
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._local = threading.local()
+
+        self._load_state()
+
+    # ------------------------------------------------------------------
+    # 提交与调度
+    # ------------------------------------------------------------------
+
+    def submit(self, url: str, project_name: str, project_path: str,
+               process_config: Optional[Dict] = None, batch_id: Optional[str] = None,
+               start_step: int = 1) -> Job:
+        """
+        提交任务并加入队列
+
+        Args:
+            url: 视频URL
+            project_name: 项目目录名
+            project_path: 项目路径
+            process_config: 处理配置
+            batch_id: 所属批量ID（单个提交时为None）
+            start_step: 起始步骤
+
+        Returns:
+            Job: 新建的任务
+        """
+        job_id = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        job = Job(job_id, url, project_name, project_path, process_config, batch_id, start_step)
+        with self._cond:
+            self._jobs[job_id] = job
+            self._queue.append(job_id)
+            self._save_state_locked()
+            position = len(self._queue)
+            self._cond.notify()
+        self.logger.info(f"[任务] 已排队 {job_id} ({project_name})，队列位置 {position}")
+        self.start()
+        return job
+
+    def start(self) -> None:
+        """启动工作线程（幂等）"""
+        with self._cond:
+            if self._workers:
+                return
+            for i in range(self.max_running):
+                worker = threading.Thread(target=self._worker_loop, name=f'job_worker_{i}', daemon=True)
+                self._workers.append(worker)
+                worker.start()
+        self.logger.info(f"[任务] 任务管理器已启动: 最多同时运行 {self.max_running} 个任务，"
+                         f"资源槽位 {self.slots.limits}")
+
+    def resume(self) -> int:
+        """
+        继续处理上次退出时未完成的任务
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        with self._cond:
+            pending = len(self._queue)
+        if pending:
+            self.logger.info(f"[任务] 恢复 {pending} 个未完成的任务")
+            self.start()
+        return pending
+
+    def _worker_loop(self) -> None:
+        """工作线程：按提交顺序取出任务并执行"""
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._jobs[self._queue.pop(0)]
+                job.cancel_token = CancellationToken()
+                job.status = JOB_RUNNING
+                job.attempts += 1
+                job.started_time = datetime.now().isoformat()
+                job.finished_time = None
+                self._save_state_locked()
+
+            self._local.job = job
+            success = False
+            try:
+                self.logger.info(f"[任务] 开始执行 {job.job_id} ({job.project_name})")
+                success = bool(self.runner(job))
+            except JobCancelled:
+                pass
+            except Exception as e:
+                job.message = str(e)
+                self.logger.error(f"[任务] 执行异常 {job.job_id}: {str(e)}")
+                self.logger.error(f"详细错误: {traceback.format_exc()}")
+            finally:
+                self._local.job = None
+                cancelled = job.cancel_token.cancelled
+                with self._cond:
+                    if cancelled:
+                        job.status = JOB_CANCELLED
+                        job.message = f"已取消: {job.cancel_token.reason}"
+                    else:
+                        job.status = JOB_COMPLETED if success else JOB_FAILED
+                    job.finished_time = datetime.now().isoformat()
+                    job.waiting_for = None
+                    self._trim_history_locked()
+                    self._save_state_locked()
+                if cancelled:
+                    self.logger.warning(f"[任务] 已取消 {job.job_id} ({job.project_name})")
+                elif success:
+                    self.logger.success(f"[任务] 已完成 {job.job_id} ({job.project_name})")
+                else:
+                    self.logger.warning(f"[任务] 已失败 {job.job_id} ({job.project_name})")
+
+    def cancel(self, job_id: str, reason: str = 'user') -> Optional[Job]:
+        """
+        取消任务：排队中的任务直接移出队列；运行中的任务通过取消令牌通知各步骤停止
+
+        Args:
+            job_id: 任务ID
+            reason: 取消原因
+
+        Returns:
+            Optional[Job]: 被取消的任务，任务不存在或已结束时返回None
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return None
+            if job.status == JOB_QUEUED:
+                if job_id in self._queue:
+                    self._queue.remove(job_id)
+                job.cancel_token.cancel(reason)
+                job.status = JOB_CANCELLED
+                job.message = f"已取消: {reason}"
+                job.finished_time = datetime.now().isoformat()
+                self._trim_history_locked()
+                self._save_state_locked()
+                self.logger.warning(f"[任务] 已取消排队中的任务 {job_id} ({job.project_name})")
+                return job
+        # 运行中：取消回调会结束子进程，不能持有队列锁执行
+        self.logger.warning(f"[任务] 正在取消 {job_id} ({job.project_name})，原因: {reason}")
+        job.cancel_token.cancel(reason)
+        return job
+
+    # ------------------------------------------------------------------
+    # 当前任务与资源槽位
+    # ------------------------------------------------------------------
+
+    def current_job(self) -> Optional[Job]:
+        """获取当前工作线程正在执行的任务"""
+        return getattr(self._local, 'job', None)
+
+    @contextmanager
+    def slot(self, resource: str, job: Optional[Job] = None):
+        """
+        为任务占用资源槽位，槽位已满时阻塞并在任务状态中记录等待的资源
+
+        Args:
+            resource: 资源名称（network/whisper/ffmpeg）
+            job: 任务（默认当前线程的任务）
+        """
+        job = job or self.current_job()
+        if not self.slots.available(resource):
+            self.logger.info(f"[任务] 等待{resource}槽位: {job.project_name if job else ''}")
+        if job:
+            job.waiting_for = resource
+        with self.slots.acquire(resource, job.cancel_token if job else None):
+            if job:
+                job.waiting_for = None
+            yield
+
+    @contextmanager
+    def admit(self, stage: str, options: List, job: Optional[Job] = None):
+        """
+        按内存预算准入一个阶段（放不下时等待或降级），决定记录在任务状态中
+
+        Args:
+            stage: 阶段名（download/transcribe/screenshots）
+            options: [(方案, 估算MB)]，首选方案在前，之后为降级方案
+            job: 任务（默认当前线程的任务）
+
+        Yields:
+            Dict: 准入决定（见 MemoryBudget.admit）
+        """
+        job = job or self.current_job()
+        name = job.project_name if job else ''
+
+        def on_wait():
+            self.logger.info(f"[内存] {name} {stage} 预计 {options[0][1]:.0f}MB，超出剩余预算，等待其他阶段释放内存")
+            if job:
+                job.waiting_for = 'memory'
+
+        with self.memory.admit(stage, options, job.cancel_token if job else None, on_wait) as decision:
+            if job:
+                job.waiting_for = None
+                job.memory[stage] = decision
+            if decision['degraded']:
+                self.logger.warning(f"[内存] {name} {stage} 降级为 {decision['option']}："
+                                    f"预计 {decision['estimate_mb']}MB（首选 {options[0][1]:.0f}MB），"
+                                    f"预算 {decision['budget_mb']}MB，已占用 {decision['reserved_mb']}MB")
+            elif self.memory.enabled:
+                self.logger.info(f"[内存] {name} {stage} 准入：预计 {decision['estimate_mb']}MB，"
+                                 f"预算 {decision['budget_mb']}MB，已占用 {decision['reserved_mb']}MB")
+            if decision['over_budget']:
+                self.logger.warning(f"[内存] {name} {stage} 单独运行也超出预算（预计 {decision['estimate_mb']}MB），"
+                                    f"没有其他阶段运行，仍然执行")
+            yield decision
+
+    @contextmanager
+    def bind(self, job: Job):
+        """
+        在当前线程绑定任务（分布式工作进程执行单个步骤时使用，任务不进入本地队列）
+
+        Args:
+            job: 任务
+        """
+        previous = self.current_job()
+        self._local.job = job
+        try:
+            yield job
+        finally:
+            self._local.job = previous
+
+    def update_job(self, job: Job, **fields) -> None:
+        """更新任务字段（仅持久化本地队列中的任务）"""
+        with self._cond:
+            for key, value in fields.items():
+                setattr(job, key, value)
+            if job.job_id in self._jobs:
+                self._save_state_locked()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """按ID获取任务"""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def find_active_job(self, project_name: str) -> Optional[Job]:
+        """查找项目排队中或运行中的任务"""
+        with self._cond:
+            for job in self._jobs.values():
+                if job.project_name == project_name and job.status in (JOB_QUEUED, JOB_RUNNING):
+                    return job
+        return None
+
+    def running_count(self) -> int:
+        """正在运行的任务数"""
+        with self._cond:
+            return sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING)
+
+    def list_jobs(self) -> Dict:
+        """
+        列出任务（排队中按队列顺序，其余按时间倒序）
+
+        Returns:
+            Dict: {'queued': [...], 'running': [...], 'finished': [...], 'slots': {...}}
+        """
+        with self._cond:
+            queued = []
+            for position, job_id in enumerate(self._queue, start=1):
+                item = self._jobs[job_id].to_dict()
+                item['queue_position'] = position
+                queued.append(item)
+            running = [job.to_dict() for job in self._jobs.values() if job.status == JOB_RUNNING]
+            finished = [job.to_dict() for job in self._jobs.values() if job.status in FINISHED_STATES]
+
+        running.sort(key=lambda j: j['started_time'] or '')
+        finished.sort(key=lambda j: j['finished_time'] or '', reverse=True)
+        return {
+            'queued': queued,
+            'running': running,
+            'finished': finished,
+            'slots': self.slots.usage(),
+            'memory': self.memory.usage(),
+            'max_running_jobs': self.max_running
+        }
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> None:
+        """读取持久化的任务队列；上次运行中断的任务重新排队"""
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"[任务] 读取任务队列失败，忽略: {str(e)}")
+            return
+
+        interrupted = []
+        for data in state.get('jobs', []):
+            try:
+                job = Job.from_dict(data)
+            except KeyError:
+                continue
+            if job.status == JOB_RUNNING:
+                job.status = JOB_QUEUED
+                interrupted.append(job.job_id)
+            self._jobs[job.job_id] = job
+
+        queue_order = [job_id for job_id in state.get('queue', []) if job_id in self._jobs]
+        # 中断的任务排在队首
+        self._queue = interrupted + [job_id for job_id in queue_order if job_id not in interrupted]
+        if self._queue:
+            self.logger.info(f"[任务] 读取到 {len(self._queue)} 个未完成的任务（其中 {len(interrupted)} 个被中断）")
+
+    def _trim_history_locked(self) -> None:
+        """只保留最近 history_limit 个已结束任务"""
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATES]
+        if len(finished) <= self.history_limit:
+            return
+        finished.sort(key=lambda j: j.finished_time or '')
+        for job in finished[:len(finished) - self.history_limit]:
+            del self._jobs[job.job_id]
+
+    def _save_state_locked(self) -> None:
+        """写入任务队列（调用方需持有锁；先写临时文件再替换，避免写入中断导致文件损坏）"""
+        state = {
+            'queue': list(self._queue),
+            'jobs': [job.to_dict() for job in self._jobs.values()],
+            'updated_time': datetime.now().isoformat()
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            self.logger.warning(f"[任务] 保存任务队列失败: {str(e)}")
@@ -6,38 +6,59 @@ import json
 import threading
 import time
 import traceback
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, Optional, Callable
+from typing import Dict, List, Optional, Callable
 import sys
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from src.utils.config import Config
-from src.utils.logger import Logger
+from src.utils.logger import Logger, release_project_log
 from src.utils.file_manager import FileManager
 from src.utils.cache_manager import CacheManager
-from src.core.steps.step1_download import YouTubeDownloader
-from src.core.steps.step2_transcribe import AudioTranscriber
-from src.core.steps.step3_screenshots import VideoScreenshot
-from src.core.steps.step4_generate_markdown import MarkdownGenerator
-from src.core.steps.step5_generate_prompt import PromptGenerator
-from src.core.steps.step6_publish_zhihu import ZhihuPublisher
+from src.utils.step_fingerprint import StepFingerprints
+from src.utils.tracing import configure_tracing, format_metric, get_tracer, METRIC_PREFIX
+from src.utils.project_log import configure_project_logs
+from src.utils.url_identifier import URLIdentifier
+from src.utils.cancellation import CancellationToken, JobCancelled
+from src.utils.memory_budget import MemoryEstimator
+from src.utils.validator import Validator
+from src.utils.transcript import copy_transcript
+from src.core.job_manager import Job, JobManager, JOB_CANCELLED, RESOURCE_NETWORK, RESOURCE_WHISPER, RESOURCE_FFMPEG
+from src.core.task_queue import create_task_queue, TASK_PENDING, TASK_CLAIMED
+# 各步骤模块（及 whisper/yt_dlp/PIL 等重量级依赖）在首次执行该步骤时才导入，
+# 保证 Web 界面启动时不加载模型相关的库
+
+STEP_NAMES = {
+    1: 'step1_download',
+    2: 'step2_transcribe',
+    3: 'step3_screenshots',
+    4: 'step4_markdown',
+    5: 'step5_prompt'
+}
 
 class YouTubeToArticleProcessor:
-    def __init__(self, config_path: str = "config/config.ini"):
-        self.config = Config(config_path)
+    def __init__(self, config_path: str = "config/config.ini", config: Optional[Config] = None):
+        self.config = config or Config(config_path)
         self.logger = Logger("processor")
         self.file_manager = FileManager(self.config, self.logger)
         self.cache_manager = CacheManager(self.config, self.logger)
-        self.current_project = None
-        self.current_step = 1
-        self.is_processing = False
+        configure_tracing(self.config)
+        configure_project_logs(self.config)
+        self.memory_estimator = MemoryEstimator(self.config)
         self.progress_callback = None
         self.step_complete_callback = None
         self.download_progress_callback = None
         self.transcribe_progress_callback = None
         self.zhihu_publisher = None  # 延迟初始化
+        # 每个视频是一个独立任务，状态保存在 Job 对象中（不再共享 current_project 等全局状态）
+        self.job_manager = JobManager(self.config, self.logger, self._run_job)
+        # 分布式模式：只负责入队，步骤由 run_worker.py 启动的工作进程执行
+        self.task_queue = None
+        if self.config.get_boolean('distributed', 'enabled', False):
+            self.task_queue = create_task_queue(self.config, self.logger)
         
     def set_callbacks(self, progress_callback: Callable = None, step_complete_callback: Callable = None, download_progress_callback: Callable = None, transcribe_progress_callback: Callable = None):
         """设置回调函数用于Web界面更新"""
@@ -46,9 +67,14 @@ class YouTubeToArticleProcessor:
         self.download_progress_callback = download_progress_callback
         self.transcribe_progress_callback = transcribe_progress_callback
     
+    @property
+    def is_processing(self) -> bool:
+        """是否有任务正在运行"""
+        return self.job_manager.running_count() > 0
+    
     def start_async_process(self, youtube_url: str, project_name: str, process_config: Dict = None) -> Dict:
         """
-        异步开始处理流程
+        异步开始处理流程（提交到任务队列）
         
         Args:
             youtube_url: 视频URL（支持YouTube和Bilibili）
@@ -73,27 +99,23 @@ class YouTubeToArticleProcessor:
                 'project_name': project_name,
                 'actual_project_name': actual_project_name,
                 'created_time': datetime.now().isoformat(),
-                'status': 'started',
+                'status': 'queued',
                 'current_step': 1,
                 'config': process_config  # 新增：保存配置
             }
             
             self.file_manager.update_project_summary(project_path, project_info)
-            self.current_project = actual_project_name
             
-            # 在后台线程中开始处理（传入配置）
-            processing_thread = threading.Thread(
-                target=self._process_video,
-                args=(youtube_url, project_path, process_config),
-                daemon=True
-            )
-            processing_thread.start()
+            # 加入任务队列，由任务管理器的工作线程处理
+            job_id = self._submit(youtube_url, actual_project_name, project_path, process_config)
+            self.file_manager.update_project_summary(project_path, {**project_info, 'job_id': job_id})
             
             return {
                 'success': True,
                 'project_name': actual_project_name,
                 'project_path': project_path,
-                'message': '项目创建成功，开始处理'
+                'job_id': job_id,
+                'message': '项目创建成功，已加入处理队列'
             }
             
         except Exception as e:
@@ -106,93 +128,576 @@ class YouTubeToArticleProcessor:
                 'message': f'启动处理失败: {str(e)}'
             }
     
-    def _process_video(self, youtube_url: str, project_path: str, process_config: Dict):
+    def start_batch_process(self, source_url: str, items: List[Dict], batch_name: str,
+                            process_config: Dict = None) -> Dict:
         """
-        后台处理视频的主流程
+        异步开始批量处理（播放列表/频道/多P视频）
+        
+        每个条目创建一个独立项目并作为独立任务提交。下载受 network 槽位限制并行执行，
+        已缓存的条目不占用下载槽位；转录受 whisper 槽位限制，按下载完成顺序进行。
         
         Args:
-            youtube_url: 视频URL
-            project_path: 项目路径
-            process_config: 处理配置
+            source_url: 批量来源URL
+            items: BatchExpander.expand 返回的条目列表
+            batch_name: 批量名称（作为项目名前缀）
+            process_config: 处理配置（同 start_async_process）
         """
         try:
-            self.is_processing = True
-            project_name = os.path.basename(project_path)
-            
-            self.logger.info(f"开始处理项目: {project_name}")
-            self.logger.info(f"配置: {process_config}")
-            self._send_progress_update(1, 0, "开始处理...")
-            
-            # 步骤1: 下载视频（使用工厂创建下载器）
-            step1_result = self._execute_step1(youtube_url, project_path)
-            if not step1_result:
-                self._send_step_complete(1, False, "步骤1失败: YouTube视频下载")
-                return
+            if process_config is None:
+                process_config = {}
+            if not items:
+                return {'success': False, 'error': '没有可处理的视频', 'message': '没有可处理的视频'}
+            
+            batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            projects = []
+            for item in items:
+                index = item.get('index', len(projects) + 1)
+                title = item.get('title') or item.get('video_id', '')
+                project_path = self.file_manager.create_project_directory(f"{batch_name}_{index:03d}_{title}")
+                actual_project_name = os.path.basename(project_path)
+                
+                project_info = {
+                    'youtube_url': item['url'],
+                    'project_name': title or batch_name,
+                    'actual_project_name': actual_project_name,
+                    'created_time': datetime.now().isoformat(),
+                    'status': 'queued',
+                    'current_step': 1,
+                    'config': process_config,
+                    'batch_id': batch_id,
+                    'batch_index': index,
+                    'batch_source': source_url
+                }
+                self.file_manager.update_project_summary(project_path, project_info)
+                job_id = self._submit(item['url'], actual_project_name, project_path,
+                                      process_config, batch_id=batch_id)
+                self.file_manager.update_project_summary(project_path, {**project_info, 'job_id': job_id})
+                projects.append(actual_project_name)
             
-            self._send_step_complete(1, True, "步骤1完成: YouTube视频下载")
+            self.logger.info(f"[批量] 已提交 {batch_id}: {len(projects)} 个视频")
+            return {
+                'success': True,
+                'batch_id': batch_id,
+                'projects': projects,
+                'message': f'批量任务已创建: {len(projects)} 个视频'
+            }
             
-            # 更新项目状态
-            self._update_project_status(project_path, 2, "step1_completed")
+        except Exception as e:
+            self.logger.error(f"启动批量处理失败: {str(e)}")
+            self.logger.error(f"详细错误: {traceback.format_exc()}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': f'启动批量处理失败: {str(e)}'
+            }
+    
+    def get_batch_status(self, batch_id: str) -> Dict:
+        """
+        获取批量任务状态
+        
+        Args:
+            batch_id: 批量ID
             
-            # 获取视频文件路径
-            step1_dir = self.file_manager.get_step_directory(project_path, 'step1_download')
-            self.logger.info(f"查找视频文件，目录: {step1_dir}")
+        Returns:
+            Dict: 各条目的项目状态
+        """
+        projects = self.file_manager.query_projects(batch_id=batch_id, per_page=0)['projects']
+        if not projects:
+            return {'success': False, 'error': '批量任务不存在'}
+        
+        projects.sort(key=lambda p: p.get('batch_index', 0))
+        items = [{
+            'index': p.get('batch_index'),
+            'project_name': p['name'],
+            'title': p.get('project_name', ''),
+            'url': p.get('youtube_url', ''),
+            'status': p.get('status', ''),
+            'current_step': p.get('current_step', 1)
+        } for p in projects]
+        
+        return {
+            'success': True,
+            'batch_id': batch_id,
+            'total': len(items),
+            'completed': sum(1 for item in items if item['status'] == 'completed'),
+            'failed': sum(1 for item in items if item['status'] == 'failed'),
+            'items': items
+        }
+    
+    def _submit(self, youtube_url: str, project_name: str, project_path: str, process_config: Dict,
+                batch_id: Optional[str] = None, start_step: int = 1) -> str:
+        """
+        提交处理任务：分布式模式下把步骤1任务写入共享队列，否则加入本进程的任务管理器
+        
+        Returns:
+            str: 任务ID
+        """
+        if self.task_queue:
+            payload = {'url': youtube_url, 'process_config': process_config,
+                       'batch_id': batch_id, 'start_step': start_step}
+            task_id = self.task_queue.enqueue(project_name, 1, payload)
+            self.logger.info(f"[队列] 已入队 {task_id} ({project_name})，等待工作进程领取")
+            return task_id
+        return self.job_manager.submit(youtube_url, project_name, project_path, process_config,
+                                       batch_id=batch_id, start_step=start_step).job_id
+    
+    def _find_active_task(self, project_name: str) -> Optional[str]:
+        """查找项目排队中或运行中的任务ID"""
+        if self.task_queue:
+            for status in (TASK_PENDING, TASK_CLAIMED):
+                for task in self.task_queue.list_tasks(status, limit=1000):
+                    if task['project_name'] == project_name:
+                        return task['task_id']
+            return None
+        job = self.job_manager.find_active_job(project_name)
+        return job.job_id if job else None
+    
+    def list_jobs(self) -> Dict:
+        """列出排队中、运行中和已结束的任务（分布式模式下为队列中的步骤任务和工作进程）"""
+        if self.task_queue:
+            return {
+                'success': True,
+                'distributed': True,
+                'tasks': self.task_queue.list_tasks(),
+                'workers': self.task_queue.list_workers()
+            }
+        return {'success': True, 'distributed': False, **self.job_manager.list_jobs()}
+    
+    def render_metrics(self) -> str:
+        """
+        运行指标（Prometheus文本格式）：本进程的步骤/子操作span汇总，以及任务队列和资源槽位的即时值
+        
+        Returns:
+            str: /metrics 响应内容
+        """
+        lines = [get_tracer().metrics.render().rstrip('\n')]
+        if self.task_queue:
+            lines.extend(format_metric(f'{METRIC_PREFIX}_tasks', 'Distributed step tasks by status.', 'gauge',
+                                       [({'status': status}, len(self.task_queue.list_tasks(status, limit=100000)))
+                                        for status in (TASK_PENDING, TASK_CLAIMED)]))
+            lines.extend(format_metric(f'{METRIC_PREFIX}_workers', 'Registered distributed workers.', 'gauge',
+                                       [({}, len(self.task_queue.list_workers()))]))
+        else:
+            jobs = self.job_manager.list_jobs()
+            lines.extend(format_metric(f'{METRIC_PREFIX}_jobs', 'Jobs by state.', 'gauge',
+                                       [({'state': state}, len(jobs[state])) for state in ('queued', 'running')]))
+            slots = sorted(jobs['slots'].items())
+            for key, help_text in (('in_use', 'Resource slots in use.'), ('waiting', 'Jobs waiting for a resource slot.'),
+                                   ('limit', 'Resource slot limit.')):
+                lines.extend(format_metric(f'{METRIC_PREFIX}_resource_slots_{key}', help_text, 'gauge',
+                                           [({'resource': name}, usage[key]) for name, usage in slots]))
+            memory = jobs['memory']
+            for key, help_text in (('budget_mb', 'Memory budget for job stages in MB.'),
+                                   ('reserved_mb', 'Estimated memory reserved by running stages in MB.'),
+                                   ('waiting', 'Stages waiting for memory budget.')):
+                lines.extend(format_metric(f'{METRIC_PREFIX}_memory_{key}', help_text, 'gauge', [({}, memory[key])]))
+        return '\n'.join(lines) + '\n'
+    
+    def get_job_status(self, job_id: str) -> Dict:
+        """获取单个任务的状态"""
+        if self.task_queue:
+            task = self.task_queue.get_task(job_id)
+            if task is None:
+                return {'success': False, 'error': '任务不存在'}
+            return {'success': True, 'job': task}
+        job = self.job_manager.get_job(job_id)
+        if job is None:
+            return {'success': False, 'error': '任务不存在'}
+        return {'success': True, 'job': job.to_dict()}
+    
+    def retry_from_step(self, project_name: str, step: int, force: bool = True) -> Dict:
+        """
+        从指定步骤重新处理项目（提交到任务队列）
+        
+        之前的步骤输入未变化时沿用已有结果；指定步骤在 force=True 时必定重新执行，
+        之后的步骤在上游产物变化时重新执行。
+        
+        Args:
+            project_name: 项目目录名
+            step: 起始步骤号（1-5）
+            force: 是否强制重新执行起始步骤（False 时仅重新执行输入发生变化的步骤）
+        """
+        try:
+            if step not in STEP_NAMES:
+                return {'success': False, 'error': '无效的步骤号'}
             
-            video_files = [f for f in os.listdir(step1_dir) if f.endswith('.mp4')]
-            if not video_files:
-                self.logger.error(f"未找到视频文件，目录内容: {os.listdir(step1_dir)}")
-                self._send_step_complete(2, False, "未找到视频文件")
-                return
+            project_path = os.path.join(self.config.get('basic', 'output_dir'), project_name)
+            summary = self.file_manager.get_project_summary(project_path) if os.path.isdir(project_path) else {}
+            if not summary.get('youtube_url'):
+                return {'success': False, 'error': '项目不存在或缺少视频URL'}
             
-            video_file = os.path.join(step1_dir, video_files[0])
-            self.logger.info(f"找到视频文件: {video_file}")
+            active_id = self._find_active_task(project_name)
+            if active_id:
+                return {'success': False, 'error': f'项目已在处理队列中: {active_id}'}
             
-            # 步骤2: 语音转录（传递语言配置）
-            transcribe_language = process_config.get('transcribe_language', 'en')
-            success = self._execute_step2(video_file, project_path, youtube_url, transcribe_language)
-            if not success:
-                self._send_step_complete(2, False, "步骤2失败: 语音转录")
-                return
+            if force:
+                StepFingerprints(project_path, self.logger).invalidate([step])
             
-            self._send_step_complete(2, True, "步骤2完成: 语音转录")
-            self._update_project_status(project_path, 3, "step2_completed")
+            job_id = self._submit(summary['youtube_url'], project_name, project_path,
+                                  summary.get('config') or {}, batch_id=summary.get('batch_id'),
+                                  start_step=step)
+            summary.update({'status': 'queued', 'current_step': step, 'job_id': job_id})
+            self.file_manager.update_project_summary(project_path, summary)
             
-            # 步骤3: 提取截图（优化版 - 并行处理，仅0s截图）
-            success = self._execute_step3(video_file, project_path, transcribe_language)
-            if not success:
-                self._send_step_complete(3, False, "步骤3失败: 提取截图")
-                return
+            self.logger.info(f"[重试] {project_name} 从步骤{step}重新处理（{'强制' if force else '仅变化的步骤'}）")
+            return {
+                'success': True,
+                'project_name': project_name,
+                'job_id': job_id,
+                'message': f'已加入处理队列，从步骤{step}开始'
+            }
             
-            self._send_step_complete(3, True, "步骤3完成: 提取截图（并行处理）")
-            self._update_project_status(project_path, 4, "step3_completed")
+        except Exception as e:
+            self.logger.error(f"重试步骤失败: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def cancel_job(self, job_id: Optional[str] = None, project_name: Optional[str] = None,
+                   reason: str = 'user') -> Dict:
+        """
+        取消排队中或运行中的任务
+        
+        排队中的任务直接移出队列；运行中的任务会结束正在执行的ffmpeg/yt-dlp子进程、停止下载循环，
+        Whisper在当前窗口结束后停止，步骤退出后立即释放资源槽位。
+        
+        Args:
+            job_id: 任务ID
+            project_name: 项目目录名（未指定 job_id 时按项目查找）
+            reason: 取消原因
+        """
+        try:
+            if self.task_queue:
+                if not project_name and job_id:
+                    task = self.task_queue.get_task(job_id)
+                    project_name = task['project_name'] if task else None
+                if not project_name:
+                    return {'success': False, 'error': '任务不存在'}
+                cancelled = self.task_queue.cancel(project_name, reason)
+                if not cancelled:
+                    return {'success': False, 'error': '项目没有排队中或执行中的任务'}
+                self.logger.warning(f"[取消] {project_name}: 已取消 {cancelled} 个步骤任务")
+                project_path = os.path.join(self.config.get('basic', 'output_dir'), project_name)
+                summary = self.file_manager.get_project_summary(project_path)
+                self._update_project_status(project_path, summary.get('current_step', 1), "cancelled")
+                return {'success': True, 'project_name': project_name, 'message': '已请求取消'}
+            
+            if not job_id and project_name:
+                job = self.job_manager.find_active_job(project_name)
+                job_id = job.job_id if job else None
+            job = self.job_manager.cancel(job_id, reason) if job_id else None
+            if job is None:
+                return {'success': False, 'error': '任务不存在或已结束'}
+            if job.status == JOB_CANCELLED:
+                # 排队中的任务不会再执行，直接更新项目状态
+                self._update_project_status(job.project_path, job.current_step, "cancelled")
+            return {
+                'success': True,
+                'job_id': job.job_id,
+                'project_name': job.project_name,
+                'message': '已取消' if job.status == JOB_CANCELLED else '已请求取消，正在停止当前步骤'
+            }
             
-            # 步骤4: 生成Markdown（图文并茂）- 根据语言选择模板
-            success = self._execute_step4(project_path, transcribe_language)
-            if not success:
-                lang_name = {'zh': '中文', 'en': '英文'}.get(transcribe_language, transcribe_language)
-                self._send_step_complete(4, False, f"步骤4失败: 生成{lang_name}Markdown")
-                return
+        except Exception as e:
+            self.logger.error(f"取消任务失败: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def _run_job(self, job: Job) -> bool:
+        """任务管理器的执行入口（在工作线程中运行）"""
+        return self._process_video(job.url, job.project_path, job.process_config, job.start_step)
+    
+    def _process_video(self, youtube_url: str, project_path: str, process_config: Dict,
+                       start_step: int = 1) -> bool:
+        """
+        后台处理视频的主流程
+        
+        Args:
+            youtube_url: 视频URL
+            project_path: 项目路径
+            process_config: 处理配置
+            start_step: 起始步骤（之前的步骤在输入未变化时沿用已有结果）
             
-            lang_name = {'zh': '中文', 'en': '英文'}.get(transcribe_language, transcribe_language)
-            self._send_step_complete(4, True, f"步骤4完成: 生成{lang_name}Markdown")
-            self._update_project_status(project_path, 5, "step4_completed")
+        Returns:
+            bool: 全部步骤是否成功
+        """
+        try:
+            project_name = os.path.basename(project_path)
+            fingerprints = StepFingerprints(project_path, self.logger)
             
-            # 步骤5: 生成优化Prompt - 根据语言选择模板
-            success = self._execute_step5(project_path, transcribe_language)
-            if not success:
-                self._send_step_complete(5, False, "步骤5失败: 生成Prompt")
-                return
+            self.logger.info(f"开始处理项目: {project_name}")
+            self.logger.info(f"配置: {process_config}")
+            self._update_project_status(project_path, 1, "downloading")
+            self._send_progress_update(1, 0, "开始处理...")
             
-            self._send_step_complete(5, True, "步骤5完成: 生成中文Prompt")
-            self._update_project_status(project_path, 5, "completed")
+            for step in sorted(STEP_NAMES):
+                if not self.run_step(step, youtube_url, project_path, process_config, start_step, fingerprints):
+                    return False
             
             self.logger.success("所有步骤完成！")
+            return True
             
+        except JobCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"处理异常: {str(e)}")
-            self._send_step_complete(self.current_step, False, f"处理异常: {str(e)}")
+            self._send_step_complete(self._current_step(), False, f"处理异常: {str(e)}")
+            self._update_project_status(project_path, self._current_step(), "failed")
+            return False
         finally:
-            self.is_processing = False
+            # 任务结束后不再写该项目的日志，关闭文件句柄
+            release_project_log(project_path)
+    
+    def run_step(self, step: int, youtube_url: str, project_path: str, process_config: Dict,
+                 start_step: int = 1, fingerprints: Optional[StepFingerprints] = None,
+                 stream_screenshots: bool = True) -> bool:
+        """
+        执行单个步骤：输入指纹未变化时沿用已有结果，否则执行并记录指纹，并更新项目状态
+        （分布式工作进程按步骤调用）
+        
+        Args:
+            step: 步骤号（1-5）
+            youtube_url: 视频URL
+            project_path: 项目路径
+            process_config: 处理配置
+            start_step: 起始步骤
+            fingerprints: 项目的步骤指纹记录
+            stream_screenshots: 步骤2是否同时流式提取截图（需要本机有ffmpeg）
+            
+        Returns:
+            bool: 步骤是否成功
+        """
+        job = self._current_job()
+        tracer = get_tracer()
+        try:
+            with tracer.trace(project_path, job.job_id if job else None):
+                with tracer.span(STEP_NAMES[step], step=step) as span:
+                    success = self._run_step(step, youtube_url, project_path, process_config, start_step,
+                                             fingerprints, stream_screenshots)
+                    if not success:
+                        span.fail('step failed')
+        except JobCancelled as e:
+            self._send_step_complete(step, False, f"步骤{step}已取消")
+            self._update_project_status(project_path, step, "cancelled")
+            self.logger.warning(f"[任务] {str(e)}")
+            raise
+        return success
+    
+    def _run_step(self, step: int, youtube_url: str, project_path: str, process_config: Dict,
+                  start_step: int, fingerprints: Optional[StepFingerprints],
+                  stream_screenshots: bool) -> bool:
+        """run_step 的实现（在步骤span内执行）"""
+        cancel_token = self._cancel_token()
+        cancel_token.raise_if_cancelled()
+        fingerprints = fingerprints or StepFingerprints(project_path, self.logger)
+        transcribe_language = process_config.get('transcribe_language', 'en')
+        lang_name = {'zh': '中文', 'en': '英文'}.get(transcribe_language, transcribe_language)
+        messages = {
+            1: ("步骤1完成: YouTube视频下载", "步骤1失败: YouTube视频下载"),
+            2: ("步骤2完成: 语音转录", "步骤2失败: 语音转录"),
+            3: ("步骤3完成: 提取截图（并行处理）", "步骤3失败: 提取截图"),
+            4: (f"步骤4完成: 生成{lang_name}Markdown", f"步骤4失败: 生成{lang_name}Markdown"),
+            5: ("步骤5完成: 生成中文Prompt", "步骤5失败: 生成Prompt"),
+        }
+        
+        video_file = None
+        if step in (2, 3):
+            # 获取视频文件路径
+            video_file = self._find_video_file(project_path)
+            if not video_file:
+                self._send_step_complete(step, False, "未找到视频文件")
+                self._update_project_status(project_path, step, "failed")
+                return False
+            self.logger.info(f"找到视频文件: {video_file}")
+        
+        started = time.time()
+        inputs = self._step_inputs(step, fingerprints, youtube_url, project_path, process_config)
+        if self._reuse_step(step, fingerprints, inputs, project_path, process_config, start_step):
+            self._record_step_result(step, status='skipped', seconds=round(time.time() - started, 3))
+            get_tracer().annotate(skipped=True)
+        else:
+            if step == 1:
+                # 步骤1: 下载视频（使用工厂创建下载器）
+                success = self._execute_step1(youtube_url, project_path)
+            elif step == 2:
+                # 步骤2: 语音转录（传递语言配置）
+                # 流式模式下每确定一条字幕就提交对应截图，步骤2与步骤3重叠执行
+                screenshot_stream = self._open_screenshot_stream(video_file, project_path) if stream_screenshots else None
+                success = False
+                try:
+                    success = self._execute_step2(
+                        video_file, project_path, youtube_url, transcribe_language,
+                        segment_callback=screenshot_stream.submit_segment if screenshot_stream else None,
+                        whisper_model=inputs['whisper_model']
+                    )
+                finally:
+                    if screenshot_stream:
+                        stream_stats = screenshot_stream.close(cancel=not success)
+                        self.logger.info(f"[流式截图] 提交 {stream_stats['submitted']}，完成 {stream_stats['extracted']}，"
+                                         f"取消 {stream_stats['cancelled']}")
+            elif step == 3:
+                # 步骤3: 提取截图（优化版 - 并行处理，仅0s截图）
+                success = self._execute_step3(video_file, project_path, transcribe_language)
+            elif step == 4:
+                # 步骤4: 生成Markdown（图文并茂）- 根据语言选择模板
+                success = self._execute_step4(project_path, transcribe_language)
+            else:
+                # 步骤5: 生成优化Prompt - 根据语言选择模板
+                success = self._execute_step5(project_path, transcribe_language)
+            
+            # 各步骤内部把取消当作失败返回，这里统一识别为取消
+            cancelled = cancel_token.cancelled
+            self._record_step_result(step, status='cancelled' if cancelled else 'completed' if success else 'failed',
+                                     seconds=round(time.time() - started, 3))
+            cancel_token.raise_if_cancelled()
+            if not success:
+                self._send_step_complete(step, False, messages[step][1])
+                self._update_project_status(project_path, step, "failed")
+                return False
+            
+            job = self._current_job()
+            if step == 2 and job and 'transcribe' in job.memory:
+                # 内存不足时可能降级为更小的模型，指纹记录实际使用的模型，内存充足时会按首选模型重新转录
+                inputs['whisper_model'] = job.memory['transcribe']['option']['model']
+            fingerprints.record(step, inputs, self._step_outputs(step, project_path, process_config))
+            # 刷新步骤目录清单，文件列表接口直接读取清单
+            self.file_manager.refresh_step_manifests(project_path, STEP_NAMES[step])
+            if step == 2 and stream_screenshots:
+                self.file_manager.refresh_step_manifests(project_path, STEP_NAMES[3])
+            self._send_step_complete(step, True, messages[step][0])
+        
+        # 更新项目状态
+        if step < 5:
+            self._update_project_status(project_path, step + 1, f"step{step}_completed")
+        else:
+            self._update_project_status(project_path, 5, "completed")
+        return True
+    
+    def _find_video_file(self, project_path: str, log_missing: bool = True) -> Optional[str]:
+        """查找步骤1下载的视频文件"""
+        step1_dir = self.file_manager.get_step_directory(project_path, 'step1_download')
+        video_files = sorted(f for f in os.listdir(step1_dir) if f.endswith('.mp4'))
+        if not video_files:
+            if log_missing:
+                self.logger.error(f"未找到视频文件，目录内容: {os.listdir(step1_dir)}")
+            return None
+        return os.path.join(step1_dir, video_files[0])
+    
+    def _video_duration(self, project_path: str, video_file: str) -> float:
+        """视频时长（秒）：优先读取步骤1保存的视频信息，没有时用ffprobe"""
+        step1_dir = self.file_manager.get_step_directory(project_path, 'step1_download')
+        try:
+            with open(os.path.join(step1_dir, 'video_info.json'), 'r', encoding='utf-8') as f:
+                duration = float(json.load(f).get('duration') or 0)
+            if duration > 0:
+                return duration
+        except (OSError, ValueError):
+            pass
+        return Validator.get_video_duration(video_file)
+    
+    def _subtitle_file(self, project_path: str, language: str) -> str:
+        """步骤2输出的字幕文件路径"""
+        language_map = {'zh': 'chinese', 'en': 'english', 'ja': 'japanese', 'ko': 'korean'}
+        step2_dir = self.file_manager.get_step_directory(project_path, 'step2_transcribe')
+        return os.path.join(step2_dir, f'{language_map.get(language, language)}_subtitles.srt')
+    
+    def _step_inputs(self, step: int, fingerprints: StepFingerprints, youtube_url: str,
+                     project_path: str, process_config: Dict) -> Dict:
+        """
+        收集步骤的输入（上游产物哈希、相关配置段、模板文件哈希），用于计算指纹
+        
+        Args:
+            step: 步骤号
+            fingerprints: 项目的步骤指纹记录
+            youtube_url: 视频URL
+            project_path: 项目路径
+            process_config: 处理配置
+        """
+        language = process_config.get('transcribe_language', 'en')
+        inputs = {'config': fingerprints.config_section(self.config, STEP_NAMES[step])}
+        
+        if step == 1:
+            inputs['url'] = youtube_url
+            return inputs
+        
+        step1_dir = self.file_manager.get_step_directory(project_path, 'step1_download')
+        if step in (2, 3):
+            inputs['video'] = fingerprints.file_digest(self._find_video_file(project_path))
+        if step == 2:
+            inputs['language'] = language
+            inputs['whisper_model'] = process_config.get('whisper_model') or self.config.get('step2_transcribe', 'model', 'base')
+        if step in (3, 4):
+            inputs['subtitles'] = fingerprints.file_digest(self._subtitle_file(project_path, language))
+        if step == 4:
+            from src.core.steps.step4_generate_markdown import MarkdownGenerator
+            step3_dir = self.file_manager.get_step_directory(project_path, 'step3_screenshots')
+            inputs['language'] = language
+            inputs['screenshots'] = fingerprints.directory_digest(os.path.join(step3_dir, 'screenshots'))
+            # 截图索引（去重结果、沿用截图）决定每条字幕显示哪张图，只改变索引时也要重新生成
+            inputs['screenshot_index'] = fingerprints.file_digest(os.path.join(step3_dir, 'screenshot_index.json'))
+            inputs['template'] = fingerprints.file_digest(MarkdownGenerator.get_template_path(language))
+        if step in (4, 5):
+            inputs['video_info'] = fingerprints.file_digest(os.path.join(step1_dir, 'video_info.json'))
+        if step == 5:
+            from src.core.steps.step5_generate_prompt import PromptGenerator
+            step4_dir = self.file_manager.get_step_directory(project_path, 'step4_markdown')
+            inputs['language'] = language
+            inputs['article'] = fingerprints.file_digest(os.path.join(step4_dir, 'article.md'))
+            inputs['templates'] = fingerprints.files_digest(PromptGenerator.get_template_files())
+        return inputs
+    
+    def _step_outputs(self, step: int, project_path: str, process_config: Dict) -> List[str]:
+        """步骤的产物路径（指纹未变化时用于确认产物仍然存在）"""
+        language = process_config.get('transcribe_language', 'en')
+        if step == 1:
+            video_file = self._find_video_file(project_path, log_missing=False)
+            return [video_file] if video_file else []
+        if step == 2:
+            return [self._subtitle_file(project_path, language)]
+        if step == 3:
+            return [os.path.join(project_path, 'step3_screenshots', 'screenshots')]
+        if step == 4:
+            return [os.path.join(project_path, 'step4_markdown', 'article.md')]
+        return [os.path.join(project_path, 'step5_prompt')]
+    
+    def _reuse_step(self, step: int, fingerprints: StepFingerprints, inputs: Dict, project_path: str,
+                    process_config: Dict, start_step: int) -> bool:
+        """
+        判断步骤能否沿用已有结果
+        
+        输入指纹与上次成功执行时一致则跳过；起始步骤之前、尚无指纹记录（旧项目）但产物齐全的步骤
+        视为已完成并补记指纹。
+        
+        Returns:
+            bool: True 表示跳过该步骤
+        """
+        if fingerprints.is_current(step, inputs):
+            self._send_step_complete(step, True, f"步骤{step}跳过: 输入未变化，沿用已有结果")
+            return True
+        
+        outputs = self._step_outputs(step, project_path, process_config)
+        if step < start_step and not fingerprints.has_record(step) and fingerprints.outputs_exist(outputs):
+            fingerprints.record(step, inputs, outputs)
+            self._send_step_complete(step, True, f"步骤{step}跳过: 沿用已有结果")
+            return True
+        return False
+    
+    def _open_screenshot_stream(self, video_file: str, project_path: str):
+        """
+        打开步骤3的流式截图会话（step3_screenshots.stream_with_transcribe 关闭时返回None）
+        
+        Args:
+            video_file: 视频文件路径
+            project_path: 项目路径
+        """
+        if not self.config.get_boolean('step3_screenshots', 'stream_with_transcribe', True):
+            return None
+        try:
+            from src.core.steps.step3_screenshots import VideoScreenshot
+            step3_dir = self.file_manager.get_step_directory(project_path, 'step3_screenshots')
+            screenshot = VideoScreenshot(self.config, self.logger)
+            screenshot.cancel_token = self._cancel_token()
+            return screenshot.open_stream(video_file, step3_dir)
+        except Exception as e:
+            self.logger.warning(f"[流式截图] 无法启用，转录完成后再提取截图: {str(e)}")
+            return None
     
     def _execute_step1(self, youtube_url: str, project_path: str) -> bool:
         """执行步骤1: 视频下载（支持多平台）"""
@@ -202,9 +707,11 @@ class YouTubeToArticleProcessor:
             # 使用工厂创建下载器
             from src.core.steps.downloader_factory import VideoDownloaderFactory
             
+            job = self._current_job()
+            
             def download_progress_callback(progress_data: Dict):
                 """下载进度回调"""
-                self._send_download_progress(1, progress_data)
+                self._send_download_progress(1, progress_data, job)
             
             # 创建对应平台的下载器
             downloader = VideoDownloaderFactory.create_downloader(
@@ -213,16 +720,26 @@ class YouTubeToArticleProcessor:
                 self.logger,
                 download_progress_callback
             )
+            downloader.cancel_token = self._cancel_token()
             
             # 获取步骤1输出目录
             step1_dir = self.file_manager.get_step_directory(project_path, 'step1_download')
             
             self._send_progress_update(1, 20, "开始下载视频...")
             
-            # 执行下载
-            result = downloader.download_video(youtube_url, step1_dir)
+            # 执行下载（已缓存的视频和本地文件只做本地物化，不占用网络槽位）
+            if (self.cache_manager.has_cached_video(youtube_url)
+                    or URLIdentifier.identify_platform(youtube_url) == 'local'):
+                slot = nullcontext()
+                admission = nullcontext()
+            else:
+                slot = self.job_manager.slot(RESOURCE_NETWORK)
+                admission = self.job_manager.admit('download', [({}, self.memory_estimator.download())])
+            with slot, admission:
+                result = downloader.download_video(youtube_url, step1_dir)
             
             if result['success']:
+                self._record_step_result(1, cache_hit=bool(result.get('from_cache')))
                 self._send_progress_update(1, 90, "下载完成，保存信息...")
                 
                 # 保存步骤信息
@@ -253,38 +770,94 @@ class YouTubeToArticleProcessor:
                                           f"执行异常: {str(e)}")
             return False
     
+    def start_model_warmup(self) -> threading.Thread:
+        """
+        在后台线程中预加载Whisper模型（可选，由 step2_transcribe.warmup_on_start 控制）
+        
+        Returns:
+            threading.Thread: 预加载线程
+        """
+        def warmup():
+            try:
+                from src.core.steps.step2_transcribe import get_whisper_model
+                model_name = self.config.get('step2_transcribe', 'model', 'base')
+                started = time.time()
+                self.logger.info(f"[预热] 开始后台加载Whisper模型: {model_name}")
+                get_whisper_model(model_name)
+                self.logger.success(f"[预热] Whisper模型已就绪: {model_name} (耗时: {time.time() - started:.1f}秒)")
+            except Exception as e:
+                self.logger.warning(f"[预热] Whisper模型预加载失败: {str(e)}")
+        
+        thread = threading.Thread(target=warmup, name='whisper_warmup', daemon=True)
+        thread.start()
+        return thread
+    
+    def _current_job(self) -> Optional[Job]:
+        """获取当前线程正在执行的任务"""
+        return self.job_manager.current_job()
+    
+    def _cancel_token(self) -> CancellationToken:
+        """当前任务的取消令牌（不在任务中执行时返回一个不会被取消的令牌）"""
+        job = self._current_job()
+        return job.cancel_token if job else CancellationToken()
+    
+    def _current_step(self) -> int:
+        """当前任务所处的步骤"""
+        job = self._current_job()
+        return job.current_step if job else 1
+    
+    def _record_step_result(self, step: int, **fields):
+        """记录当前任务某个步骤的执行结果（耗时、缓存命中等，命令行报告使用）"""
+        if 'cache_hit' in fields:
+            get_tracer().annotate(cache_hit=fields['cache_hit'])
+        job = self._current_job()
+        if job:
+            job.steps.setdefault(str(step), {'cache_hit': False}).update(fields)
+    
+    def _event_project(self, job: Optional[Job] = None) -> Optional[str]:
+        """
+        获取推送事件所属的项目
+        
+        Args:
+            job: 事件所属任务（进度监控线程等非任务线程需显式传入，默认取当前线程的任务）
+        """
+        job = job or self._current_job()
+        return job.project_name if job else None
+    
     def _send_progress_update(self, step: int, progress: int, message: str):
         """发送进度更新"""
         if self.progress_callback:
-            self.progress_callback(self.current_project, step, progress, message)
+            self.progress_callback(self._event_project(), step, progress, message)
         self.logger.info(f"[步骤{step}] {progress}% - {message}")
     
-    def _send_download_progress(self, step: int, progress_data: Dict):
+    def _send_download_progress(self, step: int, progress_data: Dict, job: Optional[Job] = None):
         """
         发送详细的下载进度更新
         
         Args:
             step: 步骤号
             progress_data: 进度数据字典
+            job: 事件所属任务
         """
         if self.download_progress_callback:
-            self.download_progress_callback(self.current_project, step, progress_data)
+            self.download_progress_callback(self._event_project(job), step, progress_data)
     
-    def _send_transcribe_progress(self, step: int, progress_data: Dict):
+    def _send_transcribe_progress(self, step: int, progress_data: Dict, job: Optional[Job] = None):
         """
         发送详细的转录进度更新
         
         Args:
             step: 步骤号
             progress_data: 进度数据字典
+            job: 事件所属任务（转录进度来自监控线程，需显式传入）
         """
         if self.transcribe_progress_callback:
-            self.transcribe_progress_callback(self.current_project, step, progress_data)
+            self.transcribe_progress_callback(self._event_project(job), step, progress_data)
     
     def _send_step_complete(self, step: int, success: bool, message: str):
         """发送步骤完成通知"""
         if self.step_complete_callback:
-            self.step_complete_callback(self.current_project, step, success, message)
+            self.step_complete_callback(self._event_project(), step, success, message)
         
         if success:
             self.logger.success(f"[步骤{step}] {message}")
@@ -293,6 +866,9 @@ class YouTubeToArticleProcessor:
     
     def _update_project_status(self, project_path: str, current_step: int, status: str):
         """更新项目状态"""
+        job = self._current_job()
+        if job and job.project_path == project_path:
+            self.job_manager.update_job(job, current_step=current_step, message=status)
         try:
             summary = self.file_manager.get_project_summary(project_path)
             summary.update({
@@ -311,15 +887,7 @@ class YouTubeToArticleProcessor:
             if not os.path.exists(project_path):
                 return {'success': False, 'error': '项目不存在'}
             
-            step_names = {
-                1: 'step1_download',
-                2: 'step2_transcribe', 
-                3: 'step3_screenshots',
-                4: 'step4_markdown',
-                5: 'step5_prompt'
-            }
-            
-            step_name = step_names.get(step)
+            step_name = STEP_NAMES.get(step)
             if not step_name:
                 return {'success': False, 'error': '无效的步骤号'}
             
@@ -336,7 +904,8 @@ class YouTubeToArticleProcessor:
             self.logger.error(f"获取步骤状态失败: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def _execute_step2(self, video_file: str, project_path: str, youtube_url: str, language: str = 'en') -> bool:
+    def _execute_step2(self, video_file: str, project_path: str, youtube_url: str, language: str = 'en',
+                       segment_callback: Optional[Callable] = None, whisper_model: Optional[str] = None) -> bool:
         """
         执行步骤2: 语音转录
         
@@ -345,6 +914,8 @@ class YouTubeToArticleProcessor:
             project_path: 项目路径
             youtube_url: 视频URL
             language: 语音识别语言代码（新增）
+            segment_callback: 字幕段确定后的回调（流式截图使用）
+            whisper_model: 首选Whisper模型（内存不足时可能降级为更小的模型）
         """
         try:
             self.logger.info(f"步骤2开始，视频文件: {video_file}")
@@ -357,6 +928,7 @@ class YouTubeToArticleProcessor:
                 self.logger.info(f"缓存已启用，检查{lang_name}字幕缓存...")
                 cached_result = self.cache_manager.get_cached_subtitles(youtube_url, language)
                 if cached_result:
+                    self._record_step_result(2, cache_hit=True)
                     self.logger.info(f"找到缓存的{lang_name}字幕，直接使用")
                     cached_srt_path, cached_info = cached_result
                     step2_dir = self.file_manager.get_step_directory(project_path, 'step2_transcribe')
@@ -369,6 +941,7 @@ class YouTubeToArticleProcessor:
                     import shutil
                     os.makedirs(step2_dir, exist_ok=True)
                     shutil.copy2(cached_srt_path, output_srt)
+                    copy_transcript(cached_srt_path, output_srt)
                     
                     self._send_progress_update(2, 100, f"使用缓存的{lang_name}字幕")
                     return True
@@ -378,13 +951,17 @@ class YouTubeToArticleProcessor:
             self._send_progress_update(2, 20, "初始化Whisper模型...")
             
             # 创建转录器
+            from src.core.steps.step2_transcribe import AudioTranscriber
             self.logger.info("创建AudioTranscriber实例...")
             transcriber = AudioTranscriber(self.config, self.logger)
+            transcriber.cancel_token = self._cancel_token()
             
             # 定义转录进度回调函数
+            job = self._current_job()
+            
             def transcribe_progress_callback(progress_data: Dict):
                 """转录进度回调"""
-                self._send_transcribe_progress(2, progress_data)
+                self._send_transcribe_progress(2, progress_data, job)
             
             # 设置进度回调，使转录进度能实时更新到Web界面
             transcriber.progress_callback = transcribe_progress_callback
@@ -396,9 +973,17 @@ class YouTubeToArticleProcessor:
             
             self._send_progress_update(2, 30, "开始语音转录...")
             
-            # 执行转录（传递语言参数）
+            # 执行转录（传递语言参数），Whisper槽位限制同时转录的任务数，内存准入决定使用的模型
             self.logger.info("调用transcriber.transcribe_video()...")
-            result = transcriber.transcribe_video(video_file, step2_dir, youtube_url, language)
+            duration = self._video_duration(project_path, video_file)
+            models = [whisper_model or transcriber.model_name]
+            if self.config.get_boolean('memory', 'allow_model_downgrade', True):
+                models += self.memory_estimator.smaller_models(models[0])
+            options = [({'model': model}, self.memory_estimator.whisper(model, duration)) for model in models]
+            with self.job_manager.slot(RESOURCE_WHISPER), self.job_manager.admit('transcribe', options) as decision:
+                transcriber.model_name = decision['option']['model']
+                result = transcriber.transcribe_video(video_file, step2_dir, youtube_url, language,
+                                                      segment_callback=segment_callback)
             
             self.logger.info(f"转录结果: success={result.get('success', False)}")
             
@@ -435,7 +1020,9 @@ class YouTubeToArticleProcessor:
             self._send_progress_update(3, 10, "初始化截图提取器...")
             
             # 创建截图提取器
+            from src.core.steps.step3_screenshots import VideoScreenshot
             screenshot = VideoScreenshot(self.config, self.logger)
+            screenshot.cancel_token = self._cancel_token()
             
             # 获取字幕文件（根据语言动态查找）
             step2_dir = self.file_manager.get_step_directory(project_path, 'step2_transcribe')
@@ -450,8 +1037,16 @@ class YouTubeToArticleProcessor:
             
             self._send_progress_update(3, 20, "开始提取截图...")
             
-            # 执行截图提取
-            result = screenshot.extract_screenshots(video_file, srt_file, step3_dir)
+            # 执行截图提取，内存准入决定并行线程数
+            width, height = Validator.get_video_resolution(video_file)
+            worker_counts = [screenshot.max_workers]
+            while worker_counts[-1] > 1:
+                worker_counts.append(worker_counts[-1] // 2)
+            options = [({'max_workers': workers}, self.memory_estimator.screenshots(width, height, workers))
+                       for workers in worker_counts]
+            with self.job_manager.slot(RESOURCE_FFMPEG), self.job_manager.admit('screenshots', options) as decision:
+                screenshot.max_workers = decision['option']['max_workers']
+                result = screenshot.extract_screenshots(video_file, srt_file, step3_dir)
             
             if result['success']:
                 self._send_progress_update(3, 100, "步骤3完成")
@@ -475,6 +1070,7 @@ class YouTubeToArticleProcessor:
             self._send_progress_update(4, 10, "初始化Markdown生成器...")
             
             # 创建Markdown生成器（传入语言参数）
+            from src.core.steps.step4_generate_markdown import MarkdownGenerator
             generator = MarkdownGenerator(self.config, self.logger)
             generator.set_language(language)
             
@@ -523,6 +1119,7 @@ class YouTubeToArticleProcessor:
             self._send_progress_update(5, 10, "初始化Prompt生成器...")
             
             # 创建Prompt生成器（传入语言参数）
+            from src.core.steps.step5_generate_prompt import PromptGenerator
             generator = PromptGenerator(self.config, self.logger)
             generator.set_language(language)
             
@@ -556,9 +1153,10 @@ class YouTubeToArticleProcessor:
             self.logger.error(f"步骤5执行异常: {str(e)}")
             return False
     
-    def _get_zhihu_publisher(self) -> ZhihuPublisher:
+    def _get_zhihu_publisher(self) -> 'ZhihuPublisher':
         """获取知乎发布器实例（延迟初始化）"""
         if self.zhihu_publisher is None:
+            from src.core.steps.step6_publish_zhihu import ZhihuPublisher
             self.zhihu_publisher = ZhihuPublisher(self.config, self.logger)
         return self.zhihu_publisher
     
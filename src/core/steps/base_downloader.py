@@ -5,6 +5,8 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Optional, Callable
 
+from src.utils.cancellation import CancellationToken
+
 
 class BaseVideoDownloader(ABC):
     """视频下载器抽象基类"""
@@ -21,6 +23,8 @@ class BaseVideoDownloader(ABC):
         self.config = config
         self.logger = logger
         self.progress_callback = progress_callback
+        # 取消令牌（由处理器替换为任务的令牌），下载循环和子进程据此中止
+        self.cancel_token = CancellationToken()
     
     @abstractmethod
     def download_video(self, url: str, output_dir: str) -> Dict:
@@ -53,3 +57,15 @@ class BaseVideoDownloader(ABC):
         """
         pass
 
+    
+    def get_video_metadata(self, url: str) -> Optional[Dict]:
+        """
+        获取视频摘要信息（不下载）
+        
+        Args:
+            url: 视频URL
+            
+        Returns:
+            Optional[Dict]: 视频信息，不支持或失败时返回None
+        """
+        return None
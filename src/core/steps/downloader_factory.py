@@ -15,6 +15,7 @@ from src.utils.url_identifier import URLIdentifier
 from src.core.steps.base_downloader import BaseVideoDownloader
 from src.core.steps.step1_download import YouTubeDownloader
 from src.core.steps.step1_bilibili_download import BilibiliDownloader
+from src.core.steps.step1_local_import import LocalVideoImporter
 
 
 class VideoDownloaderFactory:
@@ -52,6 +53,10 @@ class VideoDownloaderFactory:
             logger.info(f"[识别] 检测到Bilibili视频")
             return BilibiliDownloader(config, logger, progress_callback)
         
+        elif platform == 'local':
+            logger.info(f"[识别] 检测到本地视频文件")
+            return LocalVideoImporter(config, logger, progress_callback)
+        
         else:
             raise ValueError(f"不支持的视频平台: {url}")
     
@@ -63,5 +68,5 @@ class VideoDownloaderFactory:
         Returns:
             list: 支持的平台名称列表
         """
-        return ['youtube', 'bilibili']
+        return ['youtube', 'bilibili', 'local']
 
@@ -5,7 +5,6 @@
 import os
 import json
 import time
-import shutil
 import subprocess
 import requests
 from datetime import datetime
@@ -21,6 +20,10 @@ from src.utils.logger import Logger
 from src.utils.validator import Validator
 from src.utils.cache_manager import CacheManager
 from src.utils.url_identifier import URLIdentifier
+from src.utils.bandwidth_limiter import get_bandwidth_limiter
+from src.utils.capabilities import get_capabilities
+from src.utils.tracing import get_tracer
+from src.utils.cancellation import run_cancellable
 from src.core.steps.base_downloader import BaseVideoDownloader
 
 
@@ -32,6 +35,7 @@ class BilibiliDownloader(BaseVideoDownloader):
         self.cache_manager = CacheManager(config, logger)
         self.enable_cache = config.get_boolean('basic', 'enable_cache', True)
         self.download_start_time = None
+        self.bandwidth_limiter = get_bandwidth_limiter(config)
         
         # 创建session
         self.session = requests.Session()
@@ -41,19 +45,9 @@ class BilibiliDownloader(BaseVideoDownloader):
         })
     
     def check_dependencies(self) -> tuple:
-        """检查ffmpeg是否可用"""
-        try:
-            result = subprocess.run(
-                ['ffmpeg', '-version'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                return True, ['ffmpeg']
-            return False, None
-        except Exception:
-            return False, None
+        """检查ffmpeg是否可用（能力注册表缓存探测结果）"""
+        capability = get_capabilities().tool('ffmpeg')
+        return capability['available'], capability['command']
     
     def download_video(self, url: str, output_dir: str) -> Dict:
         """
@@ -81,7 +75,8 @@ class BilibiliDownloader(BaseVideoDownloader):
             if not bvid:
                 raise Exception(f"无法从URL提取BVID: {url}")
             
-            self.logger.info(f"[提取] BVID: {bvid}")
+            page = URLIdentifier.extract_bilibili_page(url)
+            self.logger.info(f"[提取] BVID: {bvid}" + (f" (P{page})" if page > 1 else ""))
             
             # 检查缓存
             self.logger.info("[检查] 检查视频缓存...")
@@ -92,16 +87,8 @@ class BilibiliDownloader(BaseVideoDownloader):
                     self.logger.info("[成功] 找到缓存的视频！")
                     cached_video_path, cached_info = cached_result
                     
-                    # 复制缓存文件到输出目录
-                    output_filename = os.path.basename(cached_video_path)
-                    output_video_path = os.path.join(output_dir, output_filename)
-                    
-                    if not os.path.exists(output_video_path):
-                        self.logger.info(f"[复制] 正在复制缓存文件到输出目录...")
-                        shutil.copy2(cached_video_path, output_video_path)
-                        self.logger.success(f"[成功] 从缓存复制视频完成: {output_filename}")
-                    else:
-                        self.logger.info(f"[成功] 输出目录已存在该文件，跳过复制")
+                    # 物化缓存文件到输出目录（硬链接/reflink，跨文件系统时复制）
+                    output_video_path = self.cache_manager.materialize_video(cached_info, output_dir)
                     
                     # 更新文件路径
                     cached_info['file_path'] = output_video_path
@@ -145,7 +132,7 @@ class BilibiliDownloader(BaseVideoDownloader):
             
             # 获取视频信息
             self.logger.info("[获取] 正在获取视频信息...")
-            video_info = self._get_video_info(bvid)
+            video_info = self._get_video_info(bvid, page)
             if not video_info:
                 raise Exception("无法获取视频信息")
             
@@ -169,20 +156,27 @@ class BilibiliDownloader(BaseVideoDownloader):
             
             # 下载视频流
             self.logger.info("[下载] 开始下载视频流...")
-            video_temp_path = os.path.join(output_dir, f"{bvid}_video.m4s")
-            self._download_stream(video_url, video_temp_path, "video")
+            file_stem = bvid if page == 1 else f"{bvid}_p{page}"
+            video_temp_path = os.path.join(output_dir, f"{file_stem}_video.m4s")
+            with get_tracer().span('step1.download', platform='bilibili', stream='video') as span:
+                self._download_stream(video_url, video_temp_path, "video")
+                span.set(bytes=os.path.getsize(video_temp_path))
             self.logger.success(f"[成功] 视频流下载完成")
             
             # 下载音频流
             self.logger.info("[下载] 开始下载音频流...")
-            audio_temp_path = os.path.join(output_dir, f"{bvid}_audio.m4s")
-            self._download_stream(audio_url, audio_temp_path, "audio")
+            audio_temp_path = os.path.join(output_dir, f"{file_stem}_audio.m4s")
+            with get_tracer().span('step1.download', platform='bilibili', stream='audio') as span:
+                self._download_stream(audio_url, audio_temp_path, "audio")
+                span.set(bytes=os.path.getsize(audio_temp_path))
             self.logger.success(f"[成功] 音频流下载完成")
             
             # 合并视频和音频
             self.logger.info("[合并] 正在合并视频和音频...")
-            output_video_path = os.path.join(output_dir, f"{bvid}.mp4")
-            self._merge_video_audio(video_temp_path, audio_temp_path, output_video_path)
+            output_video_path = os.path.join(output_dir, f"{file_stem}.mp4")
+            with get_tracer().span('step1.merge', platform='bilibili') as span:
+                self._merge_video_audio(video_temp_path, audio_temp_path, output_video_path)
+                span.set(bytes=os.path.getsize(output_video_path))
             self.logger.success(f"[成功] 视频合并完成")
             
             # 删除临时文件
@@ -262,20 +256,47 @@ class BilibiliDownloader(BaseVideoDownloader):
                 'message': error_msg
             }
     
-    def _get_video_info(self, bvid: str) -> Optional[Dict]:
-        """获取视频信息"""
-        try:
-            url = "https://api.bilibili.com/x/web-interface/view"
-            params = {"bvid": bvid}
-            
-            response = self.session.get(url, params=params, timeout=30)
-            data = response.json()
-            
-            if data['code'] != 0:
-                self.logger.error(f"API返回错误: {data}")
-                return None
+    def get_video_metadata(self, url: str) -> Optional[Dict]:
+        """
+        获取视频摘要信息（不下载，优先使用元数据缓存）
+        
+        Args:
+            url: Bilibili视频URL
             
-            info = data['data']
+        Returns:
+            Optional[Dict]: 视频摘要信息（含分P列表 pages），失败返回None
+        """
+        bvid = URLIdentifier.extract_bilibili_bvid(url)
+        if not bvid:
+            return None
+        return self._get_video_info(bvid, URLIdentifier.extract_bilibili_page(url))
+    
+    def _get_video_info(self, bvid: str, page: int = 1) -> Optional[Dict]:
+        """
+        获取视频信息（view接口结果按BV号写入元数据缓存）
+        
+        Args:
+            bvid: BV号
+            page: 分P序号（多P视频时选择对应分P的cid和时长）
+        """
+        try:
+            with get_tracer().span('step1.extract_info', platform='bilibili') as span:
+                info = self.cache_manager.get_cached_metadata('bilibili', bvid)
+                span.set(cache_hit=bool(info))
+                if not info:
+                    url = "https://api.bilibili.com/x/web-interface/view"
+                    params = {"bvid": bvid}
+                    
+                    response = self.session.get(url, params=params, timeout=30)
+                    data = response.json()
+                    
+                    if data['code'] != 0:
+                        self.logger.error(f"API返回错误: {data}")
+                        span.fail(f"API code {data['code']}")
+                        return None
+                    
+                    info = data['data']
+                    self.cache_manager.cache_metadata('bilibili', bvid, info)
             
             video_info = {
                 'title': info.get('title', 'Unknown'),
@@ -288,9 +309,27 @@ class BilibiliDownloader(BaseVideoDownloader):
                 'bvid': bvid,
                 'aid': info.get('aid', 0),
                 'cid': info.get('cid', 0),
-                'pic': info.get('pic', '')
+                'pic': info.get('pic', ''),
+                'pages': [
+                    {'page': p.get('page', i + 1), 'cid': p.get('cid', 0),
+                     'part': p.get('part', ''), 'duration': p.get('duration', 0)}
+                    for i, p in enumerate(info.get('pages') or [])
+                ]
             }
             
+            # 多P视频：使用对应分P的cid、时长和标题
+            if page > 1:
+                selected = next((p for p in video_info['pages'] if p['page'] == page), None)
+                if not selected:
+                    self.logger.error(f"视频不存在第{page}P: {bvid}")
+                    return None
+                video_info['cid'] = selected['cid']
+                video_info['duration'] = selected['duration']
+                video_info['url'] = f"https://www.bilibili.com/video/{bvid}?p={page}"
+                video_info['page'] = page
+                if selected['part']:
+                    video_info['title'] = f"{video_info['title']} - P{page} {selected['part']}"
+            
             return video_info
             
         except Exception as e:
@@ -372,11 +411,14 @@ class BilibiliDownloader(BaseVideoDownloader):
             downloaded_size = 0
             start_time = time.time()
             
-            with open(output_path, 'wb') as f:
+            # 取消时关闭连接，使阻塞中的读取立即返回
+            with self.cancel_token.on_cancel(response.close), open(output_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=1024 * 1024):  # 1MB chunks
+                    self.cancel_token.raise_if_cancelled()
                     if chunk:
                         f.write(chunk)
                         downloaded_size += len(chunk)
+                        self.bandwidth_limiter.consume(len(chunk))
                         
                         # 计算进度
                         if total_size > 0:
@@ -402,6 +444,12 @@ class BilibiliDownloader(BaseVideoDownloader):
             self.logger.info(f"[下载] {stream_type}流下载完成: {os.path.basename(output_path)}")
             
         except Exception as e:
+            if self.cancel_token.cancelled:
+                # 删除未下载完的分片文件
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                self.logger.warning(f"[下载] 任务已取消，停止下载{stream_type}流")
+                self.cancel_token.raise_if_cancelled()
             self.logger.error(f"下载{stream_type}流失败: {str(e)}")
             raise
     
@@ -424,8 +472,9 @@ class BilibiliDownloader(BaseVideoDownloader):
                 output_path
             ]
             
-            result = subprocess.run(
+            result = run_cancellable(
                 cmd,
+                token=self.cancel_token,
                 capture_output=True,
                 text=True,
                 timeout=600  # 10分钟超时
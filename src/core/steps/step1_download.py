@@ -5,7 +5,6 @@
 import subprocess
 import os
 import json
-import shutil
 from datetime import datetime
 from typing import Dict, Optional, Callable
 import sys
@@ -30,6 +29,11 @@ from src.utils.logger import Logger
 from src.utils.validator import Validator
 from src.utils.file_manager import FileManager
 from src.utils.cache_manager import CacheManager
+from src.utils.url_identifier import URLIdentifier
+from src.utils.bandwidth_limiter import get_bandwidth_limiter
+from src.utils.capabilities import get_capabilities
+from src.utils.tracing import get_tracer
+from src.utils.cancellation import JobCancelled, run_cancellable
 from src.core.steps.base_downloader import BaseVideoDownloader
 
 class YouTubeDownloader(BaseVideoDownloader):
@@ -40,6 +44,8 @@ class YouTubeDownloader(BaseVideoDownloader):
         self.enable_cache = config.get_boolean('basic', 'enable_cache', True)
         self.last_progress_time = None
         self.download_start_time = None
+        self.bandwidth_limiter = get_bandwidth_limiter(config)
+        self._downloaded_bytes = {}
     
     def _clean_youtube_url(self, url: str) -> str:
         """
@@ -91,37 +97,14 @@ class YouTubeDownloader(BaseVideoDownloader):
             raise ValueError(f"无效的 YouTube URL，无法提取视频ID: {url}")
         
     def check_dependencies(self):
-        """检查yt-dlp是否可用"""
-        yt_dlp_available = False
-        yt_dlp_command = None
-        
-        # 先尝试直接命令
-        try:
-            result = subprocess.run(
-                ['yt-dlp', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                yt_dlp_available = True
-                yt_dlp_command = ['yt-dlp']
-        except (FileNotFoundError, subprocess.TimeoutExpired, Exception):
-            # 尝试使用python模块方式
-            try:
-                result = subprocess.run(
-                    [sys.executable, '-m', 'yt_dlp', '--version'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    yt_dlp_available = True
-                    yt_dlp_command = [sys.executable, '-m', 'yt_dlp']
-            except Exception:
-                pass
+        """
+        检查yt-dlp是否可用
         
-        return yt_dlp_available, yt_dlp_command
+        结果来自进程内的能力注册表：Python API 可导入时不启动子进程，
+        否则只在首次调用时探测一次命令行版本。
+        """
+        capability = get_capabilities().tool('yt-dlp')
+        return capability['available'], capability['command']
         
     def download_video(self, url: str, output_dir: str) -> Dict:
         """
@@ -158,16 +141,8 @@ class YouTubeDownloader(BaseVideoDownloader):
                     self.logger.info(f"[缓存] 缓存视频路径: {cached_video_path}")
                     self.logger.info(f"[缓存] 缓存视频标题: {cached_info.get('title', '未知')}")
                     
-                    # 复制缓存文件到输出目录
-                    output_filename = os.path.basename(cached_video_path)
-                    output_video_path = os.path.join(output_dir, output_filename)
-                    
-                    if not os.path.exists(output_video_path):
-                        self.logger.info(f"[复制] 正在复制缓存文件到输出目录...")
-                        shutil.copy2(cached_video_path, output_video_path)
-                        self.logger.success(f"[成功] 从缓存复制视频完成: {output_filename}")
-                    else:
-                        self.logger.info(f"[成功] 输出目录已存在该文件，跳过复制")
+                    # 物化缓存文件到输出目录（硬链接/reflink，跨文件系统时复制）
+                    output_video_path = self.cache_manager.materialize_video(cached_info, output_dir)
                     
                     # 更新文件路径
                     cached_info['file_path'] = output_video_path
@@ -212,9 +187,14 @@ class YouTubeDownloader(BaseVideoDownloader):
             os.makedirs(output_dir, exist_ok=True)
             self.logger.info(f"[目录] 输出目录已创建: {output_dir}")
             
-            # 先获取视频信息
+            # 先获取视频信息（Python API 下只提取一次，信息字典复用于格式选择和下载）
             self.logger.info("[获取] 正在获取视频信息...")
-            video_info = self._get_video_info(url, yt_dlp_command)
+            raw_info = None
+            if YT_DLP_API_AVAILABLE:
+                raw_info = self.extract_info(url)
+                video_info = self._summarize_info(raw_info, url) if raw_info else None
+            else:
+                video_info = self._get_video_info(url, yt_dlp_command)
             if not video_info:
                 self.logger.error("[错误] 无法获取视频信息")
                 raise Exception("无法获取视频信息")
@@ -228,7 +208,13 @@ class YouTubeDownloader(BaseVideoDownloader):
             
             # 下载视频
             self.logger.info("[下载] 开始下载视频文件...")
-            video_file = self._download_video_file(url, output_dir, yt_dlp_command)
+            video_file = self._download_video_file(url, output_dir, yt_dlp_command, info=raw_info)
+            if not video_file and raw_info is not None and raw_info.get('_from_metadata_cache'):
+                # 缓存的格式地址可能已失效，重新提取一次
+                self.logger.warning("[缓存] 使用缓存元数据下载失败，重新提取后重试...")
+                raw_info = self.extract_info(url, use_cache=False)
+                if raw_info:
+                    video_file = self._download_video_file(url, output_dir, yt_dlp_command, info=raw_info)
             if not video_file:
                 self.logger.error("[错误] 视频下载失败")
                 raise Exception("视频下载失败")
@@ -304,8 +290,89 @@ class YouTubeDownloader(BaseVideoDownloader):
                 'message': error_msg
             }
     
+    def extract_info(self, url: str, use_cache: bool = True) -> Optional[Dict]:
+        """
+        提取视频信息（yt-dlp Python API，进程内调用）
+        
+        只做提取，不做格式选择（process=False），返回的信息字典可直接交给
+        process_ie_result 完成格式选择和下载。结果按规范视频ID写入元数据缓存，
+        重复运行、队列预览和播放列表展开时不再访问站点。
+        
+        Args:
+            url: YouTube视频URL
+            use_cache: 是否使用元数据缓存
+            
+        Returns:
+            Optional[Dict]: yt-dlp 信息字典，失败返回None
+        """
+        if not YT_DLP_API_AVAILABLE:
+            return None
+        
+        try:
+            url = self._clean_youtube_url(url)
+            video_id = URLIdentifier.extract_youtube_video_id(url)
+            
+            with get_tracer().span('step1.extract_info', platform='youtube') as span:
+                if use_cache:
+                    cached = self.cache_manager.get_cached_metadata('youtube', video_id)
+                    if cached:
+                        span.set(cache_hit=True)
+                        cached['_from_metadata_cache'] = True
+                        return cached
+                
+                ydl_opts = {
+                    'quiet': True,
+                    'no_warnings': True,
+                    'no_color': True,
+                    'noplaylist': True,
+                }
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = ydl.extract_info(url, download=False, process=False)
+                    info = ydl.sanitize_info(info)
+            
+            self.cache_manager.cache_metadata('youtube', info.get('id') or video_id, info)
+            return info
+            
+        except Exception as e:
+            self.logger.error(f"获取视频信息异常: {str(e)}")
+            return None
+    
+    def get_video_metadata(self, url: str) -> Optional[Dict]:
+        """
+        获取视频摘要信息（不下载，优先使用元数据缓存）
+        
+        Args:
+            url: YouTube视频URL
+            
+        Returns:
+            Optional[Dict]: 视频摘要信息，失败返回None
+        """
+        if YT_DLP_API_AVAILABLE:
+            info = self.extract_info(url)
+            return self._summarize_info(info, self._clean_youtube_url(url)) if info else None
+        
+        yt_dlp_available, yt_dlp_command = self.check_dependencies()
+        if not yt_dlp_available:
+            return None
+        return self._get_video_info(url, yt_dlp_command)
+    
+    @staticmethod
+    def _summarize_info(info: Dict, url: str) -> Dict:
+        """从 yt-dlp 信息字典中提取关键信息"""
+        return {
+            'title': info.get('title') or 'Unknown',
+            'duration': int(info.get('duration') or 0),
+            'uploader': info.get('uploader') or 'Unknown',
+            'upload_date': info.get('upload_date') or '',
+            'view_count': info.get('view_count') or 0,
+            'description': (info.get('description') or '')[:500],  # 限制描述长度
+            'url': url,
+            'video_id': info.get('id', ''),
+            'formats_available': len(info.get('formats') or [])
+        }
+    
     def _get_video_info(self, url: str, yt_dlp_command: list) -> Optional[Dict]:
-        """获取视频信息"""
+        """获取视频信息（命令行方式，Python API 不可用时使用）"""
         try:
             # 清理 URL
             url = self._clean_youtube_url(url)
@@ -337,25 +404,14 @@ class YouTubeDownloader(BaseVideoDownloader):
             info = json.loads(result.stdout)
             
             # 提取关键信息
-            video_info = {
-                'title': info.get('title', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'uploader': info.get('uploader', 'Unknown'),
-                'upload_date': info.get('upload_date', ''),
-                'view_count': info.get('view_count', 0),
-                'description': info.get('description', '')[:500],  # 限制描述长度
-                'url': url,
-                'video_id': info.get('id', ''),
-                'formats_available': len(info.get('formats', []))
-            }
-            
-            return video_info
+            return self._summarize_info(info, url)
             
         except Exception as e:
             self.logger.error(f"获取视频信息异常: {str(e)}")
             return None
     
-    def _download_video_file(self, url: str, output_dir: str, yt_dlp_command: list) -> Optional[str]:
+    def _download_video_file(self, url: str, output_dir: str, yt_dlp_command: list,
+                             info: Optional[Dict] = None) -> Optional[str]:
         """
         下载视频文件（使用 yt-dlp Python API）
         
@@ -363,6 +419,7 @@ class YouTubeDownloader(BaseVideoDownloader):
             url: YouTube视频URL
             output_dir: 输出目录
             yt_dlp_command: yt-dlp命令（用于兼容性检查，实际使用API）
+            info: extract_info 返回的信息字典，提供时直接复用，不再重新提取页面
             
         Returns:
             str: 下载的视频文件路径，失败返回 None
@@ -417,6 +474,29 @@ class YouTubeDownloader(BaseVideoDownloader):
             self.logger.info("[下载] 使用 yt-dlp Python API 开始下载...")
             self.logger.info(f"[状态] 进度回调状态: {'已设置' if self.progress_callback else '未设置'}")
             
+            # 追踪：下载span记录各流的字节数，合并等后处理单独记录子span
+            tracer = get_tracer()
+            download_span = tracer.start_span('step1.download', platform='youtube')
+            postprocess_spans = {}
+            
+            def trace_progress_hook(d: Dict):
+                # 在进度回调中抛出异常可以中止 yt-dlp 的下载循环
+                self.cancel_token.raise_if_cancelled()
+                if d.get('status') == 'finished':
+                    download_span.add_bytes(d.get('total_bytes') or d.get('downloaded_bytes') or 0)
+            
+            def trace_postprocessor_hook(d: Dict):
+                name = d.get('postprocessor', '')
+                if d.get('status') == 'started':
+                    self.cancel_token.raise_if_cancelled()
+                    span_name = 'step1.merge' if name == 'Merger' else 'step1.postprocess'
+                    postprocess_spans[name] = tracer.start_span(span_name, postprocessor=name)
+                elif d.get('status') == 'finished' and name in postprocess_spans:
+                    postprocess_spans.pop(name).finish()
+            
+            ydl_opts['progress_hooks'].append(trace_progress_hook)
+            ydl_opts['postprocessor_hooks'] = [trace_postprocessor_hook]
+            
             # 执行下载
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 # 启动超时监控线程
@@ -428,11 +508,20 @@ class YouTubeDownloader(BaseVideoDownloader):
                 timeout_thread.start()
                 
                 try:
-                    ydl.download([url])
+                    if info:
+                        ie_result = {k: v for k, v in info.items() if k != '_from_metadata_cache'}
+                        ydl.process_ie_result(ie_result, download=True)
+                    else:
+                        ydl.download([url])
                     self.download_completed = True
                 except Exception as e:
                     self.download_error = str(e)
+                    download_span.fail(str(e))
                     raise
+                finally:
+                    for span in postprocess_spans.values():
+                        span.finish()
+                    download_span.finish()
             
             # 检查是否因超时而失败
             if self.download_error and 'timeout' in self.download_error.lower():
@@ -450,6 +539,9 @@ class YouTubeDownloader(BaseVideoDownloader):
             
             return video_file
             
+        except JobCancelled:
+            self.logger.warning("[下载] 任务已取消，停止下载")
+            return None
         except Exception as e:
             error_msg = f"下载异常: {str(e)}"
             self.logger.error(error_msg)
@@ -481,8 +573,9 @@ class YouTubeDownloader(BaseVideoDownloader):
             
             self.logger.info("执行下载命令...")
             
-            result = subprocess.run(
+            result = run_cancellable(
                 cmd,
+                token=self.cancel_token,
                 capture_output=True,
                 text=True,
                 encoding='utf-8',
@@ -508,6 +601,9 @@ class YouTubeDownloader(BaseVideoDownloader):
         except subprocess.TimeoutExpired:
             self.logger.error(f"下载超时（{download_timeout}秒）")
             return None
+        except JobCancelled:
+            self.logger.warning("[下载] 任务已取消，已结束yt-dlp进程")
+            return None
         except Exception as e:
             self.logger.error(f"下载异常: {str(e)}")
             return None
@@ -535,6 +631,11 @@ class YouTubeDownloader(BaseVideoDownloader):
             if status == 'downloading':
                 # 提取进度数据
                 downloaded_bytes = d.get('downloaded_bytes', 0)
+                
+                # 全局带宽限制：按本次新增字节消耗令牌（在下载线程中阻塞即可限速）
+                if self.bandwidth_limiter.enabled:
+                    self._throttle_download(d.get('filename', ''), downloaded_bytes or 0)
+
                 total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
                 speed = d.get('speed', 0)
                 eta = d.get('eta', 0)
@@ -579,7 +680,7 @@ class YouTubeDownloader(BaseVideoDownloader):
                 if self.progress_callback:
                     try:
                         self.progress_callback(progress_data)
-                        self.logger.info(f"[进度] 进度回调已发送: {percent:.1f}%")
+                        self.logger.debug("[进度] 进度回调已发送: %.1f%%", percent)
                     except Exception as e:
                         self.logger.error(f"[错误] 进度回调失败: {str(e)}")
                 else:
@@ -592,6 +693,7 @@ class YouTubeDownloader(BaseVideoDownloader):
                     self._last_log_time = time.time()
                     
             elif status == 'finished':
+                self._downloaded_bytes.pop(d.get('filename', ''), None)
                 self.logger.success("视频下载完成，正在处理...")
                 if self.progress_callback:
                     self.progress_callback({
@@ -607,6 +709,26 @@ class YouTubeDownloader(BaseVideoDownloader):
         except Exception as e:
             self.logger.error(f"进度回调异常: {str(e)}")
     
+    def _throttle_download(self, filename: str, downloaded_bytes: int) -> int:
+        """
+        按文件本次新增的字节数消耗带宽令牌
+        
+        yt-dlp 会以相同的 downloaded_bytes 重复回调（新增0字节）；字节数变小说明该文件重新开始下载（重试），
+        此时从0开始计算。
+        
+        Args:
+            filename: 正在下载的文件
+            downloaded_bytes: 该文件已下载的字节数
+            
+        Returns:
+            int: 本次消耗的字节数
+        """
+        previous = self._downloaded_bytes.get(filename, 0)
+        delta = downloaded_bytes - previous if downloaded_bytes >= previous else downloaded_bytes
+        self._downloaded_bytes[filename] = downloaded_bytes
+        self.bandwidth_limiter.consume(delta)
+        return delta
+    
     def _monitor_timeout(self, timeout_seconds: int):
         """
         监控下载超时
@@ -0,0 +1,147 @@
+"""
+步骤1：本地视频导入模块
+将本地视频文件导入项目目录（硬链接优先，不可用时复制），非mp4格式用ffmpeg转封装
+"""
+import os
+import json
+import time
+import shutil
+from datetime import datetime
+from typing import Dict, Optional, Callable
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+
+from src.utils.config import Config
+from src.utils.logger import Logger
+from src.utils.validator import Validator
+from src.utils.url_identifier import URLIdentifier
+from src.utils.capabilities import get_capabilities
+from src.utils.media_probe import get_media_probe
+from src.utils.cancellation import run_cancellable
+from src.core.steps.base_downloader import BaseVideoDownloader
+
+
+class LocalVideoImporter(BaseVideoDownloader):
+    """本地视频导入器（与下载器接口一致，供命令行批处理使用）"""
+
+    def __init__(self, config: Config, logger: Logger, progress_callback: Optional[Callable] = None):
+        super().__init__(config, logger, progress_callback)
+
+    def check_dependencies(self) -> tuple:
+        """检查ffmpeg是否可用（仅非mp4文件需要）"""
+        capability = get_capabilities().tool('ffmpeg')
+        return capability['available'], capability['command']
+
+    def get_video_metadata(self, url: str) -> Optional[Dict]:
+        """读取本地视频的基本信息"""
+        source_path = URLIdentifier.local_video_path(url)
+        if not source_path:
+            return None
+        return {
+            'title': os.path.splitext(os.path.basename(source_path))[0],
+            'duration': self._probe_duration(source_path),
+            'uploader': '本地视频',
+            'upload_date': datetime.fromtimestamp(os.path.getmtime(source_path)).strftime('%Y%m%d'),
+            'description': '',
+            'url': source_path,
+            'platform': 'local',
+            'source_path': source_path
+        }
+
+    def download_video(self, url: str, output_dir: str) -> Dict:
+        """
+        导入本地视频
+
+        Args:
+            url: 本地文件路径或 file:// URL
+            output_dir: 输出目录
+
+        Returns:
+            Dict: 包含视频信息和文件路径的字典
+        """
+        start_time = time.time()
+        try:
+            video_info = self.get_video_metadata(url)
+            if not video_info:
+                raise FileNotFoundError(f"本地视频文件不存在: {url}")
+
+            source_path = video_info['source_path']
+            os.makedirs(output_dir, exist_ok=True)
+            stem = os.path.splitext(os.path.basename(source_path))[0]
+            output_video_path = os.path.join(output_dir, f"{stem}.mp4")
+
+            self.logger.info(f"[导入] 本地视频: {source_path}")
+            if source_path.lower().endswith('.mp4'):
+                mode = self._link_or_copy(source_path, output_video_path)
+            else:
+                mode = self._remux_to_mp4(source_path, output_video_path)
+            self.logger.info(f"[导入] 导入方式: {mode}")
+
+            is_valid, validation_message = Validator.validate_video_file(output_video_path)
+            if not is_valid:
+                raise Exception(f"视频文件验证失败: {validation_message}")
+
+            video_info['file_path'] = output_video_path
+            video_info['file_size'] = os.path.getsize(output_video_path)
+
+            info_file = os.path.join(output_dir, 'video_info.json')
+            with open(info_file, 'w', encoding='utf-8') as f:
+                json.dump(video_info, f, ensure_ascii=False, indent=2)
+            self.logger.file_created(info_file)
+
+            if self.progress_callback:
+                self.progress_callback({'percent': 100, 'status': 'finished', 'filename': os.path.basename(output_video_path)})
+
+            self.logger.success(f"[步骤1完成] 本地视频导入成功 (耗时: {time.time() - start_time:.2f}秒)")
+            return {
+                'success': True,
+                'video_info': video_info,
+                'video_file': output_video_path,
+                'info_file': info_file,
+                'message': f'本地视频导入成功: {video_info["title"]}',
+                'from_cache': False
+            }
+
+        except Exception as e:
+            error_msg = f"本地视频导入失败: {str(e)}"
+            self.logger.error(f"[步骤1失败] {error_msg} (耗时: {time.time() - start_time:.2f}秒)")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': error_msg
+            }
+
+    @staticmethod
+    def _link_or_copy(source_path: str, dest_path: str) -> str:
+        """硬链接到项目目录（跨文件系统时复制）"""
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(source_path, dest_path)
+            return 'hardlink'
+        except OSError:
+            shutil.copy2(source_path, dest_path)
+            return 'copy'
+
+    def _remux_to_mp4(self, source_path: str, dest_path: str) -> str:
+        """用ffmpeg转封装为mp4（不重新编码，失败时转码）"""
+        available, ffmpeg_cmd = self.check_dependencies()
+        if not available:
+            raise RuntimeError("导入非mp4视频需要ffmpeg，请先安装")
+
+        base_cmd = ffmpeg_cmd + ['-y', '-v', 'error', '-i', source_path]
+        for mode, codec_args in (('remux', ['-c', 'copy']), ('transcode', ['-c:v', 'libx264', '-c:a', 'aac'])):
+            result = run_cancellable(base_cmd + codec_args + [dest_path], token=self.cancel_token,
+                                     capture_output=True, text=True, encoding='utf-8', errors='ignore')
+            if result.returncode == 0:
+                return mode
+            self.logger.warning(f"[导入] ffmpeg {mode} 失败: {result.stderr.strip()[:200]}")
+        raise RuntimeError(f"无法转换为mp4: {source_path}")
+
+    @staticmethod
+    def _probe_duration(file_path: str) -> int:
+        """用ffprobe读取时长（秒），不可用时返回0（源文件在项目外，不写旁路缓存）"""
+        info = get_media_probe().probe(file_path, persist=False)
+        return int(info['duration']) if info['success'] else 0
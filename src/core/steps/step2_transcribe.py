@@ -2,7 +2,6 @@
 步骤2：语音转录模块
 使用OpenAI Whisper将视频转录为英文字幕
 """
-import whisper
 import os
 import json
 import subprocess
@@ -10,7 +9,7 @@ import threading
 import time
 import shutil
 from datetime import datetime
-from typing import Dict, Optional, Callable
+from typing import Dict, List, Optional, Callable
 import sys
 import traceback
 
@@ -20,14 +19,44 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 from src.utils.config import Config
 from src.utils.logger import Logger
 from src.utils.validator import Validator
+from src.utils.transcript import save_transcript, copy_transcript
 from src.utils.file_manager import FileManager
 from src.utils.cache_manager import CacheManager
+from src.utils.tracing import get_tracer
+from src.utils.cancellation import CancellationToken, JobCancelled
+
+# 进程内的Whisper模型缓存：同一模型只加载一次，多个任务共享
+_model_cache: Dict[str, object] = {}
+_model_lock = threading.Lock()
+
+
+def get_whisper_model(model_name: str):
+    """
+    获取Whisper模型（首次调用时导入whisper并加载模型，之后直接复用）
+    
+    Args:
+        model_name: 模型名称（tiny/base/small/medium/large）
+        
+    Returns:
+        whisper.Whisper: 模型实例
+    """
+    with get_tracer().span('step2.model_load', model=model_name) as span, _model_lock:
+        model = _model_cache.get(model_name)
+        span.set(cache_hit=model is not None)
+        if model is None:
+            import whisper
+            model = whisper.load_model(model_name)
+            _model_cache[model_name] = model
+        return model
+
 
 class AudioTranscriber:
     def __init__(self, config: Config, logger: Logger):
         self.config = config
         self.logger = logger
         self.model = None
+        # 使用的模型（处理器可按任务配置或内存准入结果替换）
+        self.model_name = config.get('step2_transcribe', 'model', 'base')
         self.cache_manager = CacheManager(config, logger)
         self.enable_cache = config.get_boolean('basic', 'enable_cache', True)
         
@@ -39,6 +68,8 @@ class AudioTranscriber:
         self.progress_callback = None
         self.timeout_occurred = False  # 超时标志
         self.current_language = 'en'  # 新增：当前使用的语言
+        # 取消令牌（由处理器替换为任务的令牌），流式转录在窗口之间检查
+        self.cancel_token = CancellationToken()
     
     def _calculate_estimated_progress(self) -> Dict:
         """
@@ -127,7 +158,7 @@ class AudioTranscriber:
             'eta': format_time(progress_info['estimated_remaining']),
             'processed': format_duration(processed_duration),
             'total': format_duration(self.video_duration),
-            'model': self.config.get('step2_transcribe', 'model', 'base'),
+            'model': self.model_name,
             'language': self.current_language
         }
     
@@ -260,14 +291,14 @@ class AudioTranscriber:
     def load_model(self) -> bool:
         """加载Whisper模型"""
         try:
-            model_name = self.config.get('step2_transcribe', 'model', 'base')
+            model_name = self.model_name
             use_fp16 = self.config.get_boolean('step2_transcribe', 'use_fp16', False)
             precision_mode = 'FP16' if use_fp16 else 'FP32'
             
             self.logger.info(f"正在加载Whisper模型: {model_name} (精度: {precision_mode})")
             self.logger.info("正在初始化模型，请稍候...")
             
-            self.model = whisper.load_model(model_name)
+            self.model = get_whisper_model(model_name)
             
             self.logger.success(f"Whisper模型加载成功: {model_name} (精度: {precision_mode})")
             self.logger.info(f"模型已就绪，准备开始转录")
@@ -277,7 +308,8 @@ class AudioTranscriber:
             self.logger.error(f"Whisper模型加载失败: {str(e)}")
             return False
         
-    def transcribe_video(self, video_path: str, output_dir: str, youtube_url: Optional[str] = None, language: str = 'en') -> Dict:
+    def transcribe_video(self, video_path: str, output_dir: str, youtube_url: Optional[str] = None, language: str = 'en',
+                         segment_callback: Optional[Callable[[int, Dict], None]] = None) -> Dict:
         """
         转录视频音频为字幕
         
@@ -286,6 +318,7 @@ class AudioTranscriber:
             output_dir: 输出目录
             youtube_url: YouTube/Bilibili视频URL（可选，用于缓存功能）
             language: 语音识别语言代码（默认: en）新增参数
+            segment_callback: 字幕段确定后的回调 (字幕序号, segment)，提供时按窗口流式转录
             
         Returns:
             Dict: 转录结果信息
@@ -341,6 +374,7 @@ class AudioTranscriber:
                     subtitle_filename = self._get_subtitle_filename(self.current_language)
                     output_srt = os.path.join(output_dir, subtitle_filename)
                     shutil.copy2(cached_srt_path, output_srt)
+                    copy_transcript(cached_srt_path, output_srt)
                     self.logger.info(f"从缓存复制字幕: {os.path.basename(output_srt)}")
                     
                     # 同时复制原始转录结果（如果存在）
@@ -397,14 +431,26 @@ class AudioTranscriber:
                 # 执行转录（使用传入的language参数）
                 self.logger.info(f"开始执行 Whisper 转录，语言: {language}, 精度: {precision_mode}, 时间戳: {timestamp_mode}")
                 try:
-                    result = self.model.transcribe(
-                        video_path,
-                        language=language,
-                        verbose=False,  # 避免输出阻塞
-                        word_timestamps=enable_word_timestamps,  # 根据语言条件启用
-                        fp16=use_fp16
-                    )
+                    with get_tracer().span('step2.transcribe', language=language, streaming=bool(segment_callback),
+                                           bytes=os.path.getsize(video_path),
+                                           media_seconds=round(video_duration, 3)):
+                        if segment_callback:
+                            result = self._transcribe_streaming(
+                                video_path, language, enable_word_timestamps, use_fp16, segment_callback
+                            )
+                        else:
+                            result = self.model.transcribe(
+                                video_path,
+                                language=language,
+                                verbose=False,  # 避免输出阻塞
+                                word_timestamps=enable_word_timestamps,  # 根据语言条件启用
+                                fp16=use_fp16
+                            )
+                    # 整段转录无法中途停止，返回后再检查是否已取消
+                    self.cancel_token.raise_if_cancelled()
                     self.logger.info("Whisper 转录完成")
+                except JobCancelled:
+                    raise
                 except Exception as transcribe_error:
                     self.logger.error(f"Whisper 转录过程异常: {str(transcribe_error)}")
                     raise Exception(f"语音转录失败: {str(transcribe_error)}")
@@ -422,6 +468,8 @@ class AudioTranscriber:
             subtitle_filename = self._get_subtitle_filename(self.current_language)
             srt_path = os.path.join(output_dir, subtitle_filename)
             self._save_srt(result, srt_path)
+            # 直接由字幕段生成字幕模型，后续步骤无需再解析SRT
+            save_transcript(srt_path, result['segments'])
             
             # 保存原始转录结果
             raw_result_path = os.path.join(output_dir, 'transcribe_raw_result.json')
@@ -502,6 +550,14 @@ class AudioTranscriber:
                 'message': f'语音转录成功: {transcribe_stats["subtitle_count"]} 条字幕'
             }
             
+        except JobCancelled as e:
+            self.logger.warning(f"[转录] {str(e)}，已停止Whisper转录")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': str(e),
+                'cancelled': True
+            }
         except Exception as e:
             error_msg = f"语音转录失败: {str(e)}"
             self.logger.error(error_msg)
@@ -513,6 +569,104 @@ class AudioTranscriber:
                 'message': error_msg
             }
     
+    def _transcribe_streaming(self, video_path: str, language: str, word_timestamps: bool, use_fp16: bool,
+                              segment_callback: Callable[[int, Dict], None]) -> Dict:
+        """
+        按时间窗口流式转录，每个窗口完成后立即回调已确定的字幕段
+        
+        窗口末尾的字幕段可能被边界截断，因此除最后一个窗口外都丢弃最后一段，
+        下一个窗口从该段的开始时间继续；上一窗口的文本作为 initial_prompt 保持上下文。
+        
+        Args:
+            video_path: 视频文件路径
+            language: 语言代码
+            word_timestamps: 是否启用单词级时间戳
+            use_fp16: 是否使用FP16
+            segment_callback: 回调 (字幕序号, segment)，序号从1开始，与SRT序号一致
+            
+        Returns:
+            Dict: 与 model.transcribe 相同结构的结果 {'text', 'language', 'segments'}
+        """
+        import whisper
+        from whisper.audio import SAMPLE_RATE
+        
+        window_seconds = max(30, self.config.get_int('step2_transcribe', 'stream_window_seconds', 300))
+        window_samples = window_seconds * SAMPLE_RATE
+        
+        audio = whisper.load_audio(video_path)
+        total_samples = len(audio)
+        self.logger.info(f"流式转录: 窗口 {window_seconds} 秒，共 {total_samples / SAMPLE_RATE:.1f} 秒音频")
+        
+        segments = []
+        detected_language = language
+        prompt = None
+        seek = 0
+        
+        while seek < total_samples and not self.timeout_occurred:
+            self.cancel_token.raise_if_cancelled()
+            chunk = audio[seek:seek + window_samples]
+            is_last = seek + window_samples >= total_samples
+            offset = seek / SAMPLE_RATE
+            
+            chunk_result = self.model.transcribe(
+                chunk,
+                language=language,
+                verbose=False,
+                word_timestamps=word_timestamps,
+                fp16=use_fp16,
+                initial_prompt=prompt
+            )
+            detected_language = chunk_result.get('language', detected_language)
+            chunk_segments = chunk_result['segments']
+            
+            next_seek = seek + len(chunk)
+            if not is_last and len(chunk_segments) > 1:
+                boundary = seek + int(chunk_segments[-1]['start'] * SAMPLE_RATE)
+                if boundary > seek:
+                    next_seek = boundary
+                    chunk_segments = chunk_segments[:-1]
+            
+            self._emit_window_segments(chunk_segments, offset, segments, segment_callback)
+            
+            if chunk_segments:
+                prompt = ''.join(seg['text'] for seg in chunk_segments)[-200:]
+            seek = next_seek
+            self.logger.info(f"流式转录进度: {min(seek, total_samples) / SAMPLE_RATE:.1f}s，已确定 {len(segments)} 条字幕")
+        
+        return {
+            'text': ''.join(seg['text'] for seg in segments),
+            'language': detected_language,
+            'segments': segments
+        }
+    
+    def _emit_window_segments(self, chunk_segments: List[Dict], offset: float, segments: List[Dict],
+                              segment_callback: Callable[[int, Dict], None]) -> None:
+        """
+        将一个窗口内已确定的字幕段换算到整段音频的时间轴，追加到 segments 并逐条回调
+        
+        Args:
+            chunk_segments: 窗口的字幕段（时间相对窗口起点）
+            offset: 窗口起点（秒）
+            segments: 已确定的全部字幕段（原地追加）
+            segment_callback: 回调 (字幕序号, segment)，segment 的 start/end 为整段音频中的秒数
+        """
+        for segment in chunk_segments:
+            segment = dict(segment)
+            segment['id'] = len(segments)
+            segment['start'] += offset
+            segment['end'] += offset
+            if 'words' in segment:
+                segment['words'] = [
+                    dict(word, start=word['start'] + offset, end=word['end'] + offset)
+                    for word in segment['words']
+                ]
+            segments.append(segment)
+            
+            try:
+                segment_callback(len(segments), segment)
+            except Exception as e:
+                self.logger.warning(f"字幕段回调失败（不影响转录）: {str(e)}")
+    
     def _save_srt(self, result: Dict, output_path: str) -> None:
         """保存为SRT格式"""
         with open(output_path, 'w', encoding='utf-8') as f:
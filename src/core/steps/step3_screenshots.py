@@ -12,10 +12,11 @@ import traceback
 import math
 import shutil
 import webbrowser
+import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
-import pysrt
 
 try:
     import imagehash
@@ -29,6 +30,167 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 from src.utils.config import Config
 from src.utils.logger import Logger
 from src.utils.validator import Validator
+from src.utils.transcript import Transcript, load_transcript, seconds_to_ms
+from src.utils.capabilities import get_capabilities
+from src.utils.tracing import get_tracer
+from src.utils.cancellation import CancellationToken, JobCancelled, run_cancellable
+
+
+class ScreenshotPlanner:
+    """
+    截图计划：按字幕时间决定哪些字幕需要截图（在提取之前减少截图数量）
+    
+    按时间顺序逐条判断，流式截图和 extract_screenshots 使用同一规则，结果一致：
+        - 合并短字幕：时长小于 merge_short_segments 且与上一条间隔也小于该值的字幕，与上一条共用截图
+        - 最小间隔：距上一张计划截图不足 min_interval 秒的字幕不截图
+        - 每分钟上限：任意60秒内最多 max_per_minute 张
+    第一条字幕总是截图；各项为0时不限制。没有截图的字幕在索引中沿用之前最近的截图。
+    """
+    
+    def __init__(self, min_interval: float = 0.0, max_per_minute: int = 0, merge_short_segments: float = 0.0):
+        self.min_interval = max(0.0, min_interval)
+        self.max_per_minute = max(0, max_per_minute)
+        self.merge_short_segments = max(0.0, merge_short_segments)
+        self._last_start = None
+        self._last_end = None
+        self._recent = deque()
+    
+    @classmethod
+    def from_config(cls, config: Config) -> 'ScreenshotPlanner':
+        """读取 [step3_screenshots] 的 min_capture_interval / max_captures_per_minute / merge_short_segments"""
+        return cls(
+            min_interval=config.get_float('step3_screenshots', 'min_capture_interval', 0.0),
+            max_per_minute=config.get_int('step3_screenshots', 'max_captures_per_minute', 0),
+            merge_short_segments=config.get_float('step3_screenshots', 'merge_short_segments', 0.0)
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.min_interval or self.max_per_minute or self.merge_short_segments)
+    
+    def accept(self, start: float, end: float) -> bool:
+        """
+        判断下一条字幕（按时间顺序调用）是否截图
+        
+        Args:
+            start: 字幕开始时间（秒）
+            end: 字幕结束时间（秒）
+            
+        Returns:
+            bool: 是否截图
+        """
+        previous_end, self._last_end = self._last_end, end
+        if self._last_start is None:
+            return self._take(start)
+        
+        if (self.merge_short_segments and end - start < self.merge_short_segments
+                and start - previous_end < self.merge_short_segments):
+            return False
+        if self.min_interval and start - self._last_start < self.min_interval:
+            return False
+        if self.max_per_minute:
+            while self._recent and start - self._recent[0] >= 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.max_per_minute:
+                return False
+        return self._take(start)
+    
+    def _take(self, start: float) -> bool:
+        self._last_start = start
+        self._recent.append(start)
+        return True
+    
+    def plan(self, transcript: Transcript) -> List[int]:
+        """
+        计算需要截图的字幕序号
+        
+        Args:
+            transcript: 字幕
+            
+        Returns:
+            List[int]: 字幕序号（从1开始）
+        """
+        return [index for index, start, end, _ in transcript if self.accept(start, end)]
+
+
+class ScreenshotStream:
+    """
+    流式截图会话
+    
+    步骤2每确定一条字幕就调用 submit_segment 提交对应截图，文件名和截图计划与 extract_screenshots 一致。
+    转录结束后照常调用 extract_screenshots：已生成的截图会被跳过，只补齐遗漏项并完成去重和索引，
+    因此失败处理和输出格式与非流式模式相同。
+    """
+    
+    def __init__(self, screenshot: 'VideoScreenshot', video_path: str, output_dir: str, max_workers: int):
+        self.screenshot = screenshot
+        self.video_path = os.path.abspath(video_path)
+        self.screenshots_dir = os.path.join(output_dir, 'screenshots')
+        os.makedirs(self.screenshots_dir, exist_ok=True)
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='screenshot_stream')
+        # 截图span记到打开会话的项目下
+        self._extract = get_tracer().wrap(screenshot._extract_single_screenshot)
+        self._futures = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.planner = ScreenshotPlanner.from_config(screenshot.config)
+    
+    def submit_segment(self, subtitle_index: int, segment: Dict) -> None:
+        """
+        提交一条字幕的截图任务（按序号顺序调用，截图计划不需要截图的字幕直接跳过）
+        
+        Args:
+            subtitle_index: 字幕序号（从1开始，与SRT序号一致）
+            segment: Whisper 字幕段（含 start/end，单位秒）
+        """
+        # 与SRT时间戳保持相同的毫秒精度，保证截图时间点和计划与非流式模式一致
+        start_seconds = seconds_to_ms(segment['start']) / 1000.0
+        end_seconds = seconds_to_ms(segment['end']) / 1000.0
+        
+        with self._lock:
+            if self._closed or not self.planner.accept(start_seconds, end_seconds):
+                return
+            for offset in self.screenshot.time_offsets:
+                output_path = os.path.join(self.screenshots_dir,
+                                           self.screenshot._screenshot_filename(subtitle_index, offset))
+                self._futures.append(self._executor.submit(
+                    self._extract,
+                    self.video_path,
+                    max(0, start_seconds + offset),
+                    output_path
+                ))
+    
+    def close(self, cancel: bool = False) -> Dict:
+        """
+        结束会话并等待正在执行的截图完成
+        
+        Args:
+            cancel: 是否取消尚未开始的任务（步骤2失败时使用）
+            
+        Returns:
+            Dict: {'submitted': 提交数, 'extracted': 成功数, 'cancelled': 取消数}
+        """
+        with self._lock:
+            self._closed = True
+            futures = list(self._futures)
+        
+        cancelled = 0
+        if cancel:
+            cancelled = sum(1 for future in futures if future.cancel())
+        self._executor.shutdown(wait=True)
+        
+        extracted = 0
+        for future in futures:
+            if future.cancelled():
+                continue
+            try:
+                if future.result():
+                    extracted += 1
+            except Exception:
+                pass
+        
+        return {'submitted': len(futures), 'extracted': extracted, 'cancelled': cancelled}
 
 
 class VideoScreenshot:
@@ -48,28 +210,17 @@ class VideoScreenshot:
         self.delete_duplicate_files = self.config.get_boolean('step3_screenshots', 'delete_duplicate_files', False)
         self.generate_dedup_report = self.config.get_boolean('step3_screenshots', 'generate_dedup_report', True)
         self.auto_open_dedup_report = self.config.get_boolean('step3_screenshots', 'auto_open_dedup_report', True)
+        # 取消令牌（由处理器替换为任务的令牌），取消时结束正在运行的ffmpeg并放弃排队的截图
+        self.cancel_token = CancellationToken()
         
     def check_ffmpeg(self) -> bool:
-        """检查ffmpeg是否可用"""
-        try:
-            result = subprocess.run(
-                ['ffmpeg', '-version'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                self.logger.success("ffmpeg可用")
-                return True
-            else:
-                self.logger.error("ffmpeg不可用")
-                return False
-        except FileNotFoundError:
-            self.logger.error("ffmpeg未安装，请安装ffmpeg")
-            return False
-        except Exception as e:
-            self.logger.error(f"检查ffmpeg失败: {str(e)}")
-            return False
+        """检查ffmpeg是否可用（能力注册表缓存探测结果）"""
+        capability = get_capabilities().tool('ffmpeg')
+        if capability['available']:
+            self.logger.success(f"ffmpeg可用: {capability['version']}")
+            return True
+        self.logger.error("ffmpeg未安装，请安装ffmpeg")
+        return False
     
     def _load_progress(self, progress_file: str) -> Dict:
         """加载进度信息"""
@@ -146,44 +297,50 @@ class VideoScreenshot:
             os.makedirs(screenshots_dir, exist_ok=True)
             self.logger.info(f"[目录] 截图输出目录: {screenshots_dir}")
             
-            # 读取字幕文件
-            self.logger.info("[读取] 正在读取字幕文件...")
-            subs = pysrt.open(srt_path, encoding='utf-8')
+            # 读取字幕（验证时已加载，这里直接取缓存）
+            subs = load_transcript(srt_path)
+            
+            # 截图计划：只提取计划内字幕的截图
+            planner = ScreenshotPlanner.from_config(self.config)
+            planned = planner.plan(subs)
+            planned_set = set(planned)
             
             self.logger.info("[配置] 处理配置:")
             self.logger.info(f"  - 字幕条数: {len(subs)}")
+            if planner.enabled:
+                self.logger.info(f"  - 计划截图: {len(planned)} 条字幕（最小间隔 {planner.min_interval}秒, "
+                                 f"每分钟上限 {planner.max_per_minute or '不限'}, 合并短字幕 {planner.merge_short_segments}秒）")
             self.logger.info(f"  - 时间偏移: {self.time_offsets}")
             self.logger.info(f"  - 并行线程: {self.max_workers}")
             self.logger.info(f"  - 批次大小: {self.batch_size}")
             
-            # 加载进度
+            # 加载进度（只保留仍在计划内的截图）
             progress = self._load_progress(progress_file)
             completed_count = progress.get('completed_count', 0)
+            screenshot_info = [info for info in progress.get('screenshot_info', [])
+                               if info.get('subtitle_index') in planned_set]
+            done = {(info['subtitle_index'], info['offset']) for info in screenshot_info}
             
             if completed_count > 0:
-                self.logger.info(f"断点续传: 已完成 {completed_count} 个字幕")
+                self.logger.info(f"断点续传: 已完成 {completed_count} 个截图")
             
             # 准备任务列表
             tasks = []
-            for i, sub in enumerate(subs, 1):
-                if i <= completed_count:
-                    continue  # 跳过已完成的
-                
-                start_seconds = (sub.start.hours * 3600 + 
-                               sub.start.minutes * 60 + 
-                               sub.start.seconds + 
-                               sub.start.milliseconds / 1000.0)
+            for i in planned:
+                _, start_seconds, _, text = subs.segment(i - 1)
                 
                 for offset in self.time_offsets:
+                    if (i, offset) in done:
+                        continue  # 跳过已完成的
+                    
                     timestamp = max(0, start_seconds + offset)
-                    offset_str = f"{offset:+.1f}s".replace('+', 'plus').replace('-', 'minus')
-                    screenshot_filename = f"{i:03d}_{offset_str}.png"
+                    screenshot_filename = self._screenshot_filename(i, offset)
                     screenshot_path = os.path.join(screenshots_dir, screenshot_filename)
                     
                     subtitle_info = {
                         'subtitle_index': i,
                         'start_time': start_seconds,
-                        'text': sub.text.strip(),
+                        'text': text,
                         'offset': offset,
                         'timestamp': timestamp,
                         'filename': screenshot_filename,
@@ -196,13 +353,14 @@ class VideoScreenshot:
             total_tasks = len(tasks)
             completed_tasks = 0
             failed_tasks = 0
-            screenshot_info = progress.get('screenshot_info', [])
+            planned_tasks = len(planned) * len(self.time_offsets)
             
             self.logger.info(f"待处理任务: {total_tasks}")
             
+            extract = get_tracer().wrap(self._extract_single_screenshot)
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                 future_to_task = {
-                    executor.submit(self._extract_single_screenshot, 
+                    executor.submit(extract, 
                                   video_path, 
                                   task[1]['timestamp'], 
                                   task[1]['path']): task 
@@ -210,6 +368,12 @@ class VideoScreenshot:
                 }
                 
                 for future in as_completed(future_to_task):
+                    if self.cancel_token.cancelled:
+                        # 放弃尚未开始的截图（已生成的截图在重新处理时直接复用）
+                        for pending in future_to_task:
+                            pending.cancel()
+                        self.cancel_token.raise_if_cancelled()
+                    
                     task = future_to_task[future]
                     subtitle_idx, subtitle_data = task
                     
@@ -228,26 +392,37 @@ class VideoScreenshot:
                             progress['completed_count'] = completed_count
                             progress['screenshot_info'] = screenshot_info
                             self._save_progress(progress_file, progress)
-                            self.logger.info(f"进度保存: {completed_count}/{len(subs)} 字幕")
+                            self.logger.info("进度保存: %d/%d 截图", completed_count, planned_tasks)
                         
                         if completed_tasks % 10 == 0:
-                            self.logger.info(f"已处理: {completed_count}/{len(subs)}")
+                            self.logger.info("已处理: %d/%d", completed_count, planned_tasks)
                             
                     except Exception as e:
                         self.logger.warning(f"处理字幕 {subtitle_idx} 失败: {str(e)}")
                         failed_tasks += 1
                         completed_tasks += 1
             
+            # 按字幕顺序排列（去重比较相邻截图，没有截图的字幕沿用之前最近的截图）
+            screenshot_info.sort(key=lambda info: (info['subtitle_index'], info['offset']))
+            extracted_count = len(screenshot_info)
+            
             # 去重处理（在保存索引文件之前）
+            self.cancel_token.raise_if_cancelled()
             dedup_stats = None
             if self.enable_deduplication:
                 if IMAGEHASH_AVAILABLE:
                     self.logger.info("[去重] 开始截图去重处理...")
-                    dedup_stats = self._deduplicate_screenshots(screenshots_dir, screenshot_info)
+                    with get_tracer().span('step3.dedup', screenshots=len(screenshot_info)):
+                        dedup_stats = self._deduplicate_screenshots(screenshots_dir, screenshot_info)
                     self.logger.info(f"[去重] 去重完成")
                 else:
                     self.logger.warning("[去重] imagehash库未安装，跳过去重")
             
+            # 计划外的字幕在索引中引用之前最近的截图，步骤4的输出与逐条截图时一致
+            inherited_count = self._inherit_screenshots(subs, planned_set, screenshot_info)
+            if inherited_count:
+                self.logger.info(f"[计划] {inherited_count} 条字幕沿用之前的截图")
+            
             # 保存最终截图索引文件
             index_file = os.path.join(output_dir, 'screenshot_index.json')
             with open(index_file, 'w', encoding='utf-8') as f:
@@ -263,11 +438,11 @@ class VideoScreenshot:
             
             self.logger.info("=" * 60)
             self.logger.success(f"[完成] 截图提取完成:")
-            self.logger.info(f"  - 成功截图: {len(screenshot_info)}/{total_tasks}")
+            self.logger.info(f"  - 成功截图: {extracted_count}/{planned_tasks}")
             self.logger.info(f"  - 失败任务: {failed_tasks}")
             self.logger.info(f"  - 实际文件: {screenshot_count} 个")
             self.logger.info(f"  - 总耗时: {elapsed_time:.2f}秒")
-            self.logger.info(f"  - 平均速度: {len(screenshot_info)/elapsed_time:.2f} 截图/秒")
+            self.logger.info(f"  - 平均速度: {extracted_count/elapsed_time:.2f} 截图/秒")
             
             # 删除进度文件（表示已完成）
             if os.path.exists(progress_file):
@@ -277,10 +452,12 @@ class VideoScreenshot:
             # 统计信息
             extraction_stats = {
                 'total_subtitles': len(subs),
-                'total_screenshots_expected': len(tasks),
-                'screenshots_extracted': len(screenshot_info),
+                'planned_subtitles': len(planned),
+                'inherited_subtitles': inherited_count,
+                'total_screenshots_expected': planned_tasks,
+                'screenshots_extracted': extracted_count,
                 'screenshots_failed': failed_tasks,
-                'success_rate': (len(screenshot_info) / len(tasks) * 100) if len(tasks) > 0 else 0,
+                'success_rate': (extracted_count / planned_tasks * 100) if planned_tasks > 0 else 0,
                 'time_offsets': self.time_offsets,
                 'max_workers': self.max_workers,
                 'batch_size': self.batch_size,
@@ -293,9 +470,17 @@ class VideoScreenshot:
                 'screenshots_dir': screenshots_dir,
                 'index_file': index_file,
                 'extraction_stats': extraction_stats,
-                'message': f'截图提取成功: {len(screenshot_info)}/{len(tasks)}'
+                'message': f'截图提取成功: {extracted_count}/{planned_tasks}'
             }
             
+        except JobCancelled as e:
+            self.logger.warning(f"[步骤3] {str(e)}，已停止截图提取")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': str(e),
+                'cancelled': True
+            }
         except Exception as e:
             elapsed_time = time.time() - screenshot_start_time
             error_msg = f"截图提取失败: {str(e)}"
@@ -317,11 +502,90 @@ class VideoScreenshot:
                 'message': error_msg
             }
     
+    @staticmethod
+    def _screenshot_filename(subtitle_index: int, offset: float) -> str:
+        """生成截图文件名（字幕序号 + 时间偏移）"""
+        offset_str = f"{offset:+.1f}s".replace('+', 'plus').replace('-', 'minus')
+        return f"{subtitle_index:03d}_{offset_str}.png"
+    
+    @staticmethod
+    def _inherit_screenshots(subs: Transcript, planned: set, screenshot_info: List[Dict]) -> int:
+        """
+        为计划外的字幕追加索引条目，引用之前最近一条有截图的字幕所用的截图（标记为重复，步骤4按引用显示）
+        
+        Args:
+            subs: 字幕
+            planned: 计划截图的字幕序号
+            screenshot_info: 按字幕顺序排列、已去重的截图信息（原地追加）
+            
+        Returns:
+            int: 追加的条目数
+        """
+        # 每条字幕取最后一个条目（与步骤4读取索引的方式一致）
+        latest = {}
+        for position, info in enumerate(screenshot_info):
+            latest[info['subtitle_index']] = position
+        
+        inherited = []
+        source = None
+        for i, start_seconds, _, text in subs:
+            if i in planned:
+                source = latest.get(i, source)
+                continue
+            if source is None:
+                continue
+            reference = screenshot_info[source]
+            if reference.get('is_duplicate'):
+                filename, root = reference['reference_screenshot'], reference['duplicate_of_index']
+            else:
+                filename, root = reference['filename'], source
+            inherited.append({
+                'subtitle_index': i,
+                'start_time': start_seconds,
+                'text': text,
+                'offset': reference['offset'],
+                'timestamp': reference['timestamp'],
+                'filename': filename,
+                'path': os.path.join(os.path.dirname(reference['path']), filename),
+                'is_duplicate': True,
+                'duplicate_of_index': root,
+                'reference_screenshot': filename,
+                'hamming_distance': 0,
+                'inherited_from': reference['subtitle_index']
+            })
+        screenshot_info.extend(inherited)
+        return len(inherited)
+    
+    def open_stream(self, video_path: str, output_dir: str) -> 'ScreenshotStream':
+        """
+        打开流式截图会话（与步骤2并行，字幕确定一条就提交一条的截图任务）
+        
+        Args:
+            video_path: 视频文件路径
+            output_dir: 步骤3输出目录
+            
+        Returns:
+            ScreenshotStream: 流式截图会话
+        """
+        max_workers = self.config.get_int('step3_screenshots', 'stream_max_workers', 2)
+        return ScreenshotStream(self, video_path, output_dir, max(1, max_workers))
+    
     def _extract_single_screenshot(self, video_path: str, timestamp: float, output_path: str) -> bool:
         """提取单张截图"""
+        with get_tracer().span('step3.extract_frame', timestamp=round(timestamp, 3)) as span:
+            success = self._run_frame_extract(video_path, timestamp, output_path, span)
+            if success and os.path.exists(output_path):
+                span.set(bytes=os.path.getsize(output_path))
+            elif not success:
+                span.fail('extract failed')
+            return success
+    
+    def _run_frame_extract(self, video_path: str, timestamp: float, output_path: str, span) -> bool:
+        """调用ffmpeg提取单帧（已存在的截图直接复用）"""
         try:
             # 检查是否已存在
             if os.path.exists(output_path):
+                span.set(cache_hit=True)
                 return True
             
             # 获取配置
@@ -344,8 +608,9 @@ class VideoScreenshot:
             ]
             
             # 执行ffmpeg命令
-            result = subprocess.run(
+            result = run_cancellable(
                 cmd,
+                token=self.cancel_token,
                 capture_output=True,
                 text=True,
                 encoding='utf-8',
@@ -360,6 +625,11 @@ class VideoScreenshot:
                 
         except subprocess.TimeoutExpired:
             return False
+        except JobCancelled:
+            # 被结束的ffmpeg可能留下不完整的图片，删除后重新处理时才会重新提取
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return False
         except Exception as e:
             return False
     
@@ -385,16 +655,20 @@ class VideoScreenshot:
         Returns:
             Optional[str]: pHash字符串，失败返回None
         """
-        try:
-            if os.path.exists(img_path):
-                img = Image.open(img_path)
-                hash_val = imagehash.phash(img)
-                img.close()
-                return str(hash_val)
-            else:
+        with get_tracer().span('step3.phash') as span:
+            try:
+                if os.path.exists(img_path):
+                    span.set(bytes=os.path.getsize(img_path))
+                    img = Image.open(img_path)
+                    hash_val = imagehash.phash(img)
+                    img.close()
+                    return str(hash_val)
+                else:
+                    span.fail('missing image')
+                    return None
+            except Exception as e:
+                span.fail(str(e))
                 return None
-        except Exception as e:
-            return None
     
     def _deduplicate_screenshots(self, screenshots_dir: str, screenshot_info: List[Dict]) -> Dict:
         """
@@ -420,9 +694,10 @@ class VideoScreenshot:
         hashes = [None] * total_count
         completed_hash_count = 0
         
+        compute_phash = get_tracer().wrap(self._compute_single_phash)
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             future_to_index = {
-                executor.submit(self._compute_single_phash, info['path']): i 
+                executor.submit(compute_phash, info['path']): i 
                 for i, info in enumerate(screenshot_info)
             }
             
@@ -446,7 +721,7 @@ class VideoScreenshot:
                 
                 completed_hash_count += 1
                 if completed_hash_count % self.batch_size == 0:
-                    self.logger.info(f"[去重] pHash计算进度: {completed_hash_count}/{total_count}")
+                    self.logger.info("[去重] pHash计算进度: %d/%d", completed_hash_count, total_count)
         
         self.logger.info(f"[去重] pHash计算完成，开始去重检测（阈值={self.phash_threshold}）")
         
@@ -504,7 +779,7 @@ class VideoScreenshot:
                 screenshot_info[i]['reference_screenshot'] = None
             
             if (i + 1) % self.batch_size == 0:
-                self.logger.info(f"[去重] 去重进度: {i + 1}/{total_count}, 已发现重复: {duplicate_count}")
+                self.logger.info("[去重] 去重进度: %d/%d, 已发现重复: %d", i + 1, total_count, duplicate_count)
         
         dedup_elapsed = time.time() - dedup_start_time
         
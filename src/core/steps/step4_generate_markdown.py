@@ -4,7 +4,6 @@
 """
 import os
 import json
-import pysrt
 from datetime import datetime
 from typing import Dict, List
 from jinja2 import Template, FileSystemLoader, Environment
@@ -17,7 +16,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 from src.utils.config import Config
 from src.utils.logger import Logger
 from src.utils.validator import Validator
+from src.utils.transcript import Transcript, load_transcript
 from src.utils.file_manager import FileManager
+from src.utils.tracing import get_tracer
 
 class MarkdownGenerator:
     def __init__(self, config: Config, logger: Logger):
@@ -36,17 +37,26 @@ class MarkdownGenerator:
         self.language = language
         self.logger.info(f"Markdown生成器语言设置为: {language}")
         
+    @staticmethod
+    def get_template_path(language: str) -> str:
+        """
+        获取语言对应的Markdown模板路径
+        
+        Args:
+            language: 语言代码 ('zh', 'en' 等)
+        """
+        if language == 'zh':
+            template_file = 'templates/markdown_template.md'  # 中文模板
+        else:
+            template_file = 'templates/markdown_template_en.md'  # 英文模板
+        return os.path.join('config', template_file)
+    
     def load_template(self) -> bool:
         """加载Markdown模板（根据语言自动选择）"""
         try:
             # 根据语言选择模板文件
-            if self.language == 'zh':
-                template_file = 'templates/markdown_template.md'  # 中文模板
-            else:
-                template_file = 'templates/markdown_template_en.md'  # 英文模板
-            
-            self.logger.info(f"根据语言({self.language})选择模板: {template_file}")
-            template_path = os.path.join('config', template_file)
+            template_path = self.get_template_path(self.language)
+            self.logger.info(f"根据语言({self.language})选择模板: {template_path}")
             
             if not os.path.exists(template_path):
                 raise Exception(f"模板文件不存在: {template_path}")
@@ -114,9 +124,8 @@ class MarkdownGenerator:
             with open(video_info_path, 'r', encoding='utf-8') as f:
                 video_info = json.load(f)
             
-            # 读取字幕
-            self.logger.info("读取字幕文件...")
-            subs = pysrt.open(srt_path, encoding='utf-8')
+            # 读取字幕（验证时已加载，这里直接取缓存）
+            subs = load_transcript(srt_path)
             
             # 准备内容数据
             content_items = self._prepare_content_data(subs, screenshots_dir)
@@ -135,7 +144,9 @@ class MarkdownGenerator:
             self.logger.info(f"准备生成文章: {len(content_items)} 个内容块")
             
             # 生成Markdown内容
-            markdown_content = self.template.render(**template_data)
+            with get_tracer().span('step4.render', content_items=len(content_items)) as span:
+                markdown_content = self.template.render(**template_data)
+                span.set(bytes=len(markdown_content.encode('utf-8')))
             
             # 保存文章
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -182,7 +193,7 @@ class MarkdownGenerator:
                 'message': error_msg
             }
         
-    def _prepare_content_data(self, subs: pysrt.SubRipFile, screenshots_dir: str) -> List[Dict]:
+    def _prepare_content_data(self, subs: Transcript, screenshots_dir: str) -> List[Dict]:
         """准备内容数据（支持去重）"""
         content_items = []
         
@@ -200,10 +211,10 @@ class MarkdownGenerator:
             except Exception as e:
                 self.logger.warning(f"读取截图索引失败: {str(e)}")
         
-        for i, sub in enumerate(subs, 1):
+        for i, start, end, text in subs:
             # 计算时间
-            start_time = self._format_srt_time(sub.start)
-            end_time = self._format_srt_time(sub.end)
+            start_time = self._format_srt_time(start)
+            end_time = self._format_srt_time(end)
             
             # 从索引中获取截图信息
             screenshot_info = screenshot_index.get(i, {})
@@ -252,7 +263,7 @@ class MarkdownGenerator:
                 'index': i,
                 'start_time': start_time,
                 'end_time': end_time,
-                'text': sub.text.strip(),
+                'text': text,
                 'screenshot_path': relative_screenshot_path,
                 'screenshot_exists': screenshot_path is not None and os.path.exists(screenshot_path),
                 'is_duplicate': is_duplicate,
@@ -264,9 +275,10 @@ class MarkdownGenerator:
         
         return content_items
     
-    def _format_srt_time(self, srt_time) -> str:
-        """格式化SRT时间为可读格式"""
-        return f"{srt_time.hours:02d}:{srt_time.minutes:02d}:{srt_time.seconds:02d}"
+    def _format_srt_time(self, seconds: float) -> str:
+        """格式化字幕时间（秒）为可读格式"""
+        seconds = int(seconds)
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
     
     def _format_duration(self, seconds: int) -> str:
         """格式化视频时长"""
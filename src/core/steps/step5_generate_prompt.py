@@ -19,12 +19,29 @@ from src.utils.logger import Logger
 from src.utils.validator import Validator
 
 
+TEMPLATES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../config/templates'))
+
+
 class PromptGenerator:
     def __init__(self, config: Config, logger: Logger):
         self.config = config
         self.logger = logger
         self.language = 'en'  # 默认英文
-        self.templates_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../config/templates'))
+        self.templates_dir = TEMPLATES_DIR
+    
+    @staticmethod
+    def get_template_files() -> List[str]:
+        """
+        获取影响Prompt输出的全部模板文件（公共prompt + prompt_template_*.txt）
+        
+        Returns:
+            list: 存在的模板文件路径
+        """
+        files = glob.glob(os.path.join(TEMPLATES_DIR, 'prompt_template_*.txt'))
+        common_file = os.path.join(TEMPLATES_DIR, 'common_prompt.txt')
+        if os.path.exists(common_file):
+            files.append(common_file)
+        return sorted(files)
     
     def set_language(self, language: str):
         """
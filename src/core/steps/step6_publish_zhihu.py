@@ -21,6 +21,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 
 from src.utils.config import Config
 from src.utils.logger import Logger
+from src.utils.tracing import get_tracer
 
 
 class ZhihuPublisher:
@@ -34,6 +35,9 @@ class ZhihuPublisher:
         self.publish_timeout = config.get_int('step6_zhihu', 'publish_timeout', 60)
         self.user_agent = config.get('step6_zhihu', 'user_agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         self.enable_draft_mode = config.get_boolean('step6_zhihu', 'enable_draft_mode', True)
+        # 图床接口地址（基准测试指向本地模拟服务）
+        self.image_api_url = config.get('step6_zhihu', 'image_api_url', 'https://api.zhihu.com/images')
+        self.image_upload_url = config.get('step6_zhihu', 'image_upload_url', 'https://zhihu-pics-upload.zhimg.com').rstrip('/')
         
         # 确保 cookie 文件目录存在
         cookie_dir = os.path.dirname(self.cookie_file)
@@ -618,7 +622,7 @@ class ZhihuPublisher:
             cookies_header = self._build_cookie_header(['_zap', '_xsrf', 'BEC', 'd_c0', 'captcha_session_v2', 'z_c0'])
             
             response = self.session.post(
-                "https://api.zhihu.com/images",
+                self.image_api_url,
                 headers={
                     'Content-Type': 'application/json',
                     'accept-language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
@@ -670,7 +674,7 @@ class ZhihuPublisher:
             
             # 上传到 OSS (使用 access_id 在 authorization header)
             response = self.session.put(
-                f"https://zhihu-pics-upload.zhimg.com/v2-{img_hash}",
+                f"{self.image_upload_url}/v2-{img_hash}",
                 headers={
                     'User-Agent': self.user_agent,
                     'Accept-Encoding': 'gzip, deflate, br, zstd',
@@ -727,28 +731,34 @@ class ZhihuPublisher:
             }
             mime_type = mime_types.get(ext, 'image/png')
             
-            # 获取上传 token
-            upload_token_data = self._get_image_upload_token(img_hash)
-            if not upload_token_data:
-                self.logger.error("获取上传 token 失败")
-                return None
-            
-            # 添加调试日志
-            self.logger.info(f"上传token响应结构: {json.dumps(upload_token_data, ensure_ascii=False, indent=2)}")
-            
-            # 检查图片状态
-            img_state = upload_token_data.get('upload_file', {}).get('state', 0)
-            
-            # state=2 表示需要上传
-            if img_state == 2:
-                upload_token = upload_token_data.get('upload_token')
-                if not upload_token:
-                    self.logger.error("未获取到上传 token")
-                    self.logger.error(f"响应数据: {json.dumps(upload_token_data, ensure_ascii=False, indent=2)}")
-                    return None
-                if not self._upload_image_to_oss(image_buffer, upload_token, img_hash, mime_type):
-                    self.logger.error("上传图片到 OSS 失败")
+            with get_tracer().span('step6.upload_image', bytes=len(image_buffer)) as span:
+                # 获取上传 token
+                upload_token_data = self._get_image_upload_token(img_hash)
+                if not upload_token_data:
+                    self.logger.error("获取上传 token 失败")
+                    span.fail('upload token failed')
                     return None
+                
+                # 添加调试日志
+                self.logger.info(f"上传token响应结构: {json.dumps(upload_token_data, ensure_ascii=False, indent=2)}")
+                
+                # 检查图片状态
+                img_state = upload_token_data.get('upload_file', {}).get('state', 0)
+                # 知乎图床已有相同hash的图片时不需要再上传
+                span.set(cache_hit=img_state != 2)
+                
+                # state=2 表示需要上传
+                if img_state == 2:
+                    upload_token = upload_token_data.get('upload_token')
+                    if not upload_token:
+                        self.logger.error("未获取到上传 token")
+                        self.logger.error(f"响应数据: {json.dumps(upload_token_data, ensure_ascii=False, indent=2)}")
+                        span.fail('missing upload token')
+                        return None
+                    if not self._upload_image_to_oss(image_buffer, upload_token, img_hash, mime_type):
+                        self.logger.error("上传图片到 OSS 失败")
+                        span.fail('oss upload failed')
+                        return None
             
             # 构建图片 URL
             image_url = f"https://picx.zhimg.com/v2-{img_hash}.{ext}"
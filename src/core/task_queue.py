@@ -0,0 +1,400 @@
+"""
+分布式任务队列
+Web进程把每个步骤作为一个任务入队，多台主机上的工作进程（run_worker.py）
+按自身能力领取任务执行，进度事件写回队列由Web进程转发给浏览器。
+
+后端可插拔：TaskQueue 定义接口，目前提供 SQLite 实现（数据库放在各主机共享的目录中），
+后续可按同一接口增加 Redis 等后端。
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.utils.config import Config
+from src.utils.logger import Logger
+
+
+# 各步骤需要的工作进程能力（步骤4、5只需普通CPU，任意工作进程都可执行）
+STEP_REQUIREMENTS = {
+    1: ['network'],
+    2: ['whisper'],
+    3: ['ffmpeg'],
+    4: [],
+    5: [],
+}
+
+# 任务状态
+TASK_PENDING = 'pending'
+TASK_CLAIMED = 'claimed'
+TASK_COMPLETED = 'completed'
+TASK_FAILED = 'failed'
+TASK_CANCELLED = 'cancelled'
+
+
+class TaskQueue(ABC):
+    """
+    任务队列接口
+
+    任务格式:
+        {'task_id', 'project_name', 'step', 'payload': Dict, 'requires': List[str],
+         'status', 'worker_id', 'attempts', 'message', 'created', 'updated'}
+    """
+
+    @abstractmethod
+    def enqueue(self, project_name: str, step: int, payload: Dict,
+                requires: Optional[List[str]] = None) -> str:
+        """
+        加入步骤任务
+
+        Args:
+            project_name: 项目目录名
+            step: 步骤号
+            payload: 执行所需参数（url、process_config、start_step 等）
+            requires: 需要的工作进程能力（默认按 STEP_REQUIREMENTS）
+
+        Returns:
+            str: 任务ID
+        """
+
+    @abstractmethod
+    def claim(self, worker_id: str, capabilities: Iterable[str]) -> Optional[Dict]:
+        """领取一个能力匹配的任务（租约过期的任务可被重新领取），没有时返回None"""
+
+    @abstractmethod
+    def heartbeat(self, task_id: str, worker_id: str) -> bool:
+        """续租；任务已被其他工作进程接管时返回False"""
+
+    @abstractmethod
+    def finish(self, task_id: str, worker_id: str, success: bool, message: str = '') -> bool:
+        """
+        标记任务完成或失败（已被取消的任务保持取消状态）
+
+        Returns:
+            bool: 是否由该工作进程结束了任务（租约已被接管或任务已取消时为 False）
+        """
+
+    @abstractmethod
+    def cancel(self, project_name: str, reason: str = 'user') -> int:
+        """
+        取消项目排队中和执行中的任务（执行中的任务由工作进程轮询状态后停止）
+
+        Returns:
+            int: 被取消的任务数
+        """
+
+    @abstractmethod
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        """按ID获取任务"""
+
+    @abstractmethod
+    def list_tasks(self, status: Optional[str] = None, limit: int = 200) -> List[Dict]:
+        """列出任务（最近更新的在前）"""
+
+    @abstractmethod
+    def publish_event(self, project_name: str, event: str, data: Dict) -> None:
+        """写入进度事件"""
+
+    @abstractmethod
+    def read_events(self, after_id: int, limit: int = 500) -> List[Dict]:
+        """读取 after_id 之后的进度事件 [{'id', 'project_name', 'event', 'data'}]"""
+
+    @abstractmethod
+    def last_event_id(self) -> int:
+        """最新事件ID（转发线程从这里开始，避免重放历史事件）"""
+
+    @abstractmethod
+    def register_worker(self, worker_id: str, capabilities: Iterable[str], info: Dict) -> None:
+        """登记工作进程（同时作为存活心跳）"""
+
+    @abstractmethod
+    def list_workers(self) -> List[Dict]:
+        """列出工作进程及最近心跳时间"""
+
+
+TASK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    project_name TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    requires TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, created);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_name TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    capabilities TEXT NOT NULL,
+    info TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """
+    SQLite（WAL）任务队列
+
+    领取任务在 BEGIN IMMEDIATE 事务中完成，多个进程同时领取时不会重复分配；
+    工作进程需在 lease_seconds 内续租，超时的任务重新变为可领取，最多尝试 max_attempts 次。
+    """
+
+    def __init__(self, db_path: str, logger: Logger, lease_seconds: float = 120,
+                 max_attempts: int = 3, event_retention: float = 3600):
+        self.db_path = db_path
+        self.logger = logger
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.event_retention = event_retention
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(TASK_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> Dict:
+        """数据库行转换为任务字典"""
+        return {
+            'task_id': row['task_id'],
+            'project_name': row['project_name'],
+            'step': row['step'],
+            'payload': json.loads(row['payload']),
+            'requires': [r for r in row['requires'].split(',') if r],
+            'status': row['status'],
+            'worker_id': row['worker_id'],
+            'attempts': row['attempts'],
+            'message': row['message'],
+            'created': row['created'],
+            'updated': row['updated']
+        }
+
+    def enqueue(self, project_name: str, step: int, payload: Dict,
+                requires: Optional[List[str]] = None) -> str:
+        task_id = f"task_{uuid.uuid4().hex[:12]}"
+        requires = STEP_REQUIREMENTS.get(step, []) if requires is None else requires
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO tasks (task_id, project_name, step, payload, requires, status, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (task_id, project_name, step, json.dumps(payload, ensure_ascii=False),
+                 ','.join(sorted(requires)), TASK_PENDING, now, now)
+            )
+        return task_id
+
+    def claim(self, worker_id: str, capabilities: Iterable[str]) -> Optional[Dict]:
+        capabilities = set(capabilities)
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # 租约过期且已达到最大尝试次数的任务直接标记失败
+                self._conn.execute(
+                    'UPDATE tasks SET status = ?, message = ?, updated = ? '
+                    'WHERE status = ? AND lease_until < ? AND attempts >= ?',
+                    (TASK_FAILED, '工作进程失联，超过最大尝试次数', now, TASK_CLAIMED, now, self.max_attempts)
+                )
+                rows = self._conn.execute(
+                    'SELECT * FROM tasks WHERE status = ? OR (status = ? AND lease_until < ?) '
+                    'ORDER BY created LIMIT 200',
+                    (TASK_PENDING, TASK_CLAIMED, now)
+                ).fetchall()
+                chosen = None
+                for row in rows:
+                    requires = {r for r in row['requires'].split(',') if r}
+                    if requires <= capabilities:
+                        chosen = row
+                        break
+                if chosen is None:
+                    self._conn.execute('COMMIT')
+                    return None
+
+                if chosen['status'] == TASK_CLAIMED:
+                    self.logger.warning(f"[队列] 任务 {chosen['task_id']} 租约过期，"
+                                        f"由 {worker_id} 接管（原工作进程: {chosen['worker_id']}）")
+                self._conn.execute(
+                    'UPDATE tasks SET status = ?, worker_id = ?, attempts = attempts + 1, '
+                    'lease_until = ?, updated = ? WHERE task_id = ?',
+                    (TASK_CLAIMED, worker_id, now + self.lease_seconds, now, chosen['task_id'])
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            row = self._conn.execute('SELECT * FROM tasks WHERE task_id = ?', (chosen['task_id'],)).fetchone()
+        return self._row_to_task(row)
+
+    def heartbeat(self, task_id: str, worker_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE tasks SET lease_until = ?, updated = ? WHERE task_id = ? AND worker_id = ? AND status = ?',
+                (now + self.lease_seconds, now, task_id, worker_id, TASK_CLAIMED)
+            )
+        return cursor.rowcount > 0
+
+    def finish(self, task_id: str, worker_id: str, success: bool, message: str = '') -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE tasks SET status = ?, message = ?, lease_until = 0, updated = ? '
+                'WHERE task_id = ? AND worker_id = ? AND status = ?',
+                (TASK_COMPLETED if success else TASK_FAILED, message, time.time(), task_id, worker_id, TASK_CLAIMED)
+            )
+        return cursor.rowcount > 0
+
+    def cancel(self, project_name: str, reason: str = 'user') -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE tasks SET status = ?, message = ?, lease_until = 0, updated = ? '
+                'WHERE project_name = ? AND status IN (?, ?)',
+                (TASK_CANCELLED, f'已取消: {reason}', time.time(), project_name, TASK_PENDING, TASK_CLAIMED)
+            )
+        return cursor.rowcount
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM tasks WHERE task_id = ?', (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def list_tasks(self, status: Optional[str] = None, limit: int = 200) -> List[Dict]:
+        with self._lock:
+            if status:
+                rows = self._conn.execute('SELECT * FROM tasks WHERE status = ? ORDER BY updated DESC LIMIT ?',
+                                          (status, limit)).fetchall()
+            else:
+                rows = self._conn.execute('SELECT * FROM tasks ORDER BY updated DESC LIMIT ?', (limit,)).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def publish_event(self, project_name: str, event: str, data: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO events (project_name, event, data, created) VALUES (?, ?, ?, ?)',
+                (project_name or '', event, json.dumps(data, ensure_ascii=False, default=str), time.time())
+            )
+
+    def read_events(self, after_id: int, limit: int = 500) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM events WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit)
+            ).fetchall()
+            # 顺带清理过期事件
+            self._conn.execute('DELETE FROM events WHERE created < ?', (time.time() - self.event_retention,))
+        return [{'id': row['id'], 'project_name': row['project_name'], 'event': row['event'],
+                 'data': json.loads(row['data'])} for row in rows]
+
+    def last_event_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(id) AS max_id FROM events').fetchone()
+        return row['max_id'] or 0
+
+    def register_worker(self, worker_id: str, capabilities: Iterable[str], info: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO workers (worker_id, capabilities, info, last_seen) VALUES (?, ?, ?, ?)',
+                (worker_id, ','.join(sorted(capabilities)), json.dumps(info, ensure_ascii=False), time.time())
+            )
+
+    def list_workers(self) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM workers ORDER BY worker_id').fetchall()
+        return [{
+            'worker_id': row['worker_id'],
+            'capabilities': [c for c in row['capabilities'].split(',') if c],
+            'info': json.loads(row['info']),
+            'last_seen': row['last_seen'],
+            'alive': now - row['last_seen'] < self.lease_seconds
+        } for row in rows]
+
+
+def start_event_relay(task_queue: TaskQueue, handlers: Dict, logger: Logger,
+                      poll_interval: float = 0.5) -> threading.Thread:
+    """
+    启动进度事件转发线程（Web进程使用）：把工作进程写入队列的事件交给对应的处理函数
+
+    Args:
+        task_queue: 任务队列
+        handlers: 事件名 -> 处理函数，调用方式 handler(project_name, **data)
+        logger: 日志对象
+        poll_interval: 轮询间隔（秒）
+
+    Returns:
+        threading.Thread: 转发线程
+    """
+    def relay():
+        last_id = task_queue.last_event_id()
+        while True:
+            try:
+                events = task_queue.read_events(last_id)
+            except Exception as e:
+                logger.warning(f"[队列] 读取进度事件失败: {str(e)}")
+                events = []
+            for event in events:
+                last_id = event['id']
+                handler = handlers.get(event['event'])
+                if handler:
+                    try:
+                        handler(event['project_name'], **event['data'])
+                    except Exception as e:
+                        logger.warning(f"[队列] 转发事件失败 {event['event']}: {str(e)}")
+            if not events:
+                time.sleep(poll_interval)
+
+    thread = threading.Thread(target=relay, name='task_event_relay', daemon=True)
+    thread.start()
+    return thread
+
+
+def create_task_queue(config: Config, logger: Logger) -> TaskQueue:
+    """
+    根据配置创建任务队列（distributed.queue_backend）
+
+    Args:
+        config: 配置对象
+        logger: 日志对象
+
+    Returns:
+        TaskQueue: 队列实例
+    """
+    backend = config.get('distributed', 'queue_backend', 'sqlite').strip().lower()
+    if backend == 'sqlite':
+        db_path = config.get('distributed', 'queue_path',
+                             os.path.join(config.get('basic', 'cache_dir', './cache'), 'task_queue.db'))
+        return SQLiteTaskQueue(
+            db_path, logger,
+            lease_seconds=config.get_float('distributed', 'lease_seconds', 120),
+            max_attempts=config.get_int('distributed', 'max_attempts', 3)
+        )
+    raise ValueError(f"不支持的任务队列后端: {backend}")
@@ -0,0 +1,225 @@
+"""
+分布式工作进程
+从共享任务队列领取与自身能力匹配的步骤任务，在共享的项目/缓存目录中执行，
+完成后把下一步骤入队；进度事件写回队列，由Web进程转发。
+"""
+import os
+import sys
+import time
+import socket
+import threading
+import traceback
+from typing import Dict, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.utils.config import Config
+from src.utils.logger import Logger, release_project_log
+from src.utils.capabilities import get_capabilities
+from src.utils.cancellation import JobCancelled
+from src.core.job_manager import Job
+from src.core.processor import YouTubeToArticleProcessor
+from src.core.task_queue import TaskQueue, TASK_CANCELLED, create_task_queue
+
+# 工作进程可声明的能力
+WORKER_CAPABILITIES = ['network', 'whisper', 'ffmpeg']
+
+
+def detect_worker_capabilities(config: Config) -> List[str]:
+    """
+    获取工作进程能力：优先使用 distributed.worker_capabilities，留空时按本机环境探测
+
+    Args:
+        config: 配置对象
+
+    Returns:
+        List[str]: 能力列表
+    """
+    configured = [c for c in config.get_list('distributed', 'worker_capabilities') if c]
+    if configured:
+        return configured
+
+    capabilities = get_capabilities()
+    detected = []
+    if capabilities.has_tool('yt-dlp'):
+        detected.append('network')
+    if capabilities.has_module('whisper'):
+        detected.append('whisper')
+    if capabilities.has_tool('ffmpeg'):
+        detected.append('ffmpeg')
+    return detected
+
+
+class StepWorker:
+    """步骤任务工作进程"""
+
+    def __init__(self, config_path: str = "config/config.ini", worker_id: Optional[str] = None,
+                 capabilities: Optional[List[str]] = None, task_queue: Optional[TaskQueue] = None):
+        self.processor = YouTubeToArticleProcessor(config_path)
+        self.config = self.processor.config
+        self.logger = Logger("worker")
+        self.task_queue = task_queue or create_task_queue(self.config, self.logger)
+        self.worker_id = worker_id or f"{socket.gethostname()}_{os.getpid()}"
+        self.capabilities = capabilities if capabilities is not None else detect_worker_capabilities(self.config)
+        self.poll_interval = max(0.1, self.config.get_float('distributed', 'poll_interval', 2.0))
+        self.lease_seconds = self.config.get_float('distributed', 'lease_seconds', 120)
+        self._stop = threading.Event()
+
+        self.processor.set_callbacks(
+            progress_callback=self._publish_progress,
+            step_complete_callback=self._publish_step_complete,
+            download_progress_callback=self._publish_download_progress,
+            transcribe_progress_callback=self._publish_transcribe_progress
+        )
+
+    # ------------------------------------------------------------------
+    # 进度事件（写回队列，由Web进程转发）
+    # ------------------------------------------------------------------
+
+    def _publish_progress(self, project_name: str, step: int, progress: int, message: str):
+        self.task_queue.publish_event(project_name, 'progress_update',
+                                      {'step': step, 'progress': progress, 'message': message})
+
+    def _publish_step_complete(self, project_name: str, step: int, success: bool, message: str):
+        self.task_queue.publish_event(project_name, 'step_complete',
+                                      {'step': step, 'success': success, 'message': message})
+
+    def _publish_download_progress(self, project_name: str, step: int, progress_data: Dict):
+        self.task_queue.publish_event(project_name, 'download_progress',
+                                      {'step': step, 'progress_data': progress_data})
+
+    def _publish_transcribe_progress(self, project_name: str, step: int, progress_data: Dict):
+        self.task_queue.publish_event(project_name, 'transcribe_progress',
+                                      {'step': step, 'progress_data': progress_data})
+
+    # ------------------------------------------------------------------
+    # 主循环
+    # ------------------------------------------------------------------
+
+    def stop(self) -> None:
+        """请求停止（当前任务执行完后退出）"""
+        self._stop.set()
+
+    def run(self, max_tasks: int = 0, exit_when_idle: bool = False) -> int:
+        """
+        领取并执行任务
+
+        Args:
+            max_tasks: 最多执行的任务数，0 表示不限制
+            exit_when_idle: 队列中没有可领取的任务时退出（测试/批处理使用）
+
+        Returns:
+            int: 执行的任务数
+        """
+        self.logger.info(f"[工作进程] {self.worker_id} 已启动，能力: {', '.join(self.capabilities) or '仅CPU步骤'}")
+        executed = 0
+        last_register = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            if now - last_register >= self.poll_interval:
+                self.task_queue.register_worker(self.worker_id, self.capabilities,
+                                                {'host': socket.gethostname(), 'pid': os.getpid(),
+                                                 'tasks_executed': executed})
+                last_register = now
+
+            task = self.task_queue.claim(self.worker_id, self.capabilities)
+            if task is None:
+                if exit_when_idle:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+
+            self.run_task(task)
+            executed += 1
+            if max_tasks and executed >= max_tasks:
+                break
+
+        self.logger.info(f"[工作进程] {self.worker_id} 已退出，共执行 {executed} 个任务")
+        return executed
+
+    def run_task(self, task: Dict) -> bool:
+        """
+        执行单个步骤任务，成功后把下一步骤入队
+
+        Args:
+            task: TaskQueue.claim 返回的任务
+
+        Returns:
+            bool: 步骤是否成功
+        """
+        payload = task['payload']
+        step = task['step']
+        project_name = task['project_name']
+        project_path = os.path.join(self.config.get('basic', 'output_dir'), project_name)
+        job = Job(task['task_id'], payload['url'], project_name, project_path,
+                  payload.get('process_config'), payload.get('batch_id'), payload.get('start_step', 1))
+        job.current_step = step
+
+        self.logger.info(f"[工作进程] 领取任务 {task['task_id']}: {project_name} 步骤{step}（第{task['attempts']}次）")
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(task['task_id'], job, heartbeat_stop),
+                                     name='task_heartbeat', daemon=True)
+        heartbeat.start()
+
+        success = False
+        message = ''
+        try:
+            with self.processor.job_manager.bind(job):
+                success = self.processor.run_step(
+                    step, job.url, project_path, job.process_config, job.start_step,
+                    stream_screenshots='ffmpeg' in self.capabilities
+                )
+        except JobCancelled as e:
+            message = str(e)
+            self.logger.warning(f"[工作进程] 任务已取消 {task['task_id']}: {project_name} 步骤{step}")
+        except Exception as e:
+            message = str(e)
+            self.logger.error(f"[工作进程] 任务异常 {task['task_id']}: {message}")
+            self.logger.error(f"详细错误: {traceback.format_exc()}")
+            self._publish_step_complete(project_name, step, False, f"处理异常: {message}")
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+            # 同一项目的后续步骤可能由其他工作进程执行，步骤结束即关闭项目日志的文件句柄
+            release_project_log(project_path)
+
+        if not self.task_queue.finish(task['task_id'], self.worker_id, success, message):
+            # 项目已被取消，或租约已被其他工作进程接管（后续步骤由接管的工作进程入队）
+            if (self.task_queue.get_task(task['task_id']) or {}).get('status') == TASK_CANCELLED:
+                self.logger.warning(f"[工作进程] 项目已取消，不再入队后续步骤: {project_name}")
+            else:
+                self.logger.warning(f"[工作进程] 任务 {task['task_id']} 已由其他工作进程接管，不再入队后续步骤")
+            return False
+        if success and step < 5:
+            next_id = self.task_queue.enqueue(project_name, step + 1, payload)
+            self.logger.info(f"[工作进程] 步骤{step}完成，已入队步骤{step + 1}: {next_id}")
+        elif success:
+            self.logger.success(f"[工作进程] 项目处理完成: {project_name}")
+        return success
+
+    def _heartbeat_loop(self, task_id: str, job: Job, stop: threading.Event) -> None:
+        """
+        任务执行期间定期续租，并按 poll_interval 检查任务是否已被取消
+
+        租约失效（已被其他工作进程接管）时取消本地执行，避免两个工作进程同时写同一项目目录；
+        队列暂时不可用（如数据库被锁定）时记录警告并在下一轮重试。
+        """
+        interval = max(1.0, self.lease_seconds / 3)
+        last_renew = time.time()
+        while not stop.wait(min(interval, self.poll_interval)):
+            try:
+                task = self.task_queue.get_task(task_id)
+                if task and task['status'] == TASK_CANCELLED:
+                    self.logger.warning(f"[工作进程] 任务 {task_id} 已被取消，正在停止")
+                    job.cancel_token.cancel(task['message'] or 'cancelled')
+                    return
+                if time.time() - last_renew < interval:
+                    continue
+                last_renew = time.time()
+                if not self.task_queue.heartbeat(task_id, self.worker_id):
+                    self.logger.warning(f"[工作进程] 任务 {task_id} 的租约已失效（可能已被其他工作进程接管），正在停止")
+                    job.cancel_token.cancel('lease lost')
+                    return
+            except Exception as e:
+                self.logger.warning(f"[工作进程] 任务 {task_id} 续租失败，稍后重试: {str(e)}")
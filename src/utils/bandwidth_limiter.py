@@ -0,0 +1,81 @@
+"""
+全局下载带宽限制模块
+使用令牌桶算法，在所有并行下载之间共享同一个带宽上限
+"""
+import time
+import threading
+from typing import Optional
+
+from .config import Config
+
+
+class BandwidthLimiter:
+    """
+    令牌桶带宽限制器（线程安全）
+
+    每个下载线程在写入数据后调用 consume(字节数)，
+    令牌不足时阻塞等待，从而让所有下载的总速率不超过上限。
+    """
+
+    def __init__(self, rate_bytes_per_sec: float, burst_seconds: float = 1.0):
+        """
+        Args:
+            rate_bytes_per_sec: 速率上限（字节/秒），<=0 表示不限制
+            burst_seconds: 允许的突发量（按秒计）
+        """
+        self.rate = float(rate_bytes_per_sec)
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用限速"""
+        return self.rate > 0
+
+    def consume(self, nbytes: int) -> float:
+        """
+        消耗令牌，令牌不足时阻塞
+
+        Args:
+            nbytes: 本次下载的字节数
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        if not self.enabled or nbytes <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= nbytes
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_shared_limiter: Optional[BandwidthLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_bandwidth_limiter(config: Config) -> BandwidthLimiter:
+    """
+    获取进程内共享的带宽限制器
+
+    Args:
+        config: 配置对象（读取 step1_download.max_bandwidth_mb，单位MB/s，0表示不限制）
+
+    Returns:
+        BandwidthLimiter: 共享实例（配置变化时重建）
+    """
+    global _shared_limiter
+    rate = config.get_float('step1_download', 'max_bandwidth_mb', 0.0) * 1024 * 1024
+    with _shared_lock:
+        if _shared_limiter is None or _shared_limiter.rate != rate:
+            _shared_limiter = BandwidthLimiter(rate)
+        return _shared_limiter
@@ -0,0 +1,394 @@
+"""
+内容寻址的Blob存储模块
+按内容哈希只保存一份媒体文件，通过硬链接/reflink/符号链接物化到项目目录
+"""
+import os
+import json
+import errno
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+try:
+    import msvcrt
+    MSVCRT_AVAILABLE = True
+except ImportError:
+    MSVCRT_AVAILABLE = False
+
+from .logger import Logger
+
+# Linux FICLONE ioctl（btrfs/xfs 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+# 支持的物化方式
+LINK_MODES = ['hardlink', 'reflink', 'symlink', 'copy']
+DEFAULT_LINK_MODES = ['hardlink', 'reflink', 'copy']
+
+
+class BlobStore:
+    """
+    内容寻址的Blob存储
+
+    目录结构:
+        <root_dir>/objects/<前2位>/<sha256>   Blob文件
+        <root_dir>/refs.json                  引用表 {digest: {'size': int, 'refs': {path: mode}}}
+        <root_dir>/refs.lock                  引用表的跨进程锁（缓存目录可由Web进程、命令行和多台主机的工作进程共享）
+
+    引用计数说明:
+        - hardlink/reflink/copy 引用与Blob内容相互独立，删除任意一方都不影响另一方
+        - symlink 引用依赖Blob文件，释放Blob前会先将其转换为独立副本
+    """
+
+    def __init__(self, root_dir: str, logger: Logger, link_modes: Optional[List[str]] = None):
+        self.root_dir = root_dir
+        self.logger = logger
+        self.objects_dir = os.path.join(root_dir, 'objects')
+        self.refs_file = os.path.join(root_dir, 'refs.json')
+        self.link_modes = [m for m in (link_modes or DEFAULT_LINK_MODES) if m in LINK_MODES]
+        if not self.link_modes:
+            self.link_modes = list(DEFAULT_LINK_MODES)
+        self.lock_file = os.path.join(root_dir, 'refs.lock')
+        self._lock = threading.RLock()
+        self._lock_handle = None
+        self._lock_depth = 0
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 基础工具
+    # ------------------------------------------------------------------
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 4 * 1024 * 1024) -> str:
+        """计算文件的SHA256哈希"""
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def blob_path(self, digest: str) -> str:
+        """获取Blob文件路径"""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def has_blob(self, digest: str) -> bool:
+        """检查Blob是否存在"""
+        return bool(digest) and os.path.isfile(self.blob_path(digest))
+
+    @contextmanager
+    def _locked(self):
+        """
+        引用表读-改-写期间持有的锁（可重入）
+
+        线程锁保证进程内互斥，最外层同时对 refs.lock 加文件锁，保证与共享缓存目录的其他进程互斥。
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                handle = open(self.lock_file, 'a+b')
+                try:
+                    self._lock_file(handle, True)
+                except OSError:
+                    handle.close()
+                    raise
+                self._lock_handle = handle
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    handle, self._lock_handle = self._lock_handle, None
+                    try:
+                        self._lock_file(handle, False)
+                    finally:
+                        handle.close()
+
+    @staticmethod
+    def _lock_file(handle, locked: bool) -> None:
+        """获取/释放文件锁"""
+        fd = handle.fileno()
+        if FCNTL_AVAILABLE:
+            fcntl.flock(fd, fcntl.LOCK_EX if locked else fcntl.LOCK_UN)
+        elif MSVCRT_AVAILABLE:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK if locked else msvcrt.LK_UNLCK, 1)
+
+    def _load_refs(self) -> Dict:
+        """加载引用表"""
+        if not os.path.exists(self.refs_file):
+            return {}
+        try:
+            with open(self.refs_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"[Blob] 读取引用表失败，将重建: {str(e)}")
+            return {}
+
+    def _save_refs(self, refs: Dict) -> None:
+        """原子写入引用表"""
+        tmp_file = f"{self.refs_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(refs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.refs_file)
+
+    def _record_ref(self, digest: str, path: str, mode: str) -> None:
+        """记录一个引用"""
+        with self._locked():
+            refs = self._load_refs()
+            entry = refs.setdefault(digest, {'size': 0, 'refs': {}, 'created_time': datetime.now().isoformat()})
+            if self.has_blob(digest):
+                entry['size'] = os.path.getsize(self.blob_path(digest))
+            entry['refs'][os.path.abspath(path)] = mode
+            self._save_refs(refs)
+
+    # ------------------------------------------------------------------
+    # 物化方式
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _reflink(src: str, dst: str) -> None:
+        """通过FICLONE创建写时复制副本（仅Linux支持的文件系统）"""
+        if not FCNTL_AVAILABLE:
+            raise OSError(errno.ENOTSUP, "当前平台不支持reflink")
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            except OSError:
+                d.close()
+                os.remove(dst)
+                raise
+
+    def _link_file(self, src: str, dst: str, mode: str) -> None:
+        """按指定方式创建文件"""
+        if mode == 'hardlink':
+            os.link(src, dst)
+        elif mode == 'reflink':
+            self._reflink(src, dst)
+        elif mode == 'symlink':
+            os.symlink(os.path.abspath(src), dst)
+        else:
+            shutil.copy2(src, dst)
+
+    def _is_live_ref(self, digest: str, path: str, mode: str) -> bool:
+        """检查引用是否仍然有效"""
+        if not os.path.lexists(path):
+            return False
+        try:
+            if mode == 'symlink':
+                return os.path.islink(path) and os.path.realpath(path) == os.path.realpath(self.blob_path(digest))
+            if mode == 'hardlink':
+                return self.has_blob(digest) and os.path.samefile(path, self.blob_path(digest))
+            return os.path.isfile(path)
+        except OSError:
+            return False
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+    def put(self, file_path: str, digest: Optional[str] = None) -> str:
+        """
+        将文件存入Blob存储
+
+        同一文件系统下直接硬链接源文件（零拷贝），否则复制一份。
+        如果相同内容的Blob已存在，则把源文件替换为指向Blob的链接，保证只保留一份数据。
+
+        Args:
+            file_path: 源文件路径
+            digest: 已知的内容哈希（可选，避免重复计算）
+
+        Returns:
+            str: 内容哈希
+        """
+        file_path = os.path.abspath(file_path)
+        digest = digest or self.hash_file(file_path)
+        target = self.blob_path(digest)
+
+        with self._locked():
+            if not self.has_blob(digest):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_target = f"{target}.tmp"
+                try:
+                    os.link(file_path, tmp_target)
+                    mode = 'hardlink'
+                except OSError:
+                    shutil.copy2(file_path, tmp_target)
+                    mode = 'copy'
+                os.replace(tmp_target, target)
+                self.logger.info(f"[Blob] 新增Blob: {digest[:12]} ({mode})")
+                self._record_ref(digest, file_path, mode)
+            elif not os.path.samefile(file_path, target):
+                # 内容已存在：将源文件替换为链接，释放重复空间
+                mode = self.materialize(digest, file_path, replace=True)
+                self.logger.info(f"[Blob] Blob已存在，源文件已替换为{mode}: {digest[:12]}")
+            else:
+                self._record_ref(digest, file_path, 'hardlink')
+
+        return digest
+
+    def materialize(self, digest: str, dest_path: str, replace: bool = False) -> str:
+        """
+        将Blob物化到目标路径
+
+        按 link_modes 顺序尝试硬链接、reflink、符号链接，全部失败（通常是跨文件系统）时才复制。
+
+        Args:
+            digest: 内容哈希
+            dest_path: 目标路径
+            replace: 目标已存在时是否替换
+
+        Returns:
+            str: 实际使用的物化方式
+        """
+        source = self.blob_path(digest)
+        if not self.has_blob(digest):
+            raise FileNotFoundError(f"Blob不存在: {digest}")
+
+        dest_path = os.path.abspath(dest_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        if os.path.lexists(dest_path):
+            if not replace:
+                raise FileExistsError(f"目标文件已存在: {dest_path}")
+
+        tmp_dest = f"{dest_path}.blobtmp"
+        last_error = None
+        for mode in self.link_modes:
+            try:
+                if os.path.lexists(tmp_dest):
+                    os.remove(tmp_dest)
+                self._link_file(source, tmp_dest, mode)
+                os.replace(tmp_dest, dest_path)
+                self._record_ref(digest, dest_path, mode)
+                self.logger.info(f"[Blob] 物化完成({mode}): {os.path.basename(dest_path)}")
+                return mode
+            except OSError as e:
+                last_error = e
+                self.logger.debug(f"[Blob] {mode} 失败，尝试下一种方式: {str(e)}")
+
+        # 所有方式均失败时兜底复制
+        if 'copy' not in self.link_modes:
+            try:
+                shutil.copy2(source, tmp_dest)
+                os.replace(tmp_dest, dest_path)
+                self._record_ref(digest, dest_path, 'copy')
+                return 'copy'
+            except OSError as e:
+                last_error = e
+
+        raise OSError(f"Blob物化失败: {str(last_error)}")
+
+    def refcount(self, digest: str) -> int:
+        """获取Blob的有效引用数（会清理失效引用）"""
+        with self._locked():
+            refs = self._load_refs()
+            entry = refs.get(digest)
+            if not entry:
+                return 0
+            live = {p: m for p, m in entry['refs'].items() if self._is_live_ref(digest, p, m)}
+            if len(live) != len(entry['refs']):
+                entry['refs'] = live
+                self._save_refs(refs)
+            return len(live)
+
+    def release(self, digest: str) -> bool:
+        """
+        从存储中移除Blob
+
+        依赖该Blob的符号链接会先被转换为独立副本，因此释放缓存不会破坏任何项目文件。
+
+        Returns:
+            bool: 是否删除了Blob文件
+        """
+        with self._locked():
+            refs = self._load_refs()
+            entry = refs.pop(digest, None)
+            target = self.blob_path(digest)
+
+            if entry and os.path.isfile(target):
+                for path, mode in entry['refs'].items():
+                    if mode == 'symlink' and self._is_live_ref(digest, path, mode):
+                        tmp_path = f"{path}.blobtmp"
+                        shutil.copy2(target, tmp_path)
+                        os.replace(tmp_path, path)
+                        self.logger.info(f"[Blob] 符号链接已转换为独立文件: {path}")
+
+            removed = False
+            if os.path.isfile(target):
+                os.remove(target)
+                removed = True
+
+            self._save_refs(refs)
+            return removed
+
+    def gc(self, remove_unreferenced: bool = False) -> Dict:
+        """
+        清理失效引用
+
+        Args:
+            remove_unreferenced: 是否同时删除没有任何有效引用的Blob
+
+        Returns:
+            Dict: 清理统计
+        """
+        stats = {'blobs': 0, 'dead_refs': 0, 'removed_blobs': 0, 'orphan_blobs': 0}
+        with self._locked():
+            refs = self._load_refs()
+            for digest in list(refs.keys()):
+                entry = refs[digest]
+                live = {p: m for p, m in entry['refs'].items() if self._is_live_ref(digest, p, m)}
+                stats['dead_refs'] += len(entry['refs']) - len(live)
+                entry['refs'] = live
+
+                if not self.has_blob(digest):
+                    refs.pop(digest)
+                    continue
+
+                stats['blobs'] += 1
+                if remove_unreferenced and not live:
+                    os.remove(self.blob_path(digest))
+                    refs.pop(digest)
+                    stats['removed_blobs'] += 1
+
+            # 统计不在引用表中的孤立Blob
+            for digest in self.iter_blobs():
+                if digest not in refs:
+                    stats['orphan_blobs'] += 1
+
+            self._save_refs(refs)
+
+        self.logger.info(f"[Blob] 引用清理完成: {stats}")
+        return stats
+
+    def iter_blobs(self) -> List[str]:
+        """列出所有Blob哈希"""
+        digests = []
+        if not os.path.exists(self.objects_dir):
+            return digests
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not name.endswith('.tmp'):
+                    digests.append(name)
+        return digests
+
+    def get_stats(self) -> Dict:
+        """获取存储统计"""
+        digests = self.iter_blobs()
+        total_size = 0
+        for digest in digests:
+            try:
+                total_size += os.path.getsize(self.blob_path(digest))
+            except OSError:
+                pass
+        return {'count': len(digests), 'size': total_size}
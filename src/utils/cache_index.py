@@ -0,0 +1,370 @@
+"""
+缓存索引模块
+使用SQLite（WAL模式）统一记录缓存条目的元数据、大小和访问统计
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .logger import Logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT '',
+    path TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL,
+    created REAL NOT NULL,
+    info TEXT,
+    PRIMARY KEY (kind, cache_key, language)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (kind, last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_lfu ON entries (kind, hit_count, last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_path ON entries (path);
+
+CREATE TABLE IF NOT EXISTS kind_totals (
+    kind TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, language)
+);
+
+CREATE TABLE IF NOT EXISTS metadata (
+    platform TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    info TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (platform, video_id)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# kind_totals 由触发器维护：共享同一文件（path 相同）的条目，大小只在第一个条目写入、最后一个条目删除时计入
+TRIGGERS = (
+    """
+    CREATE TRIGGER trg_entries_insert AFTER INSERT ON entries
+    BEGIN
+        INSERT OR IGNORE INTO kind_totals (kind, language, count, size) VALUES (NEW.kind, NEW.language, 0, 0);
+        UPDATE kind_totals SET count = count + 1,
+            size = size + CASE WHEN EXISTS (SELECT 1 FROM entries WHERE path = NEW.path AND rowid != NEW.rowid)
+                               THEN 0 ELSE NEW.size END
+            WHERE kind = NEW.kind AND language = NEW.language;
+    END;
+    """,
+    """
+    CREATE TRIGGER trg_entries_delete AFTER DELETE ON entries
+    BEGIN
+        UPDATE kind_totals SET count = count - 1,
+            size = size - CASE WHEN EXISTS (SELECT 1 FROM entries WHERE path = OLD.path)
+                               THEN 0 ELSE OLD.size END
+            WHERE kind = OLD.kind AND language = OLD.language;
+    END;
+    """,
+    """
+    CREATE TRIGGER trg_entries_update AFTER UPDATE OF path, size ON entries
+    BEGIN
+        UPDATE kind_totals SET
+            size = size
+                - CASE WHEN EXISTS (SELECT 1 FROM entries WHERE path = OLD.path AND rowid != NEW.rowid)
+                       THEN 0 ELSE OLD.size END
+                + CASE WHEN EXISTS (SELECT 1 FROM entries WHERE path = NEW.path AND rowid != NEW.rowid)
+                       THEN 0 ELSE NEW.size END
+            WHERE kind = NEW.kind AND language = NEW.language;
+    END;
+    """
+)
+
+EVICTION_POLICIES = ('lru', 'lfu')
+
+# kind_totals 的统计方式版本（触发器变化时递增，打开旧数据库时重建触发器和汇总表）
+TOTALS_VERSION = '2'
+
+
+class CacheIndex:
+    """
+    缓存索引（SQLite WAL）
+
+    每个缓存条目由 (kind, cache_key, language) 唯一确定，
+    kind_totals 表由触发器增量维护，统计查询无需遍历目录。
+    内容相同的视频共用一个Blob（条目的 path 相同），大小只计算一次。
+    """
+
+    def __init__(self, db_path: str, logger: Logger):
+        self.db_path = db_path
+        self.logger = logger
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        if self.get_meta('totals_version') != TOTALS_VERSION:
+            self._rebuild_totals()
+
+    def _rebuild_totals(self) -> None:
+        """创建（或替换旧版本的）触发器，并按当前条目重新汇总 kind_totals"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for trigger in ('trg_entries_insert', 'trg_entries_delete', 'trg_entries_update'):
+                    self._conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+                for trigger in TRIGGERS:
+                    self._conn.execute(trigger)
+                self._conn.execute('DELETE FROM kind_totals')
+                self._conn.execute(
+                    'INSERT INTO kind_totals (kind, language, count, size) '
+                    'SELECT kind, language, SUM(refs), SUM(size) FROM ('
+                    '    SELECT kind, language, COUNT(*) AS refs, MAX(size) AS size FROM entries'
+                    '    GROUP BY kind, language, COALESCE(path, cache_key)'
+                    ') GROUP BY kind, language'
+                )
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('totals_version', ?)",
+                                   (TOTALS_VERSION,))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # 元数据
+    # ------------------------------------------------------------------
+    def get_meta(self, key: str, fallback: Optional[str] = None) -> Optional[str]:
+        """读取元数据"""
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else fallback
+
+    def set_meta(self, key: str, value: str) -> None:
+        """写入元数据"""
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    # ------------------------------------------------------------------
+    # 视频元数据（TTL缓存）
+    # ------------------------------------------------------------------
+    def get_metadata(self, platform: str, video_id: str, ttl_seconds: float) -> Optional[Dict]:
+        """
+        获取未过期的视频元数据
+
+        Args:
+            platform: 平台 ('youtube', 'bilibili')
+            video_id: 规范化的视频ID
+            ttl_seconds: 有效期（秒）
+
+        Returns:
+            Optional[Dict]: 元数据，不存在或已过期返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT info, fetched FROM metadata WHERE platform = ? AND video_id = ?',
+                (platform, video_id)
+            ).fetchone()
+        if not row or time.time() - row['fetched'] > ttl_seconds:
+            return None
+        try:
+            return json.loads(row['info'])
+        except ValueError:
+            return None
+
+    def put_metadata(self, platform: str, video_id: str, info: Dict) -> None:
+        """保存视频元数据"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO metadata (platform, video_id, info, fetched) VALUES (?, ?, ?, ?)',
+                (platform, video_id, json.dumps(info, ensure_ascii=False), time.time())
+            )
+
+    def purge_metadata(self, ttl_seconds: float) -> int:
+        """删除过期的视频元数据"""
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM metadata WHERE fetched < ?', (time.time() - ttl_seconds,))
+        return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # 条目操作
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict:
+        """将数据库行转换为字典"""
+        entry = dict(row)
+        try:
+            entry['info'] = json.loads(entry['info']) if entry.get('info') else {}
+        except (TypeError, ValueError):
+            entry['info'] = {}
+        return entry
+
+    def upsert(self, kind: str, cache_key: str, path: str, size: int, info: Dict,
+               language: str = '', created: Optional[float] = None) -> None:
+        """
+        新增或更新缓存条目
+
+        Args:
+            kind: 条目类型 ('video', 'subtitle')
+            cache_key: 缓存键
+            path: 缓存文件路径
+            size: 占用字节数
+            info: 缓存信息
+            language: 语言代码（视频为空字符串）
+            created: 创建时间戳（迁移时使用原缓存时间）
+        """
+        now = time.time()
+        info_json = json.dumps(info, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                existing = self._conn.execute(
+                    'SELECT size FROM entries WHERE kind = ? AND cache_key = ? AND language = ?',
+                    (kind, cache_key, language)
+                ).fetchone()
+                if existing:
+                    self._conn.execute(
+                        'UPDATE entries SET path = ?, size = ?, info = ?, last_access = ? '
+                        'WHERE kind = ? AND cache_key = ? AND language = ?',
+                        (path, size, info_json, now, kind, cache_key, language)
+                    )
+                else:
+                    self._conn.execute(
+                        'INSERT INTO entries (kind, cache_key, language, path, size, hit_count, last_access, created, info) '
+                        'VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)',
+                        (kind, cache_key, language, path, size, created or now, created or now, info_json)
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def get(self, kind: str, cache_key: str, language: str = '') -> Optional[Dict]:
+        """获取缓存条目"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM entries WHERE kind = ? AND cache_key = ? AND language = ?',
+                (kind, cache_key, language)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def touch(self, kind: str, cache_key: str, language: str = '') -> None:
+        """记录一次缓存命中"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE entries SET hit_count = hit_count + 1, last_access = ? '
+                'WHERE kind = ? AND cache_key = ? AND language = ?',
+                (time.time(), kind, cache_key, language)
+            )
+
+    def remove(self, kind: str, cache_key: str, language: str = '') -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM entries WHERE kind = ? AND cache_key = ? AND language = ?',
+                (kind, cache_key, language)
+            )
+
+    def path_refs(self, path: str) -> int:
+        """引用同一文件（如同一个视频Blob）的条目数"""
+        with self._lock:
+            row = self._conn.execute('SELECT COUNT(*) AS refs FROM entries WHERE path = ?', (path,)).fetchone()
+        return row['refs']
+
+    def list_entries(self, kind: Optional[str] = None, language: Optional[str] = None) -> List[Dict]:
+        """列出缓存条目（按创建时间倒序）"""
+        query = 'SELECT * FROM entries'
+        conditions, params = [], []
+        if kind is not None:
+            conditions.append('kind = ?')
+            params.append(kind)
+        if language is not None:
+            conditions.append('language = ?')
+            params.append(language)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY created DESC'
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def totals(self) -> Dict[Tuple[str, str], Dict]:
+        """获取各类型缓存的数量和大小（触发器维护，无需扫描）"""
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, language, count, size FROM kind_totals').fetchall()
+        return {(row['kind'], row['language']): {'count': row['count'], 'size': row['size']} for row in rows}
+
+    def kind_size(self, kind: str) -> int:
+        """获取某一类型缓存的总大小"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COALESCE(SUM(size), 0) AS size FROM kind_totals WHERE kind = ?', (kind,)
+            ).fetchone()
+        return row['size']
+
+    def select_evictions(self, kind: str, budget_bytes: int, policy: str = 'lru',
+                         keep: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        选出需要淘汰的条目，使该类型总大小不超过预算
+
+        共享同一文件的条目全部淘汰后才释放该文件的空间；keep 条目及与它共享文件的条目不参与淘汰。
+
+        Args:
+            kind: 条目类型
+            budget_bytes: 字节预算（<=0 表示不限制）
+            policy: 'lru'（最久未访问优先）或 'lfu'（命中次数最少优先）
+            keep: 本次刚写入、不参与淘汰的 (cache_key, language)
+
+        Returns:
+            List[Dict]: 待淘汰的条目
+        """
+        if budget_bytes <= 0:
+            return []
+
+        excess = self.kind_size(kind) - budget_bytes
+        if excess <= 0:
+            return []
+
+        if policy == 'lfu':
+            order = 'hit_count ASC, last_access ASC'
+        else:
+            order = 'last_access ASC'
+
+        with self._lock:
+            rows = self._conn.execute(f'SELECT * FROM entries WHERE kind = ? ORDER BY {order}', (kind,)).fetchall()
+
+        refs: Dict[str, int] = {}
+        kept_paths = set()
+        for row in rows:
+            if row['path']:
+                refs[row['path']] = refs.get(row['path'], 0) + 1
+                if keep and (row['cache_key'], row['language']) == keep:
+                    kept_paths.add(row['path'])
+
+        victims = []
+        for row in rows:
+            if excess <= 0:
+                break
+            if keep and (row['cache_key'], row['language']) == keep or row['path'] in kept_paths:
+                continue
+            victims.append(self._row_to_dict(row))
+            path = row['path']
+            if path:
+                refs[path] -= 1
+                if refs[path]:
+                    continue
+            excess -= row['size']
+        return victims
@@ -10,6 +10,9 @@ from datetime import datetime
 from typing import Dict, Optional, Tuple, List
 from .config import Config
 from .logger import Logger
+from .blob_store import BlobStore
+from .transcript import copy_transcript, transcript_path
+from .cache_index import CacheIndex, EVICTION_POLICIES
 
 class CacheManager:
     def __init__(self, config: Config, logger: Logger):
@@ -32,6 +35,28 @@ class CacheManager:
         
         # 确保缓存目录存在
         self._ensure_cache_directories()
+        
+        # 内容寻址存储：视频按哈希只保存一份，通过链接物化到项目目录
+        self.blob_store = BlobStore(
+            os.path.join(self.cache_dir, 'blobs'),
+            logger,
+            link_modes=config.get_list('basic', 'blob_link_modes') or None
+        )
+        
+        # 缓存索引：统一记录所有缓存条目的元数据与访问统计
+        self.index = CacheIndex(os.path.join(self.cache_dir, 'cache_index.db'), logger)
+        self.eviction_policy = config.get('cache', 'eviction_policy', 'lru').strip().lower()
+        if self.eviction_policy not in EVICTION_POLICIES:
+            self.eviction_policy = 'lru'
+        self.kind_budgets = {
+            'video': config.get_int('cache', 'video_budget_mb', 0) * 1024 * 1024,
+            'subtitle': config.get_int('cache', 'subtitle_budget_mb', 0) * 1024 * 1024
+        }
+        self.metadata_ttl = config.get_int('cache', 'metadata_ttl', 3600)
+        
+        # 自动迁移旧的 *_info.json 缓存信息
+        if not self.index.get_meta('info_json_migrated'):
+            self._migrate_info_files()
     
     def _ensure_cache_directories(self):
         """确保缓存目录存在"""
@@ -78,29 +103,32 @@ class CacheManager:
         
         return video_id
     
-    def _get_cache_info_path(self, cache_type: str, cache_key: str, language: str = None) -> str:
+    @staticmethod
+    def _resolve_kind(cache_type: str, language: str = None) -> Tuple[str, str]:
         """
-        获取缓存信息文件路径
+        将缓存类型转换为索引中的 (kind, language)
         
         Args:
             cache_type: 缓存类型 ('video', 'subtitle_en', 'subtitle' 等)
-            cache_key: 缓存键
             language: 语言代码（用于 subtitle 类型）
         """
         if cache_type == 'video':
-            cache_base_dir = self.videos_cache
-        elif cache_type == 'subtitle_en':
-            cache_base_dir = self.subtitles_en_cache
-        elif cache_type == 'subtitle' and language:
-            cache_base_dir = self._get_subtitle_cache_dir(language)
-        else:
-            cache_base_dir = self.cache_dir
-        
-        return os.path.join(cache_base_dir, f"{cache_key}_info.json")
+            return 'video', ''
+        if cache_type.startswith('subtitle_'):
+            return 'subtitle', cache_type.replace('subtitle_', '')
+        return 'subtitle', language or ''
+    
+    @staticmethod
+    def _get_entry_size(path: Optional[str]) -> int:
+        """获取缓存文件大小"""
+        try:
+            return os.path.getsize(path) if path else 0
+        except OSError:
+            return 0
     
     def _save_cache_info(self, cache_type: str, cache_key: str, info: Dict, language: str = None):
         """
-        保存缓存信息
+        保存缓存信息到索引
         
         Args:
             cache_type: 缓存类型
@@ -108,35 +136,70 @@ class CacheManager:
             info: 缓存信息
             language: 语言代码（用于 subtitle 类型）
         """
-        info_path = self._get_cache_info_path(cache_type, cache_key, language)
+        kind, lang = self._resolve_kind(cache_type, language)
         info['cached_time'] = datetime.now().isoformat()
         info['cache_type'] = cache_type
         info['cache_key'] = cache_key
         if language:
             info['language'] = language
         
-        with open(info_path, 'w', encoding='utf-8') as f:
-            json.dump(info, f, ensure_ascii=False, indent=2)
+        path = info.get('cache_path') or info.get('file_path')
+        self.index.upsert(kind, cache_key, path, self._get_entry_size(path), info, language=lang)
     
     def _load_cache_info(self, cache_type: str, cache_key: str, language: str = None) -> Optional[Dict]:
         """
-        加载缓存信息
+        从索引加载缓存信息
         
         Args:
             cache_type: 缓存类型
             cache_key: 缓存键
             language: 语言代码（用于 subtitle 类型）
         """
-        info_path = self._get_cache_info_path(cache_type, cache_key, language)
-        if not os.path.exists(info_path):
-            return None
-        
-        try:
-            with open(info_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            self.logger.warning(f"读取缓存信息失败: {str(e)}")
-            return None
+        kind, lang = self._resolve_kind(cache_type, language)
+        entry = self.index.get(kind, cache_key, lang)
+        return entry['info'] if entry else None
+    
+    def _migrate_info_files(self) -> None:
+        """将旧的 *_info.json 缓存信息导入索引（只执行一次）"""
+        migrated = 0
+        scan_dirs = [('video', '', self.videos_cache)]
+        if os.path.exists(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.startswith('subtitles_'):
+                    scan_dirs.append(('subtitle', name.replace('subtitles_', ''), os.path.join(self.cache_dir, name)))
+        
+        for kind, lang, cache_dir in scan_dirs:
+            if not os.path.isdir(cache_dir):
+                continue
+            for file in os.listdir(cache_dir):
+                if not file.endswith('_info.json'):
+                    continue
+                try:
+                    with open(os.path.join(cache_dir, file), 'r', encoding='utf-8') as f:
+                        info = json.load(f)
+                    
+                    cache_key = info.get('cache_key') or file.replace('_info.json', '')
+                    path = info.get('cache_path') or info.get('file_path')
+                    if info.get('blob_hash'):
+                        path = self.blob_store.blob_path(info['blob_hash'])
+                    if not path or not os.path.exists(path):
+                        continue
+                    
+                    try:
+                        created = datetime.fromisoformat(info.get('cached_time', '')).timestamp()
+                    except ValueError:
+                        created = os.path.getmtime(path)
+                    
+                    self.index.upsert(kind, cache_key, path, self._get_entry_size(path), info,
+                                      language=info.get('language', lang) if kind == 'subtitle' else '',
+                                      created=created)
+                    migrated += 1
+                except Exception as e:
+                    self.logger.warning(f"迁移缓存信息失败 {file}: {str(e)}")
+        
+        self.index.set_meta('info_json_migrated', datetime.now().isoformat())
+        if migrated:
+            self.logger.info(f"[缓存] 已将 {migrated} 个旧缓存信息迁移到索引")
     
     # 视频缓存相关方法
     def get_cached_video(self, youtube_url: str) -> Optional[Tuple[str, Dict]]:
@@ -147,39 +210,92 @@ class CacheManager:
         if not cache_info:
             return None
         
-        # 优先查找cache_path，然后查找file_path（向后兼容）
-        video_path = cache_info.get('cache_path') or cache_info.get('file_path')
-        if not video_path or not os.path.exists(video_path):
-            self.logger.info(f"缓存的视频文件不存在: {video_path}")
-            return None
+        # 优先使用Blob存储，然后查找cache_path/file_path（向后兼容）
+        blob_hash = cache_info.get('blob_hash')
+        if blob_hash:
+            if not self.blob_store.has_blob(blob_hash):
+                self.logger.info(f"缓存的视频Blob不存在: {blob_hash[:12]}")
+                return None
+            video_path = self.blob_store.blob_path(blob_hash)
+        else:
+            video_path = cache_info.get('cache_path') or cache_info.get('file_path')
+            if not video_path or not os.path.exists(video_path):
+                self.logger.info(f"缓存的视频文件不存在: {video_path}")
+                return None
         
-        self.logger.success(f"找到缓存视频: {os.path.basename(video_path)}")
+        self.index.touch('video', cache_key)
+        self.logger.success(f"找到缓存视频: {cache_info.get('original_filename') or os.path.basename(video_path)}")
         return video_path, cache_info
     
+    def has_cached_video(self, youtube_url: str) -> bool:
+        """检查视频是否已缓存（只读索引，不计入命中统计）"""
+        cache_info = self._load_cache_info('video', self._get_url_hash(youtube_url))
+        if not cache_info:
+            return False
+        blob_hash = cache_info.get('blob_hash')
+        if blob_hash:
+            return self.blob_store.has_blob(blob_hash)
+        video_path = cache_info.get('cache_path') or cache_info.get('file_path')
+        return bool(video_path) and os.path.exists(video_path)
+
+    def materialize_video(self, cache_info: Dict, output_dir: str) -> str:
+        """
+        将缓存视频物化到输出目录
+        
+        Blob缓存通过硬链接/reflink/符号链接物化，跨文件系统时才复制；
+        旧格式的缓存文件仍然复制。
+        
+        Args:
+            cache_info: get_cached_video 返回的缓存信息
+            output_dir: 输出目录
+            
+        Returns:
+            str: 输出目录中的视频文件路径
+        """
+        blob_hash = cache_info.get('blob_hash')
+        cache_path = cache_info.get('cache_path') or cache_info.get('file_path')
+        output_filename = cache_info.get('original_filename') or os.path.basename(cache_path)
+        output_video_path = os.path.join(output_dir, output_filename)
+        
+        if os.path.exists(output_video_path):
+            self.logger.info(f"[成功] 输出目录已存在该文件，跳过物化")
+            return output_video_path
+        
+        os.makedirs(output_dir, exist_ok=True)
+        if blob_hash and self.blob_store.has_blob(blob_hash):
+            mode = self.blob_store.materialize(blob_hash, output_video_path)
+            self.logger.success(f"[成功] 从缓存物化视频完成({mode}): {output_filename}")
+        else:
+            self.logger.info(f"[复制] 正在复制缓存文件到输出目录...")
+            shutil.copy2(cache_path, output_video_path)
+            self.logger.success(f"[成功] 从缓存复制视频完成: {output_filename}")
+        
+        return output_video_path
+    
     def cache_video(self, youtube_url: str, video_path: str, video_info: Dict) -> str:
-        """缓存视频文件"""
+        """缓存视频文件（存入内容寻址的Blob存储）"""
         cache_key = self._get_url_hash(youtube_url)
-        
-        # 生成缓存文件名
         original_filename = os.path.basename(video_path)
-        cache_filename = f"{cache_key}_{original_filename}"
-        cache_path = os.path.join(self.videos_cache, cache_filename)
         
         try:
-            # 复制文件到缓存目录
-            shutil.copy2(video_path, cache_path)
-            self.logger.success(f"视频已缓存: {cache_filename}")
+            # 存入Blob存储（同一文件系统下为零拷贝硬链接）
+            blob_hash = self.blob_store.put(video_path)
+            cache_path = self.blob_store.blob_path(blob_hash)
+            self.logger.success(f"视频已缓存: {original_filename} (blob: {blob_hash[:12]})")
             
             # 保存缓存信息
             cache_info = video_info.copy()
             cache_info.update({
                 'original_path': video_path,
+                'original_filename': original_filename,
                 'cache_path': cache_path,
-                'cache_filename': cache_filename,
+                'cache_filename': blob_hash,
+                'blob_hash': blob_hash,
                 'youtube_url': youtube_url
             })
             
             self._save_cache_info('video', cache_key, cache_info)
+            self.enforce_budget('video', keep=(cache_key, ''))
             
             return cache_path
             
@@ -187,6 +303,31 @@ class CacheManager:
             self.logger.error(f"视频缓存失败: {str(e)}")
             return video_path
     
+    # 视频元数据缓存相关方法
+    def get_cached_metadata(self, platform: str, video_id: str) -> Optional[Dict]:
+        """
+        获取缓存的视频元数据（按规范视频ID，超过 metadata_ttl 视为过期）
+        
+        Args:
+            platform: 平台 ('youtube', 'bilibili')
+            video_id: 规范化的视频ID
+        """
+        if not video_id or self.metadata_ttl <= 0:
+            return None
+        info = self.index.get_metadata(platform, video_id, self.metadata_ttl)
+        if info:
+            self.logger.info(f"[缓存] 命中视频元数据缓存: {platform}/{video_id}")
+        return info
+    
+    def cache_metadata(self, platform: str, video_id: str, info: Dict) -> None:
+        """缓存视频元数据"""
+        if not video_id or self.metadata_ttl <= 0:
+            return
+        try:
+            self.index.put_metadata(platform, video_id, info)
+        except Exception as e:
+            self.logger.warning(f"[缓存] 元数据缓存失败: {str(e)}")
+    
     # 英文字幕缓存相关方法（保留向后兼容）
     def get_cached_english_subtitles(self, youtube_url: str) -> Optional[Tuple[str, Dict]]:
         """获取缓存的英文字幕（向后兼容方法）"""
@@ -220,6 +361,7 @@ class CacheManager:
             self.logger.info(f"缓存的{language}字幕不存在: {srt_path}")
             return None
         
+        self.index.touch('subtitle', cache_key, language)
         self.logger.success(f"找到缓存的{language}字幕: {os.path.basename(srt_path)}")
         return srt_path, cache_info
     
@@ -248,6 +390,7 @@ class CacheManager:
         try:
             # 复制文件到缓存目录
             shutil.copy2(srt_path, cache_path)
+            copy_transcript(srt_path, cache_path)
             self.logger.success(f"{language}字幕已缓存: {cache_filename}")
             
             # 保存缓存信息
@@ -261,6 +404,7 @@ class CacheManager:
             })
             
             self._save_cache_info('subtitle', cache_key, cache_info, language)
+            self.enforce_budget('subtitle', keep=(cache_key, language))
             
             return cache_path
             
@@ -269,22 +413,83 @@ class CacheManager:
             return srt_path
     
     # 缓存管理方法
+    def _remove_entry(self, entry: Dict) -> None:
+        """删除一个缓存条目及其文件"""
+        info = entry.get('info', {})
+        blob_hash = info.get('blob_hash')
+        self.index.remove(entry['kind'], entry['cache_key'], entry['language'])
+        try:
+            if blob_hash:
+                # 内容相同的其他缓存条目仍引用该Blob时保留；依赖Blob的符号链接会先转为独立文件
+                if not self.index.path_refs(self.blob_store.blob_path(blob_hash)):
+                    self.blob_store.release(blob_hash)
+            elif entry.get('path') and os.path.isfile(entry['path']):
+                os.remove(entry['path'])
+            
+            if entry['kind'] == 'subtitle' and entry.get('path'):
+                raw_result = os.path.join(os.path.dirname(entry['path']), f"{entry['cache_key']}_raw_result.json")
+                if os.path.exists(raw_result):
+                    os.remove(raw_result)
+                if os.path.exists(transcript_path(entry['path'])):
+                    os.remove(transcript_path(entry['path']))
+        except Exception as e:
+            self.logger.warning(f"删除缓存文件失败 {entry['cache_key']}: {str(e)}")
+    
+    def enforce_budget(self, kind: str, keep: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        按配置的字节预算淘汰缓存（LRU/LFU）
+        
+        Args:
+            kind: 条目类型 ('video', 'subtitle')
+            keep: 本次刚写入、不参与淘汰的 (cache_key, language)
+            
+        Returns:
+            List[Dict]: 被淘汰的条目
+        """
+        budget = self.kind_budgets.get(kind, 0)
+        victims = self.index.select_evictions(kind, budget, self.eviction_policy, keep=keep)
+        evicted = []
+        for entry in victims:
+            self._remove_entry(entry)
+            evicted.append(entry)
+            self.logger.info(f"[缓存] 淘汰{kind}缓存({self.eviction_policy}): {entry['cache_key']} "
+                             f"({entry['size'] / 1024 / 1024:.1f} MB, 命中 {entry['hit_count']} 次)")
+        return evicted
+    
+    def evict(self) -> Dict[str, int]:
+        """对所有类型执行预算淘汰，并清理过期的视频元数据，返回各类型淘汰数量"""
+        evicted = {kind: len(self.enforce_budget(kind)) for kind in self.kind_budgets}
+        evicted['metadata'] = self.index.purge_metadata(self.metadata_ttl) if self.metadata_ttl > 0 else 0
+        return evicted
+    
+    def gc_blobs(self, remove_unreferenced: bool = False) -> Dict:
+        """清理Blob存储中的失效引用"""
+        return self.blob_store.gc(remove_unreferenced)
+    
     def clear_cache(self, cache_type: str = None):
         """清理缓存"""
         if cache_type is None:
             # 清理所有缓存
+            entries = self.index.list_entries()
             cache_dirs = [self.videos_cache] + list(self.subtitle_cache_dirs.values())
             cache_names = ['视频'] + [f'{lang}字幕' for lang in self.subtitle_cache_dirs.keys()]
         elif cache_type == 'video':
+            entries = self.index.list_entries('video')
             cache_dirs = [self.videos_cache]
             cache_names = ['视频']
         elif cache_type == 'subtitle_en':
+            entries = self.index.list_entries('subtitle', 'en')
             cache_dirs = [self.subtitles_en_cache]
             cache_names = ['英文字幕']
         else:
+            entries = []
             cache_dirs = []
             cache_names = []
         
+        for entry in entries:
+            self._remove_entry(entry)
+        
+        # 清理目录中残留的旧格式文件
         for cache_dir, cache_name in zip(cache_dirs, cache_names):
             try:
                 if os.path.exists(cache_dir):
@@ -297,64 +502,37 @@ class CacheManager:
                 self.logger.error(f"清理{cache_name}缓存失败: {str(e)}")
     
     def get_cache_stats(self) -> Dict:
-        """获取缓存统计信息"""
+        """获取缓存统计信息（来自索引汇总表，无需扫描目录）"""
         stats = {
             'videos': {'count': 0, 'size': 0},
             'subtitles_en': {'count': 0, 'size': 0}
         }
         
         # 添加多语言字幕统计
-        for lang, cache_dir in self.subtitle_cache_dirs.items():
+        for lang in self.subtitle_cache_dirs.keys():
             stats[f'subtitles_{lang}'] = {'count': 0, 'size': 0}
         
-        # 统计视频缓存
-        if os.path.exists(self.videos_cache):
-            for file in os.listdir(self.videos_cache):
-                file_path = os.path.join(self.videos_cache, file)
-                if os.path.isfile(file_path):
-                    stats['videos']['count'] += 1
-                    stats['videos']['size'] += os.path.getsize(file_path)
-        
-        # 统计字幕缓存
-        for lang, cache_dir in self.subtitle_cache_dirs.items():
-            if os.path.exists(cache_dir):
-                for file in os.listdir(cache_dir):
-                    file_path = os.path.join(cache_dir, file)
-                    if os.path.isfile(file_path):
-                        stats[f'subtitles_{lang}']['count'] += 1
-                        stats[f'subtitles_{lang}']['size'] += os.path.getsize(file_path)
+        for (kind, lang), totals in self.index.totals().items():
+            key = 'videos' if kind == 'video' else f'subtitles_{lang}'
+            stats.setdefault(key, {'count': 0, 'size': 0})
+            stats[key]['count'] += totals['count']
+            stats[key]['size'] += totals['size']
         
         return stats
     
     def list_cached_items(self, cache_type: str) -> List[Dict]:
         """列出指定类型的缓存项"""
-        if cache_type == 'video':
-            cache_dir = self.videos_cache
-        elif cache_type == 'subtitle_en':
-            cache_dir = self.subtitles_en_cache
-        elif cache_type.startswith('subtitle_'):
-            # 提取语言代码
-            lang = cache_type.replace('subtitle_', '')
-            cache_dir = self.subtitle_cache_dirs.get(lang)
-        else:
-            cache_dir = None
-        
-        if not cache_dir or not os.path.exists(cache_dir):
+        if cache_type != 'video' and not cache_type.startswith('subtitle_'):
             return []
         
+        kind, lang = self._resolve_kind(cache_type)
         items = []
-        for file in os.listdir(cache_dir):
-            if file.endswith('_info.json'):
-                cache_key = file.replace('_info.json', '')
-                # 对于多语言字幕，需要传入语言参数
-                if cache_type.startswith('subtitle_') and cache_type != 'subtitle_en':
-                    lang = cache_type.replace('subtitle_', '')
-                    cache_info = self._load_cache_info('subtitle', cache_key, lang)
-                else:
-                    cache_info = self._load_cache_info(cache_type, cache_key)
-                if cache_info:
-                    items.append(cache_info)
-        
-        # 按缓存时间排序
-        items.sort(key=lambda x: x.get('cached_time', ''), reverse=True)
+        for entry in self.index.list_entries(kind, lang):
+            info = entry['info']
+            info.setdefault('cache_key', entry['cache_key'])
+            info['hit_count'] = entry['hit_count']
+            info['last_access'] = datetime.fromtimestamp(entry['last_access']).isoformat()
+            info['size'] = entry['size']
+            items.append(info)
+        
         return items
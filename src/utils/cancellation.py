@@ -0,0 +1,166 @@
+"""
+任务取消
+每个任务持有一个取消令牌，各步骤在循环中检查令牌；外部子进程（ffmpeg/yt-dlp命令行）
+通过 run_cancellable 启动，取消时连同子进程树一起结束。
+"""
+import os
+import sys
+import signal
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """任务已被取消（继承 Exception，步骤内部的通用异常处理会把它当作失败返回，由处理器再识别为取消）"""
+
+    def __init__(self, reason: str = 'cancelled'):
+        super().__init__(f"任务已取消: {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    取消令牌（线程安全）
+
+    cancel() 设置标志并立即执行已注册的回调（如结束子进程），
+    各步骤通过 cancelled / raise_if_cancelled() 协作退出。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = 'cancelled') -> bool:
+        """
+        取消（重复调用无效）
+
+        Args:
+            reason: 取消原因（用户取消/超时等）
+
+        Returns:
+            bool: 本次调用是否触发了取消
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        return True
+
+    def raise_if_cancelled(self) -> None:
+        """已取消时抛出 JobCancelled"""
+        if self._event.is_set():
+            raise JobCancelled(self.reason or 'cancelled')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待取消（可替代 time.sleep），返回是否已取消"""
+        return self._event.wait(timeout)
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]):
+        """
+        在代码块执行期间注册取消回调（已取消时立即执行）
+
+        Args:
+            callback: 取消时调用的函数
+        """
+        with self._lock:
+            callback_id = self._next_id
+            self._next_id += 1
+            self._callbacks[callback_id] = callback
+            already_cancelled = self._event.is_set()
+        if already_cancelled:
+            callback()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.pop(callback_id, None)
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """结束子进程及其所有子孙进程"""
+    if process.poll() is not None:
+        return
+    try:
+        if sys.platform == 'win32':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                           capture_output=True, timeout=10)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+
+def popen_group_kwargs() -> Dict:
+    """让子进程成为独立进程组，便于整体结束"""
+    if sys.platform == 'win32':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def run_cancellable(cmd: List[str], token: Optional[CancellationToken] = None,
+                    timeout: Optional[float] = None, capture_output: bool = False,
+                    **kwargs) -> subprocess.CompletedProcess:
+    """
+    与 subprocess.run 用法一致，取消或超时时结束整个子进程树
+
+    Args:
+        cmd: 命令
+        token: 取消令牌
+        timeout: 超时时间（秒），超时抛出 subprocess.TimeoutExpired
+        capture_output: 是否捕获输出
+        **kwargs: 传给 Popen 的其他参数（text/encoding/errors 等）
+
+    Returns:
+        subprocess.CompletedProcess
+
+    Raises:
+        JobCancelled: 执行期间任务被取消
+    """
+    if token is not None:
+        token.raise_if_cancelled()
+    if capture_output:
+        kwargs['stdout'] = subprocess.PIPE
+        kwargs['stderr'] = subprocess.PIPE
+
+    process = subprocess.Popen(cmd, **popen_group_kwargs(), **kwargs)
+    guard = token.on_cancel(lambda: kill_process_tree(process)) if token is not None else _no_guard()
+    with guard:
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process)
+            process.communicate()
+            raise
+        except BaseException:
+            kill_process_tree(process)
+            raise
+
+    if token is not None:
+        token.raise_if_cancelled()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+@contextmanager
+def _no_guard():
+    yield
@@ -0,0 +1,153 @@
+"""
+运行环境能力注册表
+外部工具（ffmpeg/ffprobe/yt-dlp）和可选Python模块只探测一次，结果在进程内缓存
+"""
+import sys
+import shutil
+import threading
+import subprocess
+import importlib.util
+from typing import Dict, List, Optional
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python < 3.8
+    importlib_metadata = None
+
+
+# 外部命令探测参数
+TOOL_PROBES = {
+    'ffmpeg': ['-version'],
+    'ffprobe': ['-version'],
+    'yt-dlp': ['--version'],
+}
+
+# 可选Python模块: 模块名 -> 发行包名（用于读取版本，不导入模块本身）
+PYTHON_MODULES = {
+    'yt_dlp': 'yt-dlp',
+    'whisper': 'openai-whisper',
+    'torch': 'torch',
+    'imagehash': 'ImageHash',
+    'PIL': 'Pillow',
+    'jinja2': 'Jinja2',
+}
+
+
+class CapabilityRegistry:
+    """
+    能力注册表（线程安全）
+
+    探测结果格式:
+        {'available': bool, 'version': str, 'command': List[str] | None}
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, Dict] = {}
+        self._modules: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _run_probe(command: List[str], args: List[str]) -> Optional[str]:
+        """执行探测命令，成功时返回版本行"""
+        try:
+            result = subprocess.run(command + args, capture_output=True, text=True,
+                                    encoding='utf-8', errors='ignore', timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        lines = result.stdout.strip().splitlines()
+        return lines[0].strip() if lines else ''
+
+    def _probe_tool(self, name: str) -> Dict:
+        """探测外部命令"""
+        # yt-dlp 的 Python 包可用时直接使用模块方式，不启动子进程
+        if name == 'yt-dlp' and self.has_module('yt_dlp'):
+            return {
+                'available': True,
+                'version': self.module('yt_dlp')['version'],
+                'command': [sys.executable, '-m', 'yt_dlp']
+            }
+
+        args = TOOL_PROBES.get(name, ['--version'])
+        candidates = []
+        if shutil.which(name):
+            candidates.append([name])
+        if name == 'yt-dlp':
+            candidates.append([sys.executable, '-m', 'yt_dlp'])
+
+        for command in candidates:
+            version = self._run_probe(command, args)
+            if version is not None:
+                return {'available': True, 'version': version, 'command': command}
+        return {'available': False, 'version': '', 'command': None}
+
+    def tool(self, name: str, refresh: bool = False) -> Dict:
+        """
+        获取外部命令的探测结果
+
+        Args:
+            name: 命令名（ffmpeg/ffprobe/yt-dlp）
+            refresh: 是否忽略缓存重新探测
+        """
+        with self._lock:
+            cached = self._tools.get(name)
+        if cached is not None and not refresh:
+            return cached
+
+        result = self._probe_tool(name)
+        with self._lock:
+            self._tools[name] = result
+        return result
+
+    def module(self, name: str) -> Dict:
+        """
+        获取Python模块的可用性（只查找，不导入）
+
+        Args:
+            name: 模块名
+        """
+        with self._lock:
+            cached = self._modules.get(name)
+        if cached is not None:
+            return cached
+
+        try:
+            available = importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            available = False
+
+        version = ''
+        if available and importlib_metadata is not None:
+            try:
+                version = importlib_metadata.version(PYTHON_MODULES.get(name, name))
+            except Exception:
+                version = ''
+
+        result = {'available': available, 'version': version, 'command': None}
+        with self._lock:
+            self._modules[name] = result
+        return result
+
+    def has_tool(self, name: str) -> bool:
+        """外部命令是否可用"""
+        return self.tool(name)['available']
+
+    def has_module(self, name: str) -> bool:
+        """Python模块是否可用"""
+        return self.module(name)['available']
+
+    def snapshot(self) -> Dict:
+        """探测全部能力并返回结果"""
+        return {
+            'tools': {name: self.tool(name) for name in TOOL_PROBES},
+            'python_modules': {name: self.module(name) for name in PYTHON_MODULES}
+        }
+
+
+_registry = CapabilityRegistry()
+
+
+def get_capabilities() -> CapabilityRegistry:
+    """获取进程内共享的能力注册表"""
+    return _registry
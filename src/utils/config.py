@@ -61,6 +61,12 @@ class Config:
         except ValueError:
             return []
     
+    def set(self, section: str, key: str, value: Any) -> None:
+        """设置配置值（仅修改内存中的配置，不写回文件；命令行参数覆盖配置时使用）"""
+        if not self.config.has_section(section):
+            self.config.add_section(section)
+        self.config.set(section, key, str(value))
+    
     def validate_config(self) -> bool:
         """验证配置文件完整性"""
         required_sections = ['basic', 'step1_download', 'step2_transcribe', 
@@ -9,6 +9,9 @@ from typing import Dict, List, Optional
 from pathlib import Path
 from .config import Config
 from .logger import Logger
+from .project_catalog import ProjectCatalog
+from .file_manifest import DirectoryManifest
+from .file_preview import TEXT_EXTENSIONS, read_head, preview_file
 
 class FileManager:
     def __init__(self, config: Config, logger: Optional[Logger] = None):
@@ -16,6 +19,9 @@ class FileManager:
         self.logger = logger or Logger("file_manager")
         self.output_dir = config.get('basic', 'output_dir', './projects')
         self.temp_dir = config.get('basic', 'temp_dir', './temp')
+        self.catalog_path = (config.get('basic', 'project_catalog', '')
+                             or os.path.join(self.output_dir, '.project_catalog.db'))
+        self._catalog = None
         
         # 确保目录存在
         self._ensure_directories()
@@ -118,87 +124,113 @@ class FileManager:
         with open(summary_file, 'w', encoding='utf-8') as f:
             json.dump(summary, f, ensure_ascii=False, indent=2)
         
+        # 同步更新项目索引（索引写入失败不影响处理，下次重建时恢复）
+        try:
+            self.catalog.upsert(project_path, summary)
+        except Exception as e:
+            self.logger.warning(f"[项目索引] 更新失败 {project_path}: {str(e)}")
+        
         return summary_file
     
+    @property
+    def catalog(self) -> ProjectCatalog:
+        """项目索引（首次使用时打开，索引文件不存在时从磁盘重建）"""
+        if self._catalog is None:
+            self._catalog = ProjectCatalog(self.catalog_path, self.output_dir, self.logger)
+        return self._catalog
+    
     def list_projects(self) -> List[Dict]:
-        """列出所有项目"""
-        projects = []
-        
-        if not os.path.exists(self.output_dir):
-            return projects
+        """列出所有项目（按更新时间倒序）"""
+        return self.catalog.query(per_page=0)['projects']
+    
+    def query_projects(self, **filters) -> Dict:
+        """
+        分页查询项目
         
-        for item in os.listdir(self.output_dir):
-            item_path = os.path.join(self.output_dir, item)
-            if os.path.isdir(item_path):
-                project_info = {
-                    'name': item,
-                    'path': item_path,
-                    'created_time': datetime.fromtimestamp(
-                        os.path.getctime(item_path)
-                    ).isoformat(),
-                    'modified_time': datetime.fromtimestamp(
-                        os.path.getmtime(item_path)
-                    ).isoformat()
-                }
-                
-                # 尝试读取项目总结
-                summary = self.get_project_summary(item_path)
-                if summary:
-                    project_info.update(summary)
-                
-                projects.append(project_info)
+        Args:
+            **filters: page/per_page/sort/order/status/platform/language/batch_id/since/until/search，
+                       见 ProjectCatalog.query
         
-        # 按修改时间排序
-        projects.sort(key=lambda x: x['modified_time'], reverse=True)
-        return projects
+        Returns:
+            Dict: {'projects', 'total', 'page', 'per_page', 'pages'}
+        """
+        return self.catalog.query(**filters)
     
     def get_step_files(self, project_path: str, step_name: str) -> List[Dict]:
-        """获取步骤的所有文件"""
-        step_dir = self.get_step_directory(project_path, step_name)
-        files = []
+        """
+        获取步骤目录的文件（基于目录清单，不逐个读取文件属性）
         
-        for item in os.listdir(step_dir):
-            item_path = os.path.join(step_dir, item)
-            if os.path.isfile(item_path):
-                file_info = {
-                    'name': item,
-                    'path': item_path,
-                    'size': os.path.getsize(item_path),
-                    'modified_time': datetime.fromtimestamp(
-                        os.path.getmtime(item_path)
-                    ).isoformat(),
-                    'extension': os.path.splitext(item)[1].lower()
-                }
-                files.append(file_info)
-            elif os.path.isdir(item_path):
-                # 处理子目录（如screenshots目录）
-                subfiles = []
-                for subitem in os.listdir(item_path):
-                    subitem_path = os.path.join(item_path, subitem)
-                    if os.path.isfile(subitem_path):
-                        subfile_info = {
-                            'name': subitem,
-                            'path': subitem_path,
-                            'size': os.path.getsize(subitem_path),
-                            'modified_time': datetime.fromtimestamp(
-                                os.path.getmtime(subitem_path)
-                            ).isoformat(),
-                            'extension': os.path.splitext(subitem)[1].lower()
-                        }
-                        subfiles.append(subfile_info)
-                
-                if subfiles:
-                    dir_info = {
-                        'name': item,
-                        'path': item_path,
-                        'is_directory': True,
-                        'files': subfiles,
-                        'file_count': len(subfiles)
-                    }
-                    files.append(dir_info)
+        子目录（如 screenshots）只返回文件数和总大小，具体文件通过 list_step_files 分页获取。
+        
+        Args:
+            project_path: 项目目录
+            step_name: 步骤目录名
+        
+        Returns:
+            List[Dict]: 文件信息列表
+        """
+        self.get_step_directory(project_path, step_name)
+        manifest = DirectoryManifest(project_path, step_name)
+        content = manifest.load()
+        files = [{'name': name, 'path': os.path.join(manifest.dir_path, name), **info}
+                 for name, info in content['files'].items()]
+        
+        for subdir in content['directories']:
+            summary = DirectoryManifest.summarize(DirectoryManifest(project_path, f'{step_name}/{subdir}').load())
+            if summary['file_count']:
+                files.append({
+                    'name': subdir,
+                    'path': os.path.join(manifest.dir_path, subdir),
+                    'is_directory': True,
+                    'file_count': summary['file_count'],
+                    'total_size': summary['total_size'],
+                    'by_type': summary['by_type']
+                })
         
         return files
     
+    def list_step_files(self, project_path: str, step_name: str, subdir: str = '', cursor: Optional[str] = None,
+                        limit: int = 100, file_types: Optional[List[str]] = None,
+                        extensions: Optional[List[str]] = None) -> Dict:
+        """
+        分页列出步骤目录（或其子目录）的文件
+        
+        Args:
+            project_path: 项目目录
+            step_name: 步骤目录名
+            subdir: 子目录名（如 screenshots），为空时列出步骤目录本身
+            cursor: 上一页返回的 next_cursor
+            limit: 每页数量
+            file_types: 只返回这些类型（image/video/audio/text/other）
+            extensions: 只返回这些扩展名
+        
+        Returns:
+            Dict: {'success', 'files', 'next_cursor', 'summary', 'etag'}，目录不存在时 success 为 False
+        """
+        rel_dir = f'{step_name}/{subdir}' if subdir else step_name
+        manifest = DirectoryManifest(project_path, rel_dir)
+        if not os.path.isdir(manifest.dir_path):
+            return {'success': False, 'error': f'目录不存在: {rel_dir}'}
+        
+        result = manifest.page(cursor=cursor, limit=limit, file_types=file_types, extensions=extensions)
+        result['success'] = True
+        return result
+    
+    def refresh_step_manifests(self, project_path: str, step_name: str) -> None:
+        """
+        刷新步骤目录及其子目录的清单（步骤写完文件后调用）
+        
+        Args:
+            project_path: 项目目录
+            step_name: 步骤目录名
+        """
+        try:
+            content = DirectoryManifest(project_path, step_name).refresh()
+            for subdir in content['directories']:
+                DirectoryManifest(project_path, f'{step_name}/{subdir}').refresh()
+        except OSError as e:
+            self.logger.warning(f"[文件清单] 刷新失败 {step_name}: {str(e)}")
+    
     def cleanup_temp_files(self) -> None:
         """清理临时文件"""
         if os.path.exists(self.temp_dir):
@@ -234,22 +266,18 @@ class FileManager:
         return filename
     
     def get_file_content_preview(self, file_path: str, max_lines: int = 20) -> str:
-        """获取文件内容预览"""
+        """获取文件内容预览（只读取开头的若干行）"""
         if not os.path.exists(file_path):
             return "文件不存在"
         
         try:
             file_ext = os.path.splitext(file_path)[1].lower()
             
-            if file_ext in ['.txt', '.srt', '.md', '.json', '.log']:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if len(lines) <= max_lines:
-                        return ''.join(lines)
-                    else:
-                        preview_lines = lines[:max_lines]
-                        preview_lines.append(f"\n... (还有 {len(lines) - max_lines} 行)")
-                        return ''.join(preview_lines)
+            if file_ext in TEXT_EXTENSIONS:
+                preview = read_head(file_path, max_lines)
+                if preview['truncated']:
+                    return preview['content'] + "\n... (文件未完整显示)"
+                return preview['content']
             
             elif file_ext in ['.png', '.jpg', '.jpeg']:
                 return f"图片文件: {os.path.basename(file_path)}"
@@ -263,6 +291,23 @@ class FileManager:
         except Exception as e:
             return f"无法读取文件: {str(e)}"
     
+    def preview_file(self, file_path: str, mode: str = 'head', **options) -> Dict:
+        """
+        按窗口预览文件，内存占用与文件大小无关
+        
+        Args:
+            file_path: 文件路径
+            mode: head / tail / range / srt / json，见 file_preview.preview_file
+            **options: lines / offset / length / limit
+        
+        Returns:
+            Dict: 预览结果（含 content），非文本文件只返回说明
+        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext not in TEXT_EXTENSIONS:
+            return {'mode': 'none', 'content': self.get_file_content_preview(file_path), 'truncated': False}
+        return preview_file(file_path, mode, **options)
+    
     def get_finaloutput_directory(self, project_path: str) -> str:
         """获取 FinalOutput 目录路径"""
         finaloutput_dir = os.path.join(project_path, 'FinalOutput')
@@ -0,0 +1,204 @@
+"""
+步骤目录清单
+每个步骤目录（及其子目录，如 screenshots）的文件列表保存在项目的 .manifests/ 中，
+由写入文件的步骤在完成后刷新；读取时只检查目录的修改时间，目录有新增/删除文件时才重新扫描。
+文件列表接口据此分页（游标）、按类型过滤并返回汇总计数，清单的 etag 用于 HTTP 304。
+"""
+import os
+import json
+import base64
+import hashlib
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 清单保存位置（项目目录下），不放在被列出的目录中，避免写清单本身改变目录修改时间
+MANIFEST_DIR = '.manifests'
+
+# 文件类型分类（用于过滤和汇总）
+FILE_TYPES = {
+    'image': ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp'),
+    'video': ('.mp4', '.mkv', '.webm', '.avi', '.mov', '.flv'),
+    'audio': ('.wav', '.mp3', '.m4a', '.aac', '.flac', '.ogg'),
+    'text': ('.md', '.txt', '.srt', '.vtt', '.json', '.jsonl', '.log', '.html', '.csv'),
+}
+
+# 单页最大条目数
+MAX_PAGE_SIZE = 1000
+
+
+def file_type(extension: str) -> str:
+    """按扩展名分类：image/video/audio/text/other"""
+    for name, extensions in FILE_TYPES.items():
+        if extension in extensions:
+            return name
+    return 'other'
+
+
+def encode_cursor(name: str) -> str:
+    """分页游标（上一页最后一个文件名）"""
+    return base64.urlsafe_b64encode(name.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """解析分页游标，无效时返回空字符串（从第一页开始）"""
+    try:
+        return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return ''
+
+
+class DirectoryManifest:
+    """
+    单个目录的文件清单
+
+    清单内容: {'dir_mtime_ns', 'updated', 'etag', 'files': {文件名: {size, modified_time, extension, type}},
+              'directories': [子目录名]}
+    """
+
+    def __init__(self, project_path: str, rel_dir: str):
+        """
+        Args:
+            project_path: 项目目录
+            rel_dir: 相对项目目录的路径（如 step3_screenshots/screenshots）
+        """
+        self.project_path = project_path
+        self.rel_dir = rel_dir.replace('\\', '/').strip('/')
+        self.dir_path = os.path.join(project_path, *self.rel_dir.split('/'))
+        self.manifest_path = os.path.join(project_path, MANIFEST_DIR, self.rel_dir.replace('/', '__') + '.json')
+
+    def _dir_mtime_ns(self) -> int:
+        try:
+            return os.stat(self.dir_path).st_mtime_ns
+        except OSError:
+            return -1
+
+    def load(self) -> Dict:
+        """
+        读取清单：目录修改时间与清单一致时直接使用，否则重新扫描
+
+        Returns:
+            Dict: 清单内容
+        """
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('dir_mtime_ns') == self._dir_mtime_ns():
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return self.refresh()
+
+    def refresh(self) -> Dict:
+        """
+        扫描目录并保存清单（步骤写完文件后调用）
+
+        Returns:
+            Dict: 清单内容
+        """
+        dir_mtime_ns = self._dir_mtime_ns()
+        files, directories = {}, []
+        if dir_mtime_ns >= 0:
+            with os.scandir(self.dir_path) as entries:
+                for entry in entries:
+                    # 隐藏文件（如媒体信息的旁路缓存）不列出
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            directories.append(entry.name)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            extension = os.path.splitext(entry.name)[1].lower()
+                            files[entry.name] = {
+                                'size': stat.st_size,
+                                'modified_time': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                                'extension': extension,
+                                'type': file_type(extension)
+                            }
+                    except OSError:
+                        continue
+
+        files = dict(sorted(files.items()))
+        directories.sort()
+        digest = hashlib.sha1(json.dumps([files, directories], sort_keys=True).encode('utf-8')).hexdigest()
+        manifest = {
+            'dir_mtime_ns': dir_mtime_ns,
+            'updated': datetime.now().isoformat(),
+            'etag': digest[:16],
+            'files': files,
+            'directories': directories
+        }
+        self._save(manifest)
+        return manifest
+
+    def _save(self, manifest: Dict) -> None:
+        """原子写入清单（写入失败时只影响下次读取的速度）"""
+        try:
+            manifest_dir = os.path.dirname(self.manifest_path)
+            os.makedirs(manifest_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=manifest_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(temp_path, self.manifest_path)
+        except OSError:
+            pass
+
+    def page(self, cursor: Optional[str] = None, limit: int = 100, file_types: Optional[List[str]] = None,
+             extensions: Optional[List[str]] = None, manifest: Optional[Dict] = None) -> Dict:
+        """
+        分页列出文件（按文件名排序）
+
+        Args:
+            cursor: 上一页返回的 next_cursor
+            limit: 每页数量（最大 MAX_PAGE_SIZE）
+            file_types: 只返回这些类型（image/video/audio/text/other）
+            extensions: 只返回这些扩展名（如 .png）
+            manifest: 已读取的清单（避免重复读取）
+
+        Returns:
+            Dict: {'files', 'next_cursor', 'summary', 'etag'}
+        """
+        manifest = manifest or self.load()
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else ''
+        extensions = [e.lower() if e.startswith('.') else f'.{e.lower()}' for e in (extensions or [])]
+
+        matched = []
+        for name, info in manifest['files'].items():
+            if file_types and info['type'] not in file_types:
+                continue
+            if extensions and info['extension'] not in extensions:
+                continue
+            matched.append((name, info))
+
+        start = 0
+        if after:
+            start = next((i for i, (name, _) in enumerate(matched) if name > after), len(matched))
+        page = matched[start:start + limit]
+        has_more = start + limit < len(matched)
+
+        return {
+            'files': [{'name': name, 'path': os.path.join(self.dir_path, name), **info} for name, info in page],
+            'next_cursor': encode_cursor(page[-1][0]) if has_more and page else None,
+            'summary': self.summarize(manifest, matched_count=len(matched)),
+            'etag': manifest['etag']
+        }
+
+    @staticmethod
+    def summarize(manifest: Dict, matched_count: Optional[int] = None) -> Dict:
+        """汇总：文件数、总大小、各类型数量"""
+        by_type: Dict[str, int] = {}
+        total_size = 0
+        for info in manifest['files'].values():
+            by_type[info['type']] = by_type.get(info['type'], 0) + 1
+            total_size += info['size']
+        summary = {
+            'file_count': len(manifest['files']),
+            'total_size': total_size,
+            'by_type': by_type,
+            'directories': list(manifest['directories'])
+        }
+        if matched_count is not None:
+            summary['matched'] = matched_count
+        return summary
@@ -0,0 +1,359 @@
+"""
+文件预览
+只读取请求的窗口（开头/末尾/指定偏移），内存占用与文件大小无关；
+字幕和JSON提供结构化预览：前N条字幕、顶层键及其值的类型和大小，均为流式解析，不加载整个文件。
+"""
+import os
+import re
+import json
+from typing import Dict, List, Optional
+
+# 单次预览读取的字节上限
+MAX_PREVIEW_BYTES = 256 * 1024
+# 单次预览的行数上限
+MAX_PREVIEW_LINES = 1000
+# 分块读取大小
+CHUNK_SIZE = 64 * 1024
+
+# 按文本预览的扩展名
+TEXT_EXTENSIONS = ('.txt', '.srt', '.vtt', '.md', '.json', '.jsonl', '.log', '.csv', '.html')
+
+PREVIEW_MODES = ('head', 'tail', 'range', 'srt', 'json')
+
+
+def _decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def read_head(file_path: str, max_lines: int = 20, max_bytes: int = MAX_PREVIEW_BYTES) -> Dict:
+    """
+    读取文件开头的若干行
+
+    Args:
+        file_path: 文件路径
+        max_lines: 最多行数
+        max_bytes: 最多字节数（单行过长时截断）
+
+    Returns:
+        Dict: {'content', 'lines', 'bytes_read', 'truncated'}
+    """
+    lines, bytes_read = [], 0
+    with open(file_path, 'rb') as f:
+        while len(lines) < max_lines and bytes_read < max_bytes:
+            line = f.readline(max_bytes - bytes_read)
+            if not line:
+                break
+            lines.append(line)
+            bytes_read += len(line)
+        truncated = bool(f.read(1))
+    return {
+        'content': _decode(b''.join(lines)),
+        'lines': len(lines),
+        'bytes_read': bytes_read,
+        'truncated': truncated
+    }
+
+
+def read_tail(file_path: str, max_lines: int = 20, max_bytes: int = MAX_PREVIEW_BYTES) -> Dict:
+    """
+    读取文件末尾的若干行（从文件末尾按块向前读）
+
+    Args:
+        file_path: 文件路径
+        max_lines: 最多行数
+        max_bytes: 最多字节数
+
+    Returns:
+        Dict: {'content', 'lines', 'bytes_read', 'truncated', 'offset'}，offset 为返回内容在文件中的起始位置
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = position = f.tell()
+        data = b''
+        # 多读一个换行符才能确定第一行完整
+        while position > 0 and data.count(b'\n') <= max_lines and end - position < max_bytes:
+            step = min(CHUNK_SIZE, position, max_bytes - (end - position))
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    body = data[:-1] if data.endswith(b'\n') else data
+    lines = body.split(b'\n')
+    if position > 0 and len(lines) > 1:
+        # 没有读到文件开头时第一行可能不完整，丢弃
+        lines = lines[1:]
+    kept = lines[-max_lines:]
+    content = b'\n'.join(kept) + (b'\n' if data.endswith(b'\n') else b'')
+    return {
+        'content': _decode(content),
+        'lines': len(kept) if content else 0,
+        'bytes_read': len(content),
+        'truncated': end - len(content) > 0,
+        'offset': end - len(content)
+    }
+
+
+def read_range(file_path: str, offset: int = 0, length: int = 64 * 1024) -> Dict:
+    """
+    读取指定字节范围（用于分段浏览大文件）
+
+    Args:
+        file_path: 文件路径
+        offset: 起始字节
+        length: 字节数（不超过 MAX_PREVIEW_BYTES）
+
+    Returns:
+        Dict: {'content', 'offset', 'bytes_read', 'next_offset', 'truncated'}，读完时 next_offset 为 None
+    """
+    size = os.path.getsize(file_path)
+    offset = max(0, min(int(offset), size))
+    length = max(1, min(int(length), MAX_PREVIEW_BYTES))
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    next_offset = offset + len(data)
+    return {
+        'content': _decode(data),
+        'offset': offset,
+        'bytes_read': len(data),
+        'next_offset': next_offset if next_offset < size else None,
+        'truncated': next_offset < size
+    }
+
+
+def srt_cues(file_path: str, limit: int = 20) -> Dict:
+    """
+    逐行解析SRT字幕，返回前 limit 条
+
+    Args:
+        file_path: 字幕文件
+        limit: 条数
+
+    Returns:
+        Dict: {'cues': [{'index', 'start', 'end', 'text'}], 'truncated'}
+    """
+    cues: List[Dict] = []
+    block: List[str] = []
+    truncated = False
+
+    def flush():
+        # 字幕块: 序号 / 时间轴 / 文本（序号缺失时也能识别）
+        timing = next((i for i, line in enumerate(block) if '-->' in line), None)
+        if timing is not None:
+            start, _, end = block[timing].partition('-->')
+            index = block[timing - 1].strip() if timing > 0 else str(len(cues) + 1)
+            cues.append({
+                'index': int(index) if index.isdigit() else len(cues) + 1,
+                'start': start.strip(),
+                'end': end.strip(),
+                'text': '\n'.join(block[timing + 1:])
+            })
+        block.clear()
+
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line.strip():
+                block.append(line)
+                continue
+            if block:
+                if len(cues) >= limit:
+                    truncated = True
+                    break
+                flush()
+        else:
+            # 文件末尾没有空行时，最后一个字幕块在这里处理
+            if block:
+                if len(cues) >= limit:
+                    truncated = True
+                else:
+                    flush()
+    return {'cues': cues, 'truncated': truncated}
+
+
+class _JSONScanner:
+    """
+    流式扫描JSON顶层结构（不构造对象）：顶层为对象时记录各键的值类型和字节数，顶层为数组时统计元素数
+
+    顶层按记号处理；字符串和嵌套内容用正则跳到下一个引号/括号，只跟踪括号深度。
+    """
+
+    TOKEN = re.compile(r'\s*([\[\]{}:,"]|[^\s\[\]{}:,"]+)')
+    STRING_STOP = re.compile(r'[\\"]')
+    NESTED_STOP = re.compile(r'[\[\]{}"]')
+    TYPES = {'{': 'object', '[': 'array', '"': 'string', 't': 'boolean', 'f': 'boolean', 'n': 'null'}
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.root = None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.offset = 0
+        self.expect_key = False
+        self.expect_value = False
+        self.key_buffer: Optional[List[str]] = None
+        self.keys: List[Dict] = []
+        self.items = 0
+        self.item_started = False
+        self.truncated = False
+        self.done = False
+
+    def feed(self, text: str) -> bool:
+        """处理一段文本，已收集到足够的键或顶层结构已结束时返回 False"""
+        pos, length = 0, len(text)
+        while pos < length and not (self.truncated or self.done):
+            if self.in_string:
+                pos = self._scan_string(text, pos)
+            elif self.depth > 1:
+                match = self.NESTED_STOP.search(text, pos)
+                if not match:
+                    break
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self.in_string = True
+                else:
+                    self.depth += 1 if char in '{[' else -1
+            else:
+                match = self.TOKEN.match(text, pos)
+                if not match:
+                    break
+                pos = match.end()
+                self._consume(match.group(1), self.offset + match.start(1))
+        self.offset += length
+        return not (self.truncated or self.done)
+
+    def _scan_string(self, text: str, pos: int) -> int:
+        """跳过字符串内容（顶层对象的键记录到 key_buffer），返回处理到的位置"""
+        if self.escape:
+            self.escape = False
+            if self.key_buffer is not None:
+                self.key_buffer.append(text[pos])
+            return pos + 1
+        match = self.STRING_STOP.search(text, pos)
+        stop = match.start() if match else len(text)
+        if self.key_buffer is not None:
+            self.key_buffer.append(text[pos:stop])
+        if not match:
+            return stop
+        if match.group() == '\\':
+            self.escape = True
+            return stop + 1
+
+        self.in_string = False
+        if self.key_buffer is not None:
+            if len(self.keys) >= self.max_keys:
+                self.truncated = True
+            else:
+                self.keys.append({'key': ''.join(self.key_buffer), 'type': None, 'size': None, '_start': 0})
+            self.key_buffer = None
+        return stop + 1
+
+    def _finish_value(self, position: int):
+        if self.root == 'object' and self.keys and self.keys[-1]['size'] is None:
+            self.keys[-1]['size'] = position - self.keys[-1].pop('_start')
+
+    def _consume(self, token: str, position: int):
+        """处理顶层（深度0/1）的一个记号"""
+        if self.root is None:
+            self.root = self.TYPES.get(token[0], 'number')
+            self.depth = 1
+            self.expect_key = token == '{'
+            if token not in ('{', '['):
+                # 顶层不是对象或数组，没有结构可显示
+                self.done = True
+            return
+
+        if self.expect_key and token == '"':
+            self.in_string = True
+            self.key_buffer = []
+            self.expect_key = False
+            return
+        if token == ':':
+            self.expect_value = True
+            return
+        if token == ',':
+            self._finish_value(position)
+            self.expect_key = self.root == 'object'
+            self.item_started = False
+            return
+        if token in ('}', ']'):
+            self._finish_value(position)
+            self.depth = 0
+            self.done = True
+            return
+        if self.expect_value and self.keys:
+            self.keys[-1]['type'] = self.TYPES.get(token[0], 'number')
+            self.keys[-1]['_start'] = position
+            self.expect_value = False
+        if self.root == 'array' and not self.item_started:
+            self.items += 1
+            self.item_started = True
+
+        if token == '"':
+            self.in_string = True
+        elif token in ('{', '['):
+            self.depth += 1
+
+
+def json_outline(file_path: str, max_keys: int = 50) -> Dict:
+    """
+    流式读取JSON顶层结构
+
+    Args:
+        file_path: JSON文件
+        max_keys: 最多返回的键数
+
+    Returns:
+        Dict: {'root': object/array/..., 'keys': [{'key', 'type', 'size'}], 'items', 'truncated'}，
+              size 为值的字符数（近似大小）
+    """
+    scanner = _JSONScanner(max_keys)
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk or not scanner.feed(chunk):
+                break
+    for key in scanner.keys:
+        key.pop('_start', None)
+    outline = {'root': scanner.root, 'keys': scanner.keys, 'truncated': scanner.truncated}
+    if scanner.root == 'array':
+        outline['items'] = scanner.items
+    return outline
+
+
+def preview_file(file_path: str, mode: str = 'head', lines: int = 20, offset: int = 0,
+                 length: int = 64 * 1024, limit: int = 20) -> Dict:
+    """
+    按模式预览文件
+
+    Args:
+        file_path: 文件路径
+        mode: head（开头若干行）/ tail（末尾若干行）/ range（字节范围）/ srt（前N条字幕）/ json（顶层结构）
+        lines: head/tail 的行数
+        offset: range 的起始字节
+        length: range 的字节数
+        limit: srt 的条数 / json 的键数
+
+    Returns:
+        Dict: 预览结果，均包含 'mode' 和 'content'（文本形式，兼容只显示文本的页面）
+    """
+    lines = max(1, min(int(lines), MAX_PREVIEW_LINES))
+    limit = max(1, min(int(limit), MAX_PREVIEW_LINES))
+    if mode == 'tail':
+        result = read_tail(file_path, lines)
+    elif mode == 'range':
+        result = read_range(file_path, offset, length)
+    elif mode == 'srt':
+        result = srt_cues(file_path, limit)
+        result['content'] = '\n\n'.join(f"{c['index']}\n{c['start']} --> {c['end']}\n{c['text']}"
+                                        for c in result['cues'])
+    elif mode == 'json':
+        result = json_outline(file_path, limit)
+        result['content'] = json.dumps(result, ensure_ascii=False, indent=2)
+    else:
+        mode = 'head'
+        result = read_head(file_path, lines)
+    result['mode'] = mode
+    return result
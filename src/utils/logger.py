@@ -1,15 +1,206 @@
 """
 日志系统模块
+
+所有 Logger 把日志记录放入同一个队列，由一个后台线程写入：同名的 Logger 共用一个文件处理器（按日期切换文件），
+控制台只有一个彩色输出处理器；项目日志（project_log）也在后台线程写入。
+调用方只做级别判断和消息格式化，支持 logger.debug("进度: %s", value) 形式在级别关闭时跳过格式化。
 """
-import logging
 import os
-from datetime import datetime
-from typing import Optional
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
 from colorama import init, Fore, Back, Style
 
+from .tracing import get_tracer
+from .project_log import project_log_handler, close_project_log
+
 # 初始化colorama
 init()
 
+# 控制台标签颜色
+TAG_COLORS = {
+    'DEBUG': Fore.WHITE,
+    'INFO': Fore.BLUE,
+    'SUCCESS': Fore.GREEN,
+    'WARNING': Fore.YELLOW,
+    'ERROR': Fore.RED,
+    'CRITICAL': f"{Back.RED}{Fore.WHITE}",
+    'STEP START': Fore.MAGENTA,
+    'STEP COMPLETE': Fore.GREEN,
+    'FILE': Fore.GREEN,
+}
+
+FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class ConsoleFormatter(logging.Formatter):
+    """控制台格式：彩色的 [标签] 消息"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        tag = getattr(record, 'tag', record.levelname)
+        text = f"{TAG_COLORS.get(tag, '')}[{tag}] {getattr(record, 'display', record.getMessage())}{Style.RESET_ALL}"
+        if record.exc_text:
+            text += f"\n{record.exc_text}"
+        if tag == 'STEP START':
+            text = f"\n{text}\n{'-' * 50}"
+        elif tag == 'STEP COMPLETE':
+            text = f"{text}\n{'-' * 50}"
+        return text
+
+
+class StdoutHandler(logging.StreamHandler):
+    """写入当前的 sys.stdout（与 print 一致，stdout 被重定向后跟随重定向）"""
+
+    def __init__(self):
+        super().__init__()
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class QueueingHandler(logging.Handler):
+    """
+    每个日志名一个（同名 Logger 共用）：在调用线程中完成格式化并记录所属项目，然后放入写入队列
+    """
+
+    def __init__(self, log_dir: str):
+        super().__init__(logging.DEBUG)
+        self.log_dir = log_dir
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # 参数和异常在调用线程中格式化，避免后台线程读取到已被修改的对象
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            record.log_dir = self.log_dir
+            record.project_context = get_tracer().current_context()
+            _writer.submit(record)
+        except Exception:
+            self.handleError(record)
+
+
+class LogWriter:
+    """后台写入线程（进程内唯一）"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._files: Dict[Tuple[str, str], Tuple[str, logging.FileHandler]] = {}
+        self.console = StdoutHandler()
+        self.console.setLevel(logging.INFO)
+        self.console.setFormatter(ConsoleFormatter())
+        self.file_formatter = logging.Formatter(FILE_FORMAT)
+
+    def submit(self, record: logging.LogRecord) -> None:
+        """放入写入队列（首次调用或fork后的子进程中启动写入线程）"""
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                    self._files = {}
+                    self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+        self._queue.put(record)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            if callable(item):
+                try:
+                    item()
+                except Exception:
+                    pass
+                continue
+            self._dispatch(item)
+
+    def _file_handler(self, log_dir: str, name: str, created: float) -> logging.FileHandler:
+        """同名日志共用的文件处理器，日期变化时切换到新文件"""
+        date = time.strftime('%Y%m%d', time.localtime(created))
+        key = (log_dir, name)
+        current = self._files.get(key)
+        if current and current[0] == date:
+            return current[1]
+        if current:
+            current[1].close()
+        os.makedirs(log_dir, exist_ok=True)
+        handler = logging.FileHandler(os.path.join(log_dir, f"{name}_{date}.log"), encoding='utf-8')
+        handler.setFormatter(self.file_formatter)
+        self._files[key] = (date, handler)
+        return handler
+
+    def _dispatch(self, record: logging.LogRecord) -> None:
+        try:
+            self._file_handler(record.log_dir, record.name, record.created).handle(record)
+        except OSError:
+            pass
+        if record.levelno >= self.console.level:
+            self.console.handle(record)
+        project_log_handler().handle(record)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        等待队列中已有的日志写完
+
+        Returns:
+            bool: 是否在超时前写完
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def call(self, func: Callable[[], None]) -> None:
+        """队列中已有的日志写完后在写入线程中执行 func（写入线程未运行时直接执行）"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            func()
+            return
+        self._queue.put(func)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """写完剩余日志后停止写入线程（进程退出时调用）"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        for _, handler in self._files.values():
+            handler.close()
+        self._files = {}
+
+
+_writer = LogWriter()
+atexit.register(_writer.stop)
+
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """等待已记录的日志写入文件（读取日志文件前调用）"""
+    return _writer.flush(timeout)
+
+
+def release_project_log(project_path: str) -> None:
+    """该项目已记录的日志写完后关闭项目日志的文件句柄（任务或步骤执行结束时调用，不等待）"""
+    _writer.call(lambda: close_project_log(project_path))
+
+
 class Logger:
     def __init__(self, name: str, log_dir: str = "logs"):
         self.name = name
@@ -17,79 +208,57 @@ class Logger:
         self.logger = self._setup_logger()
     
     def _setup_logger(self) -> logging.Logger:
-        """设置日志记录器"""
-        # 创建日志目录
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
-        
-        # 创建logger
+        """设置日志记录器（同名 Logger 共用处理器，重复创建不会重复打开文件）"""
         logger = logging.getLogger(self.name)
         logger.setLevel(logging.DEBUG)
+        logger.propagate = False
         
-        # 清除已有的处理器
-        logger.handlers.clear()
-        
-        # 创建文件处理器
-        log_filename = f"{self.log_dir}/{self.name}_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # 创建格式器
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_formatter = logging.Formatter(
-            '%(levelname)s - %(message)s'
-        )
-        
-        # 设置格式器
-        file_handler.setFormatter(file_formatter)
-        console_handler.setFormatter(console_formatter)
-        
-        # 添加处理器
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        handler = next((h for h in logger.handlers if isinstance(h, QueueingHandler)), None)
+        if handler is None:
+            logger.handlers.clear()
+            logger.addHandler(QueueingHandler(self.log_dir))
+        else:
+            handler.log_dir = self.log_dir
         
         return logger
     
-    def debug(self, message: str) -> None:
+    def _log(self, level: int, tag: str, message: str, args: tuple, exc_info: bool = False,
+             file_prefix: str = '') -> None:
+        """级别开启时才记录（args 非空时按 % 格式化，推迟到级别判断之后）"""
+        if not self.logger.isEnabledFor(level):
+            return
+        if args:
+            message = message % args
+        # 日志格式不包含调用位置，直接构造记录，跳过 logging 的调用栈查找
+        record = self.logger.makeRecord(self.name, level, '(unknown)', 0,
+                                        f"{file_prefix}{message}" if file_prefix else message, None,
+                                        sys.exc_info() if exc_info else None,
+                                        extra={'tag': tag, 'display': message})
+        self.logger.handle(record)
+    
+    def debug(self, message: str, *args) -> None:
         """记录调试日志"""
-        self.logger.debug(message)
+        self._log(logging.DEBUG, 'DEBUG', message, args)
     
-    def info(self, message: str) -> None:
+    def info(self, message: str, *args) -> None:
         """记录信息日志"""
-        colored_message = f"{Fore.BLUE}[INFO] {message}{Style.RESET_ALL}"
-        self.logger.info(message)
-        # 直接打印带颜色的消息到控制台
-        print(colored_message)
+        self._log(logging.INFO, 'INFO', message, args)
     
-    def success(self, message: str) -> None:
+    def success(self, message: str, *args) -> None:
         """记录成功日志"""
-        colored_message = f"{Fore.GREEN}[SUCCESS] {message}{Style.RESET_ALL}"
-        self.logger.info(f"SUCCESS: {message}")
-        print(colored_message)
+        self._log(logging.INFO, 'SUCCESS', message, args, file_prefix='SUCCESS: ')
     
-    def warning(self, message: str) -> None:
+    def warning(self, message: str, *args) -> None:
         """记录警告日志"""
-        colored_message = f"{Fore.YELLOW}[WARNING] {message}{Style.RESET_ALL}"
-        self.logger.warning(message)
-        print(colored_message)
+        self._log(logging.WARNING, 'WARNING', message, args)
     
-    def error(self, message: str, exc_info: bool = False) -> None:
+    def error(self, message: str, *args, exc_info: bool = False) -> None:
         """记录错误日志"""
-        colored_message = f"{Fore.RED}[ERROR] {message}{Style.RESET_ALL}"
-        self.logger.error(message, exc_info=exc_info)
-        print(colored_message)
+        self._log(logging.ERROR, 'ERROR', message, args, exc_info=exc_info)
     
-    def critical(self, message: str) -> None:
+    def critical(self, message: str, *args) -> None:
         """记录严重错误日志"""
-        colored_message = f"{Back.RED}{Fore.WHITE}[CRITICAL] {message}{Style.RESET_ALL}"
-        self.logger.critical(message)
-        print(colored_message)
+        self._log(logging.CRITICAL, 'CRITICAL', message, args)
     
     def progress(self, current: int, total: int, message: str = "") -> None:
         """记录进度信息"""
@@ -118,23 +287,12 @@ class Logger:
     
     def step_start(self, step_num: int, step_name: str) -> None:
         """记录步骤开始"""
-        message = f"开始执行步骤 {step_num}: {step_name}"
-        colored_message = f"{Fore.MAGENTA}[STEP START] {message}{Style.RESET_ALL}"
-        self.logger.info(message)
-        print(f"\n{colored_message}")
-        print("-" * 50)
+        self._log(logging.INFO, 'STEP START', f"开始执行步骤 {step_num}: {step_name}", ())
     
     def step_complete(self, step_num: int, step_name: str) -> None:
         """记录步骤完成"""
-        message = f"步骤 {step_num} 完成: {step_name}"
-        colored_message = f"{Fore.GREEN}[STEP COMPLETE] {message}{Style.RESET_ALL}"
-        self.logger.info(message)
-        print(f"{colored_message}")
-        print("-" * 50)
+        self._log(logging.INFO, 'STEP COMPLETE', f"步骤 {step_num} 完成: {step_name}", ())
     
     def file_created(self, file_path: str) -> None:
         """记录文件创建"""
-        message = f"文件已创建: {file_path}"
-        colored_message = f"{Fore.GREEN}[FILE] {message}{Style.RESET_ALL}"
-        self.logger.info(message)
-        print(colored_message)
+        self._log(logging.INFO, 'FILE', f"文件已创建: {file_path}", ())
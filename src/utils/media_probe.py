@@ -0,0 +1,261 @@
+"""
+媒体信息探测
+每个文件只运行一次 ffprobe（格式+全部流，可选关键帧），结果按 (路径, 大小, 修改时间) 缓存在进程内，
+并写入文件旁的隐藏JSON（.<文件名>.probe.json），重试步骤或重启服务后仍可复用。
+Validator 的视频校验、时长、分辨率和各步骤都读取同一份结果。
+"""
+import os
+import json
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .capabilities import get_capabilities
+
+# 缓存格式版本（结果字段变化时递增，旧的旁路文件自动失效）
+PROBE_VERSION = 1
+SIDECAR_SUFFIX = '.probe.json'
+
+# 进程内最多缓存的文件数
+MAX_CACHED = 256
+PROBE_TIMEOUT = 30
+KEYFRAME_TIMEOUT = 120
+
+
+def sidecar_path(file_path: str) -> str:
+    """旁路缓存文件路径（与媒体文件同目录的隐藏文件）"""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f'.{name}{SIDECAR_SUFFIX}')
+
+
+def _number(value, cast=float, default=0):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _frame_rate(value: Optional[str]) -> float:
+    """解析 ffprobe 的帧率（如 30000/1001）"""
+    if not value or value == '0/0':
+        return 0.0
+    numerator, _, denominator = value.partition('/')
+    if not denominator:
+        return _number(numerator)
+    denominator = _number(denominator)
+    return round(_number(numerator) / denominator, 3) if denominator else 0.0
+
+
+def summarize(raw: Dict) -> Dict:
+    """
+    把 ffprobe 的 JSON 输出整理为各步骤使用的字段
+
+    Args:
+        raw: ffprobe -show_format -show_streams 的输出
+
+    Returns:
+        Dict: duration / format_name / bit_rate / streams / has_video / has_audio / width / height / fps / video_codec
+    """
+    fmt = raw.get('format') or {}
+    streams = []
+    for stream in raw.get('streams') or []:
+        streams.append({
+            'index': stream.get('index'),
+            'codec_type': stream.get('codec_type'),
+            'codec_name': stream.get('codec_name'),
+            'width': _number(stream.get('width'), int),
+            'height': _number(stream.get('height'), int),
+            'fps': _frame_rate(stream.get('avg_frame_rate') or stream.get('r_frame_rate')),
+            'sample_rate': _number(stream.get('sample_rate'), int),
+            'channels': _number(stream.get('channels'), int),
+            'duration': _number(stream.get('duration'))
+        })
+    video = next((s for s in streams if s['codec_type'] == 'video'), None)
+    return {
+        'duration': max(0.0, _number(fmt.get('duration'))),
+        'format_name': fmt.get('format_name', ''),
+        'bit_rate': _number(fmt.get('bit_rate'), int),
+        'streams': streams,
+        'has_video': video is not None,
+        'has_audio': any(s['codec_type'] == 'audio' for s in streams),
+        'width': video['width'] if video else 0,
+        'height': video['height'] if video else 0,
+        'fps': video['fps'] if video else 0.0,
+        'video_codec': video['codec_name'] if video else ''
+    }
+
+
+class MediaProbe:
+    """
+    媒体信息探测服务（进程内共享，线程安全）
+
+    同一文件的并发请求只运行一次 ffprobe；文件大小或修改时间变化后重新探测。
+    """
+
+    def __init__(self, max_cached: int = MAX_CACHED, use_sidecar: bool = True):
+        self.max_cached = max_cached
+        self.use_sidecar = use_sidecar
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self.stats = {'memory_hits': 0, 'sidecar_hits': 0, 'probes': 0, 'keyframe_probes': 0}
+
+    @staticmethod
+    def _identity(file_path: str) -> Optional[Dict]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @staticmethod
+    def _matches(info: Optional[Dict], identity: Dict) -> bool:
+        return bool(info) and info.get('version') == PROBE_VERSION and \
+            info.get('size') == identity['size'] and info.get('mtime_ns') == identity['mtime_ns']
+
+    def _file_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            lock = self._file_locks.get(path)
+            if lock is None:
+                lock = self._file_locks[path] = threading.Lock()
+            return lock
+
+    def _remember(self, info: Dict) -> None:
+        with self._lock:
+            self._cache[info['path']] = info
+            self._cache.move_to_end(info['path'])
+            while len(self._cache) > self.max_cached:
+                path, _ = self._cache.popitem(last=False)
+                self._file_locks.pop(path, None)
+
+    def _cached(self, identity: Dict, keyframes: bool) -> Optional[Dict]:
+        with self._lock:
+            info = self._cache.get(identity['path'])
+            if self._matches(info, identity) and (not keyframes or 'keyframes' in info):
+                self._cache.move_to_end(identity['path'])
+                self.stats['memory_hits'] += 1
+                return info
+        return None
+
+    def _load_sidecar(self, identity: Dict) -> Optional[Dict]:
+        if not self.use_sidecar:
+            return None
+        try:
+            with open(sidecar_path(identity['path']), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self._matches(info, identity):
+            return None
+        info['path'] = identity['path']
+        return info
+
+    def _save_sidecar(self, info: Dict) -> None:
+        if not self.use_sidecar:
+            return
+        path = sidecar_path(info['path'])
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError:
+            # 目录只读等情况下只保留进程内缓存
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _run_ffprobe(args: List[str], timeout: int) -> Dict:
+        """运行 ffprobe，返回 {'success', 'data'} 或 {'success': False, 'error'}"""
+        capability = get_capabilities().tool('ffprobe')
+        if not capability['available']:
+            return {'success': False, 'error': 'ffprobe不可用'}
+        try:
+            result = subprocess.run(capability['command'] + ['-v', 'error', '-print_format', 'json'] + args,
+                                    capture_output=True, text=True, encoding='utf-8', errors='ignore',
+                                    timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {'success': False, 'error': '检查超时'}
+        except OSError as e:
+            return {'success': False, 'error': f'ffprobe执行失败: {str(e)}'}
+        if result.returncode != 0:
+            return {'success': False, 'error': f'无法读取媒体信息: {result.stderr.strip()}'}
+        try:
+            return {'success': True, 'data': json.loads(result.stdout or '{}')}
+        except ValueError:
+            return {'success': False, 'error': '无法解析媒体信息'}
+
+    def _probe_keyframes(self, file_path: str) -> Optional[List[float]]:
+        """第一个视频流的关键帧时间（读取数据包标记，不解码）"""
+        self.stats['keyframe_probes'] += 1
+        result = self._run_ffprobe(['-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+                                    file_path], KEYFRAME_TIMEOUT)
+        if not result['success']:
+            return None
+        return sorted(_number(p.get('pts_time')) for p in result['data'].get('packets') or []
+                      if 'K' in (p.get('flags') or '') and p.get('pts_time') not in (None, 'N/A'))
+
+    def probe(self, file_path: str, keyframes: bool = False, persist: bool = True) -> Dict:
+        """
+        获取媒体文件信息
+
+        Args:
+            file_path: 媒体文件路径
+            keyframes: 是否同时需要关键帧时间列表（额外读取一次数据包，结果同样缓存）
+            persist: 是否写入旁路缓存文件（项目外的文件，如本地导入的源文件，不写入）
+
+        Returns:
+            Dict: 成功时 {'success': True, 'path', 'size', 'mtime_ns', 'duration', 'streams', 'has_video',
+                  'width', 'height', 'fps', ...}（keyframes=True 时含 'keyframes'），
+                  失败时 {'success': False, 'error'}
+        """
+        identity = self._identity(file_path)
+        if identity is None:
+            return {'success': False, 'error': f'文件不存在: {file_path}'}
+        cached = self._cached(identity, keyframes)
+        if cached:
+            return cached
+
+        with self._file_lock(identity['path']):
+            # 等待期间其他线程可能已完成探测
+            cached = self._cached(identity, keyframes)
+            if cached:
+                return cached
+            with self._lock:
+                info = self._cache.get(identity['path'])
+            if not self._matches(info, identity):
+                info = self._load_sidecar(identity)
+                if info and (not keyframes or 'keyframes' in info):
+                    self.stats['sidecar_hits'] += 1
+                    self._remember(info)
+                    return info
+
+            changed = False
+            if not self._matches(info, identity):
+                self.stats['probes'] += 1
+                result = self._run_ffprobe(['-show_format', '-show_streams', file_path], PROBE_TIMEOUT)
+                if not result['success']:
+                    return result
+                info = {'success': True, 'version': PROBE_VERSION, **identity, **summarize(result['data'])}
+                changed = True
+            if keyframes and 'keyframes' not in info:
+                frames = self._probe_keyframes(file_path)
+                if frames is not None:
+                    info = {**info, 'keyframes': frames}
+                    changed = True
+            if changed:
+                if persist:
+                    self._save_sidecar(info)
+                self._remember(info)
+            return info
+
+
+_probe = MediaProbe()
+
+
+def get_media_probe() -> MediaProbe:
+    """获取进程内共享的媒体信息探测服务"""
+    return _probe
@@ -0,0 +1,249 @@
+"""
+内存准入控制
+按模型大小、视频分辨率和并行线程数估算各阶段（下载/转录/截图）的峰值内存，
+只有预算内放得下时才开始执行；放不下时排队等待，超过等待时间后降级
+（减少截图线程数、换用更小的Whisper模型），避免多个任务同时运行时触发交换或OOM。
+"""
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from .config import Config
+
+# Whisper各模型转录时的峰值内存（MB，FP32，含模型权重），按从大到小排列
+DEFAULT_WHISPER_MODEL_MB = {
+    'large': 10000,
+    'medium': 5000,
+    'small': 2000,
+    'base': 1000,
+    'tiny': 1000,
+}
+
+# whisper.load_audio 把整段音频解码为 16kHz float32
+AUDIO_BYTES_PER_SECOND = 16000 * 4
+
+# 分辨率未知时按1080p估算
+DEFAULT_RESOLUTION = (1920, 1080)
+
+
+def system_memory() -> Dict[str, int]:
+    """
+    读取物理内存（MB）
+
+    Returns:
+        Dict: {'total_mb', 'available_mb'}，无法读取时为0
+    """
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        return {'total_mb': memory.total // (1024 * 1024), 'available_mb': memory.available // (1024 * 1024)}
+    except ImportError:
+        pass
+
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                            ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                            ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                            ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                            ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return {'total_mb': status.ullTotalPhys // (1024 * 1024),
+                    'available_mb': status.ullAvailPhys // (1024 * 1024)}
+        except Exception:
+            return {'total_mb': 0, 'available_mb': 0}
+
+    values = {}
+    try:
+        with open('/proc/meminfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                values[key] = int(rest.split()[0]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return {'total_mb': values.get('MemTotal', 0), 'available_mb': values.get('MemAvailable', values.get('MemFree', 0))}
+
+
+class MemoryEstimator:
+    """各阶段峰值内存估算（MB），系数可在 [memory] 中调整"""
+
+    def __init__(self, config: Config):
+        self.download_mb = config.get_float('memory', 'download_mb', 300)
+        self.ffmpeg_base_mb = config.get_float('memory', 'ffmpeg_base_mb', 30)
+        self.ffmpeg_frame_buffers = config.get_int('memory', 'ffmpeg_frame_buffers', 8)
+        self.whisper_model_mb = dict(DEFAULT_WHISPER_MODEL_MB)
+        for item in config.get_list('memory', 'whisper_model_mb'):
+            name, _, value = item.partition(':')
+            try:
+                self.whisper_model_mb[name.strip()] = float(value)
+            except ValueError:
+                continue
+
+    def download(self) -> float:
+        """步骤1：yt-dlp 和合并音视频的ffmpeg"""
+        return self.download_mb
+
+    def whisper(self, model_name: str, duration_seconds: float) -> float:
+        """步骤2：模型峰值内存 + 解码后的完整音频"""
+        model_mb = self.whisper_model_mb.get(model_name, self.whisper_model_mb.get('large', 10000))
+        return model_mb + max(0.0, duration_seconds) * AUDIO_BYTES_PER_SECOND / (1024 * 1024)
+
+    def ffmpeg_worker(self, width: int, height: int) -> float:
+        """单个截图ffmpeg进程：进程本身 + 解码缓冲的YUV420帧"""
+        width, height = (width, height) if width and height else DEFAULT_RESOLUTION
+        frame_mb = width * height * 1.5 / (1024 * 1024)
+        return self.ffmpeg_base_mb + frame_mb * self.ffmpeg_frame_buffers
+
+    def screenshots(self, width: int, height: int, workers: int) -> float:
+        """步骤3：并行截图"""
+        return self.ffmpeg_worker(width, height) * max(1, workers)
+
+    def smaller_models(self, model_name: str) -> List[str]:
+        """比指定模型小的模型（从大到小，用于降级）"""
+        ordered = sorted(self.whisper_model_mb, key=lambda name: -self.whisper_model_mb[name])
+        if model_name not in ordered:
+            return []
+        current = self.whisper_model_mb[model_name]
+        return [name for name in ordered[ordered.index(model_name) + 1:] if self.whisper_model_mb[name] <= current]
+
+
+class MemoryBudget:
+    """
+    内存预算（线程安全）
+
+    admit() 按候选方案（首选在前，之后依次为降级方案）占用预算：
+    首选方案放得下时直接执行；否则等待其他阶段释放内存，超过 wait_seconds（或首选方案超过整个预算）后
+    选择当前放得下的第一个降级方案；没有其他阶段在运行时总是放行，避免永久等待。
+    """
+
+    def __init__(self, budget_mb: float, wait_seconds: float = 120, degrade: bool = True):
+        self.budget_mb = max(0.0, float(budget_mb))
+        self.wait_seconds = max(0.0, float(wait_seconds))
+        self.degrade = degrade
+        self._cond = threading.Condition()
+        self._reserved: Dict[int, Tuple[str, float]] = {}
+        self._next_id = 0
+        self._waiting = 0
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'MemoryBudget':
+        """
+        读取 [memory] 配置：budget_mb 为0时取物理内存 * budget_fraction；enabled=false 时不限制
+
+        Args:
+            config: 配置对象
+        """
+        budget_mb = 0.0
+        if config.get_boolean('memory', 'enabled', True):
+            budget_mb = config.get_float('memory', 'budget_mb', 0)
+            if budget_mb <= 0:
+                budget_mb = system_memory()['total_mb'] * config.get_float('memory', 'budget_fraction', 0.75)
+        return cls(budget_mb, config.get_float('memory', 'wait_seconds', 120),
+                   config.get_boolean('memory', 'degrade', True))
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用（未配置预算且无法读取物理内存时不限制）"""
+        return self.budget_mb > 0
+
+    def reserved_mb(self) -> float:
+        """已占用的预算"""
+        with self._cond:
+            return sum(mb for _, mb in self._reserved.values())
+
+    def _choose_locked(self, options: List[Tuple[Dict, float]], waited: float) -> Optional[int]:
+        """选择方案序号，需要继续等待时返回None"""
+        reserved = sum(mb for _, mb in self._reserved.values())
+        free = self.budget_mb - reserved
+        if options[0][1] <= free:
+            return 0
+        if self.degrade and (waited >= self.wait_seconds or options[0][1] > self.budget_mb):
+            for index, (_, estimate_mb) in enumerate(options):
+                if estimate_mb <= free:
+                    return index
+        if not self._reserved:
+            # 单独运行也超出预算：降级到最小方案（不允许降级时按首选方案）单独运行
+            return len(options) - 1 if self.degrade else 0
+        return None
+
+    @contextmanager
+    def admit(self, stage: str, options: List[Tuple[Dict, float]], token=None, on_wait=None):
+        """
+        为一个阶段占用内存预算
+
+        Args:
+            stage: 阶段名（download/transcribe/screenshots）
+            options: [(方案, 估算MB)]，首选方案在前
+            token: 取消令牌，等待期间被取消时抛出 JobCancelled
+            on_wait: 开始等待时调用一次（用于记录任务状态）
+
+        Yields:
+            Dict: 准入决定 {'stage', 'option', 'estimate_mb', 'budget_mb', 'reserved_mb',
+                           'waited_seconds', 'degraded', 'over_budget'}
+        """
+        started = time.monotonic()
+        with self._cond:
+            if not self.enabled:
+                index = 0
+            else:
+                index = self._choose_locked(options, 0.0)
+                if index is None:
+                    self._waiting += 1
+                    try:
+                        if on_wait:
+                            on_wait()
+                        while index is None:
+                            self._cond.wait(0.5)
+                            if token is not None:
+                                token.raise_if_cancelled()
+                            index = self._choose_locked(options, time.monotonic() - started)
+                    finally:
+                        self._waiting -= 1
+
+            option, estimate_mb = options[index]
+            reserved = sum(mb for _, mb in self._reserved.values())
+            reservation_id = self._next_id
+            self._next_id += 1
+            self._reserved[reservation_id] = (stage, estimate_mb)
+
+        decision = {
+            'stage': stage,
+            'option': option,
+            'estimate_mb': round(estimate_mb),
+            'budget_mb': round(self.budget_mb),
+            'reserved_mb': round(reserved),
+            'waited_seconds': round(time.monotonic() - started, 3),
+            'degraded': index > 0,
+            'over_budget': self.enabled and reserved + estimate_mb > self.budget_mb
+        }
+        try:
+            yield decision
+        finally:
+            with self._cond:
+                self._reserved.pop(reservation_id, None)
+                self._cond.notify_all()
+
+    def usage(self) -> Dict:
+        """预算占用情况"""
+        memory = system_memory()
+        with self._cond:
+            stages = {}
+            for stage, estimate_mb in self._reserved.values():
+                stages[stage] = round(stages.get(stage, 0) + estimate_mb)
+            return {
+                'enabled': self.enabled,
+                'budget_mb': round(self.budget_mb),
+                'reserved_mb': round(sum(mb for _, mb in self._reserved.values())),
+                'waiting': self._waiting,
+                'stages': stages,
+                'system_total_mb': memory['total_mb'],
+                'system_available_mb': memory['available_mb']
+            }
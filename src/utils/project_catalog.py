@@ -0,0 +1,272 @@
+"""
+项目目录索引
+使用SQLite（WAL模式）记录每个项目的总结信息，写入项目总结时增量更新；
+首页和项目列表接口按状态/平台/语言/日期过滤并分页查询，不再遍历输出目录。
+索引文件丢失时从磁盘上的 project_summary.json 重建。
+"""
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from .logger import Logger
+from .url_identifier import URLIdentifier
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    platform TEXT NOT NULL DEFAULT '',
+    language TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    batch_id TEXT NOT NULL DEFAULT '',
+    created_time TEXT NOT NULL,
+    modified_time TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_modified ON projects (modified_time);
+CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_time);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects (status, modified_time);
+CREATE INDEX IF NOT EXISTS idx_projects_platform ON projects (platform, modified_time);
+CREATE INDEX IF NOT EXISTS idx_projects_batch ON projects (batch_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 可排序的列
+SORT_COLUMNS = ('modified_time', 'created_time', 'title', 'status', 'name')
+
+# 分页上限
+MAX_PER_PAGE = 500
+
+
+class ProjectCatalog:
+    """
+    项目目录索引（SQLite WAL）
+
+    每个项目目录一行，summary 列保存完整的 project_summary.json；
+    查询结果与 FileManager.list_projects 原来的格式一致（name/path/created_time/modified_time + 总结字段）。
+    """
+
+    def __init__(self, db_path: str, output_dir: str, logger: Logger):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.logger = logger
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        if not self._get_meta('built_at'):
+            self.rebuild()
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _row_values(project_path: str, summary: Dict) -> tuple:
+        """由项目总结得到索引列"""
+        name = os.path.basename(os.path.normpath(project_path))
+        url = summary.get('youtube_url', '') or ''
+        created_time = summary.get('created_time')
+        modified_time = summary.get('last_updated')
+        if not created_time or not modified_time:
+            try:
+                stat = os.stat(project_path)
+                created_time = created_time or datetime.fromtimestamp(stat.st_ctime).isoformat()
+                modified_time = modified_time or datetime.fromtimestamp(stat.st_mtime).isoformat()
+            except OSError:
+                created_time = created_time or datetime.now().isoformat()
+                modified_time = modified_time or created_time
+        config = summary.get('config') or {}
+        return (
+            name, project_path, summary.get('project_name') or name, summary.get('status', '') or '',
+            URLIdentifier.identify_platform(url) if url else '', config.get('transcribe_language', '') or '',
+            url, summary.get('batch_id', '') or '', created_time, modified_time,
+            json.dumps(summary, ensure_ascii=False)
+        )
+
+    def upsert(self, project_path: str, summary: Dict) -> None:
+        """
+        写入或更新项目（FileManager.update_project_summary 调用）
+
+        Args:
+            project_path: 项目目录
+            summary: 项目总结
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO projects (name, path, title, status, platform, language, url, batch_id, '
+                'created_time, modified_time, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                self._row_values(project_path, summary)
+            )
+
+    def remove(self, project_name: str) -> None:
+        """删除项目"""
+        with self._lock:
+            self._conn.execute('DELETE FROM projects WHERE name = ?', (project_name,))
+
+    def rebuild(self) -> int:
+        """
+        从磁盘重建索引（遍历输出目录，读取各项目的 project_summary.json）
+
+        Returns:
+            int: 索引的项目数
+        """
+        rows = []
+        if os.path.isdir(self.output_dir):
+            for item in os.listdir(self.output_dir):
+                item_path = os.path.join(self.output_dir, item)
+                if not os.path.isdir(item_path):
+                    continue
+                summary = {}
+                summary_file = os.path.join(item_path, 'project_summary.json')
+                if os.path.exists(summary_file):
+                    try:
+                        with open(summary_file, 'r', encoding='utf-8') as f:
+                            summary = json.load(f)
+                    except (OSError, ValueError) as e:
+                        self.logger.warning(f"[项目索引] 读取项目总结失败 {summary_file}: {str(e)}")
+                rows.append(self._row_values(item_path, summary))
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM projects')
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO projects (name, path, title, status, platform, language, url, batch_id, '
+                    'created_time, modified_time, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+                )
+                self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                   ('built_at', datetime.now().isoformat()))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        self.logger.info(f"[项目索引] 已从磁盘重建: {len(rows)} 个项目")
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _row_to_project(row: sqlite3.Row) -> Dict:
+        project = {
+            'name': row['name'],
+            'path': row['path'],
+            'created_time': row['created_time'],
+            'modified_time': row['modified_time'],
+            'platform': row['platform']
+        }
+        try:
+            project.update(json.loads(row['summary']))
+        except ValueError:
+            pass
+        return project
+
+    def query(self, page: int = 1, per_page: int = 20, sort: str = 'modified_time', order: str = 'desc',
+              status: Optional[str] = None, platform: Optional[str] = None, language: Optional[str] = None,
+              batch_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+              search: Optional[str] = None) -> Dict:
+        """
+        分页查询项目
+
+        Args:
+            page: 页码（从1开始）
+            per_page: 每页数量，0 表示不分页
+            sort: 排序列（SORT_COLUMNS）
+            order: asc / desc
+            status: 按状态过滤（逗号分隔多个）
+            platform: 按平台过滤（youtube/bilibili/local）
+            language: 按转录语言过滤
+            batch_id: 按批量任务过滤
+            since: 创建时间下限（ISO格式，含）
+            until: 创建时间上限（ISO格式，不含）
+            search: 按标题/目录名/URL模糊匹配
+
+        Returns:
+            Dict: {'projects', 'total', 'page', 'per_page', 'pages'}
+        """
+        conditions, params = [], []
+        if status:
+            statuses = [s.strip() for s in status.split(',') if s.strip()]
+            conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        for column, value in (('platform', platform), ('language', language), ('batch_id', batch_id)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if since:
+            conditions.append('created_time >= ?')
+            params.append(since)
+        if until:
+            conditions.append('created_time < ?')
+            params.append(until)
+        if search:
+            conditions.append('(title LIKE ? OR name LIKE ? OR url LIKE ?)')
+            params.extend([f'%{search}%'] * 3)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        sort = sort if sort in SORT_COLUMNS else 'modified_time'
+        direction = 'ASC' if str(order).lower() == 'asc' else 'DESC'
+        per_page = max(0, min(int(per_page), MAX_PER_PAGE)) if per_page else 0
+        page = max(1, int(page))
+
+        sql = f'SELECT * FROM projects {where} ORDER BY {sort} {direction}, name {direction}'
+        page_params = list(params)
+        if per_page:
+            sql += ' LIMIT ? OFFSET ?'
+            page_params.extend([per_page, (page - 1) * per_page])
+
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) AS n FROM projects {where}', params).fetchone()['n']
+            rows = self._conn.execute(sql, page_params).fetchall()
+
+        # 目录已被手动删除的项目从索引中移除（只检查当前页）
+        projects = []
+        for row in rows:
+            if os.path.isdir(row['path']):
+                projects.append(self._row_to_project(row))
+            else:
+                self.remove(row['name'])
+                total -= 1
+
+        return {
+            'projects': projects,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page if per_page else 1
+        }
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        """各状态/平台/语言的项目数（用于筛选项）"""
+        result = {}
+        with self._lock:
+            for column in ('status', 'platform', 'language'):
+                rows = self._conn.execute(
+                    f'SELECT {column} AS value, COUNT(*) AS n FROM projects GROUP BY {column} ORDER BY n DESC'
+                ).fetchall()
+                result[column] = {row['value']: row['n'] for row in rows}
+        return result
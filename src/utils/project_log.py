@@ -0,0 +1,342 @@
+"""
+项目日志
+处理某个项目期间（追踪器绑定了项目的线程中）产生的日志，除写入全局日志外，
+还以JSONL格式追加到项目目录的 project_log.jsonl，并按 步骤+级别 记录每条日志的字节偏移
+（.log_index/ 下每个键一个定长偏移文件）。按步骤/级别过滤、增量读取和导出只读取命中的记录。
+Web进程和工作进程可能同时写同一个项目，追加记录和偏移时持有 .log_index/lock 的文件锁。
+"""
+import os
+import json
+import glob
+import heapq
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+try:
+    import msvcrt
+    MSVCRT_AVAILABLE = True
+except ImportError:
+    MSVCRT_AVAILABLE = False
+
+from .tracing import get_tracer
+
+# 项目目录下的日志文件和索引目录
+PROJECT_LOG_FILE = 'project_log.jsonl'
+INDEX_DIR = '.log_index'
+# 全部记录的索引键
+ALL_KEY = 'all'
+# 跨进程写入锁文件（位于索引目录）
+LOCK_FILE = 'lock'
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+# 偏移文件的记录格式（8字节无符号整数）
+OFFSET = struct.Struct('<Q')
+
+# 单次读取的记录数上限
+MAX_RECORDS = 1000
+
+
+def index_key(step: Optional[int], level: str) -> str:
+    """索引键：step<步骤号>.<级别>，步骤外的日志步骤号为0"""
+    return f"step{step or 0}.{level}"
+
+
+class ProjectLogSink:
+    """
+    项目日志写入（进程内共享）
+
+    每个项目保持日志文件和索引文件的句柄，最多同时打开 max_open 个项目，超出时关闭最久未写入的项目。
+    """
+
+    def __init__(self, max_open: int = 16):
+        self.max_open = max_open
+        self.enabled = True
+        self.min_level = logging.DEBUG
+        self._lock = threading.Lock()
+        self._open: 'OrderedDict[str, Dict]' = OrderedDict()
+
+    def _handles(self, project_path: str) -> Dict:
+        handles = self._open.get(project_path)
+        if handles is None:
+            os.makedirs(os.path.join(project_path, INDEX_DIR), exist_ok=True)
+            handles = {
+                'log': open(os.path.join(project_path, PROJECT_LOG_FILE), 'ab'),
+                'lock': open(os.path.join(project_path, INDEX_DIR, LOCK_FILE), 'a+b'),
+                'index': {}
+            }
+            self._open[project_path] = handles
+            while len(self._open) > self.max_open:
+                self._close_handles(self._open.popitem(last=False)[1])
+        else:
+            self._open.move_to_end(project_path)
+        return handles
+
+    @staticmethod
+    def _close_handles(handles: Dict) -> None:
+        for f in [handles['log'], handles['lock'], *handles['index'].values()]:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _lock_file(handles: Dict, locked: bool) -> None:
+        """获取/释放跨进程写入锁（日志偏移和索引必须与其他进程的写入互斥）"""
+        fd = handles['lock'].fileno()
+        if FCNTL_AVAILABLE:
+            fcntl.flock(fd, fcntl.LOCK_EX if locked else fcntl.LOCK_UN)
+        elif MSVCRT_AVAILABLE:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK if locked else msvcrt.LK_UNLCK, 1)
+
+    def _index_file(self, project_path: str, handles: Dict, key: str):
+        f = handles['index'].get(key)
+        if f is None:
+            f = handles['index'][key] = open(os.path.join(project_path, INDEX_DIR, f'{key}.idx'), 'ab')
+        return f
+
+    def write(self, project_path: str, record: Dict) -> Optional[int]:
+        """
+        追加一条日志并更新索引
+
+        Args:
+            project_path: 项目目录
+            record: 日志记录（含 step/level）
+
+        Returns:
+            Optional[int]: 记录在日志文件中的偏移，写入失败时返回 None
+        """
+        line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        with self._lock:
+            try:
+                handles = self._handles(project_path)
+                self._lock_file(handles, True)
+                try:
+                    log_file = handles['log']
+                    offset = log_file.seek(0, os.SEEK_END)
+                    log_file.write(line)
+                    log_file.flush()
+                    packed = OFFSET.pack(offset)
+                    for key in (ALL_KEY, index_key(record.get('step'), record['level'])):
+                        index_file = self._index_file(project_path, handles, key)
+                        index_file.write(packed)
+                        index_file.flush()
+                finally:
+                    self._lock_file(handles, False)
+                return offset
+            except OSError:
+                # 项目目录被删除等情况下丢弃该条记录，不影响处理流程
+                handles = self._open.pop(project_path, None)
+                if handles:
+                    self._close_handles(handles)
+                return None
+
+    def close(self, project_path: Optional[str] = None) -> None:
+        """关闭项目（为空时关闭全部）的文件句柄"""
+        with self._lock:
+            paths = [project_path] if project_path else list(self._open)
+            for path in paths:
+                handles = self._open.pop(path, None)
+                if handles:
+                    self._close_handles(handles)
+
+
+_sink = ProjectLogSink()
+
+
+class ProjectLogHandler(logging.Handler):
+    """把当前线程所属项目的日志写入项目日志（没有绑定项目时忽略）"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not _sink.enabled or record.levelno < _sink.min_level:
+            return
+        # 后台写入线程处理时使用记录产生时所在线程的项目
+        context = getattr(record, 'project_context', None) or get_tracer().current_context()
+        if not context:
+            return
+        try:
+            entry = {
+                'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                'level': record.levelname if record.levelname in LEVELS else 'INFO',
+                'step': context['step'] or 0,
+                'logger': record.name,
+                'job_id': context['trace_id'],
+                'message': record.getMessage()
+            }
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            if record.exc_text:
+                entry['exception'] = record.exc_text
+            _sink.write(context['project_path'], entry)
+        except Exception:
+            self.handleError(record)
+
+
+_handler = ProjectLogHandler()
+
+
+def project_log_handler() -> ProjectLogHandler:
+    """进程内共享的项目日志处理器（由日志后台写入线程调用）"""
+    return _handler
+
+
+def configure_project_logs(config) -> None:
+    """读取 [logging] 配置：是否写项目日志、最低级别"""
+    _sink.enabled = config.get_boolean('logging', 'project_logs', True)
+    level = (config.get('logging', 'project_log_level', 'DEBUG') or 'DEBUG').upper()
+    _sink.min_level = getattr(logging, level, logging.DEBUG) if level in LEVELS else logging.DEBUG
+
+
+def close_project_log(project_path: str) -> None:
+    """关闭项目日志的文件句柄（删除项目目录前调用；任务结束时通过 logger.release_project_log 调用）"""
+    _sink.close(project_path)
+
+
+# ----------------------------------------------------------------------
+# 读取
+# ----------------------------------------------------------------------
+def _index_path(project_path: str, key: str) -> str:
+    return os.path.join(project_path, INDEX_DIR, f'{key}.idx')
+
+
+def _read_offsets(path: str, after: int, limit: int, from_end: bool) -> List[int]:
+    """
+    从偏移文件读取偏移（文件按偏移递增写入，用二分查找定位）
+
+    Args:
+        path: 偏移文件
+        after: 只返回大于该值的偏移
+        limit: 最多返回的个数
+        from_end: True 时返回最后 limit 个，否则返回 after 之后的前 limit 个
+    """
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return []
+    with f:
+        count = os.fstat(f.fileno()).st_size // OFFSET.size
+
+        def offset_at(i: int) -> int:
+            f.seek(i * OFFSET.size)
+            return OFFSET.unpack(f.read(OFFSET.size))[0]
+
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if offset_at(mid) <= after:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = max(lo, count - limit) if from_end else lo
+        end = count if from_end else min(count, lo + limit)
+        if start >= end:
+            return []
+        f.seek(start * OFFSET.size)
+        data = f.read((end - start) * OFFSET.size)
+    return [value for (value,) in OFFSET.iter_unpack(data[:len(data) - len(data) % OFFSET.size])]
+
+
+def _index_keys(project_path: str, step: Optional[int], level: Optional[str]) -> List[str]:
+    """过滤条件对应的索引键（level 为最低级别）"""
+    if step is None and not level:
+        return [ALL_KEY]
+    levels = LEVELS[LEVELS.index(level):] if level in LEVELS else LEVELS
+    if step is not None:
+        return [index_key(step, name) for name in levels]
+    keys = []
+    for path in glob.glob(os.path.join(project_path, INDEX_DIR, 'step*.idx')):
+        key = os.path.basename(path)[:-len('.idx')]
+        if key.rsplit('.', 1)[-1] in levels:
+            keys.append(key)
+    return keys
+
+
+def _read_records(project_path: str, offsets: List[int]) -> List[Dict]:
+    records = []
+    try:
+        with open(os.path.join(project_path, PROJECT_LOG_FILE), 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                try:
+                    record = json.loads(f.readline())
+                except ValueError:
+                    continue
+                record['offset'] = offset
+                records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+def read_project_log(project_path: str, step: Optional[int] = None, level: Optional[str] = None,
+                     after: int = -1, limit: int = 200, tail: bool = False) -> Dict:
+    """
+    读取项目日志（只读取命中的记录）
+
+    Args:
+        project_path: 项目目录
+        step: 只返回该步骤的日志（0 表示步骤外）
+        level: 最低级别（DEBUG/INFO/WARNING/ERROR/CRITICAL）
+        after: 只返回偏移大于该值的记录（上次返回的 cursor，用于增量读取）
+        limit: 最多返回的记录数
+        tail: True 时返回最后 limit 条
+
+    Returns:
+        Dict: {'records', 'cursor', 'has_more'}，cursor 为最后一条记录的偏移
+    """
+    limit = max(1, min(int(limit), MAX_RECORDS))
+    level = level.upper() if level else None
+    streams = [_read_offsets(_index_path(project_path, key), after, limit + 1, tail)
+               for key in _index_keys(project_path, step, level)]
+    offsets = list(heapq.merge(*streams))
+    if tail:
+        has_more = len(offsets) > limit
+        offsets = offsets[-limit:]
+    else:
+        has_more = len(offsets) > limit
+        offsets = offsets[:limit]
+    records = _read_records(project_path, offsets)
+    return {
+        'records': records,
+        'cursor': offsets[-1] if offsets else after,
+        'has_more': has_more
+    }
+
+
+def iter_project_log(project_path: str, step: Optional[int] = None, level: Optional[str] = None,
+                     batch: int = 500) -> Iterator[Dict]:
+    """
+    按顺序遍历项目日志（导出使用，分批读取）
+
+    Args:
+        project_path: 项目目录
+        step: 步骤过滤
+        level: 最低级别
+        batch: 每批读取的记录数
+    """
+    after = -1
+    while True:
+        result = read_project_log(project_path, step=step, level=level, after=after, limit=batch)
+        yield from result['records']
+        if not result['has_more']:
+            return
+        after = result['cursor']
+
+
+def format_record(record: Dict) -> str:
+    """文本导出格式（与全局日志文件的格式接近）"""
+    line = f"{record.get('time', '')} - {record.get('logger', '')} - {record.get('level', '')} - " \
+           f"[步骤{record.get('step', 0)}] {record.get('message', '')}"
+    if record.get('exception'):
+        line += '\n' + record['exception']
+    return line
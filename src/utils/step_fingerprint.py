@@ -0,0 +1,220 @@
+"""
+步骤输入指纹模块
+每个步骤完成后记录其输入（上游产物哈希、相关配置段、模板文件哈希）的指纹，
+再次执行时指纹未变化且产物仍存在的步骤可以直接跳过。
+"""
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from .blob_store import BlobStore
+from .config import Config
+from .logger import Logger
+
+
+FINGERPRINT_FILE = 'fingerprints.json'
+
+# 不影响步骤产物的配置项（进度显示、超时、报告等），不计入指纹
+IGNORED_CONFIG_KEYS = {
+    'show_detailed_progress',
+    'progress_update_interval',
+    'progress_heartbeat_interval',
+    'progress_timeout',
+    'download_timeout',
+    'transcribe_speed_factor',
+    'transcribe_timeout_factor',
+    'warmup_on_start',
+    'max_workers',
+    'batch_size',
+    'stream_with_transcribe',
+    'stream_max_workers',
+    'generate_dedup_report',
+    'auto_open_dedup_report',
+}
+
+
+class StepFingerprints:
+    """
+    项目内的步骤指纹记录
+
+    文件格式（<project>/fingerprints.json）:
+        {
+            'steps': {'2': {'fingerprint': str, 'inputs': {...}, 'outputs': [相对路径], 'recorded_time': str}},
+            'file_digests': {相对路径: {'size': int, 'mtime_ns': int, 'sha256': str}}
+        }
+    file_digests 按 (大小, 修改时间) 缓存文件哈希，大视频文件只需完整读取一次。
+    """
+
+    def __init__(self, project_path: str, logger: Optional[Logger] = None):
+        self.project_path = project_path
+        self.logger = logger
+        self.state_file = os.path.join(project_path, FINGERPRINT_FILE)
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    # ------------------------------------------------------------------
+    # 输入组成部分
+    # ------------------------------------------------------------------
+
+    def file_digest(self, file_path: str) -> str:
+        """
+        文件内容哈希（带缓存）
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            str: SHA256；文件不存在时返回空字符串
+        """
+        if not file_path or not os.path.isfile(file_path):
+            return ''
+        stat = os.stat(file_path)
+        key = self._relative(file_path)
+        with self._lock:
+            cached = self._state['file_digests'].get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+
+        digest = BlobStore.hash_file(file_path)
+        with self._lock:
+            self._state['file_digests'][key] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest
+            }
+        return digest
+
+    def files_digest(self, file_paths: Iterable[str]) -> str:
+        """多个文件（如模板集合）的组合哈希，与传入顺序无关"""
+        sha256 = hashlib.sha256()
+        for file_path in sorted(set(file_paths)):
+            sha256.update(os.path.basename(file_path).encode('utf-8'))
+            sha256.update(self.file_digest(file_path).encode('ascii'))
+        return sha256.hexdigest()
+
+    def directory_digest(self, dir_path: str) -> str:
+        """目录下所有文件（递归）的组合哈希"""
+        if not os.path.isdir(dir_path):
+            return ''
+        sha256 = hashlib.sha256()
+        for root, dirs, files in os.walk(dir_path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                sha256.update(os.path.relpath(file_path, dir_path).replace(os.sep, '/').encode('utf-8'))
+                sha256.update(self.file_digest(file_path).encode('ascii'))
+        return sha256.hexdigest()
+
+    @staticmethod
+    def config_section(config: Config, section: str) -> Dict[str, str]:
+        """配置段中影响产物的配置项"""
+        return {key: value for key, value in sorted(config.get_section_items(section).items())
+                if key not in IGNORED_CONFIG_KEYS}
+
+    @staticmethod
+    def compute(inputs: Dict) -> str:
+        """根据输入字典计算指纹"""
+        payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------------
+    # 记录与比较
+    # ------------------------------------------------------------------
+
+    def is_current(self, step: int, inputs: Dict) -> bool:
+        """
+        步骤的输入是否与上次成功执行时一致，且记录的产物仍然存在
+
+        Args:
+            step: 步骤号
+            inputs: 本次的输入字典
+        """
+        with self._lock:
+            record = self._state['steps'].get(str(step))
+        if not record or record['fingerprint'] != self.compute(inputs):
+            return False
+        return self.outputs_exist(record.get('outputs', []))
+
+    def has_record(self, step: int) -> bool:
+        """步骤是否有指纹记录"""
+        with self._lock:
+            return str(step) in self._state['steps']
+
+    def outputs_exist(self, outputs: List[str]) -> bool:
+        """产物是否全部存在（目录需非空）"""
+        if not outputs:
+            return False
+        for output in outputs:
+            path = os.path.join(self.project_path, output)
+            if os.path.isdir(path):
+                if not os.listdir(path):
+                    return False
+            elif not os.path.isfile(path):
+                return False
+        return True
+
+    def record(self, step: int, inputs: Dict, outputs: List[str]) -> str:
+        """
+        记录步骤成功执行时的输入指纹
+
+        Args:
+            step: 步骤号
+            inputs: 输入字典
+            outputs: 产物路径（绝对路径或相对项目目录的路径）
+
+        Returns:
+            str: 指纹
+        """
+        fingerprint = self.compute(inputs)
+        with self._lock:
+            self._state['steps'][str(step)] = {
+                'fingerprint': fingerprint,
+                'inputs': inputs,
+                'outputs': [self._relative(path) for path in outputs],
+                'recorded_time': datetime.now().isoformat()
+            }
+        self.save()
+        return fingerprint
+
+    def invalidate(self, steps: Iterable[int]) -> None:
+        """删除指定步骤的指纹记录（下次执行时必定重新运行）"""
+        with self._lock:
+            for step in steps:
+                self._state['steps'].pop(str(step), None)
+        self.save()
+
+    def save(self) -> None:
+        """写入指纹文件"""
+        with self._lock:
+            data = json.dumps(self._state, ensure_ascii=False, indent=2)
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            if self.logger:
+                self.logger.warning(f"[指纹] 保存失败: {str(e)}")
+
+    def _load(self) -> Dict:
+        """读取指纹文件"""
+        state = {'steps': {}, 'file_digests': {}}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state.update(json.load(f))
+            except (OSError, ValueError) as e:
+                if self.logger:
+                    self.logger.warning(f"[指纹] 读取失败，将重新记录: {str(e)}")
+        return state
+
+    def _relative(self, path: str) -> str:
+        """项目内路径转换为相对路径（项目外路径保持绝对路径）"""
+        abs_path = os.path.abspath(path)
+        abs_project = os.path.abspath(self.project_path)
+        if abs_path.startswith(abs_project + os.sep):
+            return os.path.relpath(abs_path, abs_project).replace(os.sep, '/')
+        return abs_path
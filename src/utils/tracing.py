@@ -0,0 +1,377 @@
+"""
+步骤追踪与运行指标
+为每个步骤和耗时子操作（下载、模型加载、转录、截图、pHash、渲染、图片上传等）记录span：
+墙钟时间、线程CPU时间、处理字节数、缓存命中。span写入项目目录下的 trace.jsonl，
+同时汇总为计数器和直方图，由 /metrics 以Prometheus文本格式输出。
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import Config
+
+# 项目目录下的追踪文件名
+TRACE_FILE = 'trace.jsonl'
+
+# 默认直方图分桶（秒），覆盖单帧截图到整段转录
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+METRIC_PREFIX = 'uf2zhihu'
+
+
+class Span:
+    """
+    单个span（由 Tracer.span 创建）
+
+    执行期间可以通过 set() 补充属性，常用: bytes（处理字节数）、cache_hit（是否命中缓存）
+    """
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'], trace: Optional[Dict],
+                 attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace = trace
+        self.attrs = attrs
+        # 所属步骤号（子span继承父span的步骤），项目日志按步骤建立索引
+        self.step = attrs.get('step', parent.step if parent else None)
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self._finished = False
+
+    def set(self, **attrs) -> 'Span':
+        """补充span属性"""
+        self.attrs.update(attrs)
+        return self
+
+    def add_bytes(self, nbytes: int) -> 'Span':
+        """累加处理字节数"""
+        self.attrs['bytes'] = self.attrs.get('bytes', 0) + max(0, int(nbytes or 0))
+        return self
+
+    def fail(self, error: str) -> 'Span':
+        """标记为失败（不抛出异常的失败路径使用）"""
+        self.error = error
+        return self
+
+    def finish(self) -> None:
+        """结束span并记录（重复调用无效）"""
+        if self._finished:
+            return
+        self._finished = True
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.thread_time() - self._cpu_start
+        self.tracer._finish(self)
+
+    def to_dict(self) -> Dict:
+        """trace.jsonl 中的一行"""
+        data = {
+            'time': datetime.fromtimestamp(self.start_time).isoformat(),
+            'trace_id': self.trace['trace_id'] if self.trace else None,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'status': 'error' if self.error else 'ok'
+        }
+        if self.error:
+            data['error'] = self.error
+        data.update(self.attrs)
+        return data
+
+
+class MetricsRegistry:
+    """span汇总指标（线程安全）"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # span名 -> 汇总值
+        self._spans: Dict[str, Dict] = {}
+
+    def observe(self, span: Span) -> None:
+        """记录一个结束的span"""
+        with self._lock:
+            stats = self._spans.get(span.name)
+            if stats is None:
+                stats = {'count': 0, 'errors': 0, 'sum': 0.0, 'cpu': 0.0, 'bytes': 0, 'cache_hits': 0,
+                         'buckets': [0] * len(self.buckets)}
+                self._spans[span.name] = stats
+            stats['count'] += 1
+            stats['sum'] += span.wall_seconds
+            stats['cpu'] += span.cpu_seconds
+            stats['bytes'] += int(span.attrs.get('bytes') or 0)
+            if span.attrs.get('cache_hit'):
+                stats['cache_hits'] += 1
+            if span.error:
+                stats['errors'] += 1
+            for i, bound in enumerate(self.buckets):
+                if span.wall_seconds <= bound:
+                    stats['buckets'][i] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """当前汇总值的副本"""
+        with self._lock:
+            return {name: {**stats, 'buckets': list(stats['buckets'])} for name, stats in self._spans.items()}
+
+    def render(self) -> str:
+        """Prometheus文本格式"""
+        spans = self.snapshot()
+        names = sorted(spans)
+        lines = []
+
+        histogram = f'{METRIC_PREFIX}_span_duration_seconds'
+        lines.append(f'# HELP {histogram} Wall time of traced steps and sub-operations.')
+        lines.append(f'# TYPE {histogram} histogram')
+        for name in names:
+            stats = spans[name]
+            label = _escape_label(name)
+            for bound, count in zip(self.buckets, stats['buckets']):
+                lines.append(f'{histogram}_bucket{{span="{label}",le="{_format_value(bound)}"}} {count}')
+            lines.append(f'{histogram}_bucket{{span="{label}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'{histogram}_sum{{span="{label}"}} {_format_value(stats["sum"])}')
+            lines.append(f'{histogram}_count{{span="{label}"}} {stats["count"]}')
+
+        counters = (
+            ('span_cpu_seconds_total', 'cpu', 'Thread CPU time of traced operations.'),
+            ('span_bytes_total', 'bytes', 'Bytes processed by traced operations.'),
+            ('span_cache_hits_total', 'cache_hits', 'Traced operations served from cache.'),
+            ('span_errors_total', 'errors', 'Traced operations that failed.'),
+        )
+        for metric, key, help_text in counters:
+            lines.extend(format_metric(f'{METRIC_PREFIX}_{metric}', help_text, 'counter',
+                                       [({'span': name}, spans[name][key]) for name in names]))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metric(name: str, help_text: str, metric_type: str,
+                  samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    """
+    格式化一个指标（供 /metrics 追加任务队列等即时值）
+
+    Args:
+        name: 指标名
+        help_text: 说明
+        metric_type: gauge / counter
+        samples: [(标签字典, 值)]
+
+    Returns:
+        List[str]: Prometheus文本行
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    for labels, value in samples:
+        label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+        lines.append(f'{name}{{{label_text}}} {_format_value(value)}' if label_text
+                     else f'{name} {_format_value(value)}')
+    return lines
+
+
+class Tracer:
+    """
+    追踪器
+
+    当前线程绑定的项目（trace）和span栈保存在线程局部变量中；
+    提交到线程池的函数需要用 wrap() 包装，才能把子操作记到同一个项目下。
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.metrics = MetricsRegistry()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def configure(self, config: Config) -> None:
+        """读取 [tracing] 配置"""
+        self.enabled = config.get_boolean('tracing', 'enabled', True)
+        buckets = [float(b) for b in config.get_list('tracing', 'histogram_buckets') if b]
+        if buckets and tuple(sorted(buckets)) != self.metrics.buckets:
+            self.metrics = MetricsRegistry(buckets)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _current_trace(self) -> Optional[Dict]:
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def trace(self, project_path: str, trace_id: Optional[str] = None):
+        """
+        把当前线程的span记到指定项目的 trace.jsonl
+
+        Args:
+            project_path: 项目目录
+            trace_id: 追踪ID（通常为任务ID），默认使用项目名
+        """
+        previous = self._current_trace()
+        self._local.trace = {'path': os.path.join(project_path, TRACE_FILE), 'project_path': project_path,
+                             'trace_id': trace_id or os.path.basename(project_path)}
+        try:
+            yield
+        finally:
+            self._local.trace = previous
+
+    def start_span(self, name: str, **attrs) -> Span:
+        """
+        开始一个span（需要手动 finish，用于回调驱动的操作）
+
+        Args:
+            name: span名（如 'step1.download'）
+            **attrs: 初始属性
+        """
+        stack = self._stack()
+        span = Span(self, name, stack[-1] if stack else None, self._current_trace(), attrs)
+        stack.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """
+        以上下文管理器记录span，异常会标记为失败并继续抛出
+
+        用法:
+            with get_tracer().span('step2.transcribe', bytes=size) as span:
+                ...
+                span.set(cache_hit=True)
+        """
+        span = self.start_span(name, **attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f'{type(e).__name__}: {e}')
+            raise
+        finally:
+            span.finish()
+
+    def current_span(self) -> Optional[Span]:
+        """当前线程最内层的span"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def current_context(self) -> Optional[Dict]:
+        """
+        当前线程所属的项目和步骤（没有绑定项目时返回 None）
+
+        Returns:
+            Optional[Dict]: {'project_path', 'trace_id', 'step'}
+        """
+        trace = self._current_trace()
+        if not trace:
+            return None
+        span = self.current_span()
+        return {'project_path': trace['project_path'], 'trace_id': trace['trace_id'],
+                'step': span.step if span else None}
+
+    def annotate(self, **attrs) -> None:
+        """给当前span补充属性（没有span时忽略）"""
+        span = self.current_span()
+        if span:
+            span.set(**attrs)
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+        包装提交到线程池的函数：在执行线程中恢复当前的项目和父span
+
+        Args:
+            func: 原函数
+
+        Returns:
+            Callable: 包装后的函数
+        """
+        trace = self._current_trace()
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+
+        def wrapper(*args, **kwargs):
+            previous_trace = self._current_trace()
+            previous_stack = getattr(self._local, 'stack', None)
+            self._local.trace = trace
+            self._local.stack = [parent] if parent else []
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.trace = previous_trace
+                self._local.stack = previous_stack
+
+        return wrapper
+
+    def _finish(self, span: Span) -> None:
+        stack = self._stack()
+        if span in stack:
+            # 同时弹出异常路径上未结束的子span，避免残留在线程的span栈中
+            del stack[stack.index(span):]
+        self.metrics.observe(span)
+        if self.enabled and span.trace:
+            self._write(span.trace['path'], span.to_dict())
+
+    def _write(self, path: str, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        try:
+            with self._write_lock:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except OSError:
+            # 项目目录被删除等情况下丢弃该条记录，不影响处理流程
+            pass
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """获取进程内共享的追踪器"""
+    return _tracer
+
+
+def configure_tracing(config: Config) -> Tracer:
+    """按配置初始化共享追踪器"""
+    _tracer.configure(config)
+    return _tracer
+
+
+def read_trace(project_path: str, limit: int = 0) -> List[Dict]:
+    """
+    读取项目的 trace.jsonl
+
+    Args:
+        project_path: 项目目录
+        limit: 只返回最后 limit 条，0 表示全部
+
+    Returns:
+        List[Dict]: span记录
+    """
+    path = os.path.join(project_path, TRACE_FILE)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records[-limit:] if limit else records
@@ -0,0 +1,281 @@
+"""
+字幕数据模型
+字幕只解析一次：步骤2转录完成时由字幕段直接生成，外部SRT（缓存、手动放入）用正则一次性解析。
+内存中为紧凑数组（开始/结束毫秒 + 文本偏移，全部文本拼接为一个字符串），磁盘上保存为字幕旁的隐藏二进制文件
+（.<字幕文件名>.transcript），按字幕文件的大小和修改时间校验；步骤3、4和 Validator 都通过 load_transcript 读取。
+"""
+import os
+import re
+import sys
+import shutil
+import struct
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from typing import Dict, Iterable, Iterator, Optional
+
+SIDECAR_SUFFIX = '.transcript'
+
+# 文件头: 标识, 版本, 字幕条数, 字幕文件大小, 字幕文件修改时间(ns), 文本字节数
+HEADER = struct.Struct('<4sHIQqI')
+MAGIC = b'UFTS'
+VERSION = 1
+
+# 进程内最多缓存的字幕数
+MAX_CACHED = 32
+
+# 时间轴行 + 其后连续的非空行（文本）
+CUE = re.compile(
+    r'^[ \t]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[ \t]*-->[ \t]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\n]*\n?'
+    r'((?:[ \t]*\S[^\n]*(?:\n|$))*)',
+    re.MULTILINE
+)
+
+Segment = namedtuple('Segment', ['index', 'start', 'end', 'text'])
+
+
+def seconds_to_ms(seconds: float) -> int:
+    """秒转毫秒（与写SRT时的截断方式一致，转录结果和解析SRT得到相同的时间）"""
+    whole = int(seconds)
+    return whole * 1000 + int((seconds - whole) * 1000)
+
+
+def transcript_path(srt_path: str) -> str:
+    """字幕模型文件路径（与字幕同目录的隐藏文件）"""
+    directory, name = os.path.split(os.path.abspath(srt_path))
+    return os.path.join(directory, f'.{name}{SIDECAR_SUFFIX}')
+
+
+class Transcript:
+    """
+    字幕数据（只读）
+
+    starts/ends 为毫秒，第 i 条（从0开始）的文本为 text[offsets[i]:offsets[i + 1]]；
+    遍历时返回 Segment(index 从1开始, start 秒, end 秒, text)。
+    """
+
+    __slots__ = ('starts', 'ends', 'offsets', 'text')
+
+    def __init__(self, starts: array, ends: array, offsets: array, text: str):
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_segments(cls, segments: Iterable) -> 'Transcript':
+        """
+        由字幕段生成
+
+        Args:
+            segments: Whisper 的 segments（含 start/end/text 的字典）或 (开始秒, 结束秒, 文本) 元组
+        """
+        starts, ends, offsets, texts = array('i'), array('i'), array('I', [0]), []
+        length = 0
+        for segment in segments:
+            if isinstance(segment, dict):
+                start, end, text = segment['start'], segment['end'], segment['text']
+            else:
+                start, end, text = segment
+            text = text.strip()
+            starts.append(seconds_to_ms(start))
+            ends.append(seconds_to_ms(end))
+            texts.append(text)
+            length += len(text)
+            offsets.append(length)
+        return cls(starts, ends, offsets, ''.join(texts))
+
+    @classmethod
+    def parse_srt(cls, srt_path: str) -> 'Transcript':
+        """解析SRT文件（整体读取后用正则匹配，序号缺失或格式略有偏差时同样能识别）"""
+        with open(srt_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+            content = f.read().replace('\r\n', '\n').replace('\r', '\n')
+        starts, ends, offsets, texts = array('i'), array('i'), array('I', [0]), []
+        length = 0
+        for match in CUE.finditer(content):
+            h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(value) for value in match.groups()[:8])
+            text = match.group(9).strip()
+            starts.append(((h1 * 60 + m1) * 60 + s1) * 1000 + ms1)
+            ends.append(((h2 * 60 + m2) * 60 + s2) * 1000 + ms2)
+            texts.append(text)
+            length += len(text)
+            offsets.append(length)
+        return cls(starts, ends, offsets, ''.join(texts))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Segment]:
+        starts, ends, offsets, text = self.starts, self.ends, self.offsets, self.text
+        for i in range(len(starts)):
+            yield Segment(i + 1, starts[i] / 1000.0, ends[i] / 1000.0, text[offsets[i]:offsets[i + 1]])
+
+    def segment(self, i: int) -> Segment:
+        """第 i 条字幕（从0开始）"""
+        return Segment(i + 1, self.starts[i] / 1000.0, self.ends[i] / 1000.0,
+                       self.text[self.offsets[i]:self.offsets[i + 1]])
+
+    def stats(self) -> Dict:
+        """字幕统计（Validator 使用，时长单位为秒）"""
+        count = len(self)
+        stats = {
+            'subtitle_count': count,
+            'total_duration': 0,
+            'average_duration': 0,
+            'min_duration': 0,
+            'max_duration': 0,
+            'empty_subtitles': sum(1 for i in range(count) if self.offsets[i] == self.offsets[i + 1]),
+            'overlapping_subtitles': sum(1 for i in range(1, count) if self.starts[i] < self.ends[i - 1])
+        }
+        if count:
+            durations = [(end - start) / 1000.0 for start, end in zip(self.starts, self.ends)]
+            stats['total_duration'] = sum(durations)
+            stats['average_duration'] = stats['total_duration'] / count
+            stats['min_duration'] = min(durations)
+            stats['max_duration'] = max(durations)
+        return stats
+
+    # ------------------------------------------------------------------
+    # 二进制格式
+    # ------------------------------------------------------------------
+    def to_bytes(self, source_size: int, source_mtime_ns: int) -> bytes:
+        arrays = [self.starts, self.ends, self.offsets]
+        if sys.byteorder == 'big':
+            arrays = [array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        data = self.text.encode('utf-8')
+        return b''.join([HEADER.pack(MAGIC, VERSION, len(self), source_size, source_mtime_ns, len(data)),
+                         *(a.tobytes() for a in arrays), data])
+
+    @classmethod
+    def from_bytes(cls, data: bytes, source_size: int, source_mtime_ns: int) -> Optional['Transcript']:
+        """读取二进制数据，格式不符或与字幕文件不一致时返回 None"""
+        if len(data) < HEADER.size:
+            return None
+        magic, version, count, size, mtime_ns, text_bytes = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or size != source_size or mtime_ns != source_mtime_ns:
+            return None
+        arrays, position = [], HEADER.size
+        for typecode, length in (('i', count), ('i', count), ('I', count + 1)):
+            values = array(typecode)
+            end = position + length * values.itemsize
+            values.frombytes(data[position:end])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            arrays.append(values)
+            position = end
+        if position + text_bytes != len(data):
+            return None
+        return cls(*arrays, data[position:].decode('utf-8'))
+
+
+class TranscriptStore:
+    """字幕模型的读取和缓存（进程内共享，线程安全）"""
+
+    def __init__(self, max_cached: int = MAX_CACHED):
+        self.max_cached = max_cached
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'file_hits': 0, 'parsed': 0}
+
+    def _remember(self, path: str, identity: tuple, transcript: Transcript) -> None:
+        with self._lock:
+            self._cache[path] = (identity, transcript)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _save(srt_path: str, identity: tuple, transcript: Transcript) -> None:
+        path = transcript_path(srt_path)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(transcript.to_bytes(*identity))
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def load(self, srt_path: str) -> Transcript:
+        """
+        读取字幕：进程内缓存 -> 字幕模型文件 -> 解析SRT（并写入模型文件）
+
+        Args:
+            srt_path: SRT字幕文件
+
+        Returns:
+            Transcript: 字幕数据
+
+        Raises:
+            OSError: 字幕文件不存在或无法读取
+        """
+        path = os.path.abspath(srt_path)
+        stat = os.stat(path)
+        identity = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == identity:
+                self._cache.move_to_end(path)
+                self.stats['memory_hits'] += 1
+                return cached[1]
+
+        transcript = None
+        try:
+            with open(transcript_path(path), 'rb') as f:
+                transcript = Transcript.from_bytes(f.read(), *identity)
+        except (OSError, ValueError, struct.error):
+            transcript = None
+        if transcript is not None:
+            self.stats['file_hits'] += 1
+        else:
+            transcript = Transcript.parse_srt(path)
+            self.stats['parsed'] += 1
+            self._save(path, identity, transcript)
+        self._remember(path, identity, transcript)
+        return transcript
+
+    def store(self, srt_path: str, transcript: Transcript) -> None:
+        """保存刚写入的字幕对应的模型（步骤2转录完成时调用，无需再解析SRT）"""
+        path = os.path.abspath(srt_path)
+        stat = os.stat(path)
+        identity = (stat.st_size, stat.st_mtime_ns)
+        self._save(path, identity, transcript)
+        self._remember(path, identity, transcript)
+
+
+_store = TranscriptStore()
+
+
+def load_transcript(srt_path: str) -> Transcript:
+    """读取字幕（见 TranscriptStore.load）"""
+    return _store.load(srt_path)
+
+
+def save_transcript(srt_path: str, segments: Iterable) -> Transcript:
+    """
+    由字幕段生成字幕模型并保存在SRT旁（SRT须已写入）
+
+    Args:
+        srt_path: 已写入的SRT文件
+        segments: 写入SRT时使用的字幕段
+
+    Returns:
+        Transcript: 字幕数据
+    """
+    transcript = Transcript.from_segments(segments)
+    _store.store(srt_path, transcript)
+    return transcript
+
+
+def copy_transcript(src_srt: str, dst_srt: str) -> None:
+    """随字幕一起复制字幕模型（字幕用 copy2 复制后大小和修改时间不变，模型仍然有效）"""
+    source = transcript_path(src_srt)
+    if os.path.exists(source):
+        try:
+            shutil.copy2(source, transcript_path(dst_srt))
+        except OSError:
+            pass
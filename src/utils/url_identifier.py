@@ -2,7 +2,8 @@
 视频URL平台识别器
 用于识别视频来自哪个平台（YouTube、Bilibili等）
 """
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs, unquote
+import os
 import re
 from typing import Optional
 
@@ -19,9 +20,13 @@ class URLIdentifier:
             url: 视频URL
             
         Returns:
-            str: 'youtube' | 'bilibili' | 'unknown'
+            str: 'youtube' | 'bilibili' | 'local' | 'unknown'
         """
         try:
+            # 本地视频文件（命令行批处理使用）
+            if URLIdentifier.local_video_path(url):
+                return 'local'
+            
             parsed = urlparse(url)
             domain = parsed.netloc.lower()
             
@@ -37,6 +42,24 @@ class URLIdentifier:
         except Exception:
             return 'unknown'
     
+    @staticmethod
+    def local_video_path(url: str) -> Optional[str]:
+        """
+        获取本地视频文件路径（支持普通路径和 file:// URL）
+        
+        Args:
+            url: 路径或URL
+            
+        Returns:
+            str: 存在的本地文件的绝对路径，不是本地文件时返回None
+        """
+        if not url:
+            return None
+        path = unquote(urlparse(url).path) if url.startswith('file://') else url
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+        return None
+    
     @staticmethod
     def extract_bilibili_bvid(url: str) -> Optional[str]:
         """
@@ -90,4 +113,46 @@ class URLIdentifier:
             return None
         except Exception:
             return None
-
+    
+    @staticmethod
+    def extract_bilibili_page(url: str) -> int:
+        """
+        提取B站多P视频的分P序号
+        
+        Args:
+            url: B站视频URL
+            
+        Returns:
+            int: 分P序号（从1开始，未指定时为1）
+            
+        Examples:
+            >>> URLIdentifier.extract_bilibili_page("https://www.bilibili.com/video/BV1C62PBeEha?p=3")
+            3
+        """
+        try:
+            page = parse_qs(urlparse(url).query).get('p', ['1'])[0]
+            return max(int(page), 1)
+        except (ValueError, TypeError):
+            return 1
+    
+    @staticmethod
+    def is_youtube_collection(url: str) -> bool:
+        """
+        判断是否为YouTube播放列表或频道URL（而非单个视频）
+        
+        Args:
+            url: YouTube URL
+            
+        Returns:
+            bool: 播放列表/频道返回True
+        """
+        try:
+            parsed = urlparse(url)
+            if 'youtube.com' not in parsed.netloc.lower():
+                return False
+            query = parse_qs(parsed.query)
+            if parsed.path.startswith('/playlist') and 'list' in query:
+                return True
+            return bool(re.match(r'^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)', parsed.path))
+        except Exception:
+            return False
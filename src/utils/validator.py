@@ -4,9 +4,11 @@
 import os
 import json
 from typing import Dict, List, Optional, Tuple
-import pysrt
-from PIL import Image
-import subprocess
+
+from .media_probe import get_media_probe
+from .transcript import load_transcript
+
+# PIL 在对应的校验方法中按需导入，避免拖慢导入本模块的启动路径
 
 class Validator:
     @staticmethod
@@ -26,37 +28,20 @@ class Validator:
         if file_size < 1024:  # 小于1KB可能有问题
             return False, f"视频文件过小: {file_size} bytes"
         
-        # 使用ffprobe检查视频信息
-        try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', file_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            if result.returncode != 0:
-                return False, f"无法读取视频信息: {result.stderr}"
-            
-            info = json.loads(result.stdout)
-            
-            # 检查是否有视频流
-            has_video = any(stream.get('codec_type') == 'video' 
-                          for stream in info.get('streams', []))
-            if not has_video:
-                return False, "文件中没有视频流"
-            
-            # 检查时长
-            duration = float(info.get('format', {}).get('duration', 0))
-            if duration <= 0:
-                return False, "视频时长无效"
-            
-            return True, f"视频文件有效 (时长: {duration:.1f}秒)"
-            
-        except subprocess.TimeoutExpired:
-            return False, "视频文件检查超时"
-        except json.JSONDecodeError:
-            return False, "无法解析视频信息"
-        except Exception as e:
-            return False, f"视频验证失败: {str(e)}"
+        # 使用ffprobe检查视频信息（同一文件只探测一次，结果供后续步骤复用）
+        info = get_media_probe().probe(file_path)
+        if not info['success']:
+            return False, f"视频验证失败: {info['error']}"
+        
+        # 检查是否有视频流
+        if not info['has_video']:
+            return False, "文件中没有视频流"
+        
+        # 检查时长
+        if info['duration'] <= 0:
+            return False, "视频时长无效"
+        
+        return True, f"视频文件有效 (时长: {info['duration']:.1f}秒)"
     
     @staticmethod
     def validate_srt_file(file_path: str) -> Tuple[bool, str, Dict]:
@@ -65,60 +50,14 @@ class Validator:
             return False, f"字幕文件不存在: {file_path}", {}
         
         try:
-            subs = pysrt.open(file_path, encoding='utf-8')
+            # 字幕只解析一次，后续步骤读取同一份字幕模型
+            transcript = load_transcript(file_path)
             
-            if len(subs) == 0:
+            if len(transcript) == 0:
                 return False, "字幕文件为空", {}
             
             # 统计信息
-            stats = {
-                'subtitle_count': len(subs),
-                'total_duration': 0,
-                'average_duration': 0,
-                'min_duration': float('inf'),
-                'max_duration': 0,
-                'empty_subtitles': 0,
-                'overlapping_subtitles': 0
-            }
-            
-            durations = []
-            prev_end = None
-            
-            for i, sub in enumerate(subs):
-                # 检查文本内容
-                if not sub.text.strip():
-                    stats['empty_subtitles'] += 1
-                
-                # 计算时长 - 修复SubRipTime对象的方法调用
-                try:
-                    # SubRipTime对象转换为秒数
-                    start_seconds = sub.start.hours * 3600 + sub.start.minutes * 60 + sub.start.seconds + sub.start.milliseconds / 1000
-                    end_seconds = sub.end.hours * 3600 + sub.end.minutes * 60 + sub.end.seconds + sub.end.milliseconds / 1000
-                    duration = end_seconds - start_seconds
-                except Exception:
-                    duration = 0
-                durations.append(duration)
-                
-                stats['min_duration'] = min(stats['min_duration'], duration)
-                stats['max_duration'] = max(stats['max_duration'], duration)
-                
-                # 检查重叠 - 修复时间比较
-                try:
-                    if prev_end:
-                        # 将SubRipTime转换为总秒数进行比较
-                        current_start_seconds = sub.start.hours * 3600 + sub.start.minutes * 60 + sub.start.seconds + sub.start.milliseconds / 1000
-                        prev_end_seconds = prev_end.hours * 3600 + prev_end.minutes * 60 + prev_end.seconds + prev_end.milliseconds / 1000
-                        if current_start_seconds < prev_end_seconds:
-                            stats['overlapping_subtitles'] += 1
-                except Exception:
-                    pass
-                
-                prev_end = sub.end
-            
-            if durations:
-                stats['total_duration'] = sum(durations)
-                stats['average_duration'] = stats['total_duration'] / len(durations)
-                stats['min_duration'] = stats['min_duration'] if stats['min_duration'] != float('inf') else 0
+            stats = transcript.stats()
             
             # 验证结果
             issues = []
@@ -162,6 +101,7 @@ class Validator:
         invalid_images = []
         total_size = 0
         
+        from PIL import Image
         for img_file in image_files:
             img_path = os.path.join(directory, img_file)
             try:
@@ -281,22 +221,27 @@ class Validator:
             print(f"[Validator] 视频文件不存在: {file_path}")
             return 0.0
         
-        try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', file_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode != 0:
-                print(f"[Validator] ffprobe执行失败: {result.stderr}")
-                return 0.0
-            
-            info = json.loads(result.stdout)
-            duration = float(info.get('format', {}).get('duration', 0))
-            
-            return max(0.0, duration)
+        info = get_media_probe().probe(file_path)
+        if not info['success']:
+            print(f"[Validator] 获取视频时长失败: {info['error']}")
+            return 0.0
+        return info['duration']
+    
+    @staticmethod
+    def get_video_resolution(file_path: str) -> Tuple[int, int]:
+        """
+        获取视频分辨率
+        
+        Args:
+            file_path: 视频文件路径
             
-        except Exception as e:
-            print(f"[Validator] 获取视频时长异常: {str(e)}")
-            return 0.0
\ No newline at end of file
+        Returns:
+            Tuple[int, int]: (宽, 高)，失败返回 (0, 0)
+        """
+        if not os.path.exists(file_path):
+            return 0, 0
+        
+        info = get_media_probe().probe(file_path)
+        if not info['success']:
+            return 0, 0
+        return info['width'], info['height']
@@ -1,19 +1,28 @@
 """
 Flask Web应用主文件
 """
-from flask import Flask, render_template, request, jsonify, send_file, abort
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, jsonify, send_file, abort, Response
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import os
 import json
+import hashlib
 import threading
 from datetime import datetime
 from typing import Dict, Optional
 
 from ..utils.config import Config
-from ..utils.logger import Logger
+from ..utils.logger import Logger, flush_logs
 from ..utils.file_manager import FileManager
 from ..utils.cache_manager import CacheManager
-from ..core.processor import YouTubeToArticleProcessor
+from ..utils.capabilities import get_capabilities
+from ..utils.tracing import read_trace
+from ..utils.project_log import PROJECT_LOG_FILE, read_project_log, iter_project_log, format_record
+from ..core.processor import YouTubeToArticleProcessor, STEP_NAMES
+from ..core.task_queue import start_event_relay
+from ..core.batch_expander import BatchExpander
+from .progress_emitter import ProgressEmitter, project_room
+from .server import socketio_options, force_queue_mode
+from .thumbnails import ThumbnailService, IMAGE_EXTENSIONS, DEFAULT_WIDTHS
 
 # 全局变量存储应用实例
 socketio = None
@@ -22,23 +31,47 @@ logger = None
 file_manager = None
 cache_manager = None
 processor = None
+progress_emitter = None
+thumbnail_service = None
 
-def create_app() -> Flask:
-    """创建Flask应用"""
-    global socketio, config, logger, file_manager, cache_manager, processor
+def create_app(server_mode: str = 'dev') -> Flask:
+    """
+    创建Flask应用
+    
+    Args:
+        server_mode: dev（线程模式）/ production（协程模式，处理步骤交给工作进程执行）
+    """
+    global socketio, config, logger, file_manager, cache_manager, processor, progress_emitter
     
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'youtube-to-article-secret-key-2024'
     
-    # 初始化SocketIO
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
-    
-    # 初始化工具类
     config = Config()
     logger = Logger("web_app")
+    production = server_mode == 'production'
+    
+    # 初始化SocketIO（生产模式使用协程，配置了消息队列时多个Web进程共享推送）
+    async_mode = config.get('web', 'async_mode', 'gevent') if production else 'threading'
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode,
+                        **socketio_options(config.get('web', 'message_queue', '').strip()))
+    
+    # 初始化工具类
     file_manager = FileManager(config, logger)
     cache_manager = CacheManager(config, logger)
-    processor = YouTubeToArticleProcessor()
+    processor_config = Config()
+    if production:
+        # 下载/转录/截图会长时间占用CPU或阻塞，不能在协程事件循环中执行
+        force_queue_mode(processor_config, logger)
+    processor = YouTubeToArticleProcessor(config=processor_config)
+    
+    # 进度事件按任务合并后发往项目房间
+    progress_emitter = ProgressEmitter(
+        socketio,
+        interval=config.get_float('web', 'progress_interval', 0.5),
+        max_projects=config.get_int('web', 'progress_snapshot_projects', 200),
+        interval_for=job_progress_interval,
+        logger=logger
+    )
     
     # 设置处理器回调
     processor.set_callbacks(
@@ -48,6 +81,23 @@ def create_app() -> Flask:
         transcribe_progress_callback=send_transcribe_progress
     )
     
+    # 可选：后台预加载Whisper模型（步骤由工作进程执行时不需要）
+    if config.get_boolean('step2_transcribe', 'warmup_on_start', False) and not processor.task_queue:
+        processor.start_model_warmup()
+    
+    if processor.task_queue:
+        if config.get_boolean('web', 'relay_events', True):
+            # 分布式模式：转发工作进程写入队列的进度事件（多个Web进程共用消息队列时只需一个转发）
+            start_event_relay(processor.task_queue, {
+                'progress_update': send_progress_update,
+                'step_complete': send_step_complete,
+                'download_progress': send_download_progress,
+                'transcribe_progress': send_transcribe_progress
+            }, logger)
+    elif config.get_boolean('jobs', 'resume_on_start', True):
+        # 继续处理上次退出时未完成的任务
+        processor.job_manager.resume()
+    
     # 注册路由
     register_routes(app)
     register_socketio_events()
@@ -61,9 +111,9 @@ def register_routes(app: Flask):
     def index():
         """主页"""
         try:
-            # 获取历史项目
-            projects = file_manager.list_projects()
-            return render_template('index.html', projects=projects[:10])  # 只显示最近10个项目
+            # 获取历史项目（只查询最近10个）
+            projects = file_manager.query_projects(per_page=10)['projects']
+            return render_template('index.html', projects=projects)
         except Exception as e:
             logger.error(f"加载主页失败: {str(e)}")
             return render_template('index.html', projects=[])
@@ -78,11 +128,10 @@ def register_routes(app: Flask):
     @app.route('/results/<project_name>')
     def results_page(project_name: str):
         """结果展示页面"""
+        project_path = resolve_project_dir(project_name)
+        if not project_path:
+            abort(404, "项目不存在")
         try:
-            project_path = os.path.join(config.get('basic', 'output_dir'), project_name)
-            if not os.path.exists(project_path):
-                abort(404, "项目不存在")
-            
             # 获取项目信息
             project_summary = file_manager.get_project_summary(project_path)
             
@@ -104,12 +153,31 @@ def register_routes(app: Flask):
     
     @app.route('/api/projects')
     def api_projects():
-        """获取项目列表API"""
+        """
+        获取项目列表API（分页）
+        
+        查询参数: page, per_page（默认50，最大500）, sort（modified_time/created_time/title/status/name）,
+                  order（asc/desc）, status（逗号分隔）, platform, language, batch_id,
+                  since/until（按创建时间，ISO格式）, q（标题/目录名/URL模糊匹配）
+        """
         try:
-            projects = file_manager.list_projects()
+            args = request.args
+            result = file_manager.query_projects(
+                page=args.get('page', 1, type=int),
+                per_page=args.get('per_page', 50, type=int),
+                sort=args.get('sort', 'modified_time'),
+                order=args.get('order', 'desc'),
+                status=args.get('status'),
+                platform=args.get('platform'),
+                language=args.get('language'),
+                batch_id=args.get('batch_id'),
+                since=args.get('since'),
+                until=args.get('until'),
+                search=args.get('q')
+            )
             return jsonify({
                 'success': True,
-                'projects': projects
+                **result
             })
         except Exception as e:
             logger.error(f"获取项目列表失败: {str(e)}")
@@ -118,6 +186,24 @@ def register_routes(app: Flask):
                 'error': str(e)
             }), 500
     
+    @app.route('/api/projects/facets')
+    def api_project_facets():
+        """各状态/平台/语言的项目数"""
+        return jsonify({'success': True, 'facets': file_manager.catalog.facets()})
+    
+    @app.route('/api/projects/rebuild', methods=['POST'])
+    def api_rebuild_projects():
+        """从磁盘重建项目索引（手动复制或删除项目目录后使用）"""
+        try:
+            count = file_manager.catalog.rebuild()
+            return jsonify({'success': True, 'total': count})
+        except Exception as e:
+            logger.error(f"重建项目索引失败: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
     @app.route('/api/start_process', methods=['POST'])
     def api_start_process():
         """开始处理API"""
@@ -157,6 +243,8 @@ def register_routes(app: Flask):
                 'transcribe_language': transcribe_language,
                 'whisper_model': whisper_model
             }
+            if config_data.get('progress_interval') is not None:
+                process_config['progress_interval'] = float(config_data['progress_interval'])
             
             # 使用处理器启动异步处理（传入配置）
             result = processor.start_async_process(youtube_url, project_name, process_config)
@@ -171,6 +259,7 @@ def register_routes(app: Flask):
                 'success': True,
                 'project_name': actual_project_name,
                 'project_path': result['project_path'],
+                'job_id': result['job_id'],
                 'message': result['message']
             })
             
@@ -183,13 +272,126 @@ def register_routes(app: Flask):
                 'error': str(e)
             }), 500
     
+    @app.route('/api/batch/expand', methods=['POST'])
+    def api_batch_expand():
+        """展开播放列表/频道/多P视频，返回条目列表（不开始处理）"""
+        try:
+            data = request.json or {}
+            source_url = data.get('url', '').strip()
+            if not source_url:
+                return jsonify({
+                    'success': False,
+                    'error': 'URL不能为空'
+                }), 400
+            
+            result = BatchExpander(config, logger, cache_manager).expand(source_url)
+            if not result['success']:
+                return jsonify(result), 400
+            return jsonify(result)
+            
+        except Exception as e:
+            logger.error(f"展开批量URL失败: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/batch/start', methods=['POST'])
+    def api_batch_start():
+        """开始批量处理API"""
+        try:
+            data = request.json or {}
+            source_url = data.get('url', '').strip()
+            batch_name = data.get('batch_name', '').strip()
+            selected = data.get('items')
+            
+            config_data = data.get('config', {})
+            process_config = {
+                'transcribe_language': config_data.get('transcribe_language', 'en'),
+                'whisper_model': config_data.get('whisper_model', 'base')
+            }
+            if config_data.get('progress_interval') is not None:
+                process_config['progress_interval'] = float(config_data['progress_interval'])
+            
+            if not source_url:
+                return jsonify({
+                    'success': False,
+                    'error': 'URL不能为空'
+                }), 400
+            
+            # 前端未传入条目时重新展开（命中元数据缓存时不会访问站点）
+            expanded = BatchExpander(config, logger, cache_manager).expand(source_url)
+            if not expanded['success']:
+                return jsonify(expanded), 400
+            
+            items = expanded['items']
+            if selected is not None:
+                selected_urls = set(selected)
+                items = [item for item in items if item['url'] in selected_urls]
+            
+            if not batch_name:
+                batch_name = expanded.get('title') or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            
+            result = processor.start_batch_process(source_url, items, batch_name, process_config)
+            if not result['success']:
+                return jsonify(result), 500
+            
+            logger.info(f"开始批量处理: {result['batch_id']} ({len(result['projects'])} 个视频)")
+            return jsonify(result)
+            
+        except Exception as e:
+            logger.error(f"开始批量处理失败: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/batch/status/<batch_id>')
+    def api_batch_status(batch_id: str):
+        """获取批量处理状态API"""
+        result = processor.get_batch_status(batch_id)
+        if not result['success']:
+            return jsonify(result), 404
+        return jsonify(result)
+    
+    @app.route('/api/jobs')
+    def api_jobs():
+        """列出排队中、运行中和已结束的任务及资源槽位占用"""
+        try:
+            return jsonify(processor.list_jobs())
+        except Exception as e:
+            logger.error(f"获取任务列表失败: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/workers')
+    def api_workers():
+        """列出分布式工作进程及其能力"""
+        if not processor.task_queue:
+            return jsonify({'success': True, 'distributed': False, 'workers': []})
+        return jsonify({'success': True, 'distributed': True, 'workers': processor.task_queue.list_workers()})
+    
+    @app.route('/api/jobs/<job_id>')
+    def api_job_status(job_id: str):
+        """获取单个任务状态API"""
+        result = processor.get_job_status(job_id)
+        if not result['success']:
+            return jsonify(result), 404
+        return jsonify(result)
+    
     @app.route('/api/step_status/<project_name>/<int:step>')
     def api_step_status(project_name: str, step: int):
         """获取步骤状态API"""
+        if not resolve_project_dir(project_name):
+            return jsonify({'success': False, 'error': '项目不存在'}), 404
         try:
             result = processor.get_step_status(project_name, step)
             if result['success']:
-                return jsonify(result)
+                # 处理页面轮询此接口，文件列表未变化时返回304
+                etag = hashlib.sha1(json.dumps(result['files'], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+                return conditional_json(result, etag)
             else:
                 return jsonify(result), 404 if 'not exist' in result.get('error', '') else 500
             
@@ -200,34 +402,80 @@ def register_routes(app: Flask):
                 'error': str(e)
             }), 500
     
+    @app.route('/api/step_files/<project_name>/<int:step>')
+    def api_step_files(project_name: str, step: int):
+        """
+        分页获取步骤目录文件API
+        
+        查询参数: dir（子目录，如 screenshots）, cursor（上一页的 next_cursor）, limit（默认100，最大1000）,
+                  type（逗号分隔: image/video/audio/text/other）, ext（逗号分隔的扩展名）
+        响应带ETag，清单未变化时返回304
+        """
+        try:
+            project_path = resolve_project_dir(project_name)
+            step_name = STEP_NAMES.get(step)
+            if not step_name or not project_path:
+                return jsonify({'success': False, 'error': '项目或步骤不存在'}), 404
+            subdir = request.args.get('dir', '').strip('/')
+            if '..' in subdir.split('/'):
+                return jsonify({'success': False, 'error': '无效的目录'}), 400
+            
+            result = file_manager.list_step_files(
+                project_path, step_name, subdir=subdir,
+                cursor=request.args.get('cursor') or None,
+                limit=request.args.get('limit', 100, type=int),
+                file_types=split_arg(request.args.get('type', '')),
+                extensions=split_arg(request.args.get('ext', ''))
+            )
+            if not result['success']:
+                return jsonify(result), 404
+            # ETag 区分清单版本和查询参数（不同页/过滤条件的响应不同）
+            etag = hashlib.sha1(f"{result['etag']}|{request.query_string.decode('utf-8')}".encode('utf-8')).hexdigest()[:16]
+            return conditional_json(result, etag)
+        except Exception as e:
+            logger.error(f"获取步骤文件失败: {str(e)}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
     @app.route('/api/file_preview/<project_name>/<step_name>/<path:filename>')
     def api_file_preview(project_name: str, step_name: str, filename: str):
-        """文件预览API"""
+        """
+        文件预览API（只读取请求的窗口）
+        
+        查询参数: mode（head/tail/range/srt/json，默认head）, lines（head/tail行数，默认20）,
+                  offset/length（range的字节范围）, limit（srt条数/json键数）
+        """
         try:
-            project_path = os.path.join(config.get('basic', 'output_dir'), project_name)
-            if not os.path.exists(project_path):
+            if not resolve_project_dir(project_name):
                 return jsonify({
                     'success': False,
                     'error': '项目不存在'
                 }), 404
             
-            file_path = os.path.join(project_path, step_name, filename)
-            if not os.path.exists(file_path):
+            file_path = resolve_project_file(project_name, f'{step_name}/{filename}')
+            if not file_path:
                 return jsonify({
                     'success': False,
                     'error': '文件不存在'
                 }), 404
             
             # 获取文件预览内容
-            preview_content = file_manager.get_file_content_preview(file_path)
+            args = request.args
+            preview = file_manager.preview_file(
+                file_path,
+                mode=args.get('mode', 'head'),
+                lines=args.get('lines', 20, type=int),
+                offset=args.get('offset', 0, type=int),
+                length=args.get('length', 64 * 1024, type=int),
+                limit=args.get('limit', 20, type=int)
+            )
             file_ext = os.path.splitext(filename)[1].lower()
             
             return jsonify({
                 'success': True,
                 'filename': filename,
                 'file_type': file_ext,
-                'content': preview_content,
-                'file_size': os.path.getsize(file_path)
+                'file_size': os.path.getsize(file_path),
+                **preview
             })
             
         except Exception as e:
@@ -240,21 +488,52 @@ def register_routes(app: Flask):
     @app.route('/api/download/<project_name>/<step_name>/<path:filename>')
     def api_download_file(project_name: str, step_name: str, filename: str):
         """文件下载API"""
+        file_path = resolve_project_file(project_name, f'{step_name}/{filename}')
+        if not file_path:
+            abort(404, "文件不存在")
+        
         try:
-            project_path = os.path.join(config.get('basic', 'output_dir'), project_name)
-            if not os.path.exists(project_path):
-                abort(404, "项目不存在")
-            
-            file_path = os.path.join(project_path, step_name, filename)
-            if not os.path.exists(file_path):
-                abort(404, "文件不存在")
-            
             return send_file(file_path, as_attachment=True, download_name=filename)
             
         except Exception as e:
             logger.error(f"文件下载失败: {str(e)}")
             abort(500, f"文件下载失败: {str(e)}")
     
+    @app.route('/thumb/<project_name>/<path:filename>')
+    def thumbnail(project_name: str, filename: str):
+        """
+        截图缩略图（首次请求时生成并缓存）
+        
+        查询参数: w（宽度，取到 [thumbnails] widths 中的档位）, format（webp/jpeg，默认按浏览器Accept头选择）
+        """
+        source_path = resolve_project_file(project_name, filename)
+        if not source_path:
+            abort(404, "文件不存在")
+        if os.path.splitext(source_path)[1].lower() not in IMAGE_EXTENSIONS:
+            abort(400, "不支持的图片格式")
+        
+        service = get_thumbnail_service()
+        fmt = service.choose_format(request.args.get('format'), request.headers.get('Accept', ''))
+        width = service.snap_width(request.args.get('w', type=int))
+        try:
+            thumb_path, mimetype, key = service.get(source_path, width, fmt)
+        except Exception as e:
+            logger.error(f"[缩略图] 生成失败 {filename}: {str(e)}")
+            abort(500, "缩略图生成失败")
+        
+        response = send_file(thumb_path, mimetype=mimetype, etag=key[:16],
+                             max_age=config.get_int('thumbnails', 'max_age', 86400))
+        response.vary.add('Accept')
+        return response.make_conditional(request)
+    
+    @app.route('/media/<project_name>/<path:filename>')
+    def media_file(project_name: str, filename: str):
+        """项目原始文件（视频/音频/图片），浏览器内直接播放或显示，支持Range请求和ETag"""
+        file_path = resolve_project_file(project_name, filename)
+        if not file_path:
+            abort(404, "文件不存在")
+        return send_file(file_path, conditional=True, max_age=config.get_int('thumbnails', 'max_age', 86400))
+    
     @app.route('/api/cache/stats')
     def api_cache_stats():
         """获取缓存统计信息API"""
@@ -269,6 +548,8 @@ def register_routes(app: Flask):
                     bytes_size /= 1024.0
                 return f"{bytes_size:.2f} TB"
             
+            total_size = sum(item['size'] for item in stats.values())
+            
             return jsonify({
                 'success': True,
                 'stats': {
@@ -282,8 +563,8 @@ def register_routes(app: Flask):
                         'size': stats['subtitles_en']['size'],
                         'size_formatted': format_size(stats['subtitles_en']['size'])
                     },
-                    'total_size': stats['videos']['size'] + stats['subtitles_en']['size'],
-                    'total_size_formatted': format_size(stats['videos']['size'] + stats['subtitles_en']['size'])
+                    'total_size': total_size,
+                    'total_size_formatted': format_size(total_size)
                 }
             })
         except Exception as e:
@@ -351,15 +632,103 @@ def register_routes(app: Flask):
                 'error': str(e)
             }), 500
     
+    @app.route('/api/cache/evict', methods=['POST'])
+    def api_cache_evict():
+        """按容量预算淘汰缓存API"""
+        try:
+            evicted = cache_manager.evict()
+            logger.info(f"缓存淘汰完成: {evicted}")
+            
+            return jsonify({
+                'success': True,
+                'evicted': evicted,
+                'policy': cache_manager.eviction_policy
+            })
+        except Exception as e:
+            logger.error(f"缓存淘汰失败: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/system/capabilities')
+    def api_system_capabilities():
+        """获取运行环境能力（外部工具与可选模块，探测结果进程内缓存）"""
+        return jsonify({
+            'success': True,
+            'capabilities': get_capabilities().snapshot()
+        })
+    
+    @app.route('/metrics')
+    def metrics():
+        """运行指标（Prometheus文本格式）"""
+        return Response(processor.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    
+    @app.route('/api/trace/<project_name>')
+    def api_trace(project_name: str):
+        """获取项目的步骤追踪记录（trace.jsonl）"""
+        project_path = resolve_project_dir(project_name)
+        if not project_path:
+            return jsonify({'success': False, 'error': '项目不存在'}), 404
+        limit = request.args.get('limit', 0, type=int)
+        return jsonify({'success': True, 'spans': read_trace(project_path, limit)})
+    
+    @app.route('/api/logs/<project_name>')
+    def api_project_logs(project_name: str):
+        """
+        项目日志API（增量读取，用于实时显示）
+        
+        查询参数: step（步骤号，0为步骤外）, level（最低级别）, after（上次返回的cursor）,
+                  limit（默认200，最大1000）, tail（1 表示返回最后 limit 条）
+        """
+        project_path = resolve_project_dir(project_name)
+        if not project_path:
+            return jsonify({'success': False, 'error': '项目不存在'}), 404
+        args = request.args
+        result = read_project_log(
+            project_path,
+            step=args.get('step', type=int),
+            level=args.get('level'),
+            after=args.get('after', -1, type=int),
+            limit=args.get('limit', 200, type=int),
+            tail=args.get('tail', '') in ('1', 'true')
+        )
+        return jsonify({'success': True, **result})
+    
     @app.route('/api/logs/export/<project_name>')
     def api_logs_export(project_name: str):
-        """导出项目日志API"""
+        """
+        导出项目日志API
+        
+        查询参数: step, level（同 /api/logs）, format（txt/jsonl，默认txt）,
+                  scope=global 导出当天的全局处理日志（所有项目，运维使用）
+        """
+        project_path = resolve_project_dir(project_name)
+        if not project_path:
+            return jsonify({'success': False, 'error': '项目不存在'}), 404
         try:
-            # 获取日志文件路径
-            log_dir = config.get('basic', 'log_dir', './logs')
-            
-            # 尝试找到最新的日志文件
             today = datetime.now().strftime('%Y%m%d')
+            # 日志由后台线程写入，导出前等待已记录的日志写完
+            flush_logs(timeout=2.0)
+            
+            if request.args.get('scope') != 'global' and os.path.exists(os.path.join(project_path, PROJECT_LOG_FILE)):
+                # 按索引流式输出命中的记录
+                step = request.args.get('step', type=int)
+                level = request.args.get('level')
+                as_jsonl = request.args.get('format') == 'jsonl'
+                
+                def generate():
+                    for record in iter_project_log(project_path, step=step, level=level):
+                        record.pop('offset', None)
+                        yield (json.dumps(record, ensure_ascii=False) if as_jsonl else format_record(record)) + '\n'
+                
+                extension = 'jsonl' if as_jsonl else 'txt'
+                return Response(generate(), mimetype='application/x-ndjson' if as_jsonl else 'text/plain',
+                                headers={'Content-Disposition':
+                                         f'attachment; filename="{project_name}_log.{extension}"'})
+            
+            # 获取日志文件路径（没有项目日志的旧项目也导出全局日志）
+            log_dir = config.get('basic', 'log_dir', './logs')
             log_file = os.path.join(log_dir, f'processor_{today}.log')
             
             if not os.path.exists(log_file):
@@ -393,15 +762,40 @@ def register_routes(app: Flask):
                     'error': '缺少必要参数'
                 }), 400
             
-            # TODO: 实现从指定步骤重新开始的逻辑
-            # 这需要在processor中添加相应的方法
+            # force=false 时只重新执行输入发生变化的步骤（例如修改模板后只重跑步骤4、5）
+            result = processor.retry_from_step(project_name, int(step), force=parse_bool(data.get('force'), True))
+            if not result['success']:
+                return jsonify(result), 400
             
+            return jsonify(result)
+        except Exception as e:
+            logger.error(f"重试步骤失败: {str(e)}")
             return jsonify({
                 'success': False,
-                'error': '此功能正在开发中'
-            }), 501
+                'error': str(e)
+            }), 500
+    
+    @app.route('/api/process/cancel', methods=['POST'])
+    def api_cancel_process():
+        """取消任务API（按 job_id 或 project_name）"""
+        try:
+            data = request.json or {}
+            job_id = data.get('job_id')
+            project_name = data.get('project_name')
+            
+            if not job_id and not project_name:
+                return jsonify({
+                    'success': False,
+                    'error': '缺少必要参数'
+                }), 400
+            
+            result = processor.cancel_job(job_id, project_name, reason=data.get('reason', 'user'))
+            if not result['success']:
+                return jsonify(result), 404
+            
+            return jsonify(result)
         except Exception as e:
-            logger.error(f"重试步骤失败: {str(e)}")
+            logger.error(f"取消任务失败: {str(e)}")
             return jsonify({
                 'success': False,
                 'error': str(e)
@@ -410,11 +804,10 @@ def register_routes(app: Flask):
     @app.route('/step6/<project_name>')
     def step6_page(project_name: str):
         """Step6 操作页面"""
+        project_path = resolve_project_dir(project_name)
+        if not project_path:
+            abort(404, "项目不存在")
         try:
-            project_path = os.path.join(config.get('basic', 'output_dir'), project_name)
-            if not os.path.exists(project_path):
-                abort(404, "项目不存在")
-            
             # 获取项目信息
             project_summary = file_manager.get_project_summary(project_path)
             
@@ -572,66 +965,129 @@ def register_routes(app: Flask):
                              error_code=500,
                              error_message="服务器内部错误"), 500
 
+def resolve_project_dir(project_name: str) -> Optional[str]:
+    """
+    项目目录的绝对路径（项目必须是输出目录下已存在的一级目录）
+    
+    Returns:
+        Optional[str]: 项目目录，不存在或越界时返回 None
+    """
+    if not project_name or project_name in ('.', '..') or '/' in project_name or '\\' in project_name:
+        return None
+    output_dir = os.path.realpath(config.get('basic', 'output_dir'))
+    project_path = os.path.realpath(os.path.join(output_dir, project_name))
+    if not project_path.startswith(output_dir + os.sep) or not os.path.isdir(project_path):
+        return None
+    return project_path
+
+def resolve_project_file(project_name: str, filename: str) -> Optional[str]:
+    """
+    项目内文件的绝对路径（项目目录见 resolve_project_dir，文件不允许跳出项目目录）
+    
+    Returns:
+        Optional[str]: 文件路径，不存在或越界时返回 None
+    """
+    project_path = resolve_project_dir(project_name)
+    if not project_path:
+        return None
+    file_path = os.path.realpath(os.path.join(project_path, filename))
+    if not file_path.startswith(project_path + os.sep) or not os.path.isfile(file_path):
+        return None
+    return file_path
+
+def get_thumbnail_service() -> ThumbnailService:
+    """缩略图服务（首次请求缩略图时创建）"""
+    global thumbnail_service
+    if thumbnail_service is None:
+        widths = tuple(int(w) for w in config.get_list('thumbnails', 'widths') if w.isdigit())
+        thumbnail_service = ThumbnailService(
+            config.get('thumbnails', 'cache_dir', '')
+            or os.path.join(config.get('basic', 'cache_dir', './cache'), 'thumbnails'),
+            widths=widths or DEFAULT_WIDTHS,
+            quality=config.get_int('thumbnails', 'quality', 80),
+            workers=config.get_int('thumbnails', 'workers', 2),
+            logger=logger
+        )
+    return thumbnail_service
+
+def parse_bool(value, default: bool = False) -> bool:
+    """请求中的布尔参数（JSON布尔值，或 1/true/yes 字符串），未提供时返回默认值"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+def split_arg(value: str) -> list:
+    """逗号分隔的查询参数"""
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+def conditional_json(result: Dict, etag: str) -> Response:
+    """
+    带ETag的JSON响应，请求的 If-None-Match 与 ETag 一致时返回304
+    
+    Args:
+        result: 响应内容
+        etag: 内容版本
+    """
+    response = jsonify(result)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def job_progress_interval(project_name: str) -> Optional[float]:
+    """任务配置的进度发送间隔（process_config.progress_interval），未配置时返回None"""
+    if processor is None:
+        return None
+    job = processor.job_manager.find_active_job(project_name)
+    if job is None:
+        return None
+    return (job.process_config or {}).get('progress_interval')
+
 def send_progress_update(project_name: str, step: int, progress: int, message: str):
     """发送进度更新（供处理模块调用）"""
-    if socketio:
-        socketio.emit('progress_update', {
-            'project_name': project_name,
+    if progress_emitter:
+        progress_emitter.emit('progress_update', project_name, {
             'step': step,
             'progress': progress,
-            'message': message,
-            'timestamp': datetime.now().isoformat()
+            'message': message
         })
 
 def send_download_progress(project_name: str, step: int, progress_data: Dict):
     """
-    发送详细的下载进度（供处理模块调用）
+    发送详细的下载进度（供处理模块调用，按任务的发送间隔合并）
     
     Args:
         project_name: 项目名称
         step: 步骤号
         progress_data: 详细进度数据
     """
-    if socketio:
-        logger.info(f"[下载] 发送下载进度: 项目={project_name}, 步骤={step}, 进度={progress_data.get('percent', 0)}%")
-        socketio.emit('download_progress', {
-            'project_name': project_name,
-            'step': step,
-            'progress_data': progress_data,
-            'timestamp': datetime.now().isoformat()
-        })
+    if progress_emitter:
+        progress_emitter.publish('download_progress', project_name, step, progress_data)
     else:
         logger.warning("[警告] SocketIO未初始化，无法发送下载进度")
 
 def send_transcribe_progress(project_name: str, step: int, progress_data: Dict):
     """
-    发送详细的转录进度（供处理模块调用）
+    发送详细的转录进度（供处理模块调用，按任务的发送间隔合并）
     
     Args:
         project_name: 项目名称
         step: 步骤号
         progress_data: 详细进度数据
     """
-    if socketio:
-        logger.info(f"[转录] 发送转录进度: 项目={project_name}, 步骤={step}, 进度={progress_data.get('percent', 0)}%")
-        socketio.emit('transcribe_progress', {
-            'project_name': project_name,
-            'step': step,
-            'progress_data': progress_data,
-            'timestamp': datetime.now().isoformat()
-        })
+    if progress_emitter:
+        progress_emitter.publish('transcribe_progress', project_name, step, progress_data)
     else:
         logger.warning("[警告] SocketIO未初始化，无法发送转录进度")
 
 def send_step_complete(project_name: str, step: int, success: bool, message: str):
     """发送步骤完成通知（供处理模块调用）"""
-    if socketio:
-        socketio.emit('step_complete', {
-            'project_name': project_name,
+    if progress_emitter:
+        progress_emitter.emit('step_complete', project_name, {
             'step': step,
             'success': success,
-            'message': message,
-            'timestamp': datetime.now().isoformat()
+            'message': message
         })
 
 def register_socketio_events():
@@ -653,11 +1109,18 @@ def register_socketio_events():
         """加入项目房间"""
         project_name = data.get('project_name')
         if project_name:
-            # 加入房间以接收该项目的更新
-            # room = f"project_{project_name}"
-            # join_room(room)
+            # 加入房间以接收该项目的更新，并补发最新状态
+            join_room(project_room(project_name))
             logger.info(f"客户端加入项目: {project_name}")
             emit('joined_project', {'project_name': project_name})
+            progress_emitter.send_snapshot(project_name, request.sid)
+    
+    @socketio.on('leave_project')
+    def handle_leave_project(data):
+        """离开项目房间"""
+        project_name = data.get('project_name')
+        if project_name:
+            leave_room(project_room(project_name))
 
 # 导出函数供其他模块使用
 def get_socketio():
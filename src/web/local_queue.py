@@ -0,0 +1,40 @@
+"""
+进程内的SocketIO消息队列
+生产模式下 SocketIO 通过消息队列在多个服务实例间共享推送；local:// 在同一进程内模拟该行为，供测试和单机调试使用。
+"""
+import json
+import queue
+import threading
+from typing import Dict, List
+
+import socketio
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """
+    进程内的消息队列（message_queue = local://频道名）
+
+    用于测试和单机调试：同一进程中的多个SocketIO服务共享推送，行为与 Redis/Kombu 消息队列一致。
+    """
+
+    name = 'local'
+    _channels: Dict[str, List[queue.Queue]] = {}
+    _channels_lock = threading.Lock()
+
+    def __init__(self, url: str = 'local://', channel: str = 'socketio', write_only: bool = False, logger=None):
+        channel = url.split('://', 1)[-1] or channel
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _publish(self, data):
+        message = json.dumps(data)
+        with self._channels_lock:
+            subscribers = list(self._channels.get(self.channel, []))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def _listen(self):
+        subscriber = queue.Queue()
+        with self._channels_lock:
+            self._channels.setdefault(self.channel, []).append(subscriber)
+        while True:
+            yield subscriber.get()
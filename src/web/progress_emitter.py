@@ -0,0 +1,188 @@
+"""
+进度事件发送
+下载/转录进度按任务合并：同一项目同一步骤在一个发送间隔内只发送最新状态，且只发送变化的字段；
+事件只发往项目房间（join_project 加入），并保留各项目的最新状态快照，供后加入的客户端立即同步。
+"""
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 按间隔合并的高频事件，其余事件（步骤进度消息、步骤完成）立即发送
+THROTTLED_EVENTS = ('download_progress', 'transcribe_progress')
+
+# 快照重放顺序：先恢复已完成的步骤，再恢复进度
+SNAPSHOT_ORDER = ('step_complete', 'progress_update', 'download_progress', 'transcribe_progress')
+
+
+def project_room(project_name: str) -> str:
+    """项目房间名"""
+    return f"project_{project_name}"
+
+
+class ProgressEmitter:
+    """
+    房间级的进度事件发送器（线程安全）
+
+    高频进度事件（download_progress/transcribe_progress）的 progress_data 只包含相对上次发送变化的字段，
+    partial=True 表示需要与客户端已有状态合并；快照和每个步骤的第一次发送为完整状态（partial=False）。
+    """
+
+    def __init__(self, socketio, interval: float = 0.5, max_projects: int = 200,
+                 interval_for: Optional[Callable[[str], Optional[float]]] = None, logger=None):
+        """
+        Args:
+            socketio: SocketIO实例
+            interval: 默认发送间隔（秒），0 表示不合并
+            max_projects: 保留快照的项目数（超出时淘汰最久未更新的项目）
+            interval_for: 按项目返回任务配置的发送间隔，返回None时使用默认值
+            logger: 日志记录器
+        """
+        self.socketio = socketio
+        self.interval = max(0.0, interval)
+        self.max_projects = max(1, max_projects)
+        self.interval_for = interval_for
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._streams: Dict[Tuple[str, str, int], Dict] = {}
+        self._snapshots: 'OrderedDict[str, Dict[Tuple[str, int], Dict]]' = OrderedDict()
+
+    def publish(self, event: str, project_name: str, step: int, progress_data: Dict) -> None:
+        """
+        发送高频进度事件（按任务的发送间隔合并）
+
+        Args:
+            event: download_progress / transcribe_progress
+            project_name: 项目名称
+            step: 步骤号
+            progress_data: 完整的进度数据
+        """
+        key = (project_name, event, step)
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = {'latest': {}, 'sent': {}, 'last_emit': 0.0, 'timer': None,
+                          'interval': self._project_interval(project_name)}
+                self._streams[key] = stream
+            stream['latest'].update(progress_data)
+            self._remember_locked(project_name, event, step, {'step': step, 'progress_data': dict(stream['latest'])})
+
+            # 完成时立即发送，保证客户端看到100%
+            delay = stream['last_emit'] + stream['interval'] - time.monotonic()
+            if delay <= 0 or progress_data.get('percent', 0) >= 100:
+                self._flush_stream_locked(key, stream)
+            elif stream['timer'] is None:
+                timer = threading.Timer(delay, self._flush_timer, args=(key,))
+                timer.daemon = True
+                stream['timer'] = timer
+                timer.start()
+
+    def emit(self, event: str, project_name: str, payload: Dict) -> None:
+        """
+        立即发送事件到项目房间（步骤完成前先发送该项目尚未发出的进度）
+
+        Args:
+            event: progress_update / step_complete
+            project_name: 项目名称
+            payload: 事件数据（需包含 step）
+        """
+        step = payload.get('step', 0)
+        with self._lock:
+            if event == 'step_complete':
+                for key in [k for k in self._streams if k[0] == project_name and k[2] == step]:
+                    stream = self._streams.pop(key)
+                    self._flush_stream_locked(key, stream)
+            self._remember_locked(project_name, event, step, payload)
+            self._send_locked(event, project_name, payload)
+
+    def snapshot(self, project_name: str) -> List[Tuple[str, Dict]]:
+        """
+        项目的最新状态（完整数据）
+
+        Returns:
+            List[Tuple[str, Dict]]: [(事件名, 事件数据)]，按步骤和 SNAPSHOT_ORDER 排序
+        """
+        with self._lock:
+            events = dict(self._snapshots.get(project_name, {}))
+        ordered = sorted(events.items(), key=lambda item: (item[0][1], SNAPSHOT_ORDER.index(item[0][0])))
+        return [(event, self._payload(project_name, data, partial=False, snapshot=True))
+                for (event, _), data in ordered]
+
+    def send_snapshot(self, project_name: str, sid: str) -> int:
+        """
+        把项目的最新状态发送给单个客户端（加入房间后调用）
+
+        Args:
+            project_name: 项目名称
+            sid: 客户端会话ID
+
+        Returns:
+            int: 发送的事件数
+        """
+        events = self.snapshot(project_name)
+        for event, payload in events:
+            self.socketio.emit(event, payload, to=sid)
+        return len(events)
+
+    def _project_interval(self, project_name: str) -> float:
+        """任务配置的发送间隔，未配置时使用默认值"""
+        if self.interval_for:
+            try:
+                value = self.interval_for(project_name)
+                if value is not None:
+                    return max(0.0, float(value))
+            except (TypeError, ValueError):
+                pass
+        return self.interval
+
+    def _flush_timer(self, key: Tuple[str, str, int]) -> None:
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self._flush_stream_locked(key, stream)
+
+    def _flush_stream_locked(self, key: Tuple[str, str, int], stream: Dict) -> None:
+        """发送变化的字段（在锁内发送，保证同一项目的事件顺序）"""
+        if stream['timer'] is not None:
+            stream['timer'].cancel()
+            stream['timer'] = None
+        changes = {k: v for k, v in stream['latest'].items() if k not in stream['sent'] or stream['sent'][k] != v}
+        if not changes:
+            return
+        project_name, event, step = key
+        partial = bool(stream['sent'])
+        stream['sent'] = dict(stream['latest'])
+        stream['last_emit'] = time.monotonic()
+        self._send_locked(event, project_name,
+                          self._payload(project_name, {'step': step, 'progress_data': changes}, partial=partial))
+
+    def _send_locked(self, event: str, project_name: str, payload: Dict) -> None:
+        if 'timestamp' not in payload:
+            payload = self._payload(project_name, payload)
+        self.socketio.emit(event, payload, to=project_room(project_name))
+        if self.logger:
+            self.logger.debug("[进度] %s -> %s: %s", event, project_name,
+                              payload.get('progress_data', payload.get('message', '')))
+
+    def _remember_locked(self, project_name: str, event: str, step: int, data: Dict) -> None:
+        """更新快照；某步骤重新开始（收到该步骤的进度消息）时清除该步骤及之后步骤的完成记录"""
+        events = self._snapshots.setdefault(project_name, {})
+        self._snapshots.move_to_end(project_name)
+        if event == 'progress_update':
+            for key in [k for k in events if k[0] == 'step_complete' and k[1] >= step]:
+                del events[key]
+        events[(event, step)] = data
+        while len(self._snapshots) > self.max_projects:
+            self._snapshots.popitem(last=False)
+
+    @staticmethod
+    def _payload(project_name: str, data: Dict, partial: Optional[bool] = None, snapshot: bool = False) -> Dict:
+        payload = dict(data)
+        payload['project_name'] = project_name
+        if partial is not None:
+            payload['partial'] = partial
+        if snapshot:
+            payload['snapshot'] = True
+        payload['timestamp'] = datetime.now().isoformat()
+        return payload
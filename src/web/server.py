@@ -0,0 +1,111 @@
+"""
+Web服务运行模式
+dev：Flask开发服务器 + 线程模式SocketIO（默认）
+production：gevent/eventlet 协程服务器，SocketIO 可通过消息队列在多个Web进程间共享推送；
+    Web进程只处理请求和转发进度，处理步骤（下载/转录/截图）由任务队列交给独立的工作进程执行，
+    避免CPU密集的步骤阻塞协程事件循环。
+"""
+import os
+import sys
+import subprocess
+from typing import Dict, List
+
+SERVER_MODES = ('dev', 'production')
+ASYNC_MODES = ('gevent', 'eventlet')
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+
+def patch_for_async(async_mode: str) -> None:
+    """
+    按异步库给标准库打补丁（必须在导入Web应用和日志模块之前调用，因此本模块只依赖标准库）
+
+    Args:
+        async_mode: gevent / eventlet
+
+    Raises:
+        RuntimeError: 异步库未安装或不支持
+    """
+    if async_mode not in ASYNC_MODES:
+        raise RuntimeError(f"不支持的异步模式: {async_mode}（可选: {', '.join(ASYNC_MODES)}）")
+    try:
+        if async_mode == 'gevent':
+            from gevent import monkey
+            monkey.patch_all()
+        else:
+            import eventlet
+            eventlet.monkey_patch()
+    except ImportError:
+        packages = 'gevent gevent-websocket' if async_mode == 'gevent' else 'eventlet'
+        raise RuntimeError(f"生产模式需要安装 {async_mode}: pip install {packages}")
+
+
+def socketio_options(message_queue: str) -> Dict:
+    """
+    SocketIO 的消息队列参数
+
+    Args:
+        message_queue: 消息队列地址（redis:// / amqp:// / kafka:// / local://），留空表示单进程
+
+    Returns:
+        Dict: 传给 SocketIO() 的参数
+    """
+    if not message_queue:
+        return {}
+    if message_queue.startswith('local://'):
+        from .local_queue import LocalPubSubManager
+        return {'client_manager': LocalPubSubManager(message_queue)}
+    return {'message_queue': message_queue}
+
+
+def start_local_workers(count: int, config_path: str = 'config/config.ini', logger=None) -> List[subprocess.Popen]:
+    """
+    在本机启动工作进程（生产模式未部署独立工作进程时使用）
+
+    Args:
+        count: 工作进程数
+        config_path: 配置文件路径
+        logger: 日志对象
+
+    Returns:
+        List[subprocess.Popen]: 工作进程
+    """
+    workers = []
+    for index in range(count):
+        cmd = [sys.executable, os.path.join(PROJECT_ROOT, 'run_worker.py'), '--config', config_path,
+               '--worker-id', f"local_{os.getpid()}_{index + 1}"]
+        workers.append(subprocess.Popen(cmd))
+        if logger:
+            logger.info(f"[服务] 已启动本机工作进程 {index + 1}/{count} (PID {workers[-1].pid})")
+    return workers
+
+
+def stop_local_workers(workers: List[subprocess.Popen], timeout: float = 10) -> None:
+    """结束本机工作进程（工作进程会在当前步骤被中断，任务租约到期后由其他工作进程重新领取）"""
+    for worker in workers:
+        if worker.poll() is None:
+            worker.terminate()
+    for worker in workers:
+        try:
+            worker.wait(timeout)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+def force_queue_mode(config, logger=None) -> bool:
+    """
+    生产模式下让Web进程只负责入队（未开启分布式模式时改用本机任务队列）
+
+    Args:
+        config: 配置对象（会被修改）
+        logger: 日志对象
+
+    Returns:
+        bool: 是否修改了配置
+    """
+    if config.get_boolean('distributed', 'enabled', False):
+        return False
+    config.set('distributed', 'enabled', 'true')
+    if logger:
+        logger.info("[服务] 生产模式：处理步骤交给工作进程执行，Web进程只负责入队和转发进度")
+    return True
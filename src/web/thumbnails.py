@@ -0,0 +1,198 @@
+"""
+截图缩略图服务
+结果页和报告按需请求缩略图，首次请求时在进程池中生成（缩放和编码不占用Web进程的GIL），
+以源文件路径、修改时间和大小作为缓存键保存在磁盘上，源文件被替换后自动生成新的缩略图。
+"""
+import os
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Optional, Tuple
+
+from ..utils.logger import Logger
+
+# 可生成缩略图的源文件
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+# 输出格式: 扩展名, PIL格式名, MIME类型
+FORMATS = {
+    'webp': ('.webp', 'WEBP', 'image/webp'),
+    'jpeg': ('.jpg', 'JPEG', 'image/jpeg'),
+}
+
+# 默认的缩略图宽度档位，请求的宽度向上取到最近的档位，限制缓存的变体数量
+DEFAULT_WIDTHS = (160, 320, 480, 640, 960)
+
+
+def render_thumbnail(source_path: str, target_path: str, width: int, pil_format: str, quality: int) -> str:
+    """
+    生成缩略图（在进程池中执行）
+
+    Args:
+        source_path: 源图片
+        target_path: 输出路径
+        width: 最大宽度（源图更窄时不放大）
+        pil_format: PIL格式名（WEBP/JPEG）
+        quality: 编码质量
+
+    Returns:
+        str: 输出路径
+    """
+    from PIL import Image
+
+    with Image.open(source_path) as img:
+        img.thumbnail((width, width * 4), Image.LANCZOS)
+        if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        temp_path = f"{target_path}.{os.getpid()}.tmp"
+        if pil_format == 'WEBP':
+            img.save(temp_path, pil_format, quality=quality, method=4)
+        else:
+            img.save(temp_path, pil_format, quality=quality, optimize=True)
+    os.replace(temp_path, target_path)
+    return target_path
+
+
+def webp_supported() -> bool:
+    """当前Pillow是否支持WebP编码"""
+    try:
+        from PIL import features
+        return bool(features.check('webp'))
+    except Exception:
+        return False
+
+
+class ThumbnailService:
+    """
+    缩略图生成与磁盘缓存
+
+    缓存文件: <cache_dir>/<键前两位>/<键>.<扩展名>，键由源文件绝对路径、修改时间、大小、宽度、格式和质量计算，
+    同一缩略图被并发请求时只生成一次。
+    """
+
+    def __init__(self, cache_dir: str, widths: Tuple[int, ...] = DEFAULT_WIDTHS, quality: int = 80,
+                 workers: int = 2, logger: Optional[Logger] = None):
+        """
+        Args:
+            cache_dir: 缩略图缓存目录（相对路径按当前工作目录解析）
+            widths: 宽度档位
+            quality: 编码质量
+            workers: 生成缩略图的进程数，0 表示在请求线程中生成
+            logger: 日志
+        """
+        # 转为绝对路径：send_file 会按应用目录（src/web）解析相对路径
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.widths = tuple(sorted(widths)) or DEFAULT_WIDTHS
+        self.quality = quality
+        self.workers = max(0, workers)
+        self.logger = logger or Logger("thumbnails")
+        self.webp = webp_supported()
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self.stats = {'hits': 0, 'generated': 0, 'errors': 0}
+
+    def snap_width(self, width: Optional[int]) -> int:
+        """请求的宽度取到不小于它的最近档位（超过最大档位时取最大档位）"""
+        if not width or width <= 0:
+            return self.widths[0]
+        for candidate in self.widths:
+            if candidate >= width:
+                return candidate
+        return self.widths[-1]
+
+    def choose_format(self, requested: Optional[str], accept: str = '') -> str:
+        """
+        输出格式：请求指定的格式优先，否则浏览器支持WebP时用WebP，其余用JPEG
+
+        Args:
+            requested: 请求参数中的格式（webp/jpeg/jpg）
+            accept: 请求的 Accept 头
+        """
+        requested = (requested or '').lower().replace('jpg', 'jpeg')
+        if requested == 'webp' and self.webp:
+            return 'webp'
+        if requested == 'jpeg':
+            return 'jpeg'
+        return 'webp' if self.webp and 'image/webp' in accept else 'jpeg'
+
+    def cache_key(self, source_path: str, width: int, fmt: str) -> str:
+        """缓存键（源文件被修改或替换后随之变化，同时用作ETag）"""
+        stat = os.stat(source_path)
+        raw = f"{os.path.abspath(source_path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{fmt}|{self.quality}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, source_path: str, width: int, fmt: str) -> Tuple[str, str, str]:
+        """
+        获取缩略图，没有缓存时生成
+
+        Args:
+            source_path: 源图片
+            width: 宽度（已取到档位）
+            fmt: 输出格式（webp/jpeg）
+
+        Returns:
+            Tuple[str, str, str]: (缩略图路径, MIME类型, 缓存键)
+        """
+        extension, pil_format, mimetype = FORMATS[fmt]
+        key = self.cache_key(source_path, width, fmt)
+        target_path = os.path.join(self.cache_dir, key[:2], key + extension)
+        if os.path.exists(target_path):
+            self.stats['hits'] += 1
+            return target_path, mimetype, key
+
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                future = self._submit(source_path, target_path, width, pil_format)
+                self._pending[key] = future
+        try:
+            future.result()
+        except Exception:
+            if owner:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            if owner:
+                with self._lock:
+                    self._pending.pop(key, None)
+        if owner:
+            self.stats['generated'] += 1
+        return target_path, mimetype, key
+
+    def _submit(self, source_path: str, target_path: str, width: int, pil_format: str) -> Future:
+        """提交到进程池；进程池不可用时在当前线程生成"""
+        args = (source_path, target_path, width, pil_format, self.quality)
+        pool = self._get_pool()
+        if pool is not None:
+            return pool.submit(render_thumbnail, *args)
+        future = Future()
+        try:
+            future.set_result(render_thumbnail(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """首次生成缩略图时创建进程池（spawn方式，子进程不继承Web进程的连接和补丁）"""
+        if not self.workers:
+            return None
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self.logger.info(f"[缩略图] 启动 {self.workers} 个生成进程")
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"[缩略图] 进程池不可用，改为在请求线程中生成: {str(e)}")
+                self.workers = 0
+                return None
+        return self._pool
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,99 @@
+"""
+测试公共夹具
+"""
+import os
+import sys
+import configparser
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from src.utils.config import Config  # noqa: E402
+from src.utils.logger import Logger, flush_logs  # noqa: E402
+
+
+def write_config(directory: str, overrides: dict = None) -> str:
+    """
+    复制 config/config.ini 到 <directory>/config/config.ini
+
+    Args:
+        directory: 目标目录
+        overrides: {section: {key: value}} 覆盖的配置项
+
+    Returns:
+        str: 配置文件路径
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(os.path.join(ROOT_DIR, 'config', 'config.ini'), encoding='utf-8')
+    for section, values in (overrides or {}).items():
+        if not parser.has_section(section):
+            parser.add_section(section)
+        for key, value in values.items():
+            parser.set(section, key, str(value))
+    config_dir = os.path.join(directory, 'config')
+    os.makedirs(config_dir, exist_ok=True)
+    config_path = os.path.join(config_dir, 'config.ini')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        parser.write(f)
+    return config_path
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    """在临时目录中运行（默认的 logs 等相对路径不写入仓库）"""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """生成临时配置，输出、临时和缓存目录都在 tmp_path 中"""
+    def factory(overrides: dict = None) -> Config:
+        merged = {'basic': {'output_dir': tmp_path / 'projects', 'temp_dir': tmp_path / 'temp',
+                            'cache_dir': tmp_path / 'cache'}}
+        for section, values in (overrides or {}).items():
+            merged.setdefault(section, {}).update(values)
+        return Config(write_config(str(tmp_path), merged))
+    return factory
+
+
+@pytest.fixture
+def logger(tmp_path):
+    logger = Logger('tests', str(tmp_path / 'logs'))
+    yield logger
+    flush_logs()
+
+
+@pytest.fixture(scope='session')
+def web_root(tmp_path_factory):
+    """Web应用的工作目录（配置中的相对路径 ./projects、./cache 等都在其中）"""
+    root = tmp_path_factory.mktemp('web')
+    write_config(str(root), {'jobs': {'resume_on_start': 'false'}})
+    return root
+
+
+@pytest.fixture(scope='session')
+def web_app(web_root):
+    """按默认配置创建的Web应用（整个测试会话共用）"""
+    from src.web import app as app_module
+
+    previous = os.getcwd()
+    os.chdir(web_root)
+    try:
+        app = app_module.create_app()
+    finally:
+        os.chdir(previous)
+    app.config['TESTING'] = True
+    yield app
+    if app_module.thumbnail_service is not None:
+        app_module.thumbnail_service.shutdown()
+    flush_logs()
+
+
+@pytest.fixture
+def client(web_app, web_root, monkeypatch):
+    """Web测试客户端（请求期间工作目录为 web_root，与按默认配置启动服务时一致）"""
+    monkeypatch.chdir(web_root)
+    return web_app.test_client()
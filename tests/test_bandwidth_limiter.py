@@ -0,0 +1,67 @@
+"""
+下载带宽限制测试
+"""
+import time
+
+from src.utils.bandwidth_limiter import BandwidthLimiter
+from src.core.steps.step1_download import YouTubeDownloader
+
+
+class RecordingLimiter(BandwidthLimiter):
+    """记录每次消耗的字节数"""
+
+    def __init__(self, rate_bytes_per_sec: float):
+        super().__init__(rate_bytes_per_sec)
+        self.consumed = []
+
+    def consume(self, nbytes: int) -> float:
+        self.consumed.append(nbytes)
+        return super().consume(nbytes)
+
+
+def test_limiter_waits_for_tokens():
+    limiter = BandwidthLimiter(10000)
+    assert limiter.consume(0) == 0.0
+    assert limiter.consume(10000) == 0.0
+    started = time.monotonic()
+    wait = limiter.consume(1000)
+    assert 0.05 < wait <= 0.11
+    assert time.monotonic() - started >= 0.05
+
+
+def test_disabled_limiter_never_waits():
+    limiter = BandwidthLimiter(0)
+    assert not limiter.enabled
+    assert limiter.consume(10 ** 9) == 0.0
+
+
+def test_progress_hook_consumes_only_new_bytes(make_config, logger):
+    downloader = YouTubeDownloader(make_config({'step1_download': {'max_bandwidth_mb': 1}}), logger)
+    downloader.download_start_time = time.time()
+    downloader.bandwidth_limiter = RecordingLimiter(1024 * 1024 * 1024)
+
+    def hook(filename, downloaded_bytes):
+        downloader._progress_hook({'status': 'downloading', 'filename': filename,
+                                   'downloaded_bytes': downloaded_bytes, 'total_bytes': 1000})
+
+    # 重复回调（字节数不变）不消耗令牌；字节数变小时（重试）从0开始计算；每个文件单独计数
+    for filename, downloaded_bytes in [('a.mp4', 100), ('a.mp4', 100), ('a.mp4', 300), ('a.mp4', 300),
+                                       ('a.m4a', 40), ('a.mp4', 50), ('a.mp4', 80), ('a.m4a', 40)]:
+        hook(filename, downloaded_bytes)
+    assert downloader.bandwidth_limiter.consumed == [100, 0, 200, 0, 40, 50, 30, 0]
+
+    downloader._progress_hook({'status': 'finished', 'filename': 'a.mp4'})
+    assert 'a.mp4' not in downloader._downloaded_bytes
+
+
+def test_repeated_progress_does_not_stall_download(make_config, logger):
+    downloader = YouTubeDownloader(make_config({'step1_download': {'max_bandwidth_mb': 1}}), logger)
+    downloader.download_start_time = time.time()
+    downloader.bandwidth_limiter = BandwidthLimiter(1024 * 1024)
+
+    started = time.monotonic()
+    for _ in range(20):
+        downloader._progress_hook({'status': 'downloading', 'filename': 'a.mp4',
+                                   'downloaded_bytes': 512 * 1024, 'total_bytes': 1024 * 1024})
+    # 只有首次回调的 512KB 消耗令牌，在突发量以内
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,56 @@
+"""
+Blob存储测试：多个进程共享缓存目录时引用表不丢失引用
+"""
+import json
+import multiprocessing
+
+import pytest
+
+from src.utils.blob_store import BlobStore
+from src.utils.logger import Logger
+
+PROCESSES = 4
+LINKS = 50
+
+
+def materialize_links(root_dir: str, digest: str, out_dir: str, worker: int) -> None:
+    store = BlobStore(root_dir, Logger('blob_store_test', f'{out_dir}/logs'))
+    for i in range(LINKS):
+        store.materialize(digest, f'{out_dir}/{worker}/{i}.mp4')
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='需要fork')
+def test_concurrent_processes_keep_all_refs(tmp_path):
+    root_dir = str(tmp_path / 'blobs')
+    source = tmp_path / 'video.mp4'
+    source.write_bytes(b'video' * 1000)
+    store = BlobStore(root_dir, Logger('blob_store_test', str(tmp_path / 'logs')))
+    digest = store.put(str(source))
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=materialize_links, args=(root_dir, digest, str(tmp_path / 'out'), worker))
+                 for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    with open(store.refs_file, 'r', encoding='utf-8') as f:
+        refs = json.load(f)[digest]['refs']
+    # 源文件 + 每个进程物化的全部文件
+    assert len(refs) == PROCESSES * LINKS + 1
+    assert store.refcount(digest) == PROCESSES * LINKS + 1
+
+
+def test_nested_operations_reuse_the_lock(tmp_path):
+    store = BlobStore(str(tmp_path / 'blobs'), Logger('blob_store_test', str(tmp_path / 'logs')))
+    first, second = tmp_path / 'a.mp4', tmp_path / 'b.mp4'
+    first.write_bytes(b'same')
+    second.write_bytes(b'same')
+
+    # 第二次 put 在持有锁时调用 materialize，锁可重入
+    digest = store.put(str(first))
+    assert store.put(str(second)) == digest
+    assert store.refcount(digest) == 2
+    assert store._lock_depth == 0 and store._lock_handle is None
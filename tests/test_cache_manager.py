@@ -0,0 +1,87 @@
+"""
+缓存预算淘汰和共享Blob测试
+"""
+import os
+
+import pytest
+
+from src.utils.cache_manager import CacheManager
+
+MB = 1024 * 1024
+
+
+def video_url(i: int) -> str:
+    return f'https://www.youtube.com/watch?v=video{i:06d}'
+
+
+def write_video(directory, name: str, content: bytes) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+@pytest.mark.parametrize('policy', ['lru', 'lfu'])
+def test_budget_enforced_when_new_entry_sorts_first(tmp_path, make_config, logger, policy):
+    config = make_config({'cache': {'video_budget_mb': 2, 'eviction_policy': policy}})
+    manager = CacheManager(config, logger)
+    for i in range(4):
+        path = write_video(tmp_path / 'downloads' / str(i), 'video.mp4', bytes([i]) * MB)
+        manager.cache_video(video_url(i), path, {'title': str(i)})
+        # 已有条目都被命中过，LFU下刚写入的条目排在最前
+        manager.get_cached_video(video_url(i))
+
+    stats = manager.get_cache_stats()['videos']
+    assert stats['size'] <= 2 * MB
+    assert stats['count'] == 2
+    assert [manager.has_cached_video(video_url(i)) for i in range(4)] == [False, False, True, True]
+
+
+def test_shared_blob_counted_once_and_kept_until_last_reference(tmp_path, make_config, logger):
+    manager = CacheManager(make_config(), logger)
+    content = b'\x01' * MB
+    for i in range(2):
+        path = write_video(tmp_path / 'downloads' / str(i), 'video.mp4', content)
+        manager.cache_video(video_url(i), path, {})
+
+    stats = manager.get_cache_stats()['videos']
+    assert stats == {'count': 2, 'size': MB}
+
+    first = manager.index.get('video', manager._get_url_hash(video_url(0)))
+    blob_hash = first['info']['blob_hash']
+    manager._remove_entry(first)
+    assert manager.blob_store.has_blob(blob_hash)
+    assert manager.has_cached_video(video_url(1))
+    assert manager.get_cache_stats()['videos'] == {'count': 1, 'size': MB}
+
+    manager._remove_entry(manager.index.get('video', manager._get_url_hash(video_url(1))))
+    assert not manager.blob_store.has_blob(blob_hash)
+    assert manager.get_cache_stats()['videos'] == {'count': 0, 'size': 0}
+
+
+def test_budget_counts_shared_blob_once(tmp_path, make_config, logger):
+    config = make_config({'cache': {'video_budget_mb': 1, 'eviction_policy': 'lfu'}})
+    manager = CacheManager(config, logger)
+    content = b'\x02' * MB
+    for i in range(3):
+        path = write_video(tmp_path / 'downloads' / str(i), 'video.mp4', content)
+        manager.cache_video(video_url(i), path, {})
+
+    assert all(manager.has_cached_video(video_url(i)) for i in range(3))
+    assert manager.get_cache_stats()['videos'] == {'count': 3, 'size': MB}
+
+
+def test_totals_rebuilt_for_old_index(tmp_path, make_config, logger):
+    manager = CacheManager(make_config(), logger)
+    content = b'\x03' * MB
+    for i in range(2):
+        path = write_video(tmp_path / 'downloads' / str(i), 'video.mp4', content)
+        manager.cache_video(video_url(i), path, {})
+    # 模拟旧版本索引：汇总表按条目重复计算了共享Blob
+    manager.index._conn.execute("UPDATE kind_totals SET size = ? WHERE kind = 'video'", (2 * MB,))
+    manager.index.set_meta('totals_version', '1')
+    manager.index.close()
+
+    reopened = CacheManager(make_config(), logger)
+    assert reopened.get_cache_stats()['videos'] == {'count': 2, 'size': MB}
@@ -0,0 +1,107 @@
+"""
+任务取消测试：取消回调、run_cancellable 结束子进程树
+"""
+import os
+import sys
+import time
+import threading
+import subprocess
+
+import pytest
+
+from src.utils.cancellation import CancellationToken, JobCancelled, run_cancellable
+
+SLEEP = [sys.executable, '-c', 'import time; time.sleep(30)']
+
+
+def test_cancel_runs_callbacks_once():
+    token = CancellationToken()
+    calls = []
+    with token.on_cancel(lambda: calls.append('registered')):
+        assert token.cancel('user')
+        assert not token.cancel('again')
+    assert calls == ['registered']
+    assert token.cancelled and token.reason == 'user'
+    assert token.wait(0)
+
+    # 已取消后注册的回调立即执行
+    with token.on_cancel(lambda: calls.append('late')):
+        pass
+    assert calls == ['registered', 'late']
+
+    with pytest.raises(JobCancelled) as info:
+        token.raise_if_cancelled()
+    assert info.value.reason == 'user'
+
+
+def test_callbacks_are_unregistered_after_block():
+    token = CancellationToken()
+    calls = []
+    with token.on_cancel(lambda: calls.append('inside')):
+        pass
+    token.cancel()
+    assert calls == []
+
+
+def test_run_cancellable_kills_process_on_cancel():
+    token = CancellationToken()
+    timer = threading.Timer(0.3, token.cancel, args=('user',))
+    started = time.monotonic()
+    timer.start()
+    try:
+        with pytest.raises(JobCancelled):
+            run_cancellable(SLEEP, token=token)
+    finally:
+        timer.cancel()
+    assert time.monotonic() - started < 10
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='通过 /proc 检查子孙进程')
+def test_run_cancellable_kills_grandchildren(tmp_path):
+    pid_file = tmp_path / 'grandchild.pid'
+    script = ('import subprocess, sys, time\n'
+              f'child = subprocess.Popen({SLEEP!r})\n'
+              f'open({str(pid_file)!r}, "w").write(str(child.pid))\n'
+              'child.wait()\n')
+    token = CancellationToken()
+
+    def cancel_when_started():
+        while not pid_file.exists() or not pid_file.read_text():
+            time.sleep(0.02)
+        token.cancel('user')
+
+    watcher = threading.Thread(target=cancel_when_started, daemon=True)
+    watcher.start()
+    with pytest.raises(JobCancelled):
+        run_cancellable([sys.executable, '-c', script], token=token)
+    watcher.join(5)
+
+    grandchild = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and _alive(grandchild):
+        time.sleep(0.05)
+    assert not _alive(grandchild)
+
+
+def test_run_cancellable_refuses_to_start_when_cancelled():
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(JobCancelled):
+        run_cancellable([sys.executable, '-c', 'raise SystemExit(3)'], token=token)
+
+
+def test_run_cancellable_timeout_and_output():
+    result = run_cancellable([sys.executable, '-c', 'print("ok")'], token=CancellationToken(),
+                             capture_output=True, text=True)
+    assert result.returncode == 0 and result.stdout.strip() == 'ok'
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_cancellable(SLEEP, timeout=0.3)
+
+
+def _alive(pid: int) -> bool:
+    """进程是否仍在运行（僵尸进程视为已结束）"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            return f.read().split(')')[-1].split()[0] != 'Z'
+    except OSError:
+        return False
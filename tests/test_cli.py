@@ -0,0 +1,21 @@
+"""
+命令行批处理测试：未指定 --report 时标准输出只包含JSON报告
+"""
+import json
+
+from src.cli import main
+
+
+def test_batch_report_on_stdout_logs_on_stderr(tmp_path, make_config, capsys):
+    make_config({'jobs': {'resume_on_start': 'false'}})
+    inputs = tmp_path / 'inputs.txt'
+    inputs.write_text(f"{tmp_path / 'missing.mp4'}\n", encoding='utf-8')
+
+    exit_code = main(['batch', str(inputs), '--config', str(tmp_path / 'config' / 'config.ini')])
+    captured = capsys.readouterr()
+
+    assert exit_code == 1
+    report = json.loads(captured.out)
+    assert report['summary']['total'] == 1
+    assert report['summary']['failed'] == 1
+    assert '[批处理] 完成' in captured.err
@@ -0,0 +1,69 @@
+"""
+文件预览API测试：预览窗口和路径校验
+"""
+import pytest
+
+from src.utils.file_preview import srt_cues
+
+PROJECT = '20240102_000000_preview'
+
+SRT = ''.join(f'{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\nline {i}\n\n' for i in range(1, 31))
+
+
+@pytest.fixture(scope='module')
+def project(web_root):
+    """输出目录中的一个项目（含字幕和长文本）"""
+    project_path = web_root / 'projects' / PROJECT
+    step2_dir = project_path / 'step2_transcribe'
+    step2_dir.mkdir(parents=True, exist_ok=True)
+    (step2_dir / 'subtitles.srt').write_text(SRT, encoding='utf-8')
+    (step2_dir / 'notes.txt').write_text(''.join(f'row {i}\n' for i in range(1000)), encoding='utf-8')
+    return project_path
+
+
+@pytest.mark.parametrize('url', [
+    # 项目名为 ..
+    '/api/file_preview/%2E%2E/config/config.ini',
+    '/api/file_preview/%2e%2e/config/config.ini?mode=tail',
+    # 步骤目录为 ..
+    f'/api/file_preview/{PROJECT}/%2E%2E/%2E%2E/config/config.ini',
+    f'/api/file_preview/{PROJECT}/%2E%2E/step2_transcribe/notes.txt',
+    # 文件名中的 ..
+    f'/api/file_preview/{PROJECT}/step2_transcribe/%2E%2E/%2E%2E/%2E%2E/config/config.ini',
+    f'/api/file_preview/{PROJECT}/step2_transcribe/..%2F..%2F..%2Fconfig/config.ini',
+])
+def test_preview_rejects_paths_outside_project(client, project, url):
+    response = client.get(url)
+    assert response.status_code in (403, 404)
+    assert b'[basic]' not in response.data
+    assert b'row 0' not in response.data
+
+
+def test_preview_head_and_tail(client, project):
+    head = client.get(f'/api/file_preview/{PROJECT}/step2_transcribe/notes.txt?lines=3').get_json()
+    assert head['success'] and head['content'] == 'row 0\nrow 1\nrow 2\n'
+    assert head['file_size'] == (project / 'step2_transcribe' / 'notes.txt').stat().st_size
+
+    tail = client.get(f'/api/file_preview/{PROJECT}/step2_transcribe/notes.txt?mode=tail&lines=2').get_json()
+    assert tail['content'] == 'row 998\nrow 999\n'
+
+
+def test_preview_srt_window(client, project):
+    preview = client.get(f'/api/file_preview/{PROJECT}/step2_transcribe/subtitles.srt?mode=srt&limit=5').get_json()
+    assert preview['success']
+    assert 'line 5' in preview['content'] and 'line 6' not in preview['content']
+
+
+@pytest.mark.parametrize('trailing', ['', '\n', '\n\n'])
+def test_srt_cues_truncated_at_end_of_file(tmp_path, trailing):
+    srt = tmp_path / 'two.srt'
+    srt.write_text('1\n00:00:01,000 --> 00:00:02,000\nfirst\n\n'
+                   f'2\n00:00:03,000 --> 00:00:04,000\nsecond{trailing}', encoding='utf-8')
+
+    one = srt_cues(str(srt), limit=1)
+    assert [cue['text'] for cue in one['cues']] == ['first']
+    assert one['truncated']
+
+    both = srt_cues(str(srt), limit=2)
+    assert [cue['text'] for cue in both['cues']] == ['first', 'second']
+    assert not both['truncated']
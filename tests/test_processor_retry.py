@@ -0,0 +1,49 @@
+"""
+按步骤重试测试：重试参数解析和步骤4的输入指纹
+"""
+import os
+
+import pytest
+
+from src.core.processor import YouTubeToArticleProcessor
+from src.utils.step_fingerprint import StepFingerprints
+
+
+def test_step4_inputs_include_screenshot_index(tmp_path, make_config):
+    processor = YouTubeToArticleProcessor(config=make_config({'jobs': {'resume_on_start': 'false'}}))
+    project_path = str(tmp_path / 'projects' / 'demo')
+    step3_dir = os.path.join(project_path, 'step3_screenshots')
+    os.makedirs(os.path.join(step3_dir, 'screenshots'))
+    index_file = os.path.join(step3_dir, 'screenshot_index.json')
+
+    def step4_inputs():
+        return processor._step_inputs(4, StepFingerprints(project_path), 'url', project_path,
+                                      {'transcribe_language': 'en'})
+
+    with open(index_file, 'w', encoding='utf-8') as f:
+        f.write('[{"subtitle_index": 1, "is_duplicate": false}]')
+    before = step4_inputs()
+    with open(index_file, 'w', encoding='utf-8') as f:
+        f.write('[{"subtitle_index": 1, "is_duplicate": true}]')
+    after = step4_inputs()
+
+    assert before['screenshot_index'] and after['screenshot_index']
+    assert before['screenshot_index'] != after['screenshot_index']
+
+
+@pytest.mark.parametrize('force, expected', [
+    (None, True), (True, True), (False, False), ('false', False), ('0', False), ('no', False),
+    ('true', True), ('1', True), ('yes', True),
+])
+def test_retry_step_parses_force(client, monkeypatch, force, expected):
+    from src.web import app as app_module
+
+    calls = []
+    monkeypatch.setattr(app_module.processor, 'retry_from_step',
+                        lambda project_name, step, force: calls.append(force) or {'success': True})
+    payload = {'project_name': 'demo', 'step': 4}
+    if force is not None:
+        payload['force'] = force
+    response = client.post('/api/process/retry_step', json=payload)
+    assert response.status_code == 200
+    assert calls == [expected]
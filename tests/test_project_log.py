@@ -0,0 +1,62 @@
+"""
+项目日志测试：任务结束后关闭文件句柄、多进程同时写入时索引保持一致
+"""
+import multiprocessing
+
+import pytest
+
+from src.utils import project_log
+from src.utils.logger import Logger, flush_logs, release_project_log
+from src.utils.project_log import ProjectLogSink, read_project_log, iter_project_log
+from src.utils.tracing import get_tracer
+
+PROCESSES = 4
+RECORDS = 200
+
+
+def test_release_closes_handles_after_pending_records(tmp_path):
+    project_path = str(tmp_path / 'project')
+    logger = Logger('project_log_test', str(tmp_path / 'logs'))
+    with get_tracer().trace(project_path, 'job-1'):
+        for i in range(50):
+            logger.info("记录 %d", i)
+    release_project_log(project_path)
+    assert flush_logs()
+
+    assert project_path not in project_log._sink._open
+    result = read_project_log(project_path, limit=100)
+    assert [record['message'] for record in result['records']] == [f'记录 {i}' for i in range(50)]
+
+
+def write_records(project_path: str, worker: int) -> None:
+    sink = ProjectLogSink()
+    for i in range(RECORDS):
+        level = 'ERROR' if i % 10 == 0 else 'INFO'
+        sink.write(project_path, {'level': level, 'step': i % 5 + 1, 'message': f'{worker}-{i}' + 'x' * (i % 37)})
+    sink.close()
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='需要fork')
+def test_concurrent_processes_keep_index_consistent(tmp_path):
+    project_path = str(tmp_path / 'project')
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=write_records, args=(project_path, worker)) for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    records = list(iter_project_log(project_path))
+    expected = {f'{worker}-{i}' + 'x' * (i % 37) for worker in range(PROCESSES) for i in range(RECORDS)}
+    assert len(records) == PROCESSES * RECORDS
+    assert {record['message'] for record in records} == expected
+
+    # 按步骤和级别过滤时，每个偏移都指向对应的记录
+    for step in range(1, 6):
+        step_records = list(iter_project_log(project_path, step=step))
+        assert len(step_records) == PROCESSES * RECORDS // 5
+        assert all(record['step'] == step for record in step_records)
+    errors = list(iter_project_log(project_path, level='ERROR'))
+    assert len(errors) == PROCESSES * RECORDS // 10
+    assert all(record['level'] == 'ERROR' for record in errors)
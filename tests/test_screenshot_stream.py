@@ -0,0 +1,88 @@
+"""
+流式截图测试：步骤2逐条回调字幕段，步骤3的流式会话按截图计划提取截图
+"""
+import os
+import sys
+import stat
+
+import pytest
+
+from src.utils.capabilities import get_capabilities
+from src.utils.transcript import Transcript
+from src.core.steps.step2_transcribe import AudioTranscriber
+from src.core.steps.step3_screenshots import VideoScreenshot, ScreenshotPlanner
+
+FAKE_FFMPEG = '''#!{python}
+import sys
+args = sys.argv[1:]
+if '-version' in args:
+    print('ffmpeg version fake')
+    sys.exit(0)
+with open(args[-1], 'w') as f:
+    f.write(args[args.index('-ss') + 1])
+'''
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """PATH 中放一个把 -ss 时间写入输出文件的 ffmpeg"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = bin_dir / 'ffmpeg'
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    get_capabilities().tool('ffmpeg', refresh=True)
+    yield script
+    monkeypatch.undo()
+    get_capabilities().tool('ffmpeg', refresh=True)
+
+
+def window(starts):
+    """一个窗口的 Whisper 字幕段（时间相对窗口起点）"""
+    return [{'id': i, 'start': start, 'end': start + duration, 'text': f' segment {i}'}
+            for i, (start, duration) in enumerate(starts)]
+
+
+def test_stream_extracts_planned_screenshots(tmp_path, make_config, logger, fake_ffmpeg):
+    config = make_config({'step3_screenshots': {'min_capture_interval': 4, 'max_captures_per_minute': 10,
+                                                'merge_short_segments': 1.5, 'time_offsets': '0.0'}})
+    video_path = tmp_path / 'video.mp4'
+    video_path.write_bytes(b'video')
+    output_dir = tmp_path / 'step3_screenshots'
+
+    transcriber = AudioTranscriber(config, logger)
+    screenshot = VideoScreenshot(config, logger)
+    stream = screenshot.open_stream(str(video_path), str(output_dir))
+
+    segments = []
+    first = window([(i * 2.5, 2.0) for i in range(40)] + [(100.0, 0.8), (100.9, 0.6)])
+    second = window([(0.123 + i * 3.0, 2.9) for i in range(30)])
+    transcriber._emit_window_segments(first, 0.0, segments, stream.submit_segment)
+    transcriber._emit_window_segments(second, 300.0, segments, stream.submit_segment)
+    stats = stream.close()
+
+    # 与非流式模式使用同一截图计划
+    transcript = Transcript.from_segments(segments)
+    planned = ScreenshotPlanner.from_config(config).plan(transcript)
+    assert 0 < len(planned) < len(segments)
+    assert stats == {'submitted': len(planned), 'extracted': len(planned), 'cancelled': 0}
+
+    screenshots_dir = output_dir / 'screenshots'
+    expected = {screenshot._screenshot_filename(i, 0.0): transcript.segment(i - 1).start for i in planned}
+    assert set(os.listdir(screenshots_dir)) == set(expected)
+    for filename, start in expected.items():
+        assert float((screenshots_dir / filename).read_text()) == pytest.approx(start, abs=1e-6)
+
+
+def test_closed_stream_ignores_late_segments(tmp_path, make_config, logger, fake_ffmpeg):
+    config = make_config({'step3_screenshots': {'min_capture_interval': 0, 'max_captures_per_minute': 0,
+                                                'merge_short_segments': 0, 'time_offsets': '0.0'}})
+    video_path = tmp_path / 'video.mp4'
+    video_path.write_bytes(b'video')
+    stream = VideoScreenshot(config, logger).open_stream(str(video_path), str(tmp_path / 'out'))
+
+    stream.submit_segment(1, {'start': 1.0, 'end': 2.0, 'text': 'a'})
+    assert stream.close()['extracted'] == 1
+    stream.submit_segment(2, {'start': 3.0, 'end': 4.0, 'text': 'b'})
+    assert os.listdir(tmp_path / 'out' / 'screenshots') == ['001_plus0.0s.png']
@@ -0,0 +1,108 @@
+"""
+任务队列测试：按能力领取、租约过期后由其他工作进程接管、续租、取消
+"""
+import time
+
+import pytest
+
+from src.core.task_queue import (SQLiteTaskQueue, TASK_CANCELLED, TASK_CLAIMED, TASK_COMPLETED,
+                                 TASK_FAILED, TASK_PENDING)
+from src.utils.logger import Logger
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+    logger = Logger('task_queue_test', str(tmp_path / 'logs'))
+
+    def make(**kwargs):
+        queue = SQLiteTaskQueue(str(tmp_path / 'queue' / 'tasks.db'), logger, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def test_claim_matches_capabilities_and_is_exclusive(make_queue):
+    queue = make_queue()
+    transcribe = queue.enqueue('demo', 2, {'step': 2})
+    summarize = queue.enqueue('demo', 4, {'step': 4})
+
+    # 没有 whisper 能力的工作进程跳过步骤2，领取步骤4
+    task = queue.claim('cpu-worker', [])
+    assert task['task_id'] == summarize
+    assert task['status'] == TASK_CLAIMED and task['attempts'] == 1
+    assert queue.claim('cpu-worker-2', []) is None
+
+    task = queue.claim('gpu-worker', ['whisper'])
+    assert task['task_id'] == transcribe
+    assert task['payload'] == {'step': 2}
+
+    assert queue.finish(summarize, 'cpu-worker', True, 'ok')
+    assert queue.get_task(summarize)['status'] == TASK_COMPLETED
+    # 非领取者结束任务无效
+    assert not queue.finish(transcribe, 'cpu-worker', False)
+    assert queue.get_task(transcribe)['status'] == TASK_CLAIMED
+
+
+def test_expired_lease_is_reclaimed_until_max_attempts(make_queue):
+    queue = make_queue(lease_seconds=0.05, max_attempts=2)
+    task_id = queue.enqueue('demo', 4, {})
+
+    assert queue.claim('worker-a', [])['task_id'] == task_id
+    time.sleep(0.1)
+    task = queue.claim('worker-b', [])
+    assert task['task_id'] == task_id
+    assert task['worker_id'] == 'worker-b' and task['attempts'] == 2
+    # 原工作进程的租约已被接管，续租和结束都不再生效
+    assert not queue.heartbeat(task_id, 'worker-a')
+    assert not queue.finish(task_id, 'worker-a', True)
+    assert queue.get_task(task_id)['status'] == TASK_CLAIMED
+
+    time.sleep(0.1)
+    assert queue.claim('worker-c', []) is None
+    assert queue.get_task(task_id)['status'] == TASK_FAILED
+
+
+def test_heartbeat_extends_lease(make_queue):
+    queue = make_queue(lease_seconds=0.3)
+    task_id = queue.enqueue('demo', 4, {})
+    queue.claim('worker-a', [])
+
+    for _ in range(3):
+        time.sleep(0.15)
+        assert queue.heartbeat(task_id, 'worker-a')
+    assert queue.claim('worker-b', []) is None
+    assert queue.get_task(task_id)['worker_id'] == 'worker-a'
+
+
+def test_claim_from_second_connection_does_not_duplicate(make_queue):
+    first, second = make_queue(), make_queue()
+    task_ids = {first.enqueue('demo', 4, {'i': i}) for i in range(5)}
+
+    claimed = []
+    for i in range(5):
+        queue = first if i % 2 else second
+        claimed.append(queue.claim(f'worker-{i}', [])['task_id'])
+    assert sorted(claimed) == sorted(task_ids)
+    assert first.claim('worker-x', []) is None
+
+
+def test_cancel_stops_pending_and_claimed_tasks(make_queue):
+    queue = make_queue()
+    claimed = queue.enqueue('demo', 4, {})
+    pending = queue.enqueue('demo', 5, {})
+    other = queue.enqueue('other', 5, {})
+    queue.claim('worker-a', [])
+
+    assert queue.cancel('demo') == 2
+    assert queue.get_task(claimed)['status'] == TASK_CANCELLED
+    assert queue.get_task(pending)['status'] == TASK_CANCELLED
+    assert queue.get_task(other)['status'] == TASK_PENDING
+    # 已取消的任务不会被续租、结束或再次领取
+    assert not queue.heartbeat(claimed, 'worker-a')
+    assert not queue.finish(claimed, 'worker-a', True)
+    assert queue.get_task(claimed)['status'] == TASK_CANCELLED
+    assert queue.claim('worker-b', [])['task_id'] == other
@@ -0,0 +1,103 @@
+"""
+项目文件路由测试：/media、/thumb、/api/download 及按项目名读取目录的接口只能访问输出目录下的项目
+"""
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from src.web.thumbnails import webp_supported
+
+PROJECT = '20240101_000000_demo'
+SCREENSHOT = 'step3_screenshots/screenshots/001_plus0.0s.png'
+
+TRAVERSAL_URLS = [
+    '/media/%2e%2e/config/config.ini',
+    '/media/..%2Fconfig/config.ini',
+    f'/media/{PROJECT}/%2e%2e/%2e%2e/config/config.ini',
+    '/thumb/%2e%2e/config/config.ini',
+    '/api/download/%2e%2e/config/config.ini',
+    f'/api/download/{PROJECT}/%2e%2e/%2e%2e/config/config.ini',
+]
+
+# 项目名为 .. 时指向输出目录的上一级
+PROJECT_DIR_URLS = [
+    '/api/step_files/%2e%2e/1',
+    '/api/step_status/%2e%2e/1',
+    '/api/trace/%2e%2e',
+    '/api/logs/%2e%2e',
+    '/api/logs/export/%2e%2e',
+    '/results/%2e%2e',
+]
+
+
+@pytest.fixture(scope='module')
+def project(web_root):
+    """输出目录中的一个项目（含一张截图）"""
+    project_path = web_root / 'projects' / PROJECT
+    screenshot = project_path / SCREENSHOT
+    screenshot.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (1280, 720), (200, 30, 30)).save(screenshot)
+    return project_path
+
+
+@pytest.mark.parametrize('url', TRAVERSAL_URLS)
+def test_files_outside_project_rejected(client, project, url):
+    response = client.get(url)
+    assert response.status_code == 404
+    assert b'[basic]' not in response.data
+
+
+@pytest.mark.parametrize('url', PROJECT_DIR_URLS)
+def test_project_directories_outside_output_rejected(client, web_root, project, url):
+    secret = web_root / 'step1_download' / 'secret.txt'
+    secret.parent.mkdir(exist_ok=True)
+    secret.write_text('secret', encoding='utf-8')
+
+    response = client.get(url)
+    assert response.status_code == 404
+    assert b'secret' not in response.data
+    # 目录清单不能写到输出目录之外
+    assert not (web_root / '.manifests').exists()
+
+
+def test_media_serves_project_file_with_ranges(client, project):
+    response = client.get(f'/media/{PROJECT}/{SCREENSHOT}')
+    assert response.status_code == 200
+    assert response.data == (project / SCREENSHOT).read_bytes()
+
+    partial = client.get(f'/media/{PROJECT}/{SCREENSHOT}', headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206
+    assert partial.data == (project / SCREENSHOT).read_bytes()[:10]
+
+
+@pytest.mark.parametrize('fmt, mimetype, pil_format', [
+    ('jpeg', 'image/jpeg', 'JPEG'),
+    pytest.param('webp', 'image/webp', 'WEBP',
+                 marks=pytest.mark.skipif(not webp_supported(), reason='Pillow不支持WebP')),
+])
+def test_thumbnail_generated_and_cached(client, web_root, project, fmt, mimetype, pil_format):
+    url = f'/thumb/{PROJECT}/{SCREENSHOT}?w=300&format={fmt}'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    with Image.open(io.BytesIO(response.data)) as img:
+        assert img.format == pil_format
+        assert img.width == 320
+
+    # 缩略图缓存在工作目录下的 cache/thumbnails（默认配置），再次请求按ETag返回304
+    cached = [name for _, _, files in os.walk(web_root / 'cache' / 'thumbnails') for name in files]
+    assert cached
+    again = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_download_project_file(client, project):
+    response = client.get(f'/api/download/{PROJECT}/{SCREENSHOT}')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].startswith('attachment')
+
+
+def test_thumbnail_missing_source(client, project):
+    assert client.get(f'/thumb/{PROJECT}/step3_screenshots/screenshots/missing.png').status_code == 404
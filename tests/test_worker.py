@@ -0,0 +1,91 @@
+"""
+工作进程测试：租约被接管后停止执行且不重复入队后续步骤，续租异常不会结束心跳线程
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from src.core.task_queue import SQLiteTaskQueue, TASK_CLAIMED
+from src.core.worker import StepWorker
+from src.utils.cancellation import JobCancelled
+
+
+@pytest.fixture
+def make_worker(tmp_path, make_config, logger):
+    queues = []
+
+    def make(lease_seconds: float) -> StepWorker:
+        make_config({'jobs': {'resume_on_start': 'false'},
+                     'distributed': {'poll_interval': '0.05', 'lease_seconds': '3'}})
+        queue = SQLiteTaskQueue(str(tmp_path / 'queue' / 'tasks.db'), logger, lease_seconds=lease_seconds)
+        queues.append(queue)
+        return StepWorker(str(tmp_path / 'config' / 'config.ini'), worker_id='worker-a',
+                          capabilities=[], task_queue=queue)
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def wait_for_cancel(worker: StepWorker, timeout: float = 10) -> None:
+    """模拟耗时步骤：等待当前任务被取消"""
+    token = worker.processor.job_manager.current_job().cancel_token
+    token.wait(timeout)
+    token.raise_if_cancelled()
+
+
+def test_lease_takeover_cancels_step_and_skips_next_enqueue(make_worker):
+    worker = make_worker(lease_seconds=0.2)
+    queue = worker.task_queue
+    task_id = queue.enqueue('demo', 4, {'url': 'https://example.com/v'})
+    task = queue.claim('worker-a', [])
+    observed = {}
+
+    def run_step(*args, **kwargs):
+        # 租约过期后由其他工作进程接管
+        threading.Event().wait(0.4)
+        observed['taken_over'] = queue.claim('worker-b', [])
+        try:
+            wait_for_cancel(worker)
+        except JobCancelled as e:
+            observed['cancelled'] = e.reason
+            raise
+        return True
+
+    worker.processor.run_step = run_step
+    assert worker.run_task(task) is False
+
+    assert observed['taken_over']['task_id'] == task_id
+    assert observed['cancelled'] == 'lease lost'
+    current = queue.get_task(task_id)
+    assert current['status'] == TASK_CLAIMED and current['worker_id'] == 'worker-b'
+    # 后续步骤由接管的工作进程入队
+    assert [t['task_id'] for t in queue.list_tasks()] == [task_id]
+
+
+def test_heartbeat_survives_queue_errors(make_worker):
+    worker = make_worker(lease_seconds=30)
+    queue = worker.task_queue
+    queue.enqueue('demo', 4, {'url': 'https://example.com/v'})
+    task = queue.claim('worker-a', [])
+    calls = []
+    renew = queue.heartbeat
+
+    def flaky_heartbeat(task_id, worker_id):
+        calls.append(task_id)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        return renew(task_id, worker_id)
+
+    def run_step(*args, **kwargs):
+        # 第一次续租失败后心跳线程仍在运行，第二次续租成功
+        while len(calls) < 2:
+            threading.Event().wait(0.05)
+        return True
+
+    queue.heartbeat = flaky_heartbeat
+    worker.processor.run_step = run_step
+    assert worker.run_task(task) is True
+    next_tasks = [t for t in queue.list_tasks() if t['step'] == 5]
+    assert len(next_tasks) == 1